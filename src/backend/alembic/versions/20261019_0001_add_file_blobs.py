@@ -0,0 +1,51 @@
+"""Add content-addressable file_blobs table.
+
+Uploads and knowledge documents are stored once per SHA-256 digest.
+user_files and knowledge_sources reference blobs via blob_sha256;
+existing rows keep their legacy per-user paths (blob_sha256 NULL).
+
+Revision ID: 20261019_0001
+Revises: 20260216_0002
+Create Date: 2026-10-19 00:01:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261019_0001'
+down_revision = '20260216_0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create file_blobs and add blob_sha256 references."""
+    op.create_table(
+        'file_blobs',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('sha256', sa.String(64), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('storage_path', sa.String(500), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index('ix_file_blobs_sha256', 'file_blobs', ['sha256'], unique=True)
+
+    op.add_column('user_files', sa.Column('blob_sha256', sa.String(64), nullable=True))
+    op.create_index('ix_user_files_blob_sha256', 'user_files', ['blob_sha256'])
+
+    op.add_column('knowledge_sources', sa.Column('blob_sha256', sa.String(64), nullable=True))
+    op.create_index('ix_knowledge_sources_blob_sha256', 'knowledge_sources', ['blob_sha256'])
+
+
+def downgrade() -> None:
+    """Drop file_blobs and blob_sha256 references."""
+    op.drop_index('ix_knowledge_sources_blob_sha256', table_name='knowledge_sources')
+    op.drop_column('knowledge_sources', 'blob_sha256')
+    op.drop_index('ix_user_files_blob_sha256', table_name='user_files')
+    op.drop_column('user_files', 'blob_sha256')
+    op.drop_index('ix_file_blobs_sha256', table_name='file_blobs')
+    op.drop_table('file_blobs')
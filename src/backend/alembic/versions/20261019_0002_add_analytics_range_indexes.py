@@ -0,0 +1,46 @@
+"""Add indexes for index-friendly analytics date ranges
+
+Revision ID: 20261019_0002
+Revises: 20261019_0001
+Create Date: 2026-10-19 00:02:00.000000
+
+Analytics queries now filter on half-open created_at ranges instead of
+formatted date strings, so these indexes can serve them:
+- (created_at) on messages for cross-user range scans (rollups, exports);
+  per-user scans use ix_conversations_user_created joined to
+  ix_messages_conversation_created
+- (user_id, updated_at) on conversations for the recent-activity list
+
+ix_conversations_user_created, ix_workflows_user_created and
+ix_agent_components_user_created already exist (20260124_0001).
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20261019_0002"
+down_revision = "20261019_0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add analytics range indexes."""
+    op.create_index(
+        "ix_messages_created",
+        "messages",
+        ["created_at"],
+        unique=False,
+    )
+
+    op.create_index(
+        "ix_conversations_user_updated",
+        "conversations",
+        ["user_id", "updated_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Remove analytics range indexes."""
+    op.drop_index("ix_conversations_user_updated", table_name="conversations")
+    op.drop_index("ix_messages_created", table_name="messages")
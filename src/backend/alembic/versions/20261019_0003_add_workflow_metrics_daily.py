@@ -0,0 +1,54 @@
+"""Add workflow_metrics_daily table.
+
+Per-workflow per-day run metrics captured from chat/chat_stream:
+runs, errors, streamed tokens, latency and time-to-first-token totals
+and fixed-bucket histograms for p50/p95 estimates.
+
+Revision ID: 20261019_0003
+Revises: 20261019_0002
+Create Date: 2026-10-19 00:03:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261019_0003'
+down_revision = '20261019_0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create workflow_metrics_daily."""
+    op.create_table(
+        'workflow_metrics_daily',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('user_id', sa.String(36), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('workflow_id', sa.String(36), sa.ForeignKey('workflows.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('record_date', sa.Date(), nullable=False),
+        sa.Column('runs', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('errors', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('tokens', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('total_latency_ms', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('total_ttft_ms', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('ttft_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('latency_histogram', sa.JSON(), nullable=True),
+        sa.Column('ttft_histogram', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.UniqueConstraint('workflow_id', 'record_date', name='uq_workflow_metrics_workflow_date'),
+    )
+    # Dashboard reads a user's workflows over a date range
+    op.create_index(
+        'ix_workflow_metrics_user_date',
+        'workflow_metrics_daily',
+        ['user_id', 'record_date'],
+    )
+
+
+def downgrade() -> None:
+    """Drop workflow_metrics_daily."""
+    op.drop_index('ix_workflow_metrics_user_date', table_name='workflow_metrics_daily')
+    op.drop_table('workflow_metrics_daily')
@@ -0,0 +1,81 @@
+"""Add usage_counters table.
+
+Per-user counters for plan limits, maintained incrementally so limit
+checks read one row per metric instead of counting messages, agents and
+workflows. Backfilled here from the raw tables: this month's
+messages_sent/llm_tokens and the active agent/workflow gauges.
+
+Revision ID: 20261019_0004
+Revises: 20261019_0003
+Create Date: 2026-10-19 00:04:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261019_0004'
+down_revision = '20261019_0003'
+branch_labels = None
+depends_on = None
+
+# Same keys as app/services/usage_counter_service.py (monthly periods are
+# "YYYY-MM" in UTC, gauges use "all")
+MONTH_START = "date_trunc('month', timezone('utc', now()))"
+PERIOD = "to_char(timezone('utc', now()), 'YYYY-MM')"
+
+BACKFILL = [
+    # Monthly counters, current period only
+    f"""
+    INSERT INTO usage_counters (id, user_id, metric, period, value)
+    SELECT gen_random_uuid()::text, c.user_id, 'messages_sent', {PERIOD}, COUNT(m.id)
+    FROM messages m JOIN conversations c ON c.id = m.conversation_id
+    WHERE m.created_at >= {MONTH_START}
+    GROUP BY c.user_id
+    """,
+    f"""
+    INSERT INTO usage_counters (id, user_id, metric, period, value)
+    SELECT gen_random_uuid()::text, c.user_id, 'llm_tokens', {PERIOD},
+           COALESCE(SUM(length(m.content)), 0) / 4
+    FROM messages m JOIN conversations c ON c.id = m.conversation_id
+    WHERE m.created_at >= {MONTH_START}
+    GROUP BY c.user_id
+    """,
+    # Gauges: active agent components and workflows
+    """
+    INSERT INTO usage_counters (id, user_id, metric, period, value)
+    SELECT gen_random_uuid()::text, user_id, 'agents_created', 'all', COUNT(*)
+    FROM agent_components WHERE is_active
+    GROUP BY user_id
+    """,
+    """
+    INSERT INTO usage_counters (id, user_id, metric, period, value)
+    SELECT gen_random_uuid()::text, user_id, 'workflows_created', 'all', COUNT(*)
+    FROM workflows WHERE is_active
+    GROUP BY user_id
+    """,
+]
+
+
+def upgrade() -> None:
+    """Create usage_counters and backfill it."""
+    op.create_table(
+        'usage_counters',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('user_id', sa.String(36), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('metric', sa.String(50), nullable=False),
+        sa.Column('period', sa.String(7), nullable=False),
+        sa.Column('value', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.UniqueConstraint('user_id', 'metric', 'period', name='uq_usage_counter_user_metric_period'),
+    )
+
+    for statement in BACKFILL:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Drop usage_counters."""
+    op.drop_table('usage_counters')
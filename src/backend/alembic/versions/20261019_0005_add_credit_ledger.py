@@ -0,0 +1,64 @@
+"""Add credit_ledger and credit_balances tables.
+
+AI credits move through an append-only ledger (grants, purchases, chat
+holds and their settlement) with a materialised per-user balance that is
+changed only by conditional UPDATEs. Balances are created lazily on
+first use, seeded from the current month's message counter.
+
+Revision ID: 20261019_0005
+Revises: 20261019_0004
+Create Date: 2026-10-19 00:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261019_0005'
+down_revision = '20261019_0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create credit_ledger and credit_balances."""
+    op.create_table(
+        'credit_ledger',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('user_id', sa.String(36), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('entry_type', sa.String(20), nullable=False),
+        sa.Column('amount', sa.Integer(), nullable=False),
+        sa.Column('period', sa.String(7), nullable=False),
+        sa.Column('hold_id', sa.String(36), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+        sa.Column('reference', sa.String(255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index('ix_credit_ledger_user_id', 'credit_ledger', ['user_id'])
+    op.create_index('ix_credit_ledger_hold_id', 'credit_ledger', ['hold_id'], unique=True)
+    # Expired-hold sweeper
+    op.create_index('ix_credit_ledger_type_expires', 'credit_ledger', ['entry_type', 'expires_at'])
+
+    op.create_table(
+        'credit_balances',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('user_id', sa.String(36), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('period', sa.String(7), nullable=False),
+        sa.Column('granted', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('used', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('held', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.UniqueConstraint('user_id', name='uq_credit_balances_user_id'),
+    )
+
+
+def downgrade() -> None:
+    """Drop credit_ledger and credit_balances."""
+    op.drop_table('credit_balances')
+    op.drop_index('ix_credit_ledger_type_expires', table_name='credit_ledger')
+    op.drop_index('ix_credit_ledger_hold_id', table_name='credit_ledger')
+    op.drop_index('ix_credit_ledger_user_id', table_name='credit_ledger')
+    op.drop_table('credit_ledger')
@@ -0,0 +1,65 @@
+"""Turn billing_events into a webhook processing queue.
+
+Stripe webhooks are now stored as pending billing events and applied by
+a background worker. Adds processing state columns, a partial index for
+pending events, makes user_id optional (events such as
+customer.subscription.updated only carry a customer ID) and adds the
+updated_at column the model already declares.
+
+Existing rows were processed inline, so they are marked processed.
+
+Revision ID: 20261019_0006
+Revises: 20261019_0005
+Create Date: 2026-10-19 00:06:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261019_0006'
+down_revision = '20261019_0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add queue columns to billing_events."""
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('billing_events')}
+    if 'updated_at' not in columns:
+        op.add_column(
+            'billing_events',
+            sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        )
+
+    op.add_column(
+        'billing_events',
+        sa.Column('status', sa.String(20), server_default='processed', nullable=False),
+    )
+    op.add_column(
+        'billing_events',
+        sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+    )
+    op.add_column('billing_events', sa.Column('processed_at', sa.DateTime(), nullable=True))
+    op.add_column('billing_events', sa.Column('last_error', sa.Text(), nullable=True))
+    op.alter_column('billing_events', 'user_id', existing_type=sa.String(255), nullable=True)
+
+    # The worker only ever scans pending events, oldest first
+    op.create_index(
+        'ix_billing_events_pending',
+        'billing_events',
+        ['created_at'],
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    """Remove queue columns from billing_events."""
+    op.drop_index('ix_billing_events_pending', table_name='billing_events')
+    op.execute("DELETE FROM billing_events WHERE user_id IS NULL")
+    op.alter_column('billing_events', 'user_id', existing_type=sa.String(255), nullable=False)
+    op.drop_column('billing_events', 'last_error')
+    op.drop_column('billing_events', 'processed_at')
+    op.drop_column('billing_events', 'attempts')
+    op.drop_column('billing_events', 'status')
@@ -0,0 +1,36 @@
+"""Make the embed token index unique.
+
+Embed tokens are looked up (and now cached) as a unique key, but the
+index created with the column was not unique. Recreate it as unique so
+a duplicate token can never resolve to the wrong agent.
+
+Revision ID: 20261019_0007
+Revises: 20261019_0006
+Create Date: 2026-10-19 00:07:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '20261019_0007'
+down_revision = '20261019_0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Recreate ix_agent_components_embed_token as a unique index."""
+    op.drop_index('ix_agent_components_embed_token', table_name='agent_components')
+    op.create_index(
+        'ix_agent_components_embed_token',
+        'agent_components',
+        ['embed_token'],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Restore the non-unique index."""
+    op.drop_index('ix_agent_components_embed_token', table_name='agent_components')
+    op.create_index('ix_agent_components_embed_token', 'agent_components', ['embed_token'])
@@ -0,0 +1,83 @@
+"""Add workflow_agent_components link table.
+
+Finding the workflows that use an agent matched the agent id against
+workflows.agent_component_ids cast to text (a full scan per agent
+update). The link table mirrors that JSON array with one row per
+(workflow, agent) and an index on agent_component_id. Backfilled here
+from existing workflows; ids of agents that no longer exist are skipped.
+
+Revision ID: 20261019_0008
+Revises: 20261019_0007
+Create Date: 2026-10-19 00:08:00.000000
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261019_0008'
+down_revision = '20261019_0007'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def _component_ids(value) -> set:
+    """agent_component_ids as stored (a JSON array, or its text on some drivers)."""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return set()
+    if not isinstance(value, list):
+        return set()
+    return {str(v) for v in value if v}
+
+
+def upgrade() -> None:
+    """Create workflow_agent_components and backfill it from workflows."""
+    links = op.create_table(
+        'workflow_agent_components',
+        sa.Column(
+            'workflow_id',
+            sa.String(36),
+            sa.ForeignKey('workflows.id', ondelete='CASCADE'),
+            primary_key=True,
+        ),
+        sa.Column(
+            'agent_component_id',
+            sa.String(36),
+            sa.ForeignKey('agent_components.id', ondelete='CASCADE'),
+            primary_key=True,
+        ),
+    )
+    op.create_index(
+        'ix_workflow_agent_components_agent_component_id',
+        'workflow_agent_components',
+        ['agent_component_id'],
+    )
+
+    bind = op.get_bind()
+    existing = {row[0] for row in bind.execute(sa.text("SELECT id FROM agent_components"))}
+    rows = []
+    result = bind.execute(sa.text(
+        "SELECT id, agent_component_ids FROM workflows WHERE agent_component_ids IS NOT NULL"
+    ))
+    for workflow_id, component_ids in result:
+        for component_id in _component_ids(component_ids) & existing:
+            rows.append({'workflow_id': workflow_id, 'agent_component_id': component_id})
+    for start in range(0, len(rows), BATCH_SIZE):
+        op.bulk_insert(links, rows[start:start + BATCH_SIZE])
+
+
+def downgrade() -> None:
+    """Drop workflow_agent_components."""
+    op.drop_index(
+        'ix_workflow_agent_components_agent_component_id',
+        table_name='workflow_agent_components',
+    )
+    op.drop_table('workflow_agent_components')
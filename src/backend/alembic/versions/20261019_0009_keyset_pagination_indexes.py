@@ -0,0 +1,56 @@
+"""Index list queries for keyset pagination
+
+Revision ID: 20261019_0009
+Revises: 20261019_0008
+Create Date: 2026-10-19 00:09:00.000000
+
+List endpoints page by (created_at, id) after a cursor instead of OFFSET.
+(user_id, created_at, id) indexes serve each page as one range scan in
+order, including ties on created_at:
+- workflows, agent_components and knowledge_sources: replace the
+  (user_id, created_at) indexes from 20260124_0001 (the new indexes
+  cover the same queries)
+- user_files: new
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20261019_0009"
+down_revision = "20261019_0008"
+branch_labels = None
+depends_on = None
+
+REPLACED = ("workflows", "agent_components", "knowledge_sources")
+
+
+def upgrade() -> None:
+    """Add (user_id, created_at, id) list indexes."""
+    for table in REPLACED:
+        op.create_index(
+            f"ix_{table}_user_created_id",
+            table,
+            ["user_id", "created_at", "id"],
+            unique=False,
+        )
+        op.drop_index(f"ix_{table}_user_created", table_name=table)
+
+    op.create_index(
+        "ix_user_files_user_created_id",
+        "user_files",
+        ["user_id", "created_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Restore the (user_id, created_at) indexes."""
+    op.drop_index("ix_user_files_user_created_id", table_name="user_files")
+
+    for table in REPLACED:
+        op.create_index(
+            f"ix_{table}_user_created",
+            table,
+            ["user_id", "created_at"],
+            unique=False,
+        )
+        op.drop_index(f"ix_{table}_user_created_id", table_name=table)
@@ -0,0 +1,32 @@
+"""Apply subscription events in Stripe order
+
+Revision ID: 20261019_0010
+Revises: 20261019_0009
+Create Date: 2026-10-19 00:10:00.000000
+
+A failed billing event is retried after newer events for the same
+subscription have been applied, so an old customer.subscription.* event
+could overwrite newer state. Records Stripe's event `created` time on
+billing_events and the last applied one on subscriptions; the worker
+skips subscription events older than that.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261019_0010"
+down_revision = "20261019_0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add Stripe event timestamps."""
+    op.add_column("billing_events", sa.Column("stripe_created_at", sa.DateTime(), nullable=True))
+    op.add_column("subscriptions", sa.Column("stripe_event_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Remove Stripe event timestamps."""
+    op.drop_column("subscriptions", "stripe_event_at")
+    op.drop_column("billing_events", "stripe_created_at")
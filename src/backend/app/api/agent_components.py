@@ -8,7 +8,8 @@ from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy import select, and_
 
-from app.database import AsyncSessionDep
+from app.database import AsyncSessionDep, ReadOnlySessionDep
+from app.utils.pagination import InvalidCursorError
 from app.middleware.clerk_auth import CurrentUser
 from app.middleware.redis_rate_limit import check_rate_limit_with_user
 from app.models.user import User
@@ -17,6 +18,7 @@ from app.models.workflow import Workflow
 from app.schemas.agent_component import (
     AgentComponentCreateFromQA,
     AgentComponentResponse,
+    AgentComponentSummaryResponse,
     AgentComponentUpdate,
     AgentComponentListResponse,
     GenerateAvatarRequest,
@@ -84,35 +86,51 @@ async def create_agent_component_from_qa(
     "",
     response_model=AgentComponentListResponse,
     summary="List agent components",
-    description="List all agent components for the current user.",
+    description="List all agent components for the current user (summary fields; get a component for its full body).",
 )
 async def list_agent_components(
     session: AsyncSessionDep,
+    read_session: ReadOnlySessionDep,
     clerk_user: CurrentUser,
     project_id: Optional[uuid.UUID] = None,
     page: int = 1,
     page_size: int = 20,
     active_only: bool = True,
     published_only: bool = False,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
 ):
-    """List all agent components for the authenticated user."""
+    """
+    List all agent components for the authenticated user, newest first.
+
+    Pass a response's next_cursor as cursor to get the following page.
+    """
     user = await get_user_from_clerk(clerk_user, session)
-    service = AgentComponentService(session)
+    service = AgentComponentService(read_session)
 
-    components, total = await service.list_by_user(
-        user_id=user.id,
-        project_id=project_id,
-        page=page,
-        page_size=page_size,
-        active_only=active_only,
-        published_only=published_only,
-    )
+    try:
+        result = await service.list_by_user(
+            user_id=user.id,
+            project_id=project_id,
+            page=page,
+            page_size=page_size,
+            active_only=active_only,
+            published_only=published_only,
+            cursor=cursor,
+            include_total=include_total,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
 
     return AgentComponentListResponse(
-        agent_components=[AgentComponentResponse.model_validate(c) for c in components],
-        total=total,
+        agent_components=[AgentComponentSummaryResponse.model_validate(c) for c in result.items],
+        total=result.total,
         page=page,
         page_size=page_size,
+        next_cursor=result.next_cursor,
     )
 
 
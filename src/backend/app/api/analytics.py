@@ -10,7 +10,7 @@ from typing import List, Optional
 from fastapi import APIRouter, HTTPException, status
 from pydantic import BaseModel
 
-from app.database import AsyncSessionDep
+from app.database import AsyncSessionDep, ReadOnlySessionDep
 from app.middleware.clerk_auth import CurrentUser
 from app.models.user import User
 from app.services.user_service import UserService
@@ -203,6 +203,7 @@ async def get_workflow_messages(
 )
 async def get_learning_progress(
     session: AsyncSessionDep,
+    read_session: ReadOnlySessionDep,
     clerk_user: CurrentUser,
 ) -> LearningProgressResponse:
     """
@@ -219,7 +220,7 @@ async def get_learning_progress(
     users their learning journey progress.
     """
     user = await get_user_from_clerk(clerk_user, session)
-    mission_service = MissionService(session)
+    mission_service = MissionService(read_session)
 
     progress = await mission_service.get_learning_progress(str(user.id))
 
@@ -10,10 +10,11 @@ from datetime import datetime
 from fastapi import APIRouter, HTTPException, Request, status, Query
 from pydantic import BaseModel, Field
 
-from app.database import AsyncSessionDep
+from app.database import AsyncSessionDep, ReadOnlySessionDep
 from app.middleware.clerk_auth import CurrentUser
 from app.middleware.redis_rate_limit import check_rate_limit_with_user
 from app.services.user_service import UserService
+from app.services.billing_events import notify_billing_events
 from app.services.billing_service import BillingService, BillingServiceError
 from app.plans import (
     get_all_plans,
@@ -187,13 +188,14 @@ async def get_subscription(
 )
 async def get_usage(
     session: AsyncSessionDep,
+    read_session: ReadOnlySessionDep,
     clerk_user: CurrentUser,
 ) -> UsageResponse:
     """Get current usage statistics."""
     user = await get_user_from_clerk(clerk_user, session)
     billing = BillingService(session)
 
-    usage = await billing.get_usage_summary(str(user.id))
+    usage = await BillingService(read_session).get_usage_summary(str(user.id))
     plan = await billing.get_plan_for_user(str(user.id))
 
     # Calculate usage from credits system
@@ -306,7 +308,7 @@ async def stripe_webhook(
     request: Request,
     session: AsyncSessionDep,
 ):
-    """Handle Stripe webhook events."""
+    """Queue a verified Stripe event; it is applied by the billing event worker."""
     payload = await request.body()
     sig_header = request.headers.get("stripe-signature")
 
@@ -321,6 +323,8 @@ async def stripe_webhook(
     try:
         result = await billing.handle_webhook(payload, sig_header)
         await session.commit()
+        if result["status"] == "queued":
+            notify_billing_events()
         return result
 
     except BillingServiceError as e:
@@ -31,6 +31,11 @@ from app.services.composio_agent_service import (
     ComposioAgentService,
     ComposioAgentServiceError,
 )
+from app.services.stream_admission import (
+    StreamAdmissionError,
+    resolve_generation_caps,
+    stream_admission,
+)
 
 router = APIRouter(prefix="/connections", tags=["Connections"])
 
@@ -423,14 +428,16 @@ async def enhanced_chat(
         workflow_service = WorkflowService(session)
         workflow = await workflow_service.get_by_id(uuid.UUID(data.workflow_id), user.id)
 
+    caps = await resolve_generation_caps(session, user.id)
     try:
-        result = await agent_service.chat(
-            user=user,
-            message=data.message,
-            workflow=workflow,
-            conversation_id=data.conversation_id,
-            app_names=data.app_names,
-        )
+        async with stream_admission.admit(caps):
+            result = await agent_service.chat(
+                user=user,
+                message=data.message,
+                workflow=workflow,
+                conversation_id=data.conversation_id,
+                app_names=data.app_names,
+            )
 
         return EnhancedChatResponse(
             text=result["text"],
@@ -439,6 +446,12 @@ async def enhanced_chat(
             metadata=result.get("metadata", {}),
         )
 
+    except StreamAdmissionError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
     except ComposioAgentServiceError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -474,17 +487,25 @@ async def enhanced_chat_stream(
         workflow_service = WorkflowService(session)
         workflow = await workflow_service.get_by_id(uuid.UUID(data.workflow_id), user.id)
 
+    caps = await resolve_generation_caps(session, user.id)
+
     async def event_generator():
         try:
-            async for event in agent_service.chat_stream(
-                user=user,
-                message=data.message,
-                workflow=workflow,
-                conversation_id=data.conversation_id,
-                app_names=data.app_names,
-            ):
-                # Use mode='json' to properly serialize datetime objects to ISO strings
-                yield f"data: {json.dumps(event.model_dump(mode='json'))}\n\n"
+            async with stream_admission.admit(caps):
+                async for event in agent_service.chat_stream(
+                    user=user,
+                    message=data.message,
+                    workflow=workflow,
+                    conversation_id=data.conversation_id,
+                    app_names=data.app_names,
+                ):
+                    # Use mode='json' to properly serialize datetime objects to ISO strings
+                    yield f"data: {json.dumps(event.model_dump(mode='json'))}\n\n"
+        except StreamAdmissionError as e:
+            from app.schemas.streaming import error_event, done_event
+            err = error_event("TOO_MANY_STREAMS", str(e), {"retry_after": e.retry_after})
+            yield f"data: {json.dumps(err.model_dump(mode='json'))}\n\n"
+            yield f"data: {json.dumps(done_event().model_dump(mode='json'))}\n\n"
         except ComposioAgentServiceError as e:
             from app.schemas.streaming import error_event, done_event
             yield f"data: {json.dumps(error_event(str(e)).model_dump(mode='json'))}\n\n"
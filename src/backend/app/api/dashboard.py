@@ -3,18 +3,21 @@ Dashboard API endpoints for analytics and metrics.
 """
 import csv
 import io
+import json
 import logging
-from datetime import date
-from typing import List, Optional
+import zlib
+from datetime import date, datetime, timedelta
+from typing import AsyncIterator, Iterable, Iterator, List, Optional
 
 from fastapi import APIRouter, HTTPException, Query, status
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
-from app.database import AsyncSessionDep
+from app.database import AsyncSessionDep, ReadOnlySessionDep, async_session_maker, replica_router
 from app.middleware.clerk_auth import CurrentUser
 from app.services.user_service import UserService
-from app.services.analytics_service import AnalyticsService
+from app.services.analytics_service import AnalyticsService, EXPORT_COLUMNS
+from app.utils.db_replica import REPLICA_KEY
 
 logger = logging.getLogger(__name__)
 
@@ -61,6 +64,15 @@ class AgentStat(BaseModel):
     id: str
     name: str
     conversations: int = 0
+    # Run metrics for the selected period (latencies are histogram estimates)
+    runs: int = 0
+    errors: int = 0
+    error_rate: float = 0.0
+    tokens: int = 0
+    p50_latency_ms: Optional[int] = None
+    p95_latency_ms: Optional[int] = None
+    p50_ttft_ms: Optional[int] = None
+    p95_ttft_ms: Optional[int] = None
 
 
 class PeriodInfo(BaseModel):
@@ -124,6 +136,7 @@ async def get_user_from_clerk(clerk_user: CurrentUser, session: AsyncSessionDep)
 )
 async def get_dashboard_stats(
     session: AsyncSessionDep,
+    read_session: ReadOnlySessionDep,
     clerk_user: CurrentUser,
     days: int = Query(default=30, ge=1, le=365, description="Number of days for preset periods"),
     start_date: Optional[date] = Query(default=None, description="Custom range start (YYYY-MM-DD)"),
@@ -131,7 +144,7 @@ async def get_dashboard_stats(
 ) -> DashboardStatsResponse:
     """Get dashboard statistics for the authenticated user."""
     user = await get_user_from_clerk(clerk_user, session)
-    analytics = AnalyticsService(session)
+    analytics = AnalyticsService(read_session)
 
     # Validate custom date range if provided
     if start_date and end_date:
@@ -196,11 +209,12 @@ async def get_dashboard_stats(
 )
 async def get_totals(
     session: AsyncSessionDep,
+    read_session: ReadOnlySessionDep,
     clerk_user: CurrentUser,
 ) -> TotalsResponse:
     """Get total counts for the authenticated user."""
     user = await get_user_from_clerk(clerk_user, session)
-    analytics = AnalyticsService(session)
+    analytics = AnalyticsService(read_session)
 
     stats = await analytics.get_dashboard_stats(
         user_id=str(user.id),
@@ -210,57 +224,68 @@ async def get_totals(
     return TotalsResponse(**stats["totals"])
 
 
-@router.get(
-    "/export",
-    summary="Export analytics data",
-    description="Export analytics data as CSV or JSON.",
-)
-async def export_analytics(
-    session: AsyncSessionDep,
-    clerk_user: CurrentUser,
-    days: int = Query(default=30, ge=1, le=365, description="Number of days to export"),
-    format: str = Query(default="csv", description="Export format (csv or json)"),
-    start_date: Optional[date] = Query(default=None, description="Custom range start (YYYY-MM-DD)"),
-    end_date: Optional[date] = Query(default=None, description="Custom range end (YYYY-MM-DD)"),
-) -> StreamingResponse:
-    """Export analytics data for the authenticated user."""
-    user = await get_user_from_clerk(clerk_user, session)
-    analytics = AnalyticsService(session)
+def _gzip_chunks(chunks: Iterable[str]) -> Iterator[bytes]:
+    """Gzip a sequence of text chunks incrementally."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
 
-    # Use custom date range if provided
-    if start_date and end_date:
-        if start_date > end_date:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="start_date must be before or equal to end_date",
-            )
-        calculated_days = (end_date - start_date).days + 1
-        stats = await analytics.get_dashboard_stats(
-            user_id=str(user.id),
-            days=calculated_days,
-            custom_start=start_date,
-            custom_end=end_date,
-        )
-        filename_suffix = f"{start_date}_{end_date}"
-    else:
-        stats = await analytics.get_dashboard_stats(
-            user_id=str(user.id),
-            days=days,
-        )
-        filename_suffix = f"{days}d"
 
-    if format == "json":
-        import json
-        content = json.dumps(stats, indent=2)
-        return StreamingResponse(
-            iter([content]),
-            media_type="application/json",
-            headers={
-                "Content-Disposition": f"attachment; filename=analytics_{filename_suffix}.json"
-            },
-        )
+async def _gzip_async_chunks(chunks: AsyncIterator[str]) -> AsyncIterator[bytes]:
+    """Gzip an async sequence of text chunks incrementally."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _encode_batch(rows: List[dict], columns: List[str], format: str) -> str:
+    """Encode one batch of export rows as CSV lines or NDJSON."""
+    if format == "ndjson":
+        return "".join(json.dumps(row, default=str) + "\n" for row in rows)
 
-    # Default to CSV
+    output = io.StringIO()
+    writer = csv.writer(output)
+    for row in rows:
+        writer.writerow([row[column] for column in columns])
+    return output.getvalue()
+
+
+async def _stream_detail_export(
+    user_id: str,
+    detail: str,
+    format: str,
+    start_date: date,
+    end_date: date,
+    replica: bool = False,
+) -> AsyncIterator[str]:
+    """
+    Stream a per-conversation or per-message export.
+
+    Runs in its own session (on the replica if `replica`): request-scoped
+    sessions are closed before the response body is streamed.
+    """
+    columns = EXPORT_COLUMNS[detail]
+    if format == "csv":
+        output = io.StringIO()
+        csv.writer(output).writerow(columns)
+        yield output.getvalue()
+
+    session_maker = replica_router.session_maker if replica else async_session_maker
+    async with session_maker() as session:
+        session.info[REPLICA_KEY] = replica
+        analytics = AnalyticsService(session)
+        async for batch in analytics.stream_export_rows(user_id, detail, start_date, end_date):
+            yield _encode_batch(batch, columns, format)
+
+
+def _summary_csv(stats: dict) -> str:
+    """Render the daily summary export as CSV."""
     output = io.StringIO()
     writer = csv.writer(output)
 
@@ -292,11 +317,100 @@ async def export_analytics(
         writer.writerow(["Conversations Change", f'{stats["comparison"]["conversations_change"]}%'])
         writer.writerow(["Tokens Change", f'{stats["comparison"]["tokens_change"]}%'])
 
-    output.seek(0)
+    return output.getvalue()
+
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+
+@router.get(
+    "/export",
+    summary="Export analytics data",
+    description=(
+        "Export analytics data as CSV, JSON or NDJSON. detail=summary exports daily "
+        "totals; detail=conversations or detail=messages streams one row per "
+        "conversation or message (CSV or NDJSON only). Set gzip=true for a "
+        "compressed download."
+    ),
+)
+async def export_analytics(
+    session: AsyncSessionDep,
+    read_session: ReadOnlySessionDep,
+    clerk_user: CurrentUser,
+    days: int = Query(default=30, ge=1, le=365, description="Number of days to export"),
+    format: str = Query(default="csv", description="Export format (csv, json or ndjson)"),
+    detail: str = Query(default="summary", description="Detail level (summary, conversations or messages)"),
+    gzip: bool = Query(default=False, description="Gzip-compress the download"),
+    start_date: Optional[date] = Query(default=None, description="Custom range start (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(default=None, description="Custom range end (YYYY-MM-DD)"),
+) -> StreamingResponse:
+    """Export analytics data for the authenticated user."""
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="format must be one of: csv, json, ndjson",
+        )
+    if detail != "summary" and detail not in EXPORT_COLUMNS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="detail must be one of: summary, conversations, messages",
+        )
+    if detail != "summary" and format == "json":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Detailed exports are streamed; use format=csv or format=ndjson",
+        )
+
+    user = await get_user_from_clerk(clerk_user, session)
+
+    # Use custom date range if provided
+    if start_date and end_date:
+        if start_date > end_date:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="start_date must be before or equal to end_date",
+            )
+        filename_suffix = f"{start_date}_{end_date}"
+    else:
+        end_date = datetime.utcnow().date()
+        start_date = end_date - timedelta(days=days - 1)
+        filename_suffix = f"{days}d"
+
+    if detail == "summary":
+        analytics = AnalyticsService(read_session)
+        stats = await analytics.get_dashboard_stats(
+            user_id=str(user.id),
+            days=(end_date - start_date).days + 1,
+            custom_start=start_date,
+            custom_end=end_date,
+        )
+        if format == "json":
+            chunks = [json.dumps(stats, indent=2)]
+        elif format == "ndjson":
+            chunks = [json.dumps(day) + "\n" for day in stats["daily"]]
+        else:
+            chunks = [_summary_csv(stats)]
+        body = _gzip_chunks(chunks) if gzip else iter(chunks)
+    else:
+        filename_suffix = f"{detail}_{filename_suffix}"
+        rows = _stream_detail_export(
+            str(user.id), detail, format, start_date, end_date,
+            replica=bool(read_session.info.get(REPLICA_KEY)),
+        )
+        body = _gzip_async_chunks(rows) if gzip else rows
+
+    filename = f"analytics_{filename_suffix}.{format}"
+    media_type = EXPORT_MEDIA_TYPES[format]
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+
     return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={
-            "Content-Disposition": f"attachment; filename=analytics_{filename_suffix}.csv"
-        },
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
     )
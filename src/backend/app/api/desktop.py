@@ -128,10 +128,7 @@ async def _resolve_user_by_token(
     token = authorization[7:]
     if not token:
         return None
-    result = await session.execute(
-        select(User).where(User.mcp_bridge_token == token)
-    )
-    return result.scalar_one_or_none()
+    return await UserService(session).get_by_mcp_bridge_token(token)
 
 
 # ---- Endpoints ----
@@ -15,6 +15,11 @@ from app.database import AsyncSessionDep
 from app.middleware.clerk_auth import CurrentUser
 from app.services.user_service import UserService
 from app.services.agent_component_service import AgentComponentService
+from app.services.stream_admission import (
+    StreamAdmissionError,
+    resolve_generation_caps,
+    stream_admission,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -128,14 +133,10 @@ async def enable_embed(
     config = request.embed_config or EmbedConfig()
     embed_config_dict = config.model_dump()
 
-    # Update agent
-    await agent_service.update(
-        agent_id,
-        user_id=user.id,
-        is_embeddable=True,
-        embed_token=embed_token,
-        embed_config=embed_config_dict,
-    )
+    # Update agent (cached embed lookups are dropped on flush)
+    agent.is_embeddable = True
+    agent.embed_token = embed_token
+    agent.embed_config = embed_config_dict
     await session.commit()
 
     # Generate embed code
@@ -181,11 +182,7 @@ async def disable_embed(
             detail="Agent not found",
         )
 
-    await agent_service.update(
-        agent_id,
-        user_id=user.id,
-        is_embeddable=False,
-    )
+    agent.is_embeddable = False
     await session.commit()
 
     return {"message": "Embedding disabled"}
@@ -429,19 +426,27 @@ async def embed_chat(
     # TODO: Check allowed domains from request origin
 
     # Get response from agent
+    caps = await resolve_generation_caps(session, agent.user_id, embed_token=embed_token)
     try:
-        response = await agent_service.chat(
-            agent.id,
-            request.message,
-            user_id=agent.user_id,  # Use agent owner's context
-            conversation_id=request.conversation_id,
-        )
+        async with stream_admission.admit(caps):
+            response = await agent_service.chat(
+                agent.id,
+                request.message,
+                user_id=agent.user_id,  # Use agent owner's context
+                conversation_id=request.conversation_id,
+            )
 
         return EmbedChatResponse(
             message=response.get("message", ""),
             conversation_id=response.get("conversation_id", ""),
         )
 
+    except StreamAdmissionError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
     except Exception as e:
         logger.error(f"Embed chat error: {e}")
         raise HTTPException(
@@ -12,6 +12,7 @@ from fastapi.responses import FileResponse as FastAPIFileResponse
 from pydantic import BaseModel, Field
 
 from app.database import AsyncSessionDep
+from app.utils.pagination import InvalidCursorError
 from app.middleware.clerk_auth import CurrentUser
 from app.middleware.redis_rate_limit import check_rate_limit_with_user
 from app.models.user import User
@@ -44,9 +45,10 @@ class FileListResponse(BaseModel):
     """Response model for file listing."""
 
     files: list[FileResponse]
-    total: int
+    total: Optional[int] = None  # None when include_total=false
     page: int
     page_size: int
+    next_cursor: Optional[str] = None  # Pass as cursor for the next page; None on the last
 
 
 class StorageStatsResponse(BaseModel):
@@ -106,26 +108,41 @@ async def list_files(
     page: int = 1,
     page_size: int = 20,
     project_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     session: AsyncSessionDep = None,
     clerk_user: CurrentUser = None,
 ) -> FileListResponse:
-    """List files for the current user."""
+    """
+    List files for the current user, newest first.
+
+    Pass a response's next_cursor as cursor to get the following page.
+    """
     user = await get_user_from_clerk(clerk_user, session)
     service = FileService(session)
 
     project_uuid = uuid.UUID(project_id) if project_id else None
-    files, total = await service.list_files(
-        user_id=user.id,
-        project_id=project_uuid,
-        page=page,
-        page_size=page_size,
-    )
+    try:
+        result = await service.list_files(
+            user_id=user.id,
+            project_id=project_uuid,
+            page=page,
+            page_size=page_size,
+            cursor=cursor,
+            include_total=include_total,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
 
     return FileListResponse(
-        files=[file_to_response(f) for f in files],
-        total=total,
+        files=[file_to_response(f) for f in result.items],
+        total=result.total,
         page=page,
         page_size=page_size,
+        next_cursor=result.next_cursor,
     )
 
 
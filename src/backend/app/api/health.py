@@ -3,7 +3,10 @@ Health check endpoints.
 """
 from fastapi import APIRouter, status
 
+from app.database import db_pool_metrics, engine, replica_engine, replica_pool_metrics, replica_router
+from app.middleware.redis_rate_limit import rate_limit_status
 from app.services.langflow_client import langflow_client
+from app.services.stream_admission import stream_admission
 
 router = APIRouter(tags=["Health"])
 
@@ -59,4 +62,23 @@ async def full_health_check():
             "api": "healthy",
             "langflow": "healthy" if langflow_healthy else "unhealthy",
         },
+        "rate_limiting": rate_limit_status(),
+        "chat_generations": stream_admission.stats,
     }
+
+
+@router.get(
+    "/health/db",
+    status_code=status.HTTP_200_OK,
+    summary="Database pool metrics",
+)
+async def database_pool_metrics():
+    """
+    Connection pool usage: size, connections in use and overflow, checkout
+    wait percentiles, timeouts and connections opened since startup.
+    The "replica" key reports read replica lag, read routing and its pool.
+    """
+    replica = replica_router.stats
+    if replica_engine is not None:
+        replica["pool"] = replica_pool_metrics.snapshot(replica_engine.sync_engine.pool)
+    return {**db_pool_metrics.snapshot(engine.sync_engine.pool), "replica": replica}
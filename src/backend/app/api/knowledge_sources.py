@@ -9,6 +9,7 @@ from typing import Optional
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query
 
 from app.database import AsyncSessionDep
+from app.utils.pagination import InvalidCursorError
 from app.middleware.clerk_auth import CurrentUser
 from app.models.user import User
 from app.services.user_service import UserService
@@ -46,22 +47,30 @@ async def list_knowledge_sources(
     project_id: Optional[uuid.UUID] = Query(None, description="Filter by project"),
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    include_total: bool = Query(True, description="Count the total"),
 ):
-    """List all knowledge sources for the current user."""
+    """List all knowledge sources for the current user, newest first."""
     user = await get_user_from_clerk(clerk_user, session)
     service = KnowledgeService(session)
-    sources, total = await service.list_by_user(
-        user_id=user.id,
-        project_id=project_id,
-        page=page,
-        page_size=page_size,
-    )
+    try:
+        result = await service.list_by_user(
+            user_id=user.id,
+            project_id=project_id,
+            page=page,
+            page_size=page_size,
+            cursor=cursor,
+            include_total=include_total,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return KnowledgeSourceListResponse(
-        knowledge_sources=[KnowledgeSourceResponse.model_validate(s) for s in sources],
-        total=total,
+        knowledge_sources=[KnowledgeSourceResponse.model_validate(s) for s in result.items],
+        total=result.total,
         page=page,
         page_size=page_size,
+        next_cursor=result.next_cursor,
     )
 
 
@@ -18,6 +18,11 @@ from app.database import AsyncSessionDep
 from app.middleware.clerk_auth import CurrentUser
 from app.models.workflow import Workflow
 from app.models.user import User
+from app.services.stream_admission import (
+    StreamAdmissionError,
+    resolve_generation_caps,
+    stream_admission,
+)
 from app.services.user_service import UserService
 from app.services.workflow_service import WorkflowService, WorkflowServiceError
 
@@ -68,10 +73,7 @@ async def resolve_user_by_token(
     token = authorization[7:]
     if not token:
         return None
-    result = await session.execute(
-        select(User).where(User.mcp_bridge_token == token)
-    )
-    return result.scalar_one_or_none()
+    return await UserService(session).get_by_mcp_bridge_token(token)
 
 
 async def resolve_user(
@@ -277,17 +279,19 @@ async def _execute_tool_call(
         f"workflow={target_workflow.id}"
     )
 
+    caps = await resolve_generation_caps(session, user.id)
     try:
         service = WorkflowService(session)
-        response_text, conv_id, msg_id = await asyncio.wait_for(
-            service.chat(
-                workflow=target_workflow,
-                user=user,
-                message=message,
-                conversation_id=None,  # Stateless: new conversation each call
-            ),
-            timeout=MCP_TOOL_TIMEOUT,
-        )
+        async with stream_admission.admit(caps):
+            response_text, conv_id, msg_id = await asyncio.wait_for(
+                service.chat(
+                    workflow=target_workflow,
+                    user=user,
+                    message=message,
+                    conversation_id=None,  # Stateless: new conversation each call
+                ),
+                timeout=MCP_TOOL_TIMEOUT,
+            )
 
         return {
             "content": [{"type": "text", "text": response_text}],
@@ -302,6 +306,11 @@ async def _execute_tool_call(
             "content": [{"type": "text", "text": f"Tool execution timed out after {int(MCP_TOOL_TIMEOUT)} seconds."}],
             "isError": True,
         }
+    except StreamAdmissionError as e:
+        return {
+            "content": [{"type": "text", "text": f"{e} Retry after {e.retry_after} seconds."}],
+            "isError": True,
+        }
     except WorkflowServiceError as e:
         logger.error(f"MCP bridge workflow error: {e}")
         return {
@@ -379,17 +388,19 @@ async def playground_chat_via_bridge(
         f"Playground OpenClaw chat: user={user.clerk_id}, workflow={workflow.id}"
     )
 
+    caps = await resolve_generation_caps(session, user.id)
     try:
         service = WorkflowService(session)
-        response_text, conv_id, msg_id = await asyncio.wait_for(
-            service.chat(
-                workflow=workflow,
-                user=user,
-                message=body.message,
-                conversation_id=body.conversation_id,
-            ),
-            timeout=MCP_TOOL_TIMEOUT,
-        )
+        async with stream_admission.admit(caps):
+            response_text, conv_id, msg_id = await asyncio.wait_for(
+                service.chat(
+                    workflow=workflow,
+                    user=user,
+                    message=body.message,
+                    conversation_id=body.conversation_id,
+                ),
+                timeout=MCP_TOOL_TIMEOUT,
+            )
 
         return PlaygroundChatResponse(
             message=response_text,
@@ -398,6 +409,12 @@ async def playground_chat_via_bridge(
             via="openclaw",
         )
 
+    except StreamAdmissionError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
     except asyncio.TimeoutError:
         raise HTTPException(
             status_code=status.HTTP_504_GATEWAY_TIMEOUT,
@@ -7,7 +7,7 @@ from typing import List, Optional, Dict, Any
 from fastapi import APIRouter, HTTPException, status
 from pydantic import BaseModel, Field
 
-from app.database import AsyncSessionDep
+from app.database import AsyncSessionDep, ReadOnlySessionDep
 from app.middleware.clerk_auth import CurrentUser
 from app.services.user_service import UserService
 from app.services.mission_service import MissionService, MissionServiceError
@@ -212,12 +212,13 @@ def mission_to_response(
 )
 async def list_missions(
     session: AsyncSessionDep,
+    read_session: ReadOnlySessionDep,
     clerk_user: CurrentUser,
     category: Optional[str] = None,
 ) -> MissionListResponse:
     """List all missions with user's progress."""
     user = await get_user_from_clerk(clerk_user, session)
-    mission_service = MissionService(session)
+    mission_service = MissionService(read_session)
 
     missions_with_progress = await mission_service.get_missions_with_progress(
         user_id=str(user.id),
@@ -8,7 +8,8 @@ from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sse_starlette.sse import EventSourceResponse
 
-from app.database import AsyncSessionDep
+from app.database import AsyncSessionDep, ReadOnlySessionDep
+from app.utils.pagination import InvalidCursorError
 from app.middleware.clerk_auth import CurrentUser
 from app.middleware.redis_rate_limit import check_rate_limit_with_user
 from app.models.user import User
@@ -17,12 +18,18 @@ from app.schemas.workflow import (
     WorkflowCreateFromAgent,
     WorkflowCreateFromTemplate,
     WorkflowResponse,
+    WorkflowSummaryResponse,
     WorkflowUpdate,
     WorkflowListResponse,
     WorkflowExportResponse,
 )
 from app.schemas.message import ChatRequest, ChatResponse, MessageUpdate, MessageFeedback
 from app.schemas.streaming import StreamEvent, StreamEventType
+from app.services.stream_admission import (
+    StreamAdmissionError,
+    resolve_generation_caps,
+    stream_admission,
+)
 from app.services.user_service import UserService
 from app.services.workflow_service import WorkflowService, WorkflowServiceError
 
@@ -709,33 +716,49 @@ async def create_workflow_from_template(
     "",
     response_model=WorkflowListResponse,
     summary="List workflows",
-    description="List all workflows for the current user.",
+    description="List all workflows for the current user (without flow_data; get a workflow for its full body).",
 )
 async def list_workflows(
     session: AsyncSessionDep,
+    read_session: ReadOnlySessionDep,
     clerk_user: CurrentUser,
     project_id: Optional[uuid.UUID] = None,
     page: int = 1,
     page_size: int = 20,
     active_only: bool = True,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
 ):
-    """List all workflows for the authenticated user."""
+    """
+    List all workflows for the authenticated user, newest first.
+
+    Pass a response's next_cursor as cursor to get the following page.
+    """
     user = await get_user_from_clerk(clerk_user, session)
-    service = WorkflowService(session)
+    service = WorkflowService(read_session)
 
-    workflows, total = await service.list_by_user(
-        user_id=user.id,
-        project_id=project_id,
-        page=page,
-        page_size=page_size,
-        active_only=active_only,
-    )
+    try:
+        result = await service.list_by_user(
+            user_id=user.id,
+            project_id=project_id,
+            page=page,
+            page_size=page_size,
+            active_only=active_only,
+            cursor=cursor,
+            include_total=include_total,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
 
     return WorkflowListResponse(
-        workflows=[WorkflowResponse.model_validate(w) for w in workflows],
-        total=total,
+        workflows=[WorkflowSummaryResponse.model_validate(w) for w in result.items],
+        total=result.total,
         page=page,
         page_size=page_size,
+        next_cursor=result.next_cursor,
     )
 
 
@@ -946,19 +969,27 @@ async def chat_with_workflow(
             detail="Workflow not found.",
         )
 
+    caps = await resolve_generation_caps(session, user.id)
     try:
-        response_text, conversation_id, message_id = await service.chat(
-            workflow=workflow,
-            user=user,
-            message=chat_request.message,
-            conversation_id=chat_request.conversation_id,
-        )
+        async with stream_admission.admit(caps):
+            response_text, conversation_id, message_id = await service.chat(
+                workflow=workflow,
+                user=user,
+                message=chat_request.message,
+                conversation_id=chat_request.conversation_id,
+            )
 
         return ChatResponse(
             message=response_text,
             conversation_id=conversation_id,
             message_id=message_id,
         )
+    except StreamAdmissionError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
     except WorkflowServiceError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -1002,39 +1033,56 @@ async def chat_with_workflow_stream(
             detail="Workflow not found.",
         )
 
+    caps = await resolve_generation_caps(session, user.id)
+
     async def event_generator():
         """Generate SSE events from the streaming chat."""
         try:
-            async for event in service.chat_stream(
-                workflow=workflow,
-                user=user,
-                message=chat_request.message,
-                conversation_id=chat_request.conversation_id,
-            ):
-                # Convert StreamEvent to SSE format
+            # Held for the whole stream; waits (bounded) while the user is at their cap
+            async with stream_admission.admit(caps):
+                async for event in service.chat_stream(
+                    workflow=workflow,
+                    user=user,
+                    message=chat_request.message,
+                    conversation_id=chat_request.conversation_id,
+                ):
+                    # Convert StreamEvent to SSE format
+                    yield {
+                        "event": event.event.value,
+                        "data": event.model_dump_json(),
+                    }
+
+                    # Stop after done event
+                    if event.event == StreamEventType.DONE:
+                        break
+
+        except StreamAdmissionError as e:
+            from app.schemas.streaming import error_event, done_event
+            err = error_event(
+                code="TOO_MANY_STREAMS",
+                message=str(e),
+                details={"retry_after": e.retry_after},
+            )
+            for event in (err, done_event()):
                 yield {
                     "event": event.event.value,
                     "data": event.model_dump_json(),
                 }
-
-                # Stop after done event
-                if event.event == StreamEventType.DONE:
-                    break
-
         except asyncio.CancelledError:
             # Client disconnected, cleanup gracefully
             pass
         except Exception as e:
             # Send error event on unexpected errors
-            from app.schemas.streaming import error_event
+            from app.schemas.streaming import error_event, done_event
             err = error_event(
                 code="STREAM_ERROR",
                 message=str(e),
             )
-            yield {
-                "event": err.event.value,
-                "data": err.model_dump_json(),
-            }
+            for event in (err, done_event()):
+                yield {
+                    "event": event.event.value,
+                    "data": event.model_dump_json(),
+                }
 
     return EventSourceResponse(
         event_generator(),
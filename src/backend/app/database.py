@@ -10,6 +10,7 @@ from fastapi import Depends
 from sqlalchemy import DateTime, String, event
 from sqlalchemy.ext.asyncio import (
     AsyncAttrs,
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
@@ -18,27 +19,62 @@ from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 from sqlalchemy.sql import func
 
 from app.config import settings
+from app.middleware.clerk_auth import CurrentUser
+from app.utils.db_pool import PoolMetrics, instrumented_pool_class
+from app.utils.db_replica import REPLICA_KEY, ReplicaRouter, track_writes
 
 # Detect database type
 is_sqlite = settings.database_url.startswith("sqlite")
 
-# Create async engine with appropriate settings
-if is_sqlite:
-    engine = create_async_engine(
-        settings.database_url,
-        echo=settings.debug,
-        connect_args={"check_same_thread": False},
-    )
-else:
-    # PostgreSQL settings
-    engine = create_async_engine(
-        settings.database_url,
-        echo=settings.debug,
-        pool_size=5,
-        max_overflow=10,
-        pool_pre_ping=True,
-        pool_recycle=3600,
-    )
+# Checkout waits, timeouts and connection counts for /health/db
+db_pool_metrics = PoolMetrics()
+replica_pool_metrics = PoolMetrics()
+
+
+def _create_engine(url: str, metrics: PoolMetrics) -> AsyncEngine:
+    """Create an async engine with appropriate settings for its dialect."""
+    if url.startswith("sqlite"):
+        new_engine = create_async_engine(
+            url,
+            echo=settings.debug,
+            connect_args={"check_same_thread": False},
+        )
+    else:
+        # PostgreSQL settings
+        new_engine = create_async_engine(
+            url,
+            echo=settings.debug,
+            poolclass=instrumented_pool_class(metrics),
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout_seconds,
+            pool_pre_ping=settings.db_pool_pre_ping,
+            pool_recycle=settings.db_pool_recycle_seconds,
+            connect_args={
+                # asyncpg's statement cache and SQLAlchemy's prepared statement cache
+                "statement_cache_size": settings.db_statement_cache_size,
+                "prepared_statement_cache_size": settings.db_statement_cache_size,
+            },
+        )
+    metrics.listen(new_engine)
+    return new_engine
+
+
+engine = _create_engine(settings.database_url, db_pool_metrics)
+
+# Optional read replica for ReadOnlySessionDep (see app/utils/db_replica.py)
+replica_engine = (
+    _create_engine(settings.database_replica_url, replica_pool_metrics)
+    if settings.database_replica_url
+    else None
+)
+replica_router = ReplicaRouter(
+    replica_engine,
+    max_lag_seconds=settings.replica_max_lag_seconds,
+    check_seconds=settings.replica_lag_check_seconds,
+    sticky_seconds=settings.replica_sticky_seconds,
+)
+track_writes(lambda: replica_router)
 
 # Create async session factory
 async_session_maker = async_sessionmaker(
@@ -126,6 +162,64 @@ async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
 AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_session)]
 
 
+async def get_read_session(
+    clerk_user: CurrentUser,
+    session: AsyncSessionDep,
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    FastAPI dependency for read-only queries.
+
+    Provides a read replica session when a replica is configured, it is
+    within the allowed lag and the user hasn't written recently. Otherwise
+    provides the request's primary session (the AsyncSessionDep one).
+    Replica sessions refuse writes; resolve the user (which may insert)
+    with AsyncSessionDep.
+    """
+    if not await replica_router.use_replica(clerk_user.user_id):
+        yield session
+        return
+
+    async with replica_router.session_maker() as replica_session:
+        replica_session.info[REPLICA_KEY] = True
+        yield replica_session
+
+
+ReadOnlySessionDep = Annotated[AsyncSession, Depends(get_read_session)]
+
+
+def _dialect_name(bind) -> str:
+    """Dialect name for a session (sync or async) or a connection."""
+    if hasattr(bind, "dialect"):
+        return bind.dialect.name
+    return bind.get_bind().dialect.name
+
+
+def dialect_insert(session: AsyncSession, model):
+    """
+    Build an INSERT for the session's dialect that supports ON CONFLICT.
+
+    PostgreSQL and SQLite both implement ``on_conflict_do_update`` /
+    ``on_conflict_do_nothing`` but through dialect-specific constructs, so the
+    dialect is resolved from the session's bind rather than from settings
+    (tests run on SQLite even when DATABASE_URL points at PostgreSQL).
+    A Connection may be passed instead of a session (e.g. in ORM events).
+    """
+    if _dialect_name(session) == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert(model)
+
+
+def sql_uuid(session: AsyncSession):
+    """SQL expression generating a UUID string, for INSERT ... SELECT."""
+    from sqlalchemy import String, cast, func
+
+    if _dialect_name(session) == "postgresql":
+        return cast(func.gen_random_uuid(), String)
+    return func.lower(func.hex(func.randomblob(16)))
+
+
 async def create_tables() -> None:
     """Create all tables. Use Alembic migrations in production."""
     async with engine.begin() as conn:
@@ -3,6 +3,7 @@ Teach Charlie AI - FastAPI Backend Application
 
 This is the main entry point for the backend API.
 """
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
@@ -280,10 +281,66 @@ async def lifespan(app: FastAPI):
     # Sync MCP servers to .mcp.json on startup
     await sync_mcp_servers()
 
+    # Open pooled database connections before the first requests need them
+    from app.database import engine, is_sqlite
+    from app.utils.db_pool import warm_up_pool
+    if not is_sqlite:
+        opened = await warm_up_pool(engine, min(settings.db_pool_warmup_connections, settings.db_pool_size))
+        logger.info(f"Database pool warmed up with {opened} connections")
+
+    # Keep Clerk signing keys fresh so token checks never wait on a JWKS fetch
+    jwks_task = None
+    if settings.clerk_jwks_url and not settings.dev_mode:
+        from app.middleware.clerk_auth import run_jwks_refresher
+        jwks_task = asyncio.create_task(run_jwks_refresher())
+
+    # Flush buffered workflow run metrics in the background
+    from app.services.workflow_metrics import run_metrics_flusher, flush_workflow_metrics
+    metrics_task = asyncio.create_task(run_metrics_flusher())
+
+    # Apply queued Stripe webhook events in the background
+    from app.services.billing_events import run_billing_event_worker
+    billing_events_task = asyncio.create_task(run_billing_event_worker())
+
+    # Return unused rate limit leases to Redis
+    from app.middleware.redis_rate_limit import redis_rate_limiter, run_lease_releaser
+    lease_task = None
+    if redis_rate_limiter.max_lease > 1:
+        lease_task = asyncio.create_task(run_lease_releaser())
+
+    # Keep plan-limit gauges in step with agent/workflow rows
+    from app.services.usage_counter_service import register_gauge_events, run_gauge_reconciler
+    register_gauge_events()
+    gauge_task = None
+    if settings.usage_gauge_reconcile_seconds > 0:
+        gauge_task = asyncio.create_task(run_gauge_reconciler())
+
+    # Optional nightly analytics rollup
+    rollup_task = None
+    if settings.analytics_rollup_enabled:
+        from app.services.analytics_rollup import run_rollup_scheduler
+        rollup_task = asyncio.create_task(run_rollup_scheduler())
+
     yield
 
     # Shutdown
-    # Add cleanup code here if needed
+    if rollup_task:
+        rollup_task.cancel()
+    if gauge_task:
+        gauge_task.cancel()
+    if jwks_task:
+        jwks_task.cancel()
+    metrics_task.cancel()
+    billing_events_task.cancel()
+    if lease_task:
+        lease_task.cancel()
+        await redis_rate_limiter.release_expired_leases(release_all=True)
+    from app.services.billing_service import shutdown_stripe_executor
+    shutdown_stripe_executor()
+    try:
+        await flush_workflow_metrics()
+    except Exception as e:
+        logger.warning(f"Failed to flush workflow metrics on shutdown: {e}")
 
 
 # Create FastAPI application
@@ -1,17 +1,30 @@
 """
 Clerk JWT authentication middleware for FastAPI.
 Uses PyJWT with JWKS validation for secure token verification.
+
+Signing keys are held by a JWKSManager that fetches them with an async
+HTTP client and refreshes them in the background (run_jwks_refresher,
+started from the app lifespan), so requests never wait on a blocking
+JWKS fetch. Verified token payloads are cached by token hash until the
+token expires, so repeat requests skip signature verification.
 """
+import asyncio
+import hashlib
+import logging
+import time
 from dataclasses import dataclass
-from functools import lru_cache
-from typing import Annotated, Optional
+from typing import Annotated, Any, Dict, Optional
 
+import httpx
 import jwt
-from jwt import PyJWKClient, PyJWKClientError
+from jwt import PyJWKClientError, PyJWKSet
 from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from app.config import settings
+from app.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -41,30 +54,124 @@ DEV_USER = ClerkUser(
 )
 
 
-@lru_cache(maxsize=1)
-def get_jwks_client() -> PyJWKClient:
+class JWKSManager:
     """
-    Get a cached JWKS client.
-    PyJWKClient internally caches keys for 5 minutes by default.
+    Clerk signing keys, fetched asynchronously and refreshed in the background.
+
+    A token signed with an unknown key ID (key rotation) triggers an
+    immediate refresh, at most once per MIN_REFRESH_INTERVAL; concurrent
+    requests share a single fetch.
     """
+
+    MIN_REFRESH_INTERVAL = 30
+
+    def __init__(self, jwks_url: str):
+        self.jwks_url = jwks_url
+        self._keys: Dict[str, Any] = {}
+        self._fetched_at = 0.0
+        self._last_attempt = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def age(self) -> float:
+        """Seconds since keys were last fetched successfully."""
+        return time.monotonic() - self._fetched_at if self._fetched_at else float("inf")
+
+    def load(self, jwks: Dict[str, Any]) -> None:
+        """Replace the key set from a JWKS document."""
+        self._keys = {key.key_id: key for key in PyJWKSet.from_dict(jwks).keys if key.key_id}
+        self._fetched_at = time.monotonic()
+
+    async def refresh(self) -> None:
+        """
+        Fetch the JWKS document (single-flight).
+
+        Raises:
+            PyJWKClientError: If the keys cannot be fetched or parsed
+        """
+        attempt = time.monotonic()
+        async with self._lock:
+            # Another request refreshed while we waited for the lock
+            if self._last_attempt >= attempt:
+                return
+            self._last_attempt = time.monotonic()
+            try:
+                async with httpx.AsyncClient(timeout=10.0) as client:
+                    response = await client.get(self.jwks_url)
+                    response.raise_for_status()
+                self.load(response.json())
+            except Exception as e:
+                raise PyJWKClientError(f"Fail to fetch data from the url, err: {e}")
+
+    async def get_signing_key(self, kid: Optional[str]) -> Any:
+        """
+        Get the key for a token's `kid` header.
+
+        Raises:
+            PyJWKClientError: If no matching key exists after a refresh
+        """
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+
+        if not self._keys or time.monotonic() - self._last_attempt >= self.MIN_REFRESH_INTERVAL:
+            await self.refresh()
+            key = self._keys.get(kid)
+        if key is None:
+            raise PyJWKClientError(f'Unable to find a signing key that matches: "{kid}"')
+        return key
+
+
+_jwks_manager: Optional[JWKSManager] = None
+
+
+def get_jwks_manager() -> JWKSManager:
+    """Get the process-wide JWKS manager."""
+    global _jwks_manager
     if not settings.clerk_jwks_url:
         raise ValueError(
             "CLERK_JWKS_URL not configured. "
             "Set it to https://your-instance.clerk.accounts.dev/.well-known/jwks.json"
         )
+    if _jwks_manager is None:
+        _jwks_manager = JWKSManager(settings.clerk_jwks_url)
+    return _jwks_manager
 
-    return PyJWKClient(
-        settings.clerk_jwks_url,
-        cache_keys=True,
-        lifespan=300,  # 5 minutes cache
-    )
+
+async def run_jwks_refresher() -> None:
+    """
+    Keep Clerk signing keys fresh every CLERK_JWKS_REFRESH_SECONDS
+    (retrying sooner after a failure). Runs until cancelled.
+    """
+    manager = get_jwks_manager()
+    while True:
+        try:
+            await manager.refresh()
+            delay = settings.clerk_jwks_refresh_seconds
+        except PyJWKClientError as e:
+            # Requests keep using the last known keys meanwhile
+            logger.error(f"JWKS refresh failed: {e}")
+            delay = JWKSManager.MIN_REFRESH_INTERVAL
+        await asyncio.sleep(delay)
+
+
+# sha256(token) -> verified payload, kept until the token's exp
+_token_cache: TTLCache[Dict[str, Any]] = TTLCache(
+    max_size=settings.auth_token_cache_max_size,
+    ttl_seconds=3600,
+)
+
+
+def clear_token_cache() -> None:
+    """Drop all cached token verifications."""
+    _token_cache.clear()
 
 
 # Security scheme for extracting bearer token
 security = HTTPBearer(auto_error=False)
 
 
-def validate_clerk_token(token: str) -> dict:
+async def validate_clerk_token(token: str) -> dict:
     """
     Validate a Clerk JWT token and return the decoded payload.
 
@@ -83,12 +190,15 @@ def validate_clerk_token(token: str) -> dict:
             detail="Clerk authentication not configured",
         )
 
-    try:
-        # Get the JWKS client
-        jwks_client = get_jwks_client()
+    token_hash = hashlib.sha256(token.encode()).digest()
+    cached = _token_cache.get(token_hash)
+    if cached is not None:
+        return cached
 
-        # Get the signing key from the token header
-        signing_key = jwks_client.get_signing_key_from_jwt(token)
+    try:
+        # Get the signing key for the token's key ID
+        kid = jwt.get_unverified_header(token).get("kid")
+        signing_key = await get_jwks_manager().get_signing_key(kid)
 
         # Decode and verify the token
         payload = jwt.decode(
@@ -115,6 +225,11 @@ def validate_clerk_token(token: str) -> dict:
             if azp not in authorized_parties:
                 raise jwt.InvalidTokenError(f"Invalid authorized party: {azp}")
 
+        # Reuse the verification until the token expires (not before it is valid)
+        now = time.time()
+        if payload.get("nbf", now) <= now:
+            _token_cache.set(token_hash, payload, ttl_seconds=payload["exp"] - now)
+
         return payload
 
     except jwt.ExpiredSignatureError:
@@ -130,8 +245,6 @@ def validate_clerk_token(token: str) -> dict:
     except jwt.InvalidTokenError as e:
         # SECURITY: Don't expose token validation details to client
         # Log the detailed error for debugging but return generic message
-        import logging
-        logger = logging.getLogger(__name__)
         logger.warning(f"JWT validation failed: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -139,8 +252,6 @@ def validate_clerk_token(token: str) -> dict:
         )
     except PyJWKClientError as e:
         # SECURITY: Don't expose JWKS client details to client
-        import logging
-        logger = logging.getLogger(__name__)
         error_msg = str(e)
         logger.error(f"JWKS client error: {error_msg}")
 
@@ -164,8 +275,6 @@ def validate_clerk_token(token: str) -> dict:
         )
     except Exception as e:
         # SECURITY: Don't expose internal error details
-        import logging
-        logger = logging.getLogger(__name__)
         logger.error(f"Unexpected auth error: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -196,7 +305,7 @@ async def get_current_user(
         )
 
     token = credentials.credentials
-    payload = validate_clerk_token(token)
+    payload = await validate_clerk_token(token)
 
     return ClerkUser(
         user_id=payload.get("sub"),
@@ -234,7 +343,7 @@ async def get_optional_user(
     token = auth_header.split(" ", 1)[1]
 
     try:
-        payload = validate_clerk_token(token)
+        payload = await validate_clerk_token(token)
         return ClerkUser(
             user_id=payload.get("sub"),
             session_id=payload.get("sid"),
@@ -13,6 +13,7 @@ from fastapi import HTTPException, status
 from app.database import AsyncSessionDep
 from app.middleware.clerk_auth import CurrentUser
 from app.services.billing_service import BillingService
+from app.services.plan_resolver import PlanResolver
 from app.services.user_service import UserService
 
 logger = logging.getLogger(__name__)
@@ -37,10 +38,12 @@ async def check_plan_access(
     user_service = UserService(session)
     user = await user_service.get_or_create_from_clerk(clerk_user)
 
-    billing = BillingService(session)
-    subscription = await billing.get_or_create_subscription(user)
+    resolved = await PlanResolver(session).resolve(str(user.id))
+    if not resolved.has_subscription:
+        # First plan check for this user: create their free subscription row
+        await BillingService(session).get_or_create_subscription(user)
 
-    if subscription.plan_id not in allowed_plans:
+    if resolved.plan_id not in allowed_plans:
         allowed_names = ", ".join(p.title() for p in allowed_plans)
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
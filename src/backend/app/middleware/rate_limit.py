@@ -1,42 +1,68 @@
 """
-Simple in-memory rate limiting for API protection.
+In-memory rate limiting for API protection.
 
-For MVP, this uses in-memory storage. For production with multiple
-backend instances, upgrade to Redis-based rate limiting.
+Sliding-window counters over fixed-size bucket arrays, so each tracked
+identifier costs a small constant amount of memory and a check is O(1)
+(amortised). Identifiers are kept in LRU order: idle ones are swept as
+checks run and the least recently seen are evicted beyond max_keys, so
+memory stays bounded under IP-based traffic (embeds, bots).
+
+Limits are per process. RedisRateLimiter shares them across instances and
+falls back to this limiter while Redis is unavailable.
 """
+import sys
 import time
-from collections import defaultdict
-from typing import Dict, Tuple
+from array import array
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Tuple
 
 from fastapi import HTTPException, Request, status
 
+# (name, period in seconds, buckets, message when exceeded). Counts are
+# kept per bucket, so a window covers between period - period / buckets
+# and period seconds.
+_WINDOWS = (
+    ("minute", 60, 6, "Too many requests. Please slow down a bit!"),
+    ("hour", 3600, 12, "You've made a lot of requests today. Take a short break!"),
+)
+
+
+class _Entry:
+    """Bucket counts for one identifier."""
+
+    __slots__ = ("counts", "totals", "last")
+
+    def __init__(self, now: float):
+        self.counts = [array("I", bytes(4 * buckets)) for _, _, buckets, _ in _WINDOWS]
+        self.totals = [0] * len(_WINDOWS)
+        self.last = [int(now * buckets // period) for _, period, buckets, _ in _WINDOWS]
+
 
 class RateLimiter:
     """
-    Simple sliding window rate limiter.
+    Sliding-window counter rate limiter.
 
-    Tracks request counts per user/IP within a time window.
+    Tracks request counts per user/IP in fixed-size bucket arrays, evicting
+    identifiers idle for longer than the longest window and the least
+    recently seen beyond max_keys.
     """
 
     def __init__(
         self,
         requests_per_minute: int = 60,
         requests_per_hour: int = 1000,
+        max_keys: int = 50000,
+        clock: Callable[[], float] = time.monotonic,
     ):
         self.requests_per_minute = requests_per_minute
         self.requests_per_hour = requests_per_hour
-        # Track requests: {identifier: [(timestamp, count), ...]}
-        self._minute_requests: Dict[str, list] = defaultdict(list)
-        self._hour_requests: Dict[str, list] = defaultdict(list)
-
-    def _clean_old_requests(
-        self,
-        requests: list,
-        window_seconds: int,
-    ) -> list:
-        """Remove requests older than the time window."""
-        cutoff = time.time() - window_seconds
-        return [r for r in requests if r[0] > cutoff]
+        self.max_keys = max_keys
+        self._limits = (requests_per_minute, requests_per_hour)
+        self._idle_seconds = max(period for _, period, _, _ in _WINDOWS)
+        self._clock = clock
+        # identifier -> (last seen, entry), least recently seen first
+        self._entries: "OrderedDict[str, Tuple[float, _Entry]]" = OrderedDict()
+        self.evictions = 0
 
     def _get_identifier(self, request: Request) -> str:
         """Get unique identifier for rate limiting (user ID or IP)."""
@@ -53,6 +79,85 @@ class RateLimiter:
             ip = request.client.host if request.client else "unknown"
         return f"ip:{ip}"
 
+    def _evict(self, now: float) -> None:
+        """Drop idle identifiers from the LRU end, then any beyond max_keys."""
+        entries = self._entries
+        cutoff = now - self._idle_seconds
+        while entries:
+            seen, _ = next(iter(entries.values()))
+            if seen > cutoff:
+                break
+            entries.popitem(last=False)
+        while len(entries) > self.max_keys:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def _advance(self, entry: _Entry, now: float) -> List[int]:
+        """Zero buckets that have left each window. Returns the current bucket numbers."""
+        current = []
+        for i, (_, period, buckets, _) in enumerate(_WINDOWS):
+            bucket = int(now * buckets // period)
+            counts = entry.counts[i]
+            if bucket - entry.last[i] >= buckets:
+                counts[:] = array("I", bytes(4 * buckets))
+                entry.totals[i] = 0
+            else:
+                for b in range(entry.last[i] + 1, bucket + 1):
+                    entry.totals[i] -= counts[b % buckets]
+                    counts[b % buckets] = 0
+            entry.last[i] = bucket
+            current.append(bucket)
+        return current
+
+    def _retry_after(self, entry: _Entry, i: int, bucket: int, now: float) -> int:
+        """Seconds until enough old buckets expire to admit one more request."""
+        _, period, buckets, _ = _WINDOWS[i]
+        excess = entry.totals[i] - self._limits[i] + 1
+        for b in range(bucket - buckets + 1, bucket + 1):
+            excess -= entry.counts[i][b % buckets]
+            if excess <= 0:
+                break
+        expires_at = (b + buckets) * period / buckets
+        return max(1, int(expires_at - now + 0.999))
+
+    def hit(self, identifier: str) -> Tuple[bool, str, Dict[str, Any]]:
+        """
+        Count a request for an identifier if it is within every limit.
+
+        Rejected requests are not counted.
+
+        Args:
+            identifier: Rate limit key (user, IP, token...)
+
+        Returns:
+            Tuple of (is_allowed, error_message, metadata), with the same
+            metadata keys as RedisRateLimiter
+        """
+        now = self._clock()
+        item = self._entries.get(identifier)
+        if item is None:
+            entry = _Entry(now)
+        else:
+            entry = item[1]
+            self._entries.move_to_end(identifier)
+        self._entries[identifier] = (now, entry)
+        self._evict(now)
+
+        current = self._advance(entry, now)
+        for i, (name, _, _, message) in enumerate(_WINDOWS):
+            if entry.totals[i] >= self._limits[i]:
+                return False, message, {
+                    "retry_after": self._retry_after(entry, i, current[i], now),
+                    "limit": name,
+                }
+
+        meta = {}
+        for i, (name, _, buckets, _) in enumerate(_WINDOWS):
+            entry.counts[i][current[i] % buckets] += 1
+            entry.totals[i] += 1
+            meta[f"remaining_{name}"] = self._limits[i] - entry.totals[i]
+        return True, "", meta
+
     def check_rate_limit(self, request: Request) -> Tuple[bool, str]:
         """
         Check if request is within rate limits.
@@ -60,32 +165,33 @@ class RateLimiter:
         Returns:
             Tuple of (is_allowed, error_message)
         """
-        identifier = self._get_identifier(request)
-        now = time.time()
-
-        # Clean and check minute window
-        self._minute_requests[identifier] = self._clean_old_requests(
-            self._minute_requests[identifier], 60
+        is_allowed, error_message, _ = self.hit(self._get_identifier(request))
+        return is_allowed, error_message
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Tracked identifiers, evictions and approximate memory use."""
+        sample = _Entry(0)
+        per_entry = (
+            sys.getsizeof(sample)
+            + sum(sys.getsizeof(c) for c in sample.counts)
+            + sys.getsizeof(sample.counts)
+            + sys.getsizeof(sample.totals)
+            + sys.getsizeof(sample.last)
+            # (last seen, entry) tuple, float and OrderedDict slot + link
+            + 64 + 24 + 100
         )
-        minute_count = len(self._minute_requests[identifier])
-
-        if minute_count >= self.requests_per_minute:
-            return False, "Too many requests. Please slow down a bit!"
-
-        # Clean and check hour window
-        self._hour_requests[identifier] = self._clean_old_requests(
-            self._hour_requests[identifier], 3600
-        )
-        hour_count = len(self._hour_requests[identifier])
-
-        if hour_count >= self.requests_per_hour:
-            return False, "You've made a lot of requests today. Take a short break!"
-
-        # Record this request
-        self._minute_requests[identifier].append((now, 1))
-        self._hour_requests[identifier].append((now, 1))
+        keys = len(self._entries)
+        key_bytes = sum(sys.getsizeof(k) for k in self._entries)
+        return {
+            "keys": keys,
+            "max_keys": self.max_keys,
+            "evictions": self.evictions,
+            "approx_bytes": keys * per_entry + key_bytes,
+        }
 
-        return True, ""
+    def clear(self) -> None:
+        self._entries.clear()
 
 
 # Import settings for configuration
@@ -95,6 +201,7 @@ from app.config import settings
 rate_limiter = RateLimiter(
     requests_per_minute=settings.rate_limit_per_minute,
     requests_per_hour=settings.rate_limit_per_hour,
+    max_keys=settings.rate_limit_memory_max_keys,
 )
 
 
@@ -107,9 +214,10 @@ async def check_rate_limit(request: Request) -> None:
         async def chat(request: Request, _: None = Depends(check_rate_limit)):
             ...
     """
-    is_allowed, error_message = rate_limiter.check_rate_limit(request)
+    is_allowed, error_message, meta = rate_limiter.hit(rate_limiter._get_identifier(request))
     if not is_allowed:
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail=error_message,
+            headers={"Retry-After": str(meta["retry_after"])},
         )
@@ -1,35 +1,49 @@
 """
 Redis-based distributed rate limiting for production use.
 
-Uses sliding window algorithm with Redis sorted sets for accurate
-rate limiting that works across multiple backend instances.
+Uses GCRA (a smoothed sliding window) in a single Lua script, so both
+windows are checked and updated atomically in one round trip and work
+across multiple backend instances.
+
+While Redis is unavailable, limits are enforced per instance by the
+in-memory RateLimiter, and the connection is retried every
+REDIS_RETRY_SECONDS.
 """
+import asyncio
 import logging
 import time
-from typing import Optional, Tuple, Dict, Any
+from collections import OrderedDict
+from typing import Optional, Tuple, Dict, Any, List
 
 from fastapi import HTTPException, Request, status
 
+from app.middleware.rate_limit import RateLimiter
+
 logger = logging.getLogger(__name__)
 
 # Redis will be imported lazily to avoid startup failures
 _redis_client = None
 _redis_available = None
+# Monotonic time after which a failed connection is retried
+_redis_retry_at = 0.0
 
 
 async def get_redis():
-    """Get Redis client, creating connection if needed."""
-    global _redis_client, _redis_available
+    """Get Redis client, creating connection if needed (None while unavailable)."""
+    global _redis_client, _redis_available, _redis_retry_at
 
     if _redis_available is False:
-        return None
+        if time.monotonic() < _redis_retry_at:
+            return None
+        # One reconnect attempt per interval; concurrent callers keep falling back
+        _redis_client = None
+        _redis_retry_at = time.monotonic() + settings.redis_retry_seconds
 
     if _redis_client is not None:
         return _redis_client
 
     try:
         import redis.asyncio as redis
-        from app.config import settings
 
         _redis_client = redis.from_url(
             settings.redis_url,
@@ -45,37 +59,158 @@ async def get_redis():
     except ImportError:
         logger.warning("Redis package not installed, falling back to in-memory rate limiting")
         _redis_available = False
+        _redis_retry_at = float("inf")
         return None
     except Exception as e:
         logger.warning(f"Redis connection failed, falling back to in-memory: {e}")
         _redis_available = False
+        _redis_retry_at = time.monotonic() + settings.redis_retry_seconds
         return None
 
 
+# GCRA (generic cell rate algorithm) over every window in one atomic call.
+#
+# Each window stores a single value, its theoretical arrival time (TAT) in
+# ms, so memory per key is O(1). Each token advances the TAT by period /
+# limit, and tokens are granted while new_tat - period <= now for every
+# window: at most `limit` per `period`, with the full limit available as a
+# burst. Granted tokens are taken from every window; nothing is written
+# when none are granted, so rejected requests do not consume quota.
+#
+# A call first gives back `release` unused tokens from an earlier grant
+# (moving the TAT back), then grants up to `want` tokens. Plain checks use
+# want=1, release=0.
+#
+# KEYS[i]:                  one key per window
+# ARGV[1], ARGV[2]:         want, release
+# ARGV[2i+1], ARGV[2i+2]:   window i's limit and period (ms)
+#
+# Returns {granted, denied_window (1-based, 0 if granted),
+#          retry_after_ms, remaining_1, remaining_2, ...}
+GCRA_SCRIPT = """
+if redis.replicate_commands then redis.replicate_commands() end
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local want = tonumber(ARGV[1])
+local release = tonumber(ARGV[2])
+
+local tats = {}
+local intervals = {}
+local available = {}
+local granted = want
+local denied = 0
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[2 * i + 1])
+    local period = tonumber(ARGV[2 * i + 2])
+    local interval = period / limit
+    local tat = tonumber(redis.call('GET', key)) or now
+    tat = tat - release * interval
+    if tat < now then tat = now end
+    -- Small epsilon: TATs are stored rounded to microseconds
+    available[i] = math.floor((now + period - tat) / interval + 1e-6)
+    if available[i] < granted then
+        granted = available[i]
+        denied = i
+    end
+    tats[i] = tat
+    intervals[i] = interval
+end
+if granted > 0 then denied = 0 end
+
+local result = {granted, denied, 0}
+if denied > 0 then
+    result[3] = math.ceil(tats[denied] + intervals[denied] - tonumber(ARGV[2 * denied + 2]) - now)
+end
+for i, key in ipairs(KEYS) do
+    if granted > 0 or release > 0 then
+        local new_tat = tats[i] + granted * intervals[i]
+        if new_tat > now then
+            redis.call('SET', key, string.format('%.3f', new_tat), 'PX', math.ceil(new_tat - now))
+        else
+            redis.call('DEL', key)
+        end
+    end
+    result[#result + 1] = available[i] - granted
+end
+return result
+"""
+
+# (name, period in seconds, message when exceeded)
+_WINDOWS = (
+    ("minute", 60, "Too many requests. Please slow down a bit!"),
+    ("hour", 3600, "You've made a lot of requests. Take a short break!"),
+)
+
+
+class _Lease:
+    """Tokens pre-allocated from Redis for one identifier, spent locally."""
+
+    __slots__ = ("tokens", "size", "expires_at")
+
+    def __init__(self, tokens: int, size: int, expires_at: float):
+        self.tokens = tokens
+        self.size = size
+        self.expires_at = expires_at
+
+
 class RedisRateLimiter:
     """
-    Redis-based sliding window rate limiter.
-
-    Uses Redis sorted sets for accurate per-user rate limiting
-    that persists across restarts and works with multiple backend instances.
+    Redis-based GCRA rate limiter with local quota leases.
+
+    Checks the per-minute and per-hour limits in one round trip (a Lua
+    script, atomic across backend instances) with one small string key per
+    window, so limits persist across restarts and are shared by every
+    instance.
+
+    With lease_fraction > 0, each instance takes small batches of tokens
+    from Redis and spends them in-process, so steady traffic only reaches
+    Redis once per batch. A lease starts at one token, doubles each time it
+    is used up (up to lease_fraction of the smaller limit) and shrinks
+    when tokens go unused. Unused tokens are returned after lease_seconds
+    (release_expired_leases). Leased tokens are already counted in Redis,
+    so the global limit is never exceeded. The cost is that up to one
+    lease per instance may sit unused until it is returned.
+
+    Falls back to an in-memory RateLimiter with the same limits (enforced
+    per instance) when Redis is unavailable or a check fails.
     """
 
     def __init__(
         self,
         requests_per_minute: int = 60,
         requests_per_hour: int = 1000,
+        fallback_max_keys: int = 50000,
+        lease_fraction: float = 0.0,
+        lease_seconds: float = 5.0,
     ):
         self.requests_per_minute = requests_per_minute
         self.requests_per_hour = requests_per_hour
+        self._limits = (requests_per_minute, requests_per_hour)
+        self.fallback = RateLimiter(
+            requests_per_minute=requests_per_minute,
+            requests_per_hour=requests_per_hour,
+            max_keys=fallback_max_keys,
+        )
+        self.max_lease = max(1, int(min(self._limits) * lease_fraction))
+        self.lease_seconds = lease_seconds
+        # identifier -> lease, oldest first
+        self._leases: "OrderedDict[str, _Lease]" = OrderedDict()
+        self._refills: Dict[str, "asyncio.Future[None]"] = {}
+        self.redis_calls = 0
+        # Registered per client (evalsha, reloaded on NOSCRIPT)
+        self._script = None
+        self._script_client = None
 
     def _get_identifier(self, request: Request, user_id: Optional[str] = None) -> str:
         """
         Get unique identifier for rate limiting.
 
-        Prefers user_id if provided, falls back to IP address.
+        Prefers user_id if provided, falls back to IP address. The braces
+        are a Redis Cluster hash tag, keeping all of an identifier's window
+        keys in one slot so the script can touch them together.
         """
         if user_id:
-            return f"ratelimit:user:{user_id}"
+            return f"ratelimit:{{user:{user_id}}}"
 
         # Fall back to IP address
         forwarded = request.headers.get("x-forwarded-for")
@@ -83,7 +218,32 @@ class RedisRateLimiter:
             ip = forwarded.split(",")[0].strip()
         else:
             ip = request.client.host if request.client else "unknown"
-        return f"ratelimit:ip:{ip}"
+        return f"ratelimit:{{ip:{ip}}}"
+
+    def _get_script(self, redis_client):
+        if self._script is None or self._script_client is not redis_client:
+            self._script = redis_client.register_script(GCRA_SCRIPT)
+            self._script_client = redis_client
+        return self._script
+
+    def _script_args(self, identifier: str, want: int, release: int) -> Tuple[List[str], List[int]]:
+        keys = [f"{identifier}:{name}" for name, _, _ in _WINDOWS]
+        args = [want, release]
+        for limit, (_, period, _) in zip(self._limits, _WINDOWS):
+            args += [limit, period * 1000]
+        return keys, args
+
+    def _check_fallback(
+        self,
+        identifier: str,
+        error: Optional[str] = None,
+    ) -> Tuple[bool, str, Dict[str, Any]]:
+        """Apply the limits in memory (this instance only) while Redis is unavailable."""
+        is_allowed, error_message, meta = self.fallback.hit(identifier)
+        meta["fallback"] = True
+        if error:
+            meta["error"] = error
+        return is_allowed, error_message, meta
 
     async def check_rate_limit(
         self,
@@ -93,6 +253,9 @@ class RedisRateLimiter:
         """
         Check if request is within rate limits using Redis.
 
+        The request only counts against the limits if it is allowed.
+        Requests covered by a local lease do not touch Redis.
+
         Args:
             request: FastAPI request object
             user_id: Optional user ID for per-user limiting
@@ -100,86 +263,123 @@ class RedisRateLimiter:
         Returns:
             Tuple of (is_allowed, error_message, metadata)
         """
-        redis_client = await get_redis()
-
-        if redis_client is None:
-            # SECURITY: When Redis is unavailable, use conservative fallback
-            # In production with high security requirements, consider returning False
-            # to deny requests when rate limiting cannot be verified
-            from app.config import settings
-
-            # In production environments, log a warning and use in-memory tracking
-            # This prevents complete rate limit bypass during Redis outages
-            if settings.environment.lower() in {"production", "prod", "staging", "stage", "live"}:
-                logger.warning(
-                    "SECURITY: Redis unavailable for rate limiting. "
-                    "Applying conservative fallback limits."
-                )
-                # Still allow but with reduced limits tracked in metadata
-                return True, "", {"fallback": True, "warning": "rate_limiting_degraded"}
-
-            # In development, allow with fallback flag
-            return True, "", {"fallback": True}
-
         identifier = self._get_identifier(request, user_id)
-        now = time.time()
-
+        if self.max_lease == 1:
+            _, result = await self._acquire(identifier, 1, 0)
+            return result
+
+        while True:
+            lease = self._leases.get(identifier)
+            if lease is not None and lease.expires_at > time.monotonic() and lease.tokens > 0:
+                lease.tokens -= 1
+                return True, "", {"leased": lease.tokens}
+            # One refill per identifier at a time; others wait and retry the lease
+            pending = self._refills.get(identifier)
+            if pending is None:
+                break
+            await asyncio.shield(pending)
+
+        want, release = 1, 0
+        if lease is not None:
+            if lease.expires_at > time.monotonic():
+                # Used up within its lifetime: lease more
+                want = min(self.max_lease, lease.size * 2)
+            else:
+                # Expired: give back what was not used and lease less
+                release = lease.tokens
+                want = max(1, lease.size - lease.tokens)
+            del self._leases[identifier]
+
+        refill = asyncio.get_running_loop().create_future()
+        self._refills[identifier] = refill
         try:
-            # Check minute window using Redis sorted set
-            minute_key = f"{identifier}:minute"
-            pipe = redis_client.pipeline()
-
-            # Remove old entries
-            pipe.zremrangebyscore(minute_key, 0, now - 60)
-            # Count current entries
-            pipe.zcard(minute_key)
-            # Add this request
-            pipe.zadd(minute_key, {str(now): now})
-            # Set expiry
-            pipe.expire(minute_key, 60)
-
-            results = await pipe.execute()
-            minute_count = results[1]
-
-            if minute_count >= self.requests_per_minute:
-                return (
-                    False,
-                    "Too many requests. Please slow down a bit!",
-                    {"retry_after": 60, "limit": "minute", "count": minute_count},
+            granted, result = await self._acquire(identifier, want, release)
+            if granted:
+                self._leases[identifier] = _Lease(
+                    tokens=granted - 1,
+                    size=want,
+                    expires_at=time.monotonic() + self.lease_seconds,
                 )
+        finally:
+            del self._refills[identifier]
+            refill.set_result(None)
+        return result
 
-            # Check hour window
-            hour_key = f"{identifier}:hour"
-            pipe = redis_client.pipeline()
+    async def _acquire(
+        self,
+        identifier: str,
+        want: int,
+        release: int,
+    ) -> Tuple[int, Tuple[bool, str, Dict[str, Any]]]:
+        """
+        Take up to `want` tokens from Redis, first returning `release`.
 
-            pipe.zremrangebyscore(hour_key, 0, now - 3600)
-            pipe.zcard(hour_key)
-            pipe.zadd(hour_key, {str(now): now})
-            pipe.expire(hour_key, 3600)
+        Returns:
+            Tuple of (tokens granted, check result for this request)
+        """
+        redis_client = await get_redis()
+        if redis_client is None:
+            return 0, self._check_fallback(identifier)
 
-            results = await pipe.execute()
-            hour_count = results[1]
+        keys, args = self._script_args(identifier, want, release)
+        try:
+            script = self._get_script(redis_client)
+            self.redis_calls += 1
+            result = [int(v) for v in await script(keys=keys, args=args)]
+        except Exception as e:
+            logger.error(f"Redis rate limit check failed: {e}")
+            return 0, self._check_fallback(identifier, error=str(e))
+
+        granted, denied, retry_after_ms = result[0], result[1], result[2]
+        if not granted:
+            name, _, message = _WINDOWS[denied - 1]
+            return 0, (
+                False,
+                message,
+                # Seconds until one more request fits, at least 1
+                {"retry_after": max(1, -(-retry_after_ms // 1000)), "limit": name},
+            )
 
-            if hour_count >= self.requests_per_hour:
-                return (
-                    False,
-                    "You've made a lot of requests. Take a short break!",
-                    {"retry_after": 3600, "limit": "hour", "count": hour_count},
-                )
+        return granted, (
+            True,
+            "",
+            {f"remaining_{name}": remaining for (name, _, _), remaining in zip(_WINDOWS, result[3:])},
+        )
 
-            return (
-                True,
-                "",
-                {
-                    "remaining_minute": self.requests_per_minute - minute_count - 1,
-                    "remaining_hour": self.requests_per_hour - hour_count - 1,
-                },
-            )
+    async def release_expired_leases(self, release_all: bool = False) -> int:
+        """
+        Return unused tokens from expired leases (or all leases) to Redis.
 
+        Returns:
+            Number of tokens returned
+        """
+        now = time.monotonic()
+        expired = []
+        while self._leases:
+            identifier, lease = next(iter(self._leases.items()))
+            if lease.expires_at > now and not release_all:
+                break
+            del self._leases[identifier]
+            if lease.tokens > 0:
+                expired.append((identifier, lease.tokens))
+        if not expired:
+            return 0
+
+        redis_client = await get_redis()
+        if redis_client is None:
+            return 0
+        try:
+            script = self._get_script(redis_client)
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for identifier, tokens in expired:
+                    keys, args = self._script_args(identifier, 0, tokens)
+                    await script(keys=keys, args=args, client=pipe)
+                self.redis_calls += 1
+                await pipe.execute()
         except Exception as e:
-            logger.error(f"Redis rate limit check failed: {e}")
-            # On error, allow the request but log it
-            return True, "", {"error": str(e)}
+            logger.warning(f"Returning leased rate limit tokens failed: {e}")
+            return 0
+        return sum(tokens for _, tokens in expired)
 
 
 # Import settings for configuration
@@ -189,9 +389,32 @@ from app.config import settings
 redis_rate_limiter = RedisRateLimiter(
     requests_per_minute=settings.rate_limit_per_minute,
     requests_per_hour=settings.rate_limit_per_hour,
+    fallback_max_keys=settings.rate_limit_memory_max_keys,
+    lease_fraction=settings.rate_limit_lease_fraction,
+    lease_seconds=settings.rate_limit_lease_seconds,
 )
 
 
+async def run_lease_releaser() -> None:
+    """Return unused leased tokens to Redis every RATE_LIMIT_LEASE_SECONDS. Runs until cancelled."""
+    while True:
+        await asyncio.sleep(redis_rate_limiter.lease_seconds)
+        try:
+            await redis_rate_limiter.release_expired_leases()
+        except Exception as e:
+            logger.error(f"Rate limit lease release error: {e}")
+
+
+def rate_limit_status() -> Dict[str, Any]:
+    """Rate limiting backend, lease and in-memory fallback usage, for health checks."""
+    return {
+        "backend": "redis" if _redis_available else "memory",
+        "fallback": redis_rate_limiter.fallback.stats,
+        "leases": len(redis_rate_limiter._leases),
+        "redis_calls": redis_rate_limiter.redis_calls,
+    }
+
+
 async def check_rate_limit(request: Request) -> None:
     """
     FastAPI dependency for rate limiting (backward compatible).
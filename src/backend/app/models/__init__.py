@@ -19,15 +19,21 @@ from app.models.user_settings import UserSettings
 # Primary models for three-tab architecture
 from app.models.agent_component import AgentComponent
 from app.models.workflow import Workflow
+from app.models.workflow_agent_component import WorkflowAgentComponent
 from app.models.mcp_server import MCPServer
 from app.models.user_file import UserFile
 from app.models.knowledge_source import KnowledgeSource
+from app.models.file_blob import FileBlob
 from app.models.agent_preset import AgentPreset
 # Billing models
 from app.models.subscription import Subscription
 from app.models.billing_event import BillingEvent
+from app.models.usage_counter import UsageCounter
+from app.models.credit_balance import CreditBalance
+from app.models.credit_ledger_entry import CreditLedgerEntry
 # Analytics models
 from app.models.analytics_daily import AnalyticsDaily
+from app.models.workflow_metrics_daily import WorkflowMetricsDaily
 # Mission/learning models
 from app.models.mission import Mission
 from app.models.user_mission_progress import UserMissionProgress
@@ -43,15 +49,21 @@ __all__ = [
     # Primary models
     "AgentComponent",
     "Workflow",
+    "WorkflowAgentComponent",
     "MCPServer",
     "UserFile",
     "KnowledgeSource",
+    "FileBlob",
     "AgentPreset",
     # Billing models
     "Subscription",
     "BillingEvent",
+    "UsageCounter",
+    "CreditBalance",
+    "CreditLedgerEntry",
     # Analytics
     "AnalyticsDaily",
+    "WorkflowMetricsDaily",
     # Missions
     "Mission",
     "UserMissionProgress",
@@ -8,7 +8,7 @@ import uuid
 from typing import TYPE_CHECKING, Optional
 
 from sqlalchemy import String, Text, ForeignKey, Boolean, JSON
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.orm import Mapped, mapped_column, query_expression, relationship
 
 from app.database import BaseModel
 
@@ -132,6 +132,10 @@ class AgentComponent(BaseModel):
         comment="Advanced configuration: model_provider, model_name, temperature, max_tokens, etc.",
     )
 
+    # advanced_config["channel_preferences"], loaded by list queries that
+    # defer advanced_config (None otherwise)
+    channel_preferences: Mapped[Optional[list]] = query_expression()
+
     # Python component file (for sidebar publishing)
     component_file_path: Mapped[Optional[str]] = mapped_column(
         String(500),
@@ -171,6 +175,7 @@ class AgentComponent(BaseModel):
     embed_token: Mapped[Optional[str]] = mapped_column(
         String(64),
         nullable=True,
+        unique=True,
         index=True,
         comment="Unique token for embed authentication",
     )
@@ -21,6 +21,9 @@ class AnalyticsDaily(BaseModel):
     - tokens_used: Total LLM tokens consumed
     - agents_created: New agents created
     - workflows_executed: Workflow runs
+
+    conversations_count, messages_count and tokens_used are incremented
+    as chats are written (AnalyticsService.increment_daily_counters).
     """
 
     __tablename__ = "analytics_daily"
@@ -1,9 +1,10 @@
 """
-Billing events model for audit trail.
+Billing events model for audit trail and webhook processing queue.
 """
+from datetime import datetime
 from typing import Optional, Dict, Any
 
-from sqlalchemy import String, ForeignKey
+from sqlalchemy import String, ForeignKey, Integer, DateTime, Text
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -15,15 +16,21 @@ class BillingEvent(BaseModel):
     Billing event audit trail.
 
     Records all Stripe webhook events for compliance and debugging.
+
+    Webhooks are acknowledged as soon as the event is stored here with
+    status "pending"; the billing event worker (services/billing_events.py)
+    then applies it and marks it "processed" (or "failed" after
+    BILLING_EVENT_MAX_ATTEMPTS). The unique stripe_event_id makes Stripe
+    redeliveries no-ops.
     """
 
     __tablename__ = "billing_events"
 
-    # Foreign key to user
-    user_id: Mapped[str] = mapped_column(
+    # Foreign key to user (from event metadata; some events carry only a customer ID)
+    user_id: Mapped[Optional[str]] = mapped_column(
         String(255),
         ForeignKey("users.id", ondelete="CASCADE"),
-        nullable=False,
+        nullable=True,
         index=True,
     )
 
@@ -38,5 +45,14 @@ class BillingEvent(BaseModel):
     # Full event payload for debugging
     payload: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSONB, nullable=True)
 
+    # Stripe's `created` time for the event (events can arrive out of order)
+    stripe_created_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    # Processing state: pending, processed or failed
+    status: Mapped[str] = mapped_column(String(20), default="pending", nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    processed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
     def __repr__(self) -> str:
         return f"<BillingEvent {self.event_type} user={self.user_id}>"
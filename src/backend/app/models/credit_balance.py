@@ -0,0 +1,40 @@
+"""
+Credit balance model - materialised AI credit balance per user.
+"""
+from sqlalchemy import String, Integer, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import BaseModel
+
+
+class CreditBalance(BaseModel):
+    """
+    Current-period credit balance for a user (one row per user).
+
+    available = granted - used - held. Only changed through
+    CreditLedgerService, with conditional UPDATEs, alongside an entry in
+    credit_ledger.
+    """
+
+    __tablename__ = "credit_balances"
+
+    user_id: Mapped[str] = mapped_column(
+        String(36),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        unique=True,
+    )
+
+    # Billing period the balance is for ("YYYY-MM"); rolled over lazily
+    period: Mapped[str] = mapped_column(String(7), nullable=False)
+
+    granted: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    used: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    held: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    @property
+    def available(self) -> int:
+        return max(0, self.granted - self.used - self.held)
+
+    def __repr__(self) -> str:
+        return f"<CreditBalance user={self.user_id} {self.period} available={self.available}>"
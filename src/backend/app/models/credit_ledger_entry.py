@@ -0,0 +1,59 @@
+"""
+Credit ledger entry model - append-only history of AI credit movements.
+"""
+import datetime as dt
+from typing import Optional
+
+from sqlalchemy import String, Integer, DateTime, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import BaseModel
+
+
+class CreditLedgerEntry(BaseModel):
+    """
+    One AI credit movement. Rows are never updated or deleted.
+
+    entry_type / amount:
+    - grant:    monthly plan + purchased credits for a new period
+    - purchase: credit pack bought (added to the current period)
+    - adjust:   granted credits changed by a plan change (signed)
+    - hold:     credits reserved before a chat run
+    - settle:   credits charged for a hold (closes it)
+    - release:  hold returned unused (closes it)
+
+    settle/release rows carry the hold's ID in hold_id, which is unique so
+    a hold can only be closed once.
+    """
+
+    __tablename__ = "credit_ledger"
+
+    user_id: Mapped[str] = mapped_column(
+        String(36),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+
+    entry_type: Mapped[str] = mapped_column(String(20), nullable=False)
+
+    amount: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    # Billing period the entry applies to ("YYYY-MM")
+    period: Mapped[str] = mapped_column(String(7), nullable=False)
+
+    # Hold closed by this settle/release entry
+    hold_id: Mapped[Optional[str]] = mapped_column(
+        String(36),
+        nullable=True,
+        unique=True,
+    )
+
+    # Holds not closed by this time are released by the sweeper
+    expires_at: Mapped[Optional[dt.datetime]] = mapped_column(DateTime, nullable=True)
+
+    # Free-form context: conversation ID, credit pack ID, plan ID
+    reference: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<CreditLedgerEntry {self.entry_type} {self.amount} user={self.user_id}>"
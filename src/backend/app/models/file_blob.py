@@ -0,0 +1,52 @@
+"""
+FileBlob model for content-addressable file storage.
+
+Uploaded bytes are stored once per SHA-256 digest and shared by every
+UserFile and KnowledgeSource row that points at the same content.
+"""
+from sqlalchemy import String, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import BaseModel
+
+
+class FileBlob(BaseModel):
+    """
+    A single stored blob, keyed by the SHA-256 of its content.
+
+    ref_count tracks how many UserFile / active KnowledgeSource rows
+    reference the blob. Blobs whose count drops to zero are removed by
+    the garbage collector (see BlobStore.collect_garbage).
+    """
+
+    __tablename__ = "file_blobs"
+
+    sha256: Mapped[str] = mapped_column(
+        String(64),
+        nullable=False,
+        unique=True,
+        index=True,
+        comment="Hex SHA-256 digest of the content",
+    )
+
+    size: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        comment="Blob size in bytes",
+    )
+
+    storage_path: Mapped[str] = mapped_column(
+        String(500),
+        nullable=False,
+        comment="Path to blob on disk (relative to uploads dir)",
+    )
+
+    ref_count: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        comment="Number of file/knowledge rows referencing this blob",
+    )
+
+    def __repr__(self) -> str:
+        return f"<FileBlob(sha256={self.sha256[:12]}, size={self.size}, refs={self.ref_count})>"
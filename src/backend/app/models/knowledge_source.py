@@ -71,6 +71,12 @@ class KnowledgeSource(BaseModel):
         nullable=True,
         comment="File size in bytes",
     )
+    blob_sha256: Mapped[Optional[str]] = mapped_column(
+        String(64),
+        nullable=True,
+        index=True,
+        comment="SHA-256 of the FileBlob holding the content (NULL for legacy files)",
+    )
 
     # URL-specific fields
     url: Mapped[Optional[str]] = mapped_column(
@@ -54,6 +54,10 @@ class Subscription(BaseModel):
         DateTime(timezone=True), nullable=True
     )
 
+    # Stripe `created` time of the last customer.subscription.* event applied;
+    # older events (e.g. retried after a failure) are skipped
+    stripe_event_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
     # Cancel at period end flag
     cancel_at_period_end: Mapped[bool] = mapped_column(Boolean, default=False)
 
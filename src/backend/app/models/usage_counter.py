@@ -0,0 +1,40 @@
+"""
+Usage counter model for O(1) plan-limit checks.
+"""
+from sqlalchemy import String, BigInteger, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import BaseModel
+
+
+class UsageCounter(BaseModel):
+    """
+    A per-user usage counter for one billing period.
+
+    Monthly metrics (messages_sent, llm_tokens) use period "YYYY-MM";
+    gauges (agents_created, workflows_created = active agents/workflows)
+    use period "all". Maintained by services/usage_counter_service.py and
+    repaired by its reconcile job.
+    """
+
+    __tablename__ = "usage_counters"
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'metric', 'period', name='uq_usage_counter_user_metric_period'),
+    )
+
+    user_id: Mapped[str] = mapped_column(
+        String(36),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+
+    metric: Mapped[str] = mapped_column(String(50), nullable=False)
+
+    # "YYYY-MM" for monthly metrics, "all" for gauges
+    period: Mapped[str] = mapped_column(String(7), nullable=False)
+
+    value: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<UsageCounter user={self.user_id} {self.metric}[{self.period}]={self.value}>"
@@ -43,7 +43,7 @@ class UserFile(BaseModel):
     filename: Mapped[str] = mapped_column(
         String(255),
         nullable=False,
-        comment="Stored filename (UUID-based)",
+        comment="Stored filename (blob digest, or UUID-based for legacy uploads)",
     )
 
     original_filename: Mapped[str] = mapped_column(
@@ -71,6 +71,15 @@ class UserFile(BaseModel):
         comment="Path to file on disk (relative to uploads dir)",
     )
 
+    # Content-addressed blob backing this file (NULL for legacy uploads
+    # stored directly under uploads/{user_id}/)
+    blob_sha256: Mapped[Optional[str]] = mapped_column(
+        String(64),
+        nullable=True,
+        index=True,
+        comment="SHA-256 of the FileBlob holding the content",
+    )
+
     # Optional description
     description: Mapped[Optional[str]] = mapped_column(
         Text,
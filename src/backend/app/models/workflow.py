@@ -77,7 +77,8 @@ class Workflow(BaseModel):
     )
 
     # Track which agent components are used in this workflow
-    # Stored as JSON array of UUIDs for flexibility
+    # Stored as JSON array of UUIDs for flexibility; mirrored into
+    # workflow_agent_components for lookups by agent
     agent_component_ids: Mapped[Optional[list]] = mapped_column(
         JSON,
         nullable=True,
@@ -0,0 +1,35 @@
+"""
+Workflow agent component link - which agent components a workflow uses.
+"""
+from sqlalchemy import String, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class WorkflowAgentComponent(Base):
+    """
+    One row per (workflow, agent component) pair.
+
+    Mirrors Workflow.agent_component_ids, written by
+    WorkflowService.sync_agent_links wherever that list changes, so the
+    workflows using an agent are an indexed lookup by agent_component_id.
+    """
+
+    __tablename__ = "workflow_agent_components"
+
+    workflow_id: Mapped[str] = mapped_column(
+        String(36),
+        ForeignKey("workflows.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+
+    agent_component_id: Mapped[str] = mapped_column(
+        String(36),
+        ForeignKey("agent_components.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
+    )
+
+    def __repr__(self) -> str:
+        return f"<WorkflowAgentComponent workflow={self.workflow_id} agent={self.agent_component_id}>"
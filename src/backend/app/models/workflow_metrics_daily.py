@@ -0,0 +1,60 @@
+"""
+Per-workflow daily run metrics (latency, time-to-first-token, tokens, errors).
+"""
+import datetime as dt
+from typing import List, Optional
+
+from sqlalchemy import String, Integer, BigInteger, Date, ForeignKey, UniqueConstraint, JSON
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import BaseModel
+
+
+class WorkflowMetricsDaily(BaseModel):
+    """
+    Daily run metrics per workflow.
+
+    Written in batches by WorkflowMetricsAggregator (services/workflow_metrics.py).
+    Latency and TTFT are stored as fixed-bucket histograms (bucket bounds in
+    LATENCY_BUCKETS_MS) so p50/p95 can be estimated over any range of days
+    by summing bucket counts.
+    """
+
+    __tablename__ = "workflow_metrics_daily"
+
+    __table_args__ = (
+        UniqueConstraint('workflow_id', 'record_date', name='uq_workflow_metrics_workflow_date'),
+    )
+
+    user_id: Mapped[str] = mapped_column(
+        String(36),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+
+    workflow_id: Mapped[str] = mapped_column(
+        String(36),
+        ForeignKey("workflows.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+
+    record_date: Mapped[dt.date] = mapped_column(Date, nullable=False)
+
+    # Run outcomes
+    runs: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    errors: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    # Streamed tokens (text chunks) across all runs
+    tokens: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+
+    # Totals for averages; ttft_count excludes non-streaming runs
+    total_latency_ms: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    total_ttft_ms: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    ttft_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    # Bucket counts, one per LATENCY_BUCKETS_MS bound plus an overflow bucket
+    latency_histogram: Mapped[Optional[List[int]]] = mapped_column(JSON, nullable=True)
+    ttft_histogram: Mapped[Optional[List[int]]] = mapped_column(JSON, nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<WorkflowMetricsDaily workflow={self.workflow_id} date={self.record_date}>"
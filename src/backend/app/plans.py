@@ -28,6 +28,8 @@ class PlanLimits:
     monthly_credits: int  # AI credits included per month
     knowledge_files: int  # Number of knowledge base files
     team_members: int  # Number of team seats
+    concurrent_streams: int = 2  # In-flight chat generations per user
+    embed_concurrent_streams: int = 5  # In-flight generations per embed token
 
 
 @dataclass
@@ -96,6 +98,8 @@ PLANS: Dict[str, Plan] = {
             monthly_credits=500,  # ~1000 runs
             knowledge_files=5,
             team_members=1,
+            concurrent_streams=2,
+            embed_concurrent_streams=5,
         ),
         features=[
             "3 Starter Missions",
@@ -124,6 +128,8 @@ PLANS: Dict[str, Plan] = {
             monthly_credits=5000,  # Unlimited runs
             knowledge_files=50,
             team_members=1,
+            concurrent_streams=5,
+            embed_concurrent_streams=20,
         ),
         features=[
             "Full Mission Library (20+)",
@@ -153,6 +159,8 @@ PLANS: Dict[str, Plan] = {
             monthly_credits=50000,
             knowledge_files=-1,
             team_members=-1,
+            concurrent_streams=20,
+            embed_concurrent_streams=100,
         ),
         features=[
             "Everything in Individual",
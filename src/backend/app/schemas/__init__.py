@@ -42,6 +42,7 @@ from app.schemas.agent_component import (
     AgentComponentCreateFromQA,
     AgentComponentUpdate,
     AgentComponentResponse,
+    AgentComponentSummaryResponse,
     AgentComponentListResponse,
 )
 from app.schemas.workflow import (
@@ -50,6 +51,7 @@ from app.schemas.workflow import (
     WorkflowCreateFromTemplate,
     WorkflowUpdate,
     WorkflowResponse,
+    WorkflowSummaryResponse,
     WorkflowListResponse,
     WorkflowWithAgentsResponse,
     WorkflowExportResponse,
@@ -138,12 +140,14 @@ __all__ = [
     "AgentComponentCreateFromQA",
     "AgentComponentUpdate",
     "AgentComponentResponse",
+    "AgentComponentSummaryResponse",
     "AgentComponentListResponse",
     "WorkflowCreate",
     "WorkflowCreateFromAgent",
     "WorkflowCreateFromTemplate",
     "WorkflowUpdate",
     "WorkflowResponse",
+    "WorkflowSummaryResponse",
     "WorkflowListResponse",
     "WorkflowWithAgentsResponse",
     "WorkflowExportResponse",
@@ -234,13 +234,43 @@ class AgentComponentResponse(BaseModel):
     updated_at: datetime
 
 
+class AgentComponentSummaryResponse(BaseModel):
+    """
+    Schema for agent components in lists.
+
+    Leaves out the prompt fields and advanced_config (see
+    AgentComponentResponse); channel_preferences comes from advanced_config.
+    """
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: uuid.UUID
+    project_id: Optional[uuid.UUID]
+    name: str
+    description: Optional[str]
+    icon: str
+    color: str
+    avatar_url: Optional[str] = None
+    qa_who: str
+    selected_tools: Optional[List[str]] = None
+    knowledge_source_ids: Optional[List[str]] = None
+    channel_preferences: Optional[List[str]] = None
+    component_file_path: Optional[str]
+    component_class_name: Optional[str]
+    is_published: bool
+    is_active: bool
+    created_at: datetime
+    updated_at: datetime
+
+
 class AgentComponentListResponse(BaseModel):
     """Schema for paginated agent component list."""
 
-    agent_components: List[AgentComponentResponse]
-    total: int
+    agent_components: List[AgentComponentSummaryResponse]
+    total: Optional[int] = None  # None when include_total=false
     page: int
     page_size: int
+    next_cursor: Optional[str] = None  # Pass as cursor for the next page; None on the last
 
 
 class PublishWithSkillsRequest(BaseModel):
@@ -90,9 +90,10 @@ class KnowledgeSourceResponse(BaseModel):
 class KnowledgeSourceListResponse(BaseModel):
     """Schema for paginated knowledge source list."""
     knowledge_sources: List[KnowledgeSourceResponse]
-    total: int
+    total: Optional[int] = None  # None when include_total=false
     page: int
     page_size: int
+    next_cursor: Optional[str] = None  # Pass as cursor for the next page; None on the last
 
 
 class KnowledgeSourceProcessResponse(BaseModel):
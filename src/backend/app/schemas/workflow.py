@@ -104,8 +104,8 @@ class WorkflowUpdate(BaseModel):
     flow_data: Optional[dict] = None
 
 
-class WorkflowResponse(BaseModel):
-    """Schema for workflow responses."""
+class WorkflowSummaryResponse(BaseModel):
+    """Schema for workflows in lists (no flow_data; see WorkflowResponse)."""
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -114,7 +114,6 @@ class WorkflowResponse(BaseModel):
     name: str
     description: Optional[str]
     langflow_flow_id: str
-    flow_data: Optional[dict]
     agent_component_ids: Optional[List[uuid.UUID]]
     is_active: bool
     is_public: bool
@@ -122,6 +121,12 @@ class WorkflowResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
+
+class WorkflowResponse(WorkflowSummaryResponse):
+    """Schema for workflow responses."""
+
+    flow_data: Optional[dict]
+
     @model_validator(mode='after')
     def sanitize_sensitive_data(self) -> 'WorkflowResponse':
         """
@@ -129,19 +134,24 @@ class WorkflowResponse(BaseModel):
 
         This prevents accidental exposure of user API keys in API responses.
         Keys are masked like: sk-proj-••••••••xyz
+
+        Cached per workflow version: updated_at changes on every write.
         """
         if self.flow_data:
-            self.flow_data = sanitize_flow_data(self.flow_data)
+            self.flow_data = sanitize_flow_data(
+                self.flow_data, cache_key=(self.id, self.updated_at)
+            )
         return self
 
 
 class WorkflowListResponse(BaseModel):
     """Schema for paginated workflow list."""
 
-    workflows: List[WorkflowResponse]
-    total: int
+    workflows: List[WorkflowSummaryResponse]
+    total: Optional[int] = None  # None when include_total=false
     page: int
     page_size: int
+    next_cursor: Optional[str] = None  # Pass as cursor for the next page; None on the last
 
 
 class WorkflowWithAgentsResponse(WorkflowResponse):
@@ -3,10 +3,15 @@ AgentComponent service for managing reusable AI agent components.
 """
 import logging
 import uuid
-from typing import List, Optional, Tuple
+from typing import List, Optional
 
-from sqlalchemy import select, func, cast, String
+from sqlalchemy import event, select, func
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer, lazyload, object_session, with_expression
+from sqlalchemy.orm.attributes import get_history
+
+from app.config import settings
+from app.services.row_cache import RowCache
 
 logger = logging.getLogger(__name__)
 
@@ -14,12 +19,15 @@ from app.models.agent_component import AgentComponent
 from app.models.user import User
 from app.models.project import Project
 from app.models.workflow import Workflow
+from app.models.workflow_agent_component import WorkflowAgentComponent
 from app.schemas.agent_component import (
     AgentComponentCreateFromQA,
     AgentComponentUpdate,
 )
 from app.services.template_mapping import TemplateMapper, template_mapper
 from app.services.langflow_client import LangflowClient, langflow_client
+from app.services.usage_counter_service import UsageCounterService
+from app.utils.pagination import Page, page_rows, paginate
 
 
 class AgentComponentServiceError(Exception):
@@ -27,6 +35,17 @@ class AgentComponentServiceError(Exception):
     pass
 
 
+# embed_token -> embeddable, active component (or a cached miss). Public embed
+# endpoints resolve the token on every request; ORM changes to a component
+# drop its entries (see _on_component_change)
+_embed_token_cache: RowCache[AgentComponent] = RowCache(
+    AgentComponent,
+    max_size=settings.token_lookup_cache_max_size,
+    ttl_seconds=settings.token_lookup_cache_ttl_seconds,
+    negative_ttl_seconds=settings.token_lookup_negative_ttl_seconds,
+)
+
+
 class AgentComponentService:
     """Service for agent component CRUD operations."""
 
@@ -92,13 +111,16 @@ class AgentComponentService:
         Returns:
             AgentComponent if found and embeddable, None otherwise
         """
-        stmt = select(AgentComponent).where(
-            AgentComponent.embed_token == embed_token,
-            AgentComponent.is_embeddable == True,
-            AgentComponent.is_active == True,
-        )
-        result = await self.session.execute(stmt)
-        return result.scalar_one_or_none()
+        async def load() -> Optional[AgentComponent]:
+            stmt = select(AgentComponent).where(
+                AgentComponent.embed_token == embed_token,
+                AgentComponent.is_embeddable == True,
+                AgentComponent.is_active == True,
+            ).options(lazyload("*"))
+            result = await self.session.execute(stmt)
+            return result.scalar_one_or_none()
+
+        return await _embed_token_cache.get(self.session, embed_token, load)
 
     async def chat(
         self,
@@ -218,9 +240,24 @@ class AgentComponentService:
         page_size: int = 20,
         active_only: bool = True,
         published_only: bool = False,
-    ) -> Tuple[List[AgentComponent], int]:
+        cursor: Optional[str] = None,
+        include_total: bool = True,
+    ) -> Page[AgentComponent]:
         """
-        List agent components for a user with pagination.
+        List agent components for a user, newest first.
+
+        Only summary columns are loaded: the prompt fields and
+        advanced_config are deferred and raise if accessed, with
+        channel_preferences extracted from advanced_config instead. List
+        responses must use AgentComponentSummaryResponse.
+
+        Args:
+            cursor: Continue after a previous page's next_cursor
+            include_total: Also return the total (from the agents gauge for
+                all active agents when the user has one, otherwise counted)
+
+        Raises:
+            InvalidCursorError: Cursor is malformed
         """
         user_id_str = str(user_id)
         stmt = select(AgentComponent).where(AgentComponent.user_id == user_id_str)
@@ -235,19 +272,30 @@ class AgentComponentService:
         if published_only:
             stmt = stmt.where(AgentComponent.is_published == True)
 
-        # Count total
-        count_stmt = select(func.count()).select_from(stmt.subquery())
-        total_result = await self.session.execute(count_stmt)
-        total = total_result.scalar_one()
-
-        # Paginate
-        stmt = stmt.order_by(AgentComponent.created_at.desc())
-        stmt = stmt.offset((page - 1) * page_size).limit(page_size)
-
-        result = await self.session.execute(stmt)
-        components = list(result.scalars().all())
+        total = None
+        if include_total:
+            if active_only and not project_id and not published_only:
+                total = await UsageCounterService(self.session).get_gauge(
+                    user_id_str, "agents_created"
+                )
+            if total is None:
+                count_stmt = select(func.count()).select_from(stmt.subquery())
+                total = (await self.session.execute(count_stmt)).scalar_one()
+
+        list_stmt = paginate(stmt, AgentComponent, page_size, cursor, page).options(
+            defer(AgentComponent.qa_rules, raiseload=True),
+            defer(AgentComponent.qa_tricks, raiseload=True),
+            defer(AgentComponent.system_prompt, raiseload=True),
+            defer(AgentComponent.advanced_config, raiseload=True),
+            with_expression(
+                AgentComponent.channel_preferences,
+                AgentComponent.advanced_config["channel_preferences"],
+            ),
+        )
+        result = await self.session.execute(list_stmt)
+        components, next_cursor = page_rows(list(result.scalars().all()), page_size)
 
-        return components, total
+        return Page(components, total, next_cursor)
 
     async def _get_or_create_default_project(self, user: User) -> str:
         """Get or create the user's default project."""
@@ -391,6 +439,19 @@ class AgentComponentService:
 
         return component
 
+    async def get_linked_workflows(self, component_id: uuid.UUID) -> List[Workflow]:
+        """Active workflows that use an agent component (indexed link lookup)."""
+        stmt = (
+            select(Workflow)
+            .join(WorkflowAgentComponent, WorkflowAgentComponent.workflow_id == Workflow.id)
+            .where(
+                WorkflowAgentComponent.agent_component_id == str(component_id),
+                Workflow.is_active == True,
+            )
+        )
+        result = await self.session.execute(stmt)
+        return list(result.scalars().all())
+
     async def _sync_linked_workflows(self, component: AgentComponent) -> None:
         """
         Sync agent component changes to all linked workflows in Langflow.
@@ -400,15 +461,7 @@ class AgentComponentService:
         - The Agent node's display_name
         - Tool nodes (adds/removes based on selected_tools changes)
         """
-        # Find workflows that use this agent component
-        # Cast JSON to text and use LIKE since JSON .contains() doesn't work properly
-        component_id_str = str(component.id)
-        stmt = select(Workflow).where(
-            cast(Workflow.agent_component_ids, String).like(f'%{component_id_str}%'),
-            Workflow.is_active == True,
-        )
-        result = await self.session.execute(stmt)
-        workflows = list(result.scalars().all())
+        workflows = await self.get_linked_workflows(component.id)
 
         if not workflows:
             logger.debug(f"No workflows found for agent {component.id}")
@@ -647,3 +700,20 @@ class AgentComponentService:
 
         logger.info(f"Imported agent component as {component.id} for user {user.id}")
         return component
+
+
+def clear_embed_token_cache() -> None:
+    """Drop every cached embed token lookup in this process."""
+    _embed_token_cache.clear()
+
+
+def _on_component_change(mapper, connection, target: AgentComponent) -> None:
+    # Covers enable/disable, token rotation, deactivation and deletes
+    history = get_history(target, "embed_token")
+    session = object_session(target)
+    for token in {target.embed_token, *history.deleted, *history.added}:
+        _embed_token_cache.invalidate(token, session)
+
+
+for _event in ("after_insert", "after_update", "after_delete"):
+    event.listen(AgentComponent, _event, _on_component_change)
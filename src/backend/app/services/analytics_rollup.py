@@ -0,0 +1,313 @@
+"""
+Nightly analytics rollup for all users.
+
+Recomputes analytics_daily from the raw conversations, messages,
+workflows and agent_components tables with a few set-based statements per
+day (INSERT ... SELECT ... GROUP BY user_id upserts), instead of the
+per-user queries in AnalyticsService.record_daily_stats.
+
+Each day is rebuilt from scratch inside one transaction, so re-running a
+day is idempotent and an interrupted range can be resumed from the first
+day that was not committed. Only closed days (before today, UTC) are
+rolled up: today's counters are maintained live by
+AnalyticsService.increment_daily_counters.
+
+The job can be run from the CLI (scripts/rollup_analytics.py) or by the
+optional in-process scheduler started in the app lifespan when
+ANALYTICS_ROLLUP_ENABLED is set.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import distinct, func, literal, select, true, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import async_session_maker, dialect_insert, sql_uuid
+from app.models.agent_component import AgentComponent
+from app.models.analytics_daily import AnalyticsDaily
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.models.workflow import Workflow
+from app.models.workflow_agent_component import WorkflowAgentComponent
+from app.services.analytics_service import _day_range
+from app.services.credit_ledger_service import CreditLedgerService
+from app.services.usage_counter_service import UsageCounterService
+from app.utils.run_claim import claim_run
+
+logger = logging.getLogger(__name__)
+
+# Counters owned by the rollup; reset before a day is rebuilt
+ROLLUP_COUNTERS = (
+    "conversations_count",
+    "messages_count",
+    "tokens_used",
+    "agents_created",
+    "agents_active",
+    "workflows_created",
+)
+
+# Scheduler run claim: Redis key per run date, or a PostgreSQL advisory lock
+ROLLUP_CLAIM_KEY = "analytics-rollup:{day}"
+ROLLUP_CLAIM_TTL_SECONDS = 23 * 3600
+ROLLUP_ADVISORY_LOCK_ID = 0x616E616C79746963  # "analytic"
+
+
+def last_closed_day(now: Optional[datetime] = None) -> date:
+    """Latest day the rollup may rebuild: yesterday, UTC."""
+    return (now or datetime.utcnow()).date() - timedelta(days=1)
+
+
+class AnalyticsRollupService:
+    """Rebuild analytics_daily for every user, one day at a time."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def _upsert_counts(self, day: date, counts, columns: Dict[str, Any]) -> None:
+        """
+        Upsert per-user counters from a grouped select.
+
+        Args:
+            day: Rollup date
+            counts: Select yielding one row per user_id
+            columns: Target column -> column of `counts`
+        """
+        subq = counts.subquery()
+        now = datetime.utcnow()
+        source = select(
+            sql_uuid(self.session),
+            subq.c.user_id,
+            literal(day),
+            *[subq.c[name] for name in columns.values()],
+            literal(now),
+            literal(now),
+        ).where(true())  # Disambiguates ON CONFLICT after SELECT on SQLite
+
+        stmt = dialect_insert(self.session, AnalyticsDaily).from_select(
+            ["id", "user_id", "record_date", *columns.keys(), "created_at", "updated_at"],
+            source,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AnalyticsDaily.user_id, AnalyticsDaily.record_date],
+            set_={
+                **{column: getattr(stmt.excluded, column) for column in columns},
+                "updated_at": now,
+            },
+        )
+        await self.session.execute(stmt)
+
+    async def rollup_day(self, day: date) -> None:
+        """
+        Rebuild analytics_daily rows for all users for one day.
+
+        Does not commit; the caller owns the transaction.
+
+        Raises:
+            ValueError: If `day` is today or later (its counters are live)
+        """
+        if day > last_closed_day():
+            raise ValueError(f"Cannot roll up {day}: only days before today (UTC) are closed")
+        day_start, day_end = _day_range(day, day)
+
+        # Reset so users whose activity disappeared do not keep stale counts
+        await self.session.execute(
+            update(AnalyticsDaily)
+            .where(AnalyticsDaily.record_date == day)
+            .values(
+                **{column: 0 for column in ROLLUP_COUNTERS},
+                breakdown=None,
+                updated_at=datetime.utcnow(),
+            )
+        )
+
+        messages = (
+            select(
+                Conversation.user_id,
+                func.count(Message.id).label("messages"),
+                (func.coalesce(func.sum(func.length(Message.content)), 0) // 4).label("tokens"),
+            )
+            .join(Conversation, Conversation.id == Message.conversation_id)
+            .where(Message.created_at >= day_start, Message.created_at < day_end)
+            .group_by(Conversation.user_id)
+        )
+        await self._upsert_counts(day, messages, {
+            "messages_count": "messages",
+            "tokens_used": "tokens",
+        })
+
+        conversations = (
+            select(Conversation.user_id, func.count(Conversation.id).label("conversations"))
+            .where(Conversation.created_at >= day_start, Conversation.created_at < day_end)
+            .group_by(Conversation.user_id)
+        )
+        await self._upsert_counts(day, conversations, {"conversations_count": "conversations"})
+
+        agents = (
+            select(AgentComponent.user_id, func.count(AgentComponent.id).label("agents"))
+            .where(AgentComponent.created_at >= day_start, AgentComponent.created_at < day_end)
+            .group_by(AgentComponent.user_id)
+        )
+        await self._upsert_counts(day, agents, {"agents_created": "agents"})
+
+        workflows = (
+            select(Workflow.user_id, func.count(Workflow.id).label("workflows"))
+            .where(Workflow.created_at >= day_start, Workflow.created_at < day_end)
+            .group_by(Workflow.user_id)
+        )
+        await self._upsert_counts(day, workflows, {"workflows_created": "workflows"})
+
+        # Agent components that answered messages that day (via their workflows)
+        active_agents = (
+            select(
+                Conversation.user_id,
+                func.count(distinct(WorkflowAgentComponent.agent_component_id)).label("agents"),
+            )
+            .select_from(Message)
+            .join(Conversation, Conversation.id == Message.conversation_id)
+            .join(
+                WorkflowAgentComponent,
+                WorkflowAgentComponent.workflow_id == Conversation.workflow_id,
+            )
+            .where(Message.created_at >= day_start, Message.created_at < day_end)
+            .group_by(Conversation.user_id)
+        )
+        await self._upsert_counts(day, active_agents, {"agents_active": "agents"})
+
+        await self._write_breakdown(day, day_start, day_end)
+
+    async def _write_breakdown(self, day: date, day_start: datetime, day_end: datetime) -> None:
+        """Store per-workflow conversation/message counts in `breakdown`."""
+        msg_stmt = (
+            select(Conversation.user_id, Conversation.workflow_id, func.count(Message.id))
+            .join(Conversation, Conversation.id == Message.conversation_id)
+            .where(
+                Conversation.workflow_id.isnot(None),
+                Message.created_at >= day_start,
+                Message.created_at < day_end,
+            )
+            .group_by(Conversation.user_id, Conversation.workflow_id)
+        )
+        conv_stmt = (
+            select(Conversation.user_id, Conversation.workflow_id, func.count(Conversation.id))
+            .where(
+                Conversation.workflow_id.isnot(None),
+                Conversation.created_at >= day_start,
+                Conversation.created_at < day_end,
+            )
+            .group_by(Conversation.user_id, Conversation.workflow_id)
+        )
+
+        breakdowns: Dict[str, Dict[str, Dict[str, int]]] = defaultdict(
+            lambda: defaultdict(lambda: {"conversations": 0, "messages": 0})
+        )
+        for user_id, workflow_id, count in (await self.session.execute(msg_stmt)).all():
+            breakdowns[str(user_id)][str(workflow_id)]["messages"] = count
+        for user_id, workflow_id, count in (await self.session.execute(conv_stmt)).all():
+            breakdowns[str(user_id)][str(workflow_id)]["conversations"] = count
+
+        if not breakdowns:
+            return
+
+        # Every user here has a row: they had messages or conversations today
+        for user_id, workflows in breakdowns.items():
+            await self.session.execute(
+                update(AnalyticsDaily)
+                .where(
+                    AnalyticsDaily.user_id == user_id,
+                    AnalyticsDaily.record_date == day,
+                )
+                .values(breakdown={
+                    "workflows": {wf_id: dict(counts) for wf_id, counts in workflows.items()},
+                })
+            )
+
+
+async def rollup_range(
+    start_date: date,
+    end_date: date,
+    on_day_done: Optional[Callable[[date], None]] = None,
+) -> int:
+    """
+    Roll up an inclusive date range, committing after each day.
+
+    If the job stops part-way, re-run it starting from the first day that
+    was not reported as done. Days from today on are skipped.
+
+    Returns:
+        Number of days rolled up
+    """
+    if end_date > last_closed_day():
+        logger.info(f"Analytics rollup skips {last_closed_day() + timedelta(days=1)} onwards (live counters)")
+        end_date = last_closed_day()
+    days = 0
+    day = start_date
+    while day <= end_date:
+        async with async_session_maker() as session:
+            await AnalyticsRollupService(session).rollup_day(day)
+            await session.commit()
+        if on_day_done:
+            on_day_done(day)
+        days += 1
+        day += timedelta(days=1)
+    return days
+
+
+def _seconds_until(hour: int, now: datetime) -> float:
+    """Seconds from `now` until the next HH:00 UTC."""
+    target = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+def _claim_run(day: date):
+    """Claim the scheduled run for `day` (kept for the rest of the day)."""
+    return claim_run(
+        ROLLUP_CLAIM_KEY.format(day=day.isoformat()),
+        ROLLUP_CLAIM_TTL_SECONDS,
+        ROLLUP_ADVISORY_LOCK_ID,
+    )
+
+
+async def _run_scheduled_jobs() -> None:
+    """One scheduled run: the rollup, then usage counter reconciliation."""
+    end_date = last_closed_day()
+    start_date = end_date - timedelta(days=max(settings.analytics_rollup_lookback_days, 1) - 1)
+    try:
+        days = await rollup_range(start_date, end_date)
+        logger.info(f"Analytics rollup complete: {days} days ({start_date} to {end_date})")
+    except Exception as e:
+        logger.error(f"Analytics rollup failed: {e}")
+
+    # Repair drift in plan-limit usage counters in the same quiet window
+    try:
+        async with async_session_maker() as session:
+            await UsageCounterService(session).reconcile()
+            released = await CreditLedgerService(session).release_expired_holds()
+            await session.commit()
+        logger.info(f"Usage counter reconciliation complete ({released} expired credit holds released)")
+    except Exception as e:
+        logger.error(f"Usage counter reconciliation failed: {e}")
+
+
+async def run_rollup_scheduler() -> None:
+    """
+    Roll up recent days once a day at ANALYTICS_ROLLUP_HOUR (UTC).
+
+    Re-processes the last ANALYTICS_ROLLUP_LOOKBACK_DAYS closed days so
+    late writes are picked up, then reconciles usage counters and releases
+    expired credit holds. Runs until cancelled. Every app worker starts
+    the scheduler, but only the one that claims the day runs the jobs.
+    """
+    while True:
+        await asyncio.sleep(_seconds_until(settings.analytics_rollup_hour, datetime.utcnow()))
+
+        async with _claim_run(datetime.utcnow().date()) as claimed:
+            if not claimed:
+                logger.info("Analytics rollup claimed by another worker; skipping")
+                continue
+            await _run_scheduled_jobs()
@@ -5,25 +5,63 @@ Provides aggregated analytics data for the dashboard.
 
 Updated 2026-01-15: Removed references to deprecated agents and usage_metrics tables.
 Analytics now queries agent_components and workflows only.
+
+Message, conversation and token counts are maintained incrementally in
+analytics_daily (see increment_daily_counters), so dashboard reads are
+O(days) regardless of message volume. backfill_daily_counters rebuilds
+the rollup from the raw tables.
+
+Per-workflow run metrics (latency/TTFT percentiles, errors) come from
+workflow_metrics_daily, written by services/workflow_metrics.py.
 """
+import json
 import logging
 import uuid
-from datetime import date, datetime, timedelta
-from typing import Dict, Any, List, Union
-
-from sqlalchemy import select, func, String, cast, Date
+from datetime import date, datetime, time, timedelta
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple, Union
+
+from sqlalchemy import (
+    BigInteger,
+    Date,
+    DateTime,
+    String,
+    cast,
+    func,
+    literal,
+    null,
+    select,
+    type_coerce,
+    union_all,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.config import settings
+from app.database import dialect_insert
 from app.models.analytics_daily import AnalyticsDaily
 from app.models.conversation import Conversation
 from app.models.message import Message
 from app.models.agent_component import AgentComponent
 from app.models.workflow import Workflow
+from app.models.workflow_metrics_daily import WorkflowMetricsDaily
+from app.services.workflow_metrics import histogram_percentile, merge_histograms
 
 logger = logging.getLogger(__name__)
 
 
+# Rows fetched per server-side cursor round trip when streaming exports
+EXPORT_BATCH_SIZE = 1000
+
+# Columns for each detailed export level, in output order
+EXPORT_COLUMNS = {
+    "conversations": [
+        "conversation_id", "title", "workflow_id", "created_at", "updated_at",
+        "messages", "tokens",
+    ],
+    "messages": [
+        "conversation_id", "message_id", "created_at", "role", "tokens", "content",
+    ],
+}
+
+
 def _calculate_percent_change(previous: int, current: int) -> float:
     """Calculate percentage change between two values."""
     if previous == 0:
@@ -31,6 +69,27 @@ def _calculate_percent_change(previous: int, current: int) -> float:
     return round(((current - previous) / previous) * 100, 1)
 
 
+def _day_range(start_date: date, end_date: date) -> Tuple[datetime, datetime]:
+    """
+    Convert an inclusive date range to a half-open timestamp range.
+
+    Filtering with ``created_at >= start AND created_at < end`` keeps the
+    predicate on the bare column, so (user_id, created_at) indexes apply.
+    """
+    start = datetime.combine(start_date, time.min)
+    end = datetime.combine(end_date + timedelta(days=1), time.min)
+    return start, end
+
+
+def _as_date(value: Union[str, date, datetime]) -> date:
+    """Normalise a truncated-day value from the database to a date."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
 def _to_str(user_id: Union[str, uuid.UUID]) -> str:
     """Convert user_id to string for database queries on String columns."""
     if isinstance(user_id, str):
@@ -71,18 +130,18 @@ class AnalyticsService:
             end_date = custom_end
             days = (end_date - start_date).days + 1
         else:
-            end_date = date.today()
+            end_date = datetime.utcnow().date()
             start_date = end_date - timedelta(days=days - 1)
 
         # Previous period (same length, immediately before)
         prev_end_date = start_date - timedelta(days=1)
         prev_start_date = prev_end_date - timedelta(days=days - 1)
 
-        # Get aggregated daily data for current period
-        daily_stats = await self._get_daily_stats(uid, start_date, end_date)
+        # Everything below comes from a single statement (one DB round trip)
+        rows = await self._fetch_dashboard_rows(uid, prev_start_date, end_date, start_date)
 
-        # Get daily data for previous period (for comparison)
-        prev_daily_stats = await self._get_daily_stats(uid, prev_start_date, prev_end_date)
+        daily_stats = self._build_daily(rows["day"], start_date, end_date)
+        prev_daily_stats = self._build_daily(rows["day"], prev_start_date, prev_end_date)
 
         # Calculate period totals
         current_messages = sum(d['messages'] for d in daily_stats)
@@ -93,14 +152,39 @@ class AnalyticsService:
         prev_conversations = sum(d['conversations'] for d in prev_daily_stats)
         prev_tokens = sum(d['tokens'] for d in prev_daily_stats)
 
-        # Get totals (all-time counts)
-        totals = await self._get_totals(uid)
+        # Totals (all-time counts plus this month's activity)
+        totals_row = rows["totals"][0]
+        month_row = rows["month"][0]
+        totals = {
+            "agents": totals_row.n1,
+            "workflows": totals_row.n2,
+            "conversations": totals_row.n3,
+            "messages_this_month": month_row.n1,
+            "tokens_this_month": month_row.n2,
+        }
 
-        # Get recent activity
-        recent_conversations = await self._get_recent_conversations(uid, limit=5)
+        # Recent activity
+        recent_conversations = [
+            {
+                "id": str(row.ref_id),
+                "title": row.label or "Untitled",
+                "workflow_id": str(row.ref2) if row.ref2 else None,
+                "updated_at": row.ts.isoformat() if row.ts else None,
+            }
+            for row in sorted(rows["recent"], key=lambda r: r.ts or datetime.min, reverse=True)
+        ]
 
-        # Get workflow performance stats
-        workflow_stats = await self._get_workflow_stats(uid)
+        # Workflow performance stats
+        run_metrics = self._merge_workflow_metrics(rows["wf_metrics"])
+        workflow_stats = [
+            {
+                "id": str(row.ref_id),
+                "name": row.label,
+                "conversations": row.n1,
+                **run_metrics.get(str(row.ref_id), self._empty_run_metrics()),
+            }
+            for row in sorted(rows["workflow"], key=lambda r: r.n1, reverse=True)
+        ]
 
         return {
             "period": {
@@ -131,162 +215,132 @@ class AnalyticsService:
             },
         }
 
-    def _get_date_expr(self, column):
-        """Get a database-agnostic date expression for grouping by date."""
+    def _get_day_expr(self, column):
+        """
+        Get a database-agnostic expression truncating a timestamp to its day.
+
+        Only use this for GROUP BY; filter with _day_range so the predicate
+        stays index-friendly. Results should be passed through _as_date.
+        """
         # Check if we're using SQLite or PostgreSQL
-        is_sqlite = "sqlite" in settings.database_url.lower()
+        is_sqlite = self.session.get_bind().dialect.name == "sqlite"
 
         if is_sqlite:
             # SQLite: use date() function which returns YYYY-MM-DD format
             return func.date(column)
         else:
-            # PostgreSQL: use to_char for consistent formatting
-            return func.to_char(column, 'YYYY-MM-DD')
-
-    async def _get_daily_stats(
-        self,
-        user_id: str,
-        start_date: date,
-        end_date: date,
-    ) -> List[Dict[str, Any]]:
-        """Get daily aggregated stats - computed on-the-fly from actual data."""
-        # Convert to ISO strings for database compatibility
-        start_str = start_date.isoformat()
-        end_str = end_date.isoformat()
-
-        # Get message counts grouped by date
-        # Use database-agnostic date expression
-        msg_date_expr = self._get_date_expr(Message.created_at)
-
-        msg_stmt = (
-            select(
-                msg_date_expr.label("msg_date"),
-                func.count(Message.id).label("count"),
-            )
-            .join(Conversation, Conversation.id == Message.conversation_id)
-            .where(
-                Conversation.user_id == user_id,
-                msg_date_expr >= start_str,
-                msg_date_expr <= end_str,
-            )
-            .group_by(msg_date_expr)
+            # PostgreSQL: date_trunc keeps the value a timestamp
+            return func.date_trunc("day", column)
+
+    # -------------------------------------------------------------------------
+    # Dashboard aggregation
+    #
+    # Each part of the dashboard is projected onto one shared row shape and
+    # the parts are combined with UNION ALL, so get_dashboard_stats costs a
+    # single round trip. Rows are tagged with `kind`; unused columns are NULL.
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _dashboard_row(
+        kind: str,
+        day=None,
+        ref_id=None,
+        label=None,
+        ref2=None,
+        ts=None,
+        n1=None,
+        n2=None,
+        n3=None,
+    ):
+        """Project values onto the shared dashboard row columns."""
+
+        # NULLs are cast so PostgreSQL can type the UNION; real values keep
+        # their column type (SQLite CASTs to DATE would yield numbers)
+        def col(value, type_):
+            if value is None:
+                return cast(null(), type_)
+            return type_coerce(value, type_)
+
+        return (
+            literal(kind, String).label("kind"),
+            col(day, Date).label("day"),
+            col(ref_id, String).label("ref_id"),
+            col(label, String).label("label"),
+            col(ref2, String).label("ref2"),
+            col(ts, DateTime).label("ts"),
+            col(n1, BigInteger).label("n1"),
+            col(n2, BigInteger).label("n2"),
+            col(n3, BigInteger).label("n3"),
         )
-        msg_result = await self.session.execute(msg_stmt)
-        # Keys are now strings like "2026-01-14"
-        msg_by_date = {row[0]: row[1] for row in msg_result.all()}
-
-        # Get conversation counts grouped by date
-        conv_date_expr = self._get_date_expr(Conversation.created_at)
 
-        conv_stmt = (
-            select(
-                conv_date_expr.label("conv_date"),
-                func.count(Conversation.id).label("count"),
-            )
-            .where(
-                Conversation.user_id == user_id,
-                conv_date_expr >= start_str,
-                conv_date_expr <= end_str,
-            )
-            .group_by(conv_date_expr)
+    def _daily_rows_stmt(self, user_id: str, start_date: date, end_date: date):
+        """Rollup rows for an inclusive date range."""
+        return select(*self._dashboard_row(
+            "day",
+            day=AnalyticsDaily.record_date,
+            n1=AnalyticsDaily.conversations_count,
+            n2=AnalyticsDaily.messages_count,
+            n3=AnalyticsDaily.tokens_used,
+        )).where(
+            AnalyticsDaily.user_id == user_id,
+            AnalyticsDaily.record_date >= start_date,
+            AnalyticsDaily.record_date <= end_date,
         )
-        conv_result = await self.session.execute(conv_stmt)
-        conv_by_date = {row[0]: row[1] for row in conv_result.all()}
-
-        # Build daily stats list
-        daily = []
-        current = start_date
-        while current <= end_date:
-            date_key = current.isoformat()  # Match the string format from SQL
-            messages = msg_by_date.get(date_key, 0)
-            daily.append({
-                "date": date_key,
-                "conversations": conv_by_date.get(date_key, 0),
-                "messages": messages,
-                "tokens": messages * 100,  # Estimate ~100 tokens per message
-            })
-            current += timedelta(days=1)
 
-        return daily
-
-    async def _get_totals(self, user_id: str) -> Dict[str, int]:
-        """Get total counts for user."""
+    def _totals_stmt(self, user_id: str):
+        """All-time agent, workflow and conversation counts."""
         # Count agent_components (the "Agents" shown in sidebar)
-        component_stmt = select(func.count()).select_from(AgentComponent).where(
+        agents = select(func.count()).select_from(AgentComponent).where(
             AgentComponent.user_id == user_id,
-        )
-        component_result = await self.session.execute(component_stmt)
-        agent_count = component_result.scalar_one()
-
-        # Count workflows
-        workflow_stmt = select(func.count()).select_from(Workflow).where(
+        ).scalar_subquery()
+        workflows = select(func.count()).select_from(Workflow).where(
             Workflow.user_id == user_id,
+        ).scalar_subquery()
+        conversations = select(
+            func.coalesce(func.sum(AnalyticsDaily.conversations_count), 0)
+        ).where(AnalyticsDaily.user_id == user_id).scalar_subquery()
+
+        return select(*self._dashboard_row(
+            "totals", n1=agents, n2=workflows, n3=conversations,
+        ))
+
+    def _month_stmt(self, user_id: str):
+        """This calendar month's messages and tokens from the rollup."""
+        month_start = datetime.utcnow().date().replace(day=1)
+        return select(*self._dashboard_row(
+            "month",
+            n1=func.coalesce(func.sum(AnalyticsDaily.messages_count), 0),
+            n2=func.coalesce(func.sum(AnalyticsDaily.tokens_used), 0),
+        )).where(
+            AnalyticsDaily.user_id == user_id,
+            AnalyticsDaily.record_date >= month_start,
         )
-        workflow_result = await self.session.execute(workflow_stmt)
-        workflow_count = workflow_result.scalar_one()
-
-        # Count conversations
-        conv_stmt = select(func.count()).select_from(Conversation).where(
-            Conversation.user_id == user_id,
-        )
-        conv_result = await self.session.execute(conv_stmt)
-        conversation_count = conv_result.scalar_one()
 
-        # Get this month's messages
-        now = datetime.utcnow()
-        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-
-        msg_stmt = (
-            select(func.count())
-            .select_from(Message)
-            .join(Conversation, Conversation.id == Message.conversation_id)
-            .where(
-                Conversation.user_id == user_id,
-                Message.created_at >= month_start,
+    def _recent_conversations_stmt(self, user_id: str, limit: int = 5):
+        """Most recently updated conversations."""
+        recent = (
+            select(
+                Conversation.id,
+                Conversation.title,
+                Conversation.workflow_id,
+                Conversation.updated_at,
             )
-        )
-        msg_result = await self.session.execute(msg_stmt)
-        messages_this_month = msg_result.scalar_one()
-
-        # Tokens: estimate based on message count (~100 tokens per message)
-        tokens_this_month = messages_this_month * 100
-
-        return {
-            "agents": agent_count,
-            "workflows": workflow_count,
-            "conversations": conversation_count,
-            "messages_this_month": messages_this_month,
-            "tokens_this_month": tokens_this_month,
-        }
-
-    async def _get_recent_conversations(
-        self,
-        user_id: str,
-        limit: int = 5,
-    ) -> List[Dict[str, Any]]:
-        """Get recent conversations."""
-        stmt = (
-            select(Conversation)
             .where(Conversation.user_id == user_id)
             .order_by(Conversation.updated_at.desc())
             .limit(limit)
+            .subquery()
         )
-        result = await self.session.execute(stmt)
-        conversations = result.scalars().all()
-
-        return [
-            {
-                "id": str(c.id),
-                "title": c.title or "Untitled",
-                "workflow_id": str(c.workflow_id) if c.workflow_id else None,
-                "updated_at": c.updated_at.isoformat() if c.updated_at else None,
-            }
-            for c in conversations
-        ]
-
-    async def _get_workflow_stats(self, user_id: str) -> List[Dict[str, Any]]:
-        """Get per-workflow statistics."""
-        stmt = (
+        return select(*self._dashboard_row(
+            "recent",
+            ref_id=recent.c.id,
+            label=recent.c.title,
+            ref2=recent.c.workflow_id,
+            ts=recent.c.updated_at,
+        ))
+
+    def _workflow_stats_stmt(self, user_id: str, limit: int = 10):
+        """Per-workflow conversation counts for the top workflows."""
+        stats = (
             select(
                 Workflow.id,
                 Workflow.name,
@@ -298,19 +352,133 @@ class AnalyticsService:
             )
             .group_by(Workflow.id, Workflow.name)
             .order_by(func.count(Conversation.id).desc())
-            .limit(10)
+            .limit(limit)
+            .subquery()
+        )
+        return select(*self._dashboard_row(
+            "workflow",
+            ref_id=stats.c.id,
+            label=stats.c.name,
+            n1=stats.c.conversation_count,
+        ))
+
+    def _workflow_metrics_stmt(self, user_id: str, start_date: date, end_date: date):
+        """Per-workflow per-day run metrics for an inclusive date range."""
+        return select(*self._dashboard_row(
+            "wf_metrics",
+            day=WorkflowMetricsDaily.record_date,
+            ref_id=WorkflowMetricsDaily.workflow_id,
+            # Histograms travel as JSON text in the shared string columns
+            label=cast(WorkflowMetricsDaily.latency_histogram, String),
+            ref2=cast(WorkflowMetricsDaily.ttft_histogram, String),
+            n1=WorkflowMetricsDaily.runs,
+            n2=WorkflowMetricsDaily.errors,
+            n3=WorkflowMetricsDaily.tokens,
+        )).where(
+            WorkflowMetricsDaily.user_id == user_id,
+            WorkflowMetricsDaily.record_date >= start_date,
+            WorkflowMetricsDaily.record_date <= end_date,
         )
-        result = await self.session.execute(stmt)
-        rows = result.all()
 
-        return [
-            {
-                "id": str(row[0]),
-                "name": row[1],
-                "conversations": row[2],
+    @staticmethod
+    def _empty_run_metrics() -> Dict[str, Any]:
+        return {
+            "runs": 0,
+            "errors": 0,
+            "error_rate": 0.0,
+            "tokens": 0,
+            "p50_latency_ms": None,
+            "p95_latency_ms": None,
+            "p50_ttft_ms": None,
+            "p95_ttft_ms": None,
+        }
+
+    def _merge_workflow_metrics(self, metric_rows: List[Any]) -> Dict[str, Dict[str, Any]]:
+        """Sum daily run metrics per workflow and estimate percentiles."""
+        merged: Dict[str, Dict[str, Any]] = {}
+        for row in metric_rows:
+            entry = merged.setdefault(str(row.ref_id), {
+                "runs": 0, "errors": 0, "tokens": 0, "latency": None, "ttft": None,
+            })
+            entry["runs"] += row.n1
+            entry["errors"] += row.n2
+            entry["tokens"] += row.n3
+            entry["latency"] = merge_histograms(entry["latency"], json.loads(row.label or "null"))
+            entry["ttft"] = merge_histograms(entry["ttft"], json.loads(row.ref2 or "null"))
+
+        return {
+            workflow_id: {
+                "runs": entry["runs"],
+                "errors": entry["errors"],
+                "error_rate": round(entry["errors"] / entry["runs"] * 100, 1) if entry["runs"] else 0.0,
+                "tokens": entry["tokens"],
+                "p50_latency_ms": histogram_percentile(entry["latency"], 50),
+                "p95_latency_ms": histogram_percentile(entry["latency"], 95),
+                "p50_ttft_ms": histogram_percentile(entry["ttft"], 50),
+                "p95_ttft_ms": histogram_percentile(entry["ttft"], 95),
             }
-            for row in rows
-        ]
+            for workflow_id, entry in merged.items()
+        }
+
+    async def _fetch_dashboard_rows(
+        self,
+        user_id: str,
+        start_date: date,
+        end_date: date,
+        metrics_start: date,
+    ) -> Dict[str, List[Any]]:
+        """
+        Run the combined dashboard statement.
+
+        Args:
+            user_id: User ID
+            start_date: First day of daily rows (start of the previous period)
+            end_date: Last day of daily and workflow metric rows
+            metrics_start: First day of workflow run metrics (current period)
+
+        Returns:
+            Rows grouped by kind: day, totals, month, recent, workflow, wf_metrics
+        """
+        stmt = union_all(
+            self._daily_rows_stmt(user_id, start_date, end_date),
+            self._totals_stmt(user_id),
+            self._month_stmt(user_id),
+            self._recent_conversations_stmt(user_id),
+            self._workflow_stats_stmt(user_id),
+            self._workflow_metrics_stmt(user_id, metrics_start, end_date),
+        )
+        result = await self.session.execute(stmt)
+
+        rows: Dict[str, List[Any]] = {
+            "day": [], "totals": [], "month": [], "recent": [], "workflow": [], "wf_metrics": [],
+        }
+        for row in result.all():
+            rows[row.kind].append(row)
+        return rows
+
+    @staticmethod
+    def _build_daily(
+        day_rows: List[Any],
+        start_date: date,
+        end_date: date,
+    ) -> List[Dict[str, Any]]:
+        """Expand rollup rows into a dense daily series for a date range."""
+        by_date = {_as_date(row.day): row for row in day_rows}
+
+        # Days without activity have no rollup row
+        daily = []
+        current = start_date
+        while current <= end_date:
+            row = by_date.get(current)
+            daily.append({
+                "date": current.isoformat(),
+                "conversations": row.n1 if row else 0,
+                "messages": row.n2 if row else 0,
+                "tokens": row.n3 if row else 0,
+            })
+            current += timedelta(days=1)
+
+        return daily
 
     async def record_daily_stats(
         self,
@@ -320,10 +488,11 @@ class AnalyticsService:
         """
         Record or update daily analytics for a user.
 
-        This can be called at the end of each day or on-demand.
+        This can be called at the end of each day or on-demand. To roll up
+        every user, use AnalyticsRollupService (analytics_rollup.py).
         """
         if record_date is None:
-            record_date = date.today()
+            record_date = datetime.utcnow().date()
 
         # Check if record exists
         stmt = select(AnalyticsDaily).where(
@@ -333,15 +502,14 @@ class AnalyticsService:
         result = await self.session.execute(stmt)
         record = result.scalar_one_or_none()
 
-        # Calculate stats for the day
-        day_start = datetime.combine(record_date, datetime.min.time())
-        day_end = datetime.combine(record_date, datetime.max.time())
+        # Calculate stats for the day (half-open range)
+        day_start, day_end = _day_range(record_date, record_date)
 
         # Count conversations created today
         conv_stmt = select(func.count()).select_from(Conversation).where(
             Conversation.user_id == user_id,
             Conversation.created_at >= day_start,
-            Conversation.created_at <= day_end,
+            Conversation.created_at < day_end,
         )
         conv_result = await self.session.execute(conv_stmt)
         conversations_count = conv_result.scalar_one()
@@ -354,7 +522,7 @@ class AnalyticsService:
             .where(
                 Conversation.user_id == user_id,
                 Message.created_at >= day_start,
-                Message.created_at <= day_end,
+                Message.created_at < day_end,
             )
         )
         msg_result = await self.session.execute(msg_stmt)
@@ -364,7 +532,7 @@ class AnalyticsService:
         component_stmt = select(func.count()).select_from(AgentComponent).where(
             AgentComponent.user_id == user_id,
             AgentComponent.created_at >= day_start,
-            AgentComponent.created_at <= day_end,
+            AgentComponent.created_at < day_end,
         )
         component_result = await self.session.execute(component_stmt)
         agents_created = component_result.scalar_one()
@@ -381,7 +549,7 @@ class AnalyticsService:
         wf_stmt = select(func.count()).select_from(Workflow).where(
             Workflow.user_id == user_id,
             Workflow.created_at >= day_start,
-            Workflow.created_at <= day_end,
+            Workflow.created_at < day_end,
         )
         wf_result = await self.session.execute(wf_stmt)
         workflows_created = wf_result.scalar_one()
@@ -406,3 +574,214 @@ class AnalyticsService:
 
         await self.session.flush()
         return record
+
+    async def increment_daily_counters(
+        self,
+        user_id: str,
+        conversations: int = 0,
+        messages: int = 0,
+        tokens: int = 0,
+        record_date: date = None,
+    ) -> None:
+        """
+        Atomically add to a user's analytics_daily counters for a day.
+
+        Called alongside message/conversation inserts so the increment
+        commits (or rolls back) with the rows it counts. Uses a single
+        INSERT ... ON CONFLICT DO UPDATE, so concurrent chats never race.
+        """
+        if not (conversations or messages or tokens):
+            return
+        if record_date is None:
+            record_date = datetime.utcnow().date()
+
+        now = datetime.utcnow()
+        stmt = dialect_insert(self.session, AnalyticsDaily).values(
+            id=str(uuid.uuid4()),
+            user_id=user_id,
+            record_date=record_date,
+            conversations_count=conversations,
+            messages_count=messages,
+            tokens_used=tokens,
+            created_at=now,
+            updated_at=now,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AnalyticsDaily.user_id, AnalyticsDaily.record_date],
+            set_={
+                "conversations_count": AnalyticsDaily.conversations_count + conversations,
+                "messages_count": AnalyticsDaily.messages_count + messages,
+                "tokens_used": AnalyticsDaily.tokens_used + tokens,
+                "updated_at": now,
+            },
+        )
+        await self.session.execute(stmt)
+
+    async def backfill_daily_counters(
+        self,
+        user_id: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> int:
+        """
+        Rebuild a user's message/conversation/token rollup from raw rows.
+
+        Overwrites the counters for every day that has activity, optionally
+        limited to an inclusive date range. Messages written while the
+        backfill runs may be counted twice or not at all, so run it before
+        enabling traffic or during a quiet period.
+
+        Returns:
+            Number of days written
+        """
+        msg_day = self._get_day_expr(Message.created_at)
+        msg_stmt = (
+            select(
+                msg_day.label("msg_day"),
+                func.count(Message.id),
+                func.coalesce(func.sum(func.length(Message.content)), 0),
+            )
+            .join(Conversation, Conversation.id == Message.conversation_id)
+            .where(Conversation.user_id == user_id)
+            .group_by(msg_day)
+        )
+
+        conv_day = self._get_day_expr(Conversation.created_at)
+        conv_stmt = (
+            select(conv_day.label("conv_day"), func.count(Conversation.id))
+            .where(Conversation.user_id == user_id)
+            .group_by(conv_day)
+        )
+
+        if start_date:
+            range_start, _ = _day_range(start_date, start_date)
+            msg_stmt = msg_stmt.where(Message.created_at >= range_start)
+            conv_stmt = conv_stmt.where(Conversation.created_at >= range_start)
+        if end_date:
+            _, range_end = _day_range(end_date, end_date)
+            msg_stmt = msg_stmt.where(Message.created_at < range_end)
+            conv_stmt = conv_stmt.where(Conversation.created_at < range_end)
+
+        msg_result = await self.session.execute(msg_stmt)
+        conv_result = await self.session.execute(conv_stmt)
+
+        days: Dict[date, Dict[str, int]] = {}
+        for day, count, chars in msg_result.all():
+            counts = days.setdefault(_as_date(day), {})
+            counts["messages"] = count
+            # Same ~4 chars/token estimate used when counting live traffic
+            counts["tokens"] = int(chars) // 4
+        for day, count in conv_result.all():
+            days.setdefault(_as_date(day), {})["conversations"] = count
+
+        now = datetime.utcnow()
+        for day, counts in days.items():
+            values = {
+                "conversations_count": counts.get("conversations", 0),
+                "messages_count": counts.get("messages", 0),
+                "tokens_used": counts.get("tokens", 0),
+            }
+            stmt = dialect_insert(self.session, AnalyticsDaily).values(
+                id=str(uuid.uuid4()),
+                user_id=user_id,
+                record_date=day,
+                created_at=now,
+                updated_at=now,
+                **values,
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[AnalyticsDaily.user_id, AnalyticsDaily.record_date],
+                set_={**values, "updated_at": now},
+            )
+            await self.session.execute(stmt)
+
+        return len(days)
+
+    # -------------------------------------------------------------------------
+    # Detailed export
+    # -------------------------------------------------------------------------
+
+    def _export_stmt(self, user_id: str, detail: str, start_date: date, end_date: date):
+        """Build the ordered export query for one detail level."""
+        range_start, range_end = _day_range(start_date, end_date)
+
+        if detail == "conversations":
+            return (
+                select(
+                    Conversation.id.label("conversation_id"),
+                    Conversation.title,
+                    Conversation.workflow_id,
+                    Conversation.created_at,
+                    Conversation.updated_at,
+                    func.count(Message.id).label("messages"),
+                    (func.coalesce(func.sum(func.length(Message.content)), 0) // 4).label("tokens"),
+                )
+                .outerjoin(Message, Message.conversation_id == Conversation.id)
+                .where(
+                    Conversation.user_id == user_id,
+                    Conversation.created_at >= range_start,
+                    Conversation.created_at < range_end,
+                )
+                .group_by(Conversation.id)
+                .order_by(Conversation.created_at, Conversation.id)
+            )
+
+        if detail == "messages":
+            return (
+                select(
+                    Message.conversation_id,
+                    Message.id.label("message_id"),
+                    Message.created_at,
+                    Message.role,
+                    (func.length(Message.content) // 4).label("tokens"),
+                    Message.content,
+                )
+                .join(Conversation, Conversation.id == Message.conversation_id)
+                .where(
+                    Conversation.user_id == user_id,
+                    Message.created_at >= range_start,
+                    Message.created_at < range_end,
+                )
+                .order_by(Message.created_at, Message.id)
+            )
+
+        raise ValueError(f"Unknown export detail level: {detail}")
+
+    async def stream_export_rows(
+        self,
+        user_id: str,
+        detail: str,
+        start_date: date,
+        end_date: date,
+        batch_size: int = EXPORT_BATCH_SIZE,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Stream per-conversation or per-message export rows in batches.
+
+        Rows are read through a server-side cursor (asyncpg) so memory use
+        is bounded by batch_size regardless of the date range. The session
+        must stay open until iteration finishes.
+
+        Args:
+            user_id: Owner of the exported data
+            detail: "conversations" or "messages" (see EXPORT_COLUMNS)
+            start_date: First day to export (inclusive)
+            end_date: Last day to export (inclusive)
+            batch_size: Rows fetched per round trip
+
+        Yields:
+            Lists of row dicts keyed by EXPORT_COLUMNS[detail]
+        """
+        stmt = self._export_stmt(user_id, detail, start_date, end_date)
+        result = await self.session.stream(
+            stmt.execution_options(yield_per=batch_size)
+        )
+        columns = EXPORT_COLUMNS[detail]
+        async for partition in result.partitions():
+            yield [
+                {
+                    column: value.isoformat() if isinstance(value, datetime) else value
+                    for column, value in zip(columns, row)
+                }
+                for row in partition
+            ]
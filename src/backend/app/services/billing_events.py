@@ -0,0 +1,126 @@
+"""
+Background processing of queued Stripe webhook events.
+
+The webhook endpoint only verifies the signature and inserts a pending
+billing_events row (BillingService.handle_webhook), so Stripe gets its 200
+immediately. run_billing_event_worker, started from the app lifespan,
+applies pending events oldest first, one transaction per event:
+
+- success marks the event "processed" in the same transaction as its
+  subscription/credit changes, so an event is never applied twice
+- failure rolls those changes back and records the error; the event is
+  retried on later polls until BILLING_EVENT_MAX_ATTEMPTS, then "failed"
+- a retried subscription event older (by Stripe's `created`) than one
+  already applied to the subscription is skipped (BillingService.process_event)
+
+Rows are claimed with FOR UPDATE SKIP LOCKED, so several app instances
+can run the worker concurrently.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Callable, Set
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import async_session_maker
+from app.models.billing_event import BillingEvent
+from app.services.billing_service import BillingService
+
+logger = logging.getLogger(__name__)
+
+# Set by the webhook endpoint after it commits a new event
+_wakeup = asyncio.Event()
+
+
+def notify_billing_events() -> None:
+    """Wake the worker so a just-queued event is applied without waiting for the poll."""
+    _wakeup.set()
+
+
+async def _record_failure(
+    session_maker: Callable[[], AsyncSession],
+    event_id: str,
+    error: str,
+) -> None:
+    async with session_maker() as session:
+        event = await session.get(BillingEvent, event_id)
+        if event is None:
+            return
+        event.attempts += 1
+        event.last_error = error[:2000]
+        if event.attempts >= settings.billing_event_max_attempts:
+            event.status = "failed"
+            logger.error(
+                f"Billing event {event.stripe_event_id} ({event.event_type}) failed "
+                f"after {event.attempts} attempts: {error}"
+            )
+        await session.commit()
+
+
+async def process_pending_billing_events(
+    limit: int = 100,
+    session_maker: Callable[[], AsyncSession] = async_session_maker,
+) -> int:
+    """
+    Apply up to `limit` pending events, each at most once per call.
+
+    Returns:
+        Number of events processed successfully
+    """
+    processed = 0
+    seen: Set[str] = set()
+    while len(seen) < limit:
+        async with session_maker() as session:
+            stmt = (
+                select(BillingEvent)
+                .where(BillingEvent.status == "pending")
+                .order_by(BillingEvent.created_at)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            )
+            if seen:
+                stmt = stmt.where(BillingEvent.id.notin_(seen))
+            event = (await session.execute(stmt)).scalar_one_or_none()
+            if event is None:
+                break
+
+            event_id = event.id
+            seen.add(event_id)
+            try:
+                await BillingService(session).process_event(event)
+                event.status = "processed"
+                event.attempts += 1
+                event.processed_at = datetime.utcnow()
+                event.last_error = None
+                await session.commit()
+                processed += 1
+                continue
+            except Exception as e:
+                await session.rollback()
+                error = str(e) or type(e).__name__
+                logger.warning(f"Billing event {event_id} failed: {error}")
+
+        await _record_failure(session_maker, event_id, error)
+
+    return processed
+
+
+async def run_billing_event_worker() -> None:
+    """
+    Apply pending billing events every BILLING_EVENT_POLL_SECONDS, or as
+    soon as notify_billing_events() is called. Runs until cancelled.
+    """
+    while True:
+        try:
+            await process_pending_billing_events()
+        except Exception as e:
+            logger.error(f"Billing event worker error: {e}")
+
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=settings.billing_event_poll_seconds)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
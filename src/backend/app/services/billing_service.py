@@ -2,21 +2,39 @@
 Billing service for Stripe integration and usage tracking.
 
 Handles subscriptions, usage metering, and billing webhooks.
+
+The Stripe SDK is synchronous, so every Stripe call goes through
+run_stripe(), which runs it in a bounded thread pool with a timeout.
+Webhooks are verified and queued in billing_events; the billing event
+worker (services/billing_events.py) applies them via process_event().
 """
+import asyncio
+import functools
+import json
 import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
+from app.database import dialect_insert
 from app.plans import get_plan, PLANS, Plan
 from app.models.subscription import Subscription
 from app.models.billing_event import BillingEvent
 from app.models.user import User
+from app.services.credit_ledger_service import CreditLedgerService
+from app.services.plan_resolver import PlanResolver
+from app.services.usage_counter_service import MONTHLY_METRICS, UsageCounterService
+from app.utils.ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 # Lazy import stripe to avoid startup failures if not installed
 _stripe = None
 
@@ -41,6 +59,55 @@ class BillingServiceError(Exception):
     pass
 
 
+# Bounded pool for blocking Stripe SDK calls (created on first use)
+_stripe_executor: Optional[ThreadPoolExecutor] = None
+
+# customer_id -> (limit fetched, paid invoices); dropped on invoice webhooks
+_invoice_cache: TTLCache[Tuple[int, List[Dict[str, Any]]]] = TTLCache(
+    max_size=1000,
+    ttl_seconds=settings.stripe_invoice_cache_ttl_seconds,
+)
+
+
+async def run_stripe(fn: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Run a blocking Stripe SDK call off the event loop.
+
+    Raises:
+        BillingServiceError: If the call does not finish within
+            STRIPE_TIMEOUT_SECONDS (the thread finishes in the background)
+    """
+    global _stripe_executor
+    if _stripe_executor is None:
+        _stripe_executor = ThreadPoolExecutor(
+            max_workers=settings.stripe_max_workers,
+            thread_name_prefix="stripe",
+        )
+
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(_stripe_executor, functools.partial(fn, *args, **kwargs))
+    try:
+        return await asyncio.wait_for(future, timeout=settings.stripe_timeout_seconds)
+    except asyncio.TimeoutError:
+        name = getattr(fn, "__qualname__", repr(fn))
+        logger.error(f"Stripe call {name} timed out after {settings.stripe_timeout_seconds}s")
+        raise BillingServiceError("Payment provider did not respond in time. Please try again.")
+
+
+def shutdown_stripe_executor() -> None:
+    """Stop the Stripe thread pool (app shutdown)."""
+    global _stripe_executor
+    if _stripe_executor is not None:
+        _stripe_executor.shutdown(wait=False, cancel_futures=True)
+        _stripe_executor = None
+
+
+def invalidate_invoice_cache(customer_id: Optional[str]) -> None:
+    """Drop a customer's cached invoice list."""
+    if customer_id:
+        _invoice_cache.pop(customer_id)
+
+
 class BillingService:
     """Service for billing, subscriptions, and usage tracking."""
 
@@ -114,7 +181,8 @@ class BillingService:
 
         # Get or create Stripe customer
         if not subscription.stripe_customer_id:
-            customer = stripe.Customer.create(
+            customer = await run_stripe(
+                stripe.Customer.create,
                 email=user.email,
                 name=user.full_name,
                 metadata={"user_id": str(user.id)},
@@ -124,7 +192,8 @@ class BillingService:
             logger.info(f"Created Stripe customer {customer.id} for user {user.id}")
 
         # Create checkout session
-        session = stripe.checkout.Session.create(
+        session = await run_stripe(
+            stripe.checkout.Session.create,
             customer=subscription.stripe_customer_id,
             mode="subscription",
             line_items=[{"price": price_id, "quantity": 1}],
@@ -165,7 +234,8 @@ class BillingService:
         if not subscription or not subscription.stripe_customer_id:
             raise BillingServiceError("No billing account found")
 
-        session = stripe.billing_portal.Session.create(
+        session = await run_stripe(
+            stripe.billing_portal.Session.create,
             customer=subscription.stripe_customer_id,
             return_url=return_url,
         )
@@ -174,15 +244,19 @@ class BillingService:
 
     async def handle_webhook(self, payload: bytes, sig_header: str) -> Dict[str, Any]:
         """
-        Handle Stripe webhook events.
+        Verify a Stripe webhook and queue it for processing.
 
-        Processes subscription lifecycle events.
+        Only the signature check and one insert happen while Stripe waits;
+        the billing event worker applies the event after the caller
+        commits. Redelivered events are ignored.
+
+        Returns:
+            Dict with status ("queued" or "duplicate") and event_type
         """
         stripe = get_stripe()
         if not stripe:
             raise BillingServiceError("Stripe is not configured")
 
-        from app.config import settings
         webhook_secret = getattr(settings, "stripe_webhook_secret", None)
 
         if not webhook_secret:
@@ -197,36 +271,109 @@ class BillingService:
         except stripe.error.SignatureVerificationError as e:
             raise BillingServiceError(f"Invalid signature: {e}")
 
-        # Process event
-        event_type = event.type
-        event_data = event.data.object
-
-        logger.info(f"Processing Stripe webhook: {event_type}")
-
-        if event_type == "checkout.session.completed":
-            await self._handle_checkout_completed(event_data)
-        elif event_type == "customer.subscription.created":
-            await self._handle_subscription_created(event_data)
-        elif event_type == "customer.subscription.updated":
-            await self._handle_subscription_updated(event_data)
-        elif event_type == "customer.subscription.deleted":
-            await self._handle_subscription_deleted(event_data)
-        elif event_type == "invoice.payment_failed":
-            await self._handle_payment_failed(event_data)
-        elif event_type == "invoice.paid":
-            await self._handle_invoice_paid(event_data)
-
-        # Record the event for audit
-        user_id = event_data.get("metadata", {}).get("user_id")
-        if user_id:
-            await self._record_billing_event(
-                user_id=user_id,
-                event_type=event_type,
-                stripe_event_id=event.id,
-                payload=event_data,
-            )
+        # Store the verified raw object (plain JSON, independent of SDK types)
+        raw_event = json.loads(payload)
+        queued = await self.enqueue_event(
+            event.id, event.type, raw_event["data"]["object"], raw_event.get("created")
+        )
 
-        return {"status": "success", "event_type": event_type}
+        logger.info(f"Stripe webhook {event.type} ({event.id}) {'queued' if queued else 'already received'}")
+        return {"status": "queued" if queued else "duplicate", "event_type": event.type}
+
+    async def enqueue_event(
+        self,
+        stripe_event_id: str,
+        event_type: str,
+        event_data: Dict[str, Any],
+        created: Optional[int] = None,
+    ) -> bool:
+        """
+        Insert a pending billing event (no-op if the Stripe event ID exists).
+
+        Args:
+            stripe_event_id: Stripe event ID
+            event_type: Stripe event type
+            event_data: The event's data.object
+            created: Stripe event `created` (Unix seconds)
+
+        Returns:
+            True if the event was newly queued
+        """
+        now = datetime.utcnow()
+        metadata_user_id = (event_data.get("metadata") or {}).get("user_id")
+        # NULL rather than a foreign key error when the user no longer exists
+        user_id = (
+            select(User.id).where(User.id == str(metadata_user_id)).scalar_subquery()
+            if metadata_user_id else None
+        )
+        stmt = dialect_insert(self.session, BillingEvent).values(
+            id=str(uuid.uuid4()),
+            user_id=user_id,
+            event_type=event_type,
+            stripe_event_id=stripe_event_id,
+            payload=event_data,
+            stripe_created_at=datetime.utcfromtimestamp(created) if created else None,
+            status="pending",
+            attempts=0,
+            created_at=now,
+            updated_at=now,
+        ).on_conflict_do_nothing(
+            index_elements=[BillingEvent.stripe_event_id],
+        ).returning(BillingEvent.id)
+        return (await self.session.execute(stmt)).first() is not None
+
+    async def process_event(self, event: BillingEvent) -> None:
+        """
+        Apply a queued Stripe event.
+
+        Does not commit or change the event's status; see
+        services/billing_events.py.
+
+        customer.subscription.* events older than the last one applied to
+        the subscription are skipped: a retried event must not overwrite
+        state from newer events that were applied while it was failing.
+        """
+        handlers = {
+            "checkout.session.completed": self._handle_checkout_completed,
+            "customer.subscription.created": self._handle_subscription_created,
+            "customer.subscription.updated": self._handle_subscription_updated,
+            "customer.subscription.deleted": self._handle_subscription_deleted,
+            "invoice.payment_failed": self._handle_payment_failed,
+            "invoice.paid": self._handle_invoice_paid,
+        }
+        handler = handlers.get(event.event_type)
+        if not handler:
+            return
+
+        payload = event.payload or {}
+        subscription = None
+        if event.event_type.startswith("customer.subscription.") and event.stripe_created_at:
+            subscription = await self._get_subscription_by_customer(payload.get("customer"))
+            if (
+                subscription
+                and subscription.stripe_event_at
+                and event.stripe_created_at < subscription.stripe_event_at
+            ):
+                logger.info(
+                    f"Skipping Stripe webhook {event.event_type} ({event.stripe_event_id}): "
+                    f"older than the last event applied to subscription {subscription.id}"
+                )
+                return
+
+        logger.info(f"Processing Stripe webhook: {event.event_type} ({event.stripe_event_id})")
+        await handler(payload)
+        if subscription:
+            subscription.stripe_event_at = event.stripe_created_at
+            await self.session.flush()
+
+    async def _get_subscription_by_customer(self, customer_id: Optional[str]) -> Optional[Subscription]:
+        """Get the subscription for a Stripe customer ID."""
+        if not customer_id:
+            return None
+        result = await self.session.execute(
+            select(Subscription).where(Subscription.stripe_customer_id == customer_id)
+        )
+        return result.scalar_one_or_none()
 
     async def _handle_checkout_completed(self, session: Dict) -> None:
         """Handle successful checkout (subscriptions and credit purchases)."""
@@ -264,6 +411,7 @@ class BillingService:
             subscription.stripe_subscription_id = stripe_subscription_id
             subscription.status = "active"
             await self.session.flush()
+            await CreditLedgerService(self.session).sync_plan_grant(user_id, reference=plan_id)
             logger.info(f"User {user_id} upgraded to {plan_id}")
 
     async def _handle_subscription_created(self, sub: Dict) -> None:
@@ -326,6 +474,9 @@ class BillingService:
             subscription.status = "canceled"
             subscription.stripe_subscription_id = None
             await self.session.flush()
+            await CreditLedgerService(self.session).sync_plan_grant(
+                str(subscription.user_id), reference="free"
+            )
             logger.info(f"User {subscription.user_id} downgraded to free")
 
     async def _handle_payment_failed(self, invoice: Dict) -> None:
@@ -333,6 +484,7 @@ class BillingService:
         customer_id = invoice.get("customer")
         if not customer_id:
             return
+        invalidate_invoice_cache(customer_id)
 
         stmt = select(Subscription).where(
             Subscription.stripe_customer_id == customer_id
@@ -350,6 +502,7 @@ class BillingService:
         customer_id = invoice.get("customer")
         if not customer_id:
             return
+        invalidate_invoice_cache(customer_id)
 
         stmt = select(Subscription).where(
             Subscription.stripe_customer_id == customer_id
@@ -361,35 +514,10 @@ class BillingService:
             subscription.status = "active"
             await self.session.flush()
 
-    async def _record_billing_event(
-        self,
-        user_id: str,
-        event_type: str,
-        stripe_event_id: str,
-        payload: Dict,
-    ) -> None:
-        """Record a billing event for audit."""
-        # Check for duplicate
-        stmt = select(BillingEvent).where(
-            BillingEvent.stripe_event_id == stripe_event_id
-        )
-        result = await self.session.execute(stmt)
-        if result.scalar_one_or_none():
-            return  # Already processed
-
-        event = BillingEvent(
-            user_id=user_id,
-            event_type=event_type,
-            stripe_event_id=stripe_event_id,
-            payload=payload,
-        )
-        self.session.add(event)
-        await self.session.flush()
-
     # =========================================================================
     # Usage Tracking
-    # Note: Usage metrics are now computed on-the-fly from Message/Conversation tables
-    # The usage_metrics table has been removed (2026-01-15 cleanup)
+    # Usage is read from incrementally maintained counters (usage_counters);
+    # see services/usage_counter_service.py
     # =========================================================================
 
     async def track_usage(
@@ -402,66 +530,23 @@ class BillingService:
         """
         Track usage metric (e.g., LLM tokens, messages).
 
-        Note: This method is now a no-op. Usage is computed on-the-fly from
-        the messages table. Kept for API compatibility.
+        Monthly metrics (messages_sent, llm_tokens) are added to the user's
+        counter for the current period. Other metric types are ignored:
+        agent/workflow counts are maintained automatically.
         """
         logger.debug(f"Usage tracking: user={user_id}, type={metric_type}, value={value}")
+        if metric_type in MONTHLY_METRICS:
+            await UsageCounterService(self.session).increment(user_id, metric_type, value)
         return {"user_id": user_id, "metric_type": metric_type, "value": value}
 
     async def get_usage_summary(self, user_id: str) -> Dict[str, int]:
         """
         Get current billing period usage summary.
 
-        Computed on-the-fly from Message/Conversation/AgentComponent/Workflow tables.
+        Read from usage counters (a single indexed query, or Redis when
+        the usage cache is enabled).
         """
-        from sqlalchemy import func
-        from app.models.message import Message
-        from app.models.conversation import Conversation
-        from app.models.agent_component import AgentComponent
-        from app.models.workflow import Workflow
-
-        now = datetime.utcnow()
-        period_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-
-        # Count messages this month
-        msg_stmt = (
-            select(func.count())
-            .select_from(Message)
-            .join(Conversation, Conversation.id == Message.conversation_id)
-            .where(
-                Conversation.user_id == user_id,
-                Message.created_at >= period_start,
-            )
-        )
-        msg_result = await self.session.execute(msg_stmt)
-        messages_count = msg_result.scalar_one() or 0
-
-        # Count agents (AgentComponents) - total active agents
-        agent_stmt = select(func.count()).select_from(AgentComponent).where(
-            AgentComponent.user_id == user_id,
-            AgentComponent.is_active == True,
-        )
-        agent_result = await self.session.execute(agent_stmt)
-        agents_count = agent_result.scalar_one() or 0
-
-        # Count workflows - total active workflows
-        workflow_stmt = select(func.count()).select_from(Workflow).where(
-            Workflow.user_id == user_id,
-            Workflow.is_active == True,
-        )
-        workflow_result = await self.session.execute(workflow_stmt)
-        workflows_count = workflow_result.scalar_one() or 0
-
-        # Estimate tokens (~100 per message)
-        tokens_count = messages_count * 100
-
-        # Return keys that match what the billing API expects
-        return {
-            "messages_sent": messages_count,
-            "llm_tokens": tokens_count,
-            "agents_created": agents_count,
-            "workflows_created": workflows_count,
-        }
+        return await UsageCounterService(self.session).get_usage(user_id)
 
     async def check_limit(
         self,
@@ -473,8 +558,7 @@ class BillingService:
 
         Returns: (is_within_limit, current_usage, max_limit)
         """
-        subscription = await self.get_subscription(user_id)
-        plan = get_plan(subscription.plan_id if subscription else "free")
+        plan = await self.get_plan_for_user(user_id)
 
         usage = await self.get_usage_summary(user_id)
 
@@ -494,7 +578,6 @@ class BillingService:
         usage_key_map = {
             "agents": "agents_created",
             "workflows": "workflows_created",
-            "monthly_credits": "credits_used",
         }
 
         max_limit = limit_map.get(limit_type, float("inf"))
@@ -503,16 +586,19 @@ class BillingService:
         if max_limit == -1:
             return True, 0, -1
 
-        usage_key = usage_key_map.get(limit_type, limit_type)
-        current = usage.get(usage_key, 0)
+        if limit_type == "monthly_credits":
+            balance = await CreditLedgerService(self.session).get_balance(user_id)
+            current = balance["used"] + balance["held"]
+        else:
+            usage_key = usage_key_map.get(limit_type, limit_type)
+            current = usage.get(usage_key, 0)
 
         return current < max_limit, current, max_limit
 
     async def get_plan_for_user(self, user_id: str) -> Plan:
-        """Get the user's current plan."""
-        subscription = await self.get_subscription(user_id)
-        plan_id = subscription.plan_id if subscription else "free"
-        return get_plan(plan_id)
+        """Get the user's current plan (cached; see services/plan_resolver.py)."""
+        resolved = await PlanResolver(self.session).resolve(user_id)
+        return resolved.plan
 
     # =========================================================================
     # AI Credits Management
@@ -523,34 +609,28 @@ class BillingService:
         Get current credit balance for a user.
 
         Returns dict with balance, purchased_credits, credits_used, etc.
-        Credits = monthly plan credits + purchased credits - credits used this month.
+        The balance comes from the materialised credit ledger balance
+        (credits held by in-flight chats are not available).
         """
-        plan = await self.get_plan_for_user(user_id)
-        usage = await self.get_usage_summary(user_id)
-        subscription = await self.get_subscription(user_id)
-
-        # Calculate credits used this month (simplified: 1 message = 10 credits)
-        credits_used = usage.get("messages_sent", 0) * 10
+        resolved = await PlanResolver(self.session).resolve(user_id)
+        plan = resolved.plan
+        balance = await CreditLedgerService(self.session).get_balance(user_id)
 
         # Get purchased credits from subscription
-        purchased_credits = subscription.purchased_credits if subscription else 0
-
-        # Total available = monthly + purchased - used
-        monthly_credits = plan.limits.monthly_credits
-        total_credits = monthly_credits + purchased_credits
-        credits_remaining = max(0, total_credits - credits_used)
+        purchased_credits = resolved.purchased_credits
 
         # Get billing period end for reset date
         reset_date = None
-        if subscription and subscription.current_period_end:
-            reset_date = subscription.current_period_end.isoformat()
+        if resolved.current_period_end:
+            reset_date = resolved.current_period_end.isoformat()
 
         return {
-            "balance": credits_remaining,
-            "monthly_credits": monthly_credits,
+            "balance": balance["available"],
+            "monthly_credits": plan.limits.monthly_credits,
             "purchased_credits": purchased_credits,
-            "credits_used": credits_used,
-            "credits_remaining": credits_remaining,
+            "credits_used": balance["used"],
+            "credits_held": balance["held"],
+            "credits_remaining": balance["available"],
             "reset_date": reset_date,
             "using_byo_key": False,  # TODO: Check if user has BYO API keys
         }
@@ -567,6 +647,9 @@ class BillingService:
         if subscription:
             subscription.purchased_credits = (subscription.purchased_credits or 0) + credits
             await self.session.flush()
+            await CreditLedgerService(self.session).add_credits(
+                user_id, credits, entry_type="purchase", reference=pack_id
+            )
             logger.info(
                 f"Added {credits} purchased credits to user {user_id} "
                 f"(total: {subscription.purchased_credits})"
@@ -598,7 +681,8 @@ class BillingService:
 
         # Get or create Stripe customer
         if not subscription.stripe_customer_id:
-            customer = stripe.Customer.create(
+            customer = await run_stripe(
+                stripe.Customer.create,
                 email=user.email,
                 name=user.full_name,
                 metadata={"user_id": str(user.id)},
@@ -629,7 +713,8 @@ class BillingService:
                 "quantity": 1,
             }]
 
-        session = stripe.checkout.Session.create(
+        session = await run_stripe(
+            stripe.checkout.Session.create,
             customer=subscription.stripe_customer_id,
             mode="payment",
             line_items=line_items,
@@ -756,6 +841,9 @@ class BillingService:
         """
         Get invoice history for a user from Stripe.
 
+        Cached per customer for STRIPE_INVOICE_CACHE_TTL_SECONDS; invoice
+        webhooks drop the cached list.
+
         Returns list of invoices with id, date, amount, status, and PDF URL.
         """
         stripe = get_stripe()
@@ -766,13 +854,19 @@ class BillingService:
         if not subscription or not subscription.stripe_customer_id:
             return []
 
+        customer_id = subscription.stripe_customer_id
+        cached = _invoice_cache.get(customer_id)
+        if cached is not None and cached[0] >= limit:
+            return cached[1][:limit]
+
         try:
-            invoices = stripe.Invoice.list(
-                customer=subscription.stripe_customer_id,
+            invoices = await run_stripe(
+                stripe.Invoice.list,
+                customer=customer_id,
                 limit=limit,
             )
 
-            return [
+            paid = [
                 {
                     "id": inv.id,
                     "number": inv.number,
@@ -790,3 +884,6 @@ class BillingService:
         except Exception as e:
             logger.error(f"Failed to fetch invoices for user {user_id}: {e}")
             return []
+
+        _invoice_cache.set(customer_id, (limit, paid))
+        return paid
@@ -0,0 +1,306 @@
+"""
+Content-addressable blob store for uploaded files and knowledge documents.
+
+Bytes are written once to uploads/blobs/{sha[:2]}/{sha[2:4]}/{sha} and
+shared by reference. Rows store a path with the original file extension,
+{sha}{ext}, hard-linked to the blob: Langflow's File component picks a
+parser by extension. UserFile and KnowledgeSource rows point at a blob via
+their blob_sha256 column; FileBlob.ref_count tracks those references so
+identical uploads are deduplicated and "add file as knowledge" is a
+metadata-only operation.
+"""
+import hashlib
+import logging
+import os
+import re
+import shutil
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+import aiofiles
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import dialect_insert
+from app.models.file_blob import FileBlob
+from app.models.knowledge_source import KnowledgeSource
+from app.models.user_file import UserFile
+
+logger = logging.getLogger(__name__)
+
+# Storage configuration - use same base as file_service
+UPLOADS_DIR = Path(__file__).parent.parent / "uploads"
+BLOBS_DIR = UPLOADS_DIR / "blobs"
+
+# Unreferenced blobs younger than this are kept, so a concurrent upload of
+# the same content can re-acquire the blob before it is collected.
+DEFAULT_GC_GRACE_PERIOD = timedelta(hours=1)
+
+# Extensions kept on blob paths (anything else is dropped)
+_EXTENSION_RE = re.compile(r"\.[a-z0-9]{1,10}")
+
+
+class BlobStoreError(Exception):
+    """Exception raised when blob storage operations fail."""
+    pass
+
+
+class BlobStore:
+    """Service for storing, referencing and collecting content-addressed blobs."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    @staticmethod
+    def hash_content(content: bytes) -> str:
+        """Return the hex SHA-256 digest for content."""
+        return hashlib.sha256(content).hexdigest()
+
+    @staticmethod
+    def extension_for(filename: Optional[str]) -> str:
+        """Return the lower-cased extension of filename (e.g. ".pdf"), or "" if none."""
+        suffix = Path(filename or "").suffix.lower()
+        return suffix if _EXTENSION_RE.fullmatch(suffix) else ""
+
+    @staticmethod
+    def storage_path_for(sha256: str, extension: str = "") -> str:
+        """Return the blob path relative to the uploads directory."""
+        return f"blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}"
+
+    def get_path(self, sha256: str, extension: str = "") -> Path:
+        """Get the absolute path of a blob on disk."""
+        return UPLOADS_DIR / self.storage_path_for(sha256, extension)
+
+    def path_with_extension(self, sha256: str, extension: str) -> str:
+        """
+        Return a path to a stored blob that ends in `extension`.
+
+        The path is a hard link to the blob (a copy where links are not
+        supported), created on first use and collected with the blob.
+
+        Args:
+            sha256: Digest of a blob written by put()
+            extension: Extension from extension_for(), or "" for the blob itself
+
+        Returns:
+            Path relative to the uploads directory, for storage_path/file_path
+
+        Raises:
+            BlobStoreError: If the link cannot be created
+        """
+        if extension:
+            self._link_if_missing(self.get_path(sha256), self.get_path(sha256, extension))
+        return self.storage_path_for(sha256, extension)
+
+    async def put(self, content: bytes) -> FileBlob:
+        """
+        Store content and take one reference to it.
+
+        If a blob with the same digest already exists its reference count
+        is incremented and nothing is written to disk.
+
+        Args:
+            content: Raw file bytes
+
+        Returns:
+            The FileBlob holding the content
+
+        Raises:
+            BlobStoreError: If the content cannot be written to disk
+        """
+        sha256 = self.hash_content(content)
+        storage_path = self.storage_path_for(sha256)
+        now = datetime.utcnow()
+
+        # Upsert the row first so its updated_at protects the blob from a
+        # concurrent garbage-collection pass while we write the bytes.
+        stmt = dialect_insert(self.session, FileBlob).values(
+            id=str(uuid.uuid4()),
+            sha256=sha256,
+            size=len(content),
+            storage_path=storage_path,
+            ref_count=1,
+            created_at=now,
+            updated_at=now,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[FileBlob.sha256],
+            set_={"ref_count": FileBlob.ref_count + 1, "updated_at": now},
+        )
+        await self.session.execute(stmt)
+
+        await self._write_if_missing(self.get_path(sha256), content)
+
+        blob = await self.get(sha256)
+        logger.debug(f"Stored blob {sha256[:12]} (refs={blob.ref_count})")
+        return blob
+
+    async def get(self, sha256: str) -> Optional[FileBlob]:
+        """Get a blob row by digest."""
+        result = await self.session.execute(
+            select(FileBlob)
+            .where(FileBlob.sha256 == sha256)
+            .execution_options(populate_existing=True)
+        )
+        return result.scalar_one_or_none()
+
+    async def acquire(self, sha256: str) -> bool:
+        """
+        Take an additional reference to an existing blob.
+
+        Returns:
+            True if the blob exists and was referenced, False otherwise
+        """
+        result = await self.session.execute(
+            update(FileBlob)
+            .where(FileBlob.sha256 == sha256)
+            .values(ref_count=FileBlob.ref_count + 1, updated_at=datetime.utcnow())
+        )
+        return result.rowcount > 0
+
+    async def release(self, sha256: str) -> None:
+        """
+        Drop one reference to a blob.
+
+        The bytes stay on disk until collect_garbage removes unreferenced
+        blobs, so a release never races with a concurrent reader.
+        """
+        await self.session.execute(
+            update(FileBlob)
+            .where(FileBlob.sha256 == sha256, FileBlob.ref_count > 0)
+            .values(ref_count=FileBlob.ref_count - 1, updated_at=datetime.utcnow())
+        )
+
+    async def read_prefix(self, sha256: str, length: int) -> bytes:
+        """Read the first `length` bytes of a blob (used for previews)."""
+        try:
+            async with aiofiles.open(self.get_path(sha256), "rb") as f:
+                return await f.read(length)
+        except IOError as e:
+            logger.warning(f"Failed to read blob {sha256[:12]}: {e}")
+            return b""
+
+    async def reconcile_ref_counts(self) -> int:
+        """
+        Recompute every blob's reference count from the referencing rows.
+
+        Corrects drift from paths that remove rows without going through
+        the services (e.g. ON DELETE CASCADE when a user is deleted).
+
+        Returns:
+            Number of blob rows whose count was corrected
+        """
+        file_refs = (
+            select(func.count())
+            .select_from(UserFile)
+            .where(UserFile.blob_sha256 == FileBlob.sha256)
+            .scalar_subquery()
+        )
+        knowledge_refs = (
+            select(func.count())
+            .select_from(KnowledgeSource)
+            .where(
+                KnowledgeSource.blob_sha256 == FileBlob.sha256,
+                KnowledgeSource.is_active == True,
+            )
+            .scalar_subquery()
+        )
+        actual = file_refs + knowledge_refs
+        result = await self.session.execute(
+            update(FileBlob)
+            .where(FileBlob.ref_count != actual)
+            .values(ref_count=actual)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    async def collect_garbage(
+        self,
+        grace_period: timedelta = DEFAULT_GC_GRACE_PERIOD,
+    ) -> int:
+        """
+        Delete unreferenced blobs from the database and disk.
+
+        Only blobs untouched for `grace_period` are removed. Each row is
+        deleted with a conditional DELETE so a blob that was re-acquired
+        since the scan is left alone.
+
+        Returns:
+            Number of blobs removed
+        """
+        cutoff = datetime.utcnow() - grace_period
+        result = await self.session.execute(
+            select(FileBlob.sha256).where(
+                FileBlob.ref_count <= 0,
+                FileBlob.updated_at < cutoff,
+            )
+        )
+        candidates = list(result.scalars().all())
+
+        removed = 0
+        for sha256 in candidates:
+            deleted = await self.session.execute(
+                delete(FileBlob)
+                .where(
+                    FileBlob.sha256 == sha256,
+                    FileBlob.ref_count <= 0,
+                    FileBlob.updated_at < cutoff,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            if deleted.rowcount == 0:
+                continue
+
+            path = self.get_path(sha256)
+            for file_path in [path, *path.parent.glob(f"{sha256}.*")]:
+                try:
+                    if file_path.exists():
+                        file_path.unlink()
+                except OSError as e:
+                    logger.warning(f"Failed to delete blob file {file_path}: {e}")
+            removed += 1
+
+        if removed:
+            logger.info(f"Garbage-collected {removed} unreferenced blobs")
+        return removed
+
+    async def _write_if_missing(self, path: Path, content: bytes) -> None:
+        """Atomically write content to path unless it already exists."""
+        if path.exists():
+            return
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            async with aiofiles.open(tmp_path, "wb") as f:
+                await f.write(content)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Failed to write blob {path}: {e}")
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+            raise BlobStoreError("Failed to save file")
+
+    def _link_if_missing(self, blob_path: Path, path: Path) -> None:
+        """Atomically hard-link (or copy) blob_path to path unless it already exists."""
+        if path.exists():
+            return
+
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            try:
+                os.link(blob_path, tmp_path)
+            except OSError:
+                shutil.copyfile(blob_path, tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Failed to link blob {path}: {e}")
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+            raise BlobStoreError("Failed to save file")
@@ -0,0 +1,326 @@
+"""
+AI credit ledger with pre-authorisation holds.
+
+Every credit movement is appended to credit_ledger, and the per-user
+balance in credit_balances is changed with conditional UPDATEs only
+(e.g. "held = held + N WHERE granted - used - held >= N"), so concurrent
+chats cannot overspend and there is no read-modify-write window.
+
+Chat flow:
+    hold_id = await ledger.hold(user_id, CHAT_HOLD_CREDITS)  # before the run
+    ...
+    await ledger.settle(hold_id, charged)   # or ledger.release(hold_id)
+
+Holds that are never closed (process died mid-stream) are returned by
+release_expired_holds(): lazily for the user by hold() and get_balance()
+once they have expired, and for everyone by the usage reconciliation.
+
+Balances roll over lazily: the first operation in a new month resets
+`used` and re-grants plan credits + purchased credits.
+"""
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.database import dialect_insert
+from app.models.credit_balance import CreditBalance
+from app.models.credit_ledger_entry import CreditLedgerEntry
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.services.plan_resolver import PlanResolver
+from app.services.usage_counter_service import current_period
+
+logger = logging.getLogger(__name__)
+
+# Credits charged per chat message (user and assistant messages both count)
+CREDITS_PER_MESSAGE = 10
+
+# Reserved before a chat run: one user + one assistant message
+CHAT_HOLD_CREDITS = 2 * CREDITS_PER_MESSAGE
+
+# Unclosed holds older than this are released by release_expired_holds()
+HOLD_TTL = timedelta(minutes=15)
+
+
+class InsufficientCreditsError(Exception):
+    """Raised when a hold cannot be placed because the balance is too low."""
+    pass
+
+
+class CreditLedgerService:
+    """Credit balance reads, holds, settlement and grants."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    def _entry(self, user_id: str, entry_type: str, amount: int, **kwargs) -> CreditLedgerEntry:
+        entry = CreditLedgerEntry(
+            user_id=str(user_id),
+            entry_type=entry_type,
+            amount=amount,
+            period=current_period(),
+            **kwargs,
+        )
+        self.session.add(entry)
+        return entry
+
+    async def _plan_grant(self, user_id: str) -> int:
+        """Credits granted per period: plan credits + purchased credits."""
+        resolved = await PlanResolver(self.session).resolve(user_id)
+        return resolved.plan.limits.monthly_credits + resolved.purchased_credits
+
+    async def _ensure_balance(self, user_id: str) -> bool:
+        """
+        Create the balance row, or roll it over to the current period.
+
+        A new row starts with this month's messages (counted from the
+        messages table, not the usage counters, which may not be populated
+        yet) as used, so enabling the ledger mid-month does not re-grant
+        credits.
+
+        Returns:
+            True if a row was created or rolled over
+        """
+        period = current_period()
+        granted = await self._plan_grant(user_id)
+        now = datetime.utcnow()
+        period_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        messages = await self.session.scalar(
+            select(func.count(Message.id))
+            .join(Conversation, Conversation.id == Message.conversation_id)
+            .where(
+                Conversation.user_id == str(user_id),
+                Message.created_at >= period_start,
+            )
+        ) or 0
+
+        stmt = dialect_insert(self.session, CreditBalance).values(
+            id=str(uuid.uuid4()),
+            user_id=str(user_id),
+            period=period,
+            granted=granted,
+            used=messages * CREDITS_PER_MESSAGE,
+            held=0,
+            created_at=now,
+            updated_at=now,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CreditBalance.user_id],
+            # Holds carry over; they are settled against the new period
+            set_={"period": period, "granted": granted, "used": 0, "updated_at": now},
+            where=CreditBalance.period != period,
+        ).returning(CreditBalance.id)
+
+        changed = (await self.session.execute(stmt)).first() is not None
+        if changed:
+            self._entry(user_id, "grant", granted)
+            await self.session.flush()
+        return changed
+
+    async def get_balance(self, user_id: str) -> Dict[str, Any]:
+        """
+        Current balance (single-row lookup; creates/rolls over the row if needed).
+
+        Returns:
+            Dict with period, granted, used, held and available
+        """
+        stmt = (
+            select(CreditBalance)
+            .where(CreditBalance.user_id == str(user_id))
+            .execution_options(populate_existing=True)
+        )
+        balance = (await self.session.execute(stmt)).scalar_one_or_none()
+        if balance is None or balance.period != current_period():
+            await self._ensure_balance(user_id)
+            balance = (await self.session.execute(stmt)).scalar_one()
+        elif balance.held and await self.release_expired_holds(user_id=user_id):
+            balance = (await self.session.execute(stmt)).scalar_one()
+
+        return {
+            "period": balance.period,
+            "granted": balance.granted,
+            "used": balance.used,
+            "held": balance.held,
+            "available": balance.available,
+        }
+
+    async def hold(
+        self,
+        user_id: str,
+        amount: int = CHAT_HOLD_CREDITS,
+        reference: Optional[str] = None,
+    ) -> str:
+        """
+        Reserve credits before a chat run.
+
+        Returns:
+            Hold ID to pass to settle() or release()
+
+        Raises:
+            InsufficientCreditsError: If fewer than `amount` credits are available
+        """
+        period = current_period()
+        stmt = (
+            update(CreditBalance)
+            .where(
+                CreditBalance.user_id == str(user_id),
+                CreditBalance.period == period,
+                CreditBalance.granted - CreditBalance.used - CreditBalance.held >= amount,
+            )
+            .values(held=CreditBalance.held + amount, updated_at=datetime.utcnow())
+            .returning(CreditBalance.id)
+            .execution_options(synchronize_session=False)
+        )
+
+        placed = (await self.session.execute(stmt)).first() is not None
+        # No current-period row yet, or credits tied up in abandoned holds:
+        # fix that and try once more
+        if not placed and (
+            await self._ensure_balance(user_id)
+            or await self.release_expired_holds(user_id=user_id)
+        ):
+            placed = (await self.session.execute(stmt)).first() is not None
+        if not placed:
+            raise InsufficientCreditsError(f"Insufficient credits for user {user_id}")
+
+        entry = self._entry(
+            user_id,
+            "hold",
+            amount,
+            expires_at=datetime.utcnow() + HOLD_TTL,
+            reference=reference,
+        )
+        await self.session.flush()
+        return entry.id
+
+    async def _close_hold(self, hold_id: str, entry_type: str, charge: int) -> bool:
+        """Close a hold once: record the closing entry, then move credits."""
+        hold = await self.session.get(CreditLedgerEntry, hold_id)
+        if hold is None or hold.entry_type != "hold":
+            logger.warning(f"Cannot {entry_type} unknown hold {hold_id}")
+            return False
+
+        now = datetime.utcnow()
+        # Unique hold_id makes settle/release idempotent and mutually exclusive
+        stmt = dialect_insert(self.session, CreditLedgerEntry).values(
+            id=str(uuid.uuid4()),
+            user_id=hold.user_id,
+            entry_type=entry_type,
+            amount=charge if entry_type == "settle" else hold.amount,
+            period=current_period(),
+            hold_id=hold_id,
+            reference=hold.reference,
+            created_at=now,
+            updated_at=now,
+        ).on_conflict_do_nothing(
+            index_elements=[CreditLedgerEntry.hold_id],
+        ).returning(CreditLedgerEntry.id)
+        if (await self.session.execute(stmt)).first() is None:
+            return False
+
+        await self.session.execute(
+            update(CreditBalance)
+            .where(CreditBalance.user_id == hold.user_id)
+            .values(
+                held=CreditBalance.held - hold.amount,
+                used=CreditBalance.used + charge,
+                updated_at=now,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        return True
+
+    async def settle(self, hold_id: str, amount: int) -> bool:
+        """
+        Charge `amount` credits for a hold and release the remainder.
+
+        The charge may exceed the hold (e.g. a longer run than estimated).
+
+        Returns:
+            False if the hold was already closed or does not exist
+        """
+        return await self._close_hold(hold_id, "settle", amount)
+
+    async def release(self, hold_id: str) -> bool:
+        """Return a hold's credits without charging."""
+        return await self._close_hold(hold_id, "release", 0)
+
+    async def release_expired_holds(
+        self,
+        now: Optional[datetime] = None,
+        user_id: Optional[str] = None,
+    ) -> int:
+        """
+        Release holds past their expiry that were never closed.
+
+        Args:
+            now: Release holds that expired before this (default: now)
+            user_id: Only this user's holds (default: everyone's)
+
+        Returns:
+            Number of holds released
+        """
+        closing = aliased(CreditLedgerEntry)
+        stmt = (
+            select(CreditLedgerEntry.id)
+            .outerjoin(closing, closing.hold_id == CreditLedgerEntry.id)
+            .where(
+                CreditLedgerEntry.entry_type == "hold",
+                CreditLedgerEntry.expires_at < (now or datetime.utcnow()),
+                closing.id.is_(None),
+            )
+        )
+        if user_id is not None:
+            stmt = stmt.where(CreditLedgerEntry.user_id == str(user_id))
+        result = await self.session.execute(stmt)
+        released = 0
+        for hold_id in result.scalars().all():
+            if await self.release(hold_id):
+                released += 1
+        return released
+
+    async def add_credits(
+        self,
+        user_id: str,
+        amount: int,
+        entry_type: str = "purchase",
+        reference: Optional[str] = None,
+    ) -> None:
+        """Add credits to the current period (e.g. a purchased credit pack)."""
+        if await self._ensure_balance(user_id):
+            # The fresh grant already includes the updated purchased_credits
+            return
+
+        await self.session.execute(
+            update(CreditBalance)
+            .where(CreditBalance.user_id == str(user_id))
+            .values(granted=CreditBalance.granted + amount, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        self._entry(user_id, entry_type, amount, reference=reference)
+        await self.session.flush()
+
+    async def sync_plan_grant(self, user_id: str, reference: Optional[str] = None) -> None:
+        """Re-derive this period's granted credits after a plan change."""
+        if await self._ensure_balance(user_id):
+            return
+
+        granted = await self._plan_grant(user_id)
+        balance = await self.get_balance(user_id)
+        delta = granted - balance["granted"]
+        if delta == 0:
+            return
+
+        await self.session.execute(
+            update(CreditBalance)
+            .where(CreditBalance.user_id == str(user_id))
+            .values(granted=CreditBalance.granted + delta, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        self._entry(user_id, "adjust", delta, reference=reference)
+        await self.session.flush()
@@ -7,13 +7,15 @@ import shutil
 import uuid
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import List, Optional
 
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.user import User
 from app.models.user_file import UserFile
+from app.services.blob_store import BlobStore, BlobStoreError
+from app.utils.pagination import Page, page_rows, paginate
 
 logger = logging.getLogger(__name__)
 
@@ -56,18 +58,25 @@ class FileService:
         project_id: Optional[uuid.UUID] = None,
         page: int = 1,
         page_size: int = 20,
-    ) -> Tuple[List[UserFile], int]:
+        cursor: Optional[str] = None,
+        include_total: bool = True,
+    ) -> Page[UserFile]:
         """
-        List files for a user with pagination.
+        List files for a user, newest first.
 
         Args:
             user_id: User's ID
             project_id: Optional project filter
-            page: Page number (1-indexed)
+            page: Page number (1-indexed), used without a cursor
             page_size: Items per page
+            cursor: Continue after a previous page's next_cursor
+            include_total: Also count the total
 
         Returns:
-            Tuple of (files list, total count)
+            Page of files, with the total if requested
+
+        Raises:
+            InvalidCursorError: Cursor is malformed
         """
         user_id_str = str(user_id)
         stmt = select(UserFile).where(UserFile.user_id == user_id_str)
@@ -75,19 +84,15 @@ class FileService:
         if project_id:
             stmt = stmt.where(UserFile.project_id == str(project_id))
 
-        # Count total
-        count_stmt = select(func.count()).select_from(stmt.subquery())
-        total_result = await self.session.execute(count_stmt)
-        total = total_result.scalar_one()
+        total = None
+        if include_total:
+            count_stmt = select(func.count()).select_from(stmt.subquery())
+            total = (await self.session.execute(count_stmt)).scalar_one()
 
-        # Paginate
-        stmt = stmt.order_by(UserFile.created_at.desc())
-        stmt = stmt.offset((page - 1) * page_size).limit(page_size)
-
-        result = await self.session.execute(stmt)
-        files = list(result.scalars().all())
+        result = await self.session.execute(paginate(stmt, UserFile, page_size, cursor, page))
+        files, next_cursor = page_rows(list(result.scalars().all()), page_size)
 
-        return files, total
+        return Page(files, total, next_cursor)
 
     async def get_file(
         self,
@@ -150,31 +155,24 @@ class FileService:
                 f"File too large. Maximum size is {MAX_FILE_SIZE // (1024 * 1024)}MB"
             )
 
-        # Generate unique filename
-        file_uuid = str(uuid.uuid4())
-        stored_filename = f"{file_uuid}{ext}"
-
-        # Create user-specific directory
-        user_dir = UPLOADS_DIR / str(user.id)
-        user_dir.mkdir(parents=True, exist_ok=True)
-
-        # Save file to disk
-        file_path = user_dir / stored_filename
+        # Store content in the blob store (identical uploads share one blob)
+        blob_store = BlobStore(self.session)
         try:
-            file_path.write_bytes(content)
-        except Exception as e:
-            logger.error(f"Failed to write file to disk: {e}")
-            raise FileServiceError("Failed to save file")
+            blob = await blob_store.put(content)
+            storage_path = blob_store.path_with_extension(blob.sha256, blob_store.extension_for(filename))
+        except BlobStoreError as e:
+            raise FileServiceError(str(e))
 
         # Create database record
         user_file = UserFile(
             user_id=str(user.id),
             project_id=str(project_id) if project_id else None,
-            filename=stored_filename,
+            filename=blob.sha256,
             original_filename=filename,
             content_type=content_type,
             size=len(content),
-            storage_path=f"{user.id}/{stored_filename}",
+            storage_path=storage_path,
+            blob_sha256=blob.sha256,
             description=description,
         )
 
@@ -207,14 +205,18 @@ class FileService:
         if not user_file:
             return False
 
-        # Delete file from disk
-        file_path = UPLOADS_DIR / user_file.storage_path
-        try:
-            if file_path.exists():
-                file_path.unlink()
-        except Exception as e:
-            logger.error(f"Failed to delete file from disk: {e}")
-            # Continue with database deletion even if file deletion fails
+        if user_file.blob_sha256:
+            # Shared blob: drop our reference, garbage collection removes the bytes
+            await BlobStore(self.session).release(user_file.blob_sha256)
+        else:
+            # Legacy upload stored under uploads/{user_id}/
+            file_path = UPLOADS_DIR / user_file.storage_path
+            try:
+                if file_path.exists():
+                    file_path.unlink()
+            except Exception as e:
+                logger.error(f"Failed to delete file from disk: {e}")
+                # Continue with database deletion even if file deletion fails
 
         # Delete database record
         await self.session.delete(user_file)
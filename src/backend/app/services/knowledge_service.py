@@ -6,14 +6,11 @@ Actual RAG processing (embedding, vector storage) is done by Langflow
 components at flow runtime.
 """
 import logging
-import os
 import uuid
-import hashlib
 import httpx
 import aiofiles
 from pathlib import Path
-from typing import List, Optional, Tuple
-from datetime import datetime
+from typing import List, Optional
 
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -22,13 +19,20 @@ from app.models.knowledge_source import KnowledgeSource
 from app.models.user import User
 from app.models.user_file import UserFile
 from app.config import settings
+from app.services.blob_store import BlobStore, BlobStoreError
+from app.utils.pagination import Page, page_rows, paginate
 
 logger = logging.getLogger(__name__)
 
-# Storage configuration - use same base as file_service
+# Storage configuration - use same base as file_service.
+# New sources live in the shared blob store; KNOWLEDGE_STORAGE_DIR only
+# holds legacy per-user copies written before blobs were introduced.
 UPLOADS_DIR = Path(__file__).parent.parent / "uploads"
 KNOWLEDGE_STORAGE_DIR = UPLOADS_DIR / "knowledge"
 
+# MIME types whose first bytes are shown as a content preview
+PREVIEW_MIME_TYPES = ["text/plain", "text/markdown", "text/csv"]
+
 
 class KnowledgeServiceError(Exception):
     """Exception raised when knowledge source operations fail."""
@@ -40,26 +44,22 @@ class KnowledgeService:
 
     def __init__(self, session: AsyncSession):
         self.session = session
-        self._ensure_storage_dir()
-
-    def _ensure_storage_dir(self):
-        """Ensure the knowledge storage directory exists."""
-        KNOWLEDGE_STORAGE_DIR.mkdir(parents=True, exist_ok=True)
-
-    def _get_user_storage_path(self, user_id: str) -> Path:
-        """Get the storage directory for a user."""
-        user_dir = KNOWLEDGE_STORAGE_DIR / user_id
-        user_dir.mkdir(parents=True, exist_ok=True)
-        return user_dir
-
-    def _generate_safe_filename(self, original_filename: str, user_id: str) -> str:
-        """Generate a unique, safe filename."""
-        # Get extension
-        ext = Path(original_filename).suffix.lower()
-        # Create unique name
-        unique_id = hashlib.md5(f"{user_id}{original_filename}{datetime.utcnow().isoformat()}".encode()).hexdigest()[:12]
-        safe_name = f"{unique_id}{ext}"
-        return safe_name
+        self.blob_store = BlobStore(session)
+
+    async def _store_blob(self, content: bytes, filename: str):
+        """
+        Store content in the blob store, mapping errors to KnowledgeServiceError.
+
+        Returns:
+            (blob, path of the blob with filename's extension)
+        """
+        try:
+            blob = await self.blob_store.put(content)
+            return blob, self.blob_store.path_with_extension(
+                blob.sha256, self.blob_store.extension_for(filename)
+            )
+        except BlobStoreError as e:
+            raise KnowledgeServiceError(f"Failed to save file: {e}")
 
     async def get_by_id(
         self,
@@ -81,8 +81,19 @@ class KnowledgeService:
         project_id: Optional[uuid.UUID] = None,
         page: int = 1,
         page_size: int = 50,
-    ) -> Tuple[List[KnowledgeSource], int]:
-        """List knowledge sources for a user with pagination."""
+        cursor: Optional[str] = None,
+        include_total: bool = True,
+    ) -> Page[KnowledgeSource]:
+        """
+        List knowledge sources for a user, newest first.
+
+        Args:
+            cursor: Continue after a previous page's next_cursor
+            include_total: Also count the total
+
+        Raises:
+            InvalidCursorError: Cursor is malformed
+        """
         user_id_str = str(user_id)
         stmt = select(KnowledgeSource).where(
             KnowledgeSource.user_id == user_id_str,
@@ -92,19 +103,15 @@ class KnowledgeService:
         if project_id:
             stmt = stmt.where(KnowledgeSource.project_id == str(project_id))
 
-        # Count total
-        count_stmt = select(func.count()).select_from(stmt.subquery())
-        total_result = await self.session.execute(count_stmt)
-        total = total_result.scalar_one()
-
-        # Paginate
-        stmt = stmt.order_by(KnowledgeSource.created_at.desc())
-        stmt = stmt.offset((page - 1) * page_size).limit(page_size)
+        total = None
+        if include_total:
+            count_stmt = select(func.count()).select_from(stmt.subquery())
+            total = (await self.session.execute(count_stmt)).scalar_one()
 
-        result = await self.session.execute(stmt)
-        sources = list(result.scalars().all())
+        result = await self.session.execute(paginate(stmt, KnowledgeSource, page_size, cursor, page))
+        sources, next_cursor = page_rows(list(result.scalars().all()), page_size)
 
-        return sources, total
+        return Page(sources, total, next_cursor)
 
     async def create_from_file(
         self,
@@ -129,22 +136,11 @@ class KnowledgeService:
         """
         user_id_str = str(user.id)
 
-        # Generate safe filename and path
-        safe_filename = self._generate_safe_filename(filename, user_id_str)
-        user_storage = self._get_user_storage_path(user_id_str)
-        file_path = user_storage / safe_filename
-
-        # Write file to disk
-        try:
-            async with aiofiles.open(file_path, "wb") as f:
-                await f.write(file_content)
-        except IOError as e:
-            logger.error(f"Failed to write file {file_path}: {e}")
-            raise KnowledgeServiceError(f"Failed to save file: {e}")
+        blob, file_path = await self._store_blob(file_content, filename)
 
         # Generate content preview (first 500 chars for text files)
         content_preview = None
-        if mime_type in ["text/plain", "text/markdown", "text/csv"]:
+        if mime_type in PREVIEW_MIME_TYPES:
             try:
                 content_preview = file_content[:500].decode("utf-8", errors="ignore")
             except Exception:
@@ -156,7 +152,8 @@ class KnowledgeService:
             project_id=str(project_id) if project_id else None,
             name=filename,
             source_type="file",
-            file_path=str(file_path.relative_to(KNOWLEDGE_STORAGE_DIR.parent)),
+            file_path=file_path,
+            blob_sha256=blob.sha256,
             original_filename=filename,
             mime_type=mime_type,
             file_size=len(file_content),
@@ -227,17 +224,14 @@ class KnowledgeService:
             status = "error"
             error_message = str(e)
 
-        # Optionally save content to file for persistence
+        # Optionally save content to the blob store for persistence
         file_path = None
+        blob_sha256 = None
         if content and status == "ready":
-            safe_filename = self._generate_safe_filename(f"{name}.txt", user_id_str)
-            user_storage = self._get_user_storage_path(user_id_str)
-            local_path = user_storage / safe_filename
             try:
-                async with aiofiles.open(local_path, "w", encoding="utf-8") as f:
-                    await f.write(content)
-                file_path = str(local_path.relative_to(KNOWLEDGE_STORAGE_DIR.parent))
-            except IOError as e:
+                blob, file_path = await self._store_blob(content.encode("utf-8"), "content.txt")
+                blob_sha256 = blob.sha256
+            except KnowledgeServiceError as e:
                 logger.warning(f"Failed to cache URL content: {e}")
 
         # Create database record
@@ -248,6 +242,7 @@ class KnowledgeService:
             source_type="url",
             url=url,
             file_path=file_path,
+            blob_sha256=blob_sha256,
             file_size=len(content) if content else None,
             status=status,
             error_message=error_message,
@@ -282,17 +277,8 @@ class KnowledgeService:
         """
         user_id_str = str(user.id)
 
-        # Save content to file
-        safe_filename = self._generate_safe_filename(f"{name}.txt", user_id_str)
-        user_storage = self._get_user_storage_path(user_id_str)
-        file_path = user_storage / safe_filename
-
-        try:
-            async with aiofiles.open(file_path, "w", encoding="utf-8") as f:
-                await f.write(content)
-        except IOError as e:
-            logger.error(f"Failed to write text content: {e}")
-            raise KnowledgeServiceError(f"Failed to save content: {e}")
+        # Save content to the blob store
+        blob, file_path = await self._store_blob(content.encode("utf-8"), "content.txt")
 
         # Create database record
         source = KnowledgeSource(
@@ -300,7 +286,8 @@ class KnowledgeService:
             project_id=str(project_id) if project_id else None,
             name=name,
             source_type="text",
-            file_path=str(file_path.relative_to(KNOWLEDGE_STORAGE_DIR.parent)),
+            file_path=file_path,
+            blob_sha256=blob.sha256,
             mime_type="text/plain",
             file_size=len(content.encode("utf-8")),
             status="ready",
@@ -323,6 +310,8 @@ class KnowledgeService:
         """
         Create a knowledge source from an existing user file.
 
+        Blob-backed files are linked by reference, so no bytes are copied.
+
         Args:
             user: The user creating the knowledge source
             file_id: ID of the user file to convert
@@ -344,13 +333,20 @@ class KnowledgeService:
         if not user_file:
             raise KnowledgeServiceError("File not found or access denied")
 
-        # Check if this file is already a knowledge source
-        existing_stmt = select(KnowledgeSource).where(
-            KnowledgeSource.user_id == user_id_str,
-            KnowledgeSource.original_filename == user_file.original_filename,
-            KnowledgeSource.file_size == user_file.size,
-            KnowledgeSource.is_active == True,
-        )
+        if user_file.blob_sha256:
+            # Blob-backed upload: link the existing blob, no bytes are copied
+            existing_stmt = select(KnowledgeSource).where(
+                KnowledgeSource.user_id == user_id_str,
+                KnowledgeSource.blob_sha256 == user_file.blob_sha256,
+                KnowledgeSource.is_active == True,
+            ).limit(1)
+        else:
+            existing_stmt = select(KnowledgeSource).where(
+                KnowledgeSource.user_id == user_id_str,
+                KnowledgeSource.original_filename == user_file.original_filename,
+                KnowledgeSource.file_size == user_file.size,
+                KnowledgeSource.is_active == True,
+            ).limit(1)
         existing_result = await self.session.execute(existing_stmt)
         existing_source = existing_result.scalar_one_or_none()
 
@@ -358,7 +354,41 @@ class KnowledgeService:
             logger.info(f"File {user_file.original_filename} already exists as knowledge source {existing_source.id}")
             return existing_source
 
-        # Read file content
+        if user_file.blob_sha256 and await self.blob_store.acquire(user_file.blob_sha256):
+            try:
+                file_path = self.blob_store.path_with_extension(
+                    user_file.blob_sha256,
+                    self.blob_store.extension_for(user_file.original_filename),
+                )
+            except BlobStoreError as e:
+                raise KnowledgeServiceError(str(e))
+            mime_type = user_file.content_type or "application/octet-stream"
+            content_preview = None
+            if mime_type in PREVIEW_MIME_TYPES:
+                prefix = await self.blob_store.read_prefix(user_file.blob_sha256, 500)
+                content_preview = prefix.decode("utf-8", errors="ignore") or None
+
+            source = KnowledgeSource(
+                user_id=user_id_str,
+                project_id=str(project_id) if project_id else None,
+                name=user_file.original_filename,
+                source_type="file",
+                file_path=file_path,
+                blob_sha256=user_file.blob_sha256,
+                original_filename=user_file.original_filename,
+                mime_type=mime_type,
+                file_size=user_file.size,
+                status="ready",
+                content_preview=content_preview,
+            )
+            self.session.add(source)
+            await self.session.flush()
+            await self.session.refresh(source)
+
+            logger.info(f"Linked knowledge source {source.id} to file {user_file.id}")
+            return source
+
+        # Legacy upload without a blob: read it once into the blob store
         file_full_path = UPLOADS_DIR / user_file.storage_path
         if not file_full_path.exists():
             raise KnowledgeServiceError(f"File not found on disk: {user_file.storage_path}")
@@ -383,10 +413,12 @@ class KnowledgeService:
         """
         Delete a knowledge source.
 
-        Soft deletes the database record and optionally removes the file.
+        Soft deletes the database record and releases its blob reference
+        (legacy per-user copies are removed from disk directly).
         """
-        # Delete file if exists
-        if source.file_path:
+        if source.blob_sha256:
+            await self.blob_store.release(source.blob_sha256)
+        elif source.file_path:
             full_path = KNOWLEDGE_STORAGE_DIR.parent / source.file_path
             try:
                 if full_path.exists():
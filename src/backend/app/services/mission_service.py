@@ -13,7 +13,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.mission import Mission
 from app.models.user_mission_progress import UserMissionProgress
-from app.models.subscription import Subscription
+from app.services.plan_resolver import PlanResolver
 
 logger = logging.getLogger(__name__)
 
@@ -56,12 +56,10 @@ class MissionService:
 
     async def get_user_plan(self, user_id: str) -> str:
         """Get the user's current plan. Defaults to 'free' if no subscription."""
-        stmt = select(Subscription).where(Subscription.user_id == user_id)
-        result = await self.session.execute(stmt)
-        subscription = result.scalar_one_or_none()
+        resolved = await PlanResolver(self.session).resolve(user_id)
 
-        if subscription and subscription.status in ("active", "trialing"):
-            return subscription.plan_id
+        if resolved.has_subscription and resolved.is_active:
+            return resolved.plan_id
 
         return "free"
 
@@ -0,0 +1,135 @@
+"""
+Subscription plan resolution with request-scoped and cross-request caching.
+
+Plan gating (feature_gate, check_limit, missions, credit balance) needs a
+user's plan on nearly every request. PlanResolver resolves it at most once
+per request (memoised on the request's AsyncSession) and keeps resolved
+plans in a process-wide TTL LRU, so warm paths issue no subscription
+queries.
+
+Any insert/update/delete of a Subscription through the ORM (Stripe
+webhooks, checkout, credit purchases, settings changes) drops the user's
+entry immediately and again when the transaction ends. Other workers
+only see the change once their entry expires (PLAN_CACHE_TTL_SECONDS).
+"""
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+
+from app.config import settings
+from app.models.subscription import Subscription
+from app.plans import Plan, get_plan
+from app.utils.db_replica import REPLICA_KEY
+from app.utils.ttl_cache import TTLCache, invalidate_with_session
+
+logger = logging.getLogger(__name__)
+
+# Request memo key in Session.info
+_MEMO_KEY = "resolved_plans"
+
+
+@dataclass(frozen=True)
+class ResolvedPlan:
+    """Snapshot of the subscription fields used for plan gating."""
+
+    user_id: str
+    plan_id: str
+    status: str
+    purchased_credits: int = 0
+    current_period_end: Optional[datetime] = None
+    has_subscription: bool = False
+
+    @property
+    def plan(self) -> Plan:
+        return get_plan(self.plan_id)
+
+    @property
+    def is_active(self) -> bool:
+        return self.status in ("active", "trialing")
+
+
+_plan_cache: TTLCache[ResolvedPlan] = TTLCache(
+    max_size=settings.plan_cache_max_size,
+    ttl_seconds=settings.plan_cache_ttl_seconds,
+)
+
+
+class PlanResolver:
+    """Resolve a user's subscription plan through the request and process caches."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def resolve(self, user_id: str) -> ResolvedPlan:
+        """
+        Get the user's plan snapshot.
+
+        Users without a subscription row resolve to an active free plan.
+        """
+        user_id = str(user_id)
+        memo: Dict[str, ResolvedPlan] = self.session.info.setdefault(_MEMO_KEY, {})
+        resolved = memo.get(user_id)
+        if resolved is not None:
+            return resolved
+
+        resolved = _plan_cache.get(user_id)
+        if resolved is None:
+            resolved = await self._load(user_id)
+            # A lagging replica may predate the last invalidation
+            if not self.session.info.get(REPLICA_KEY):
+                _plan_cache.set(user_id, resolved)
+
+        memo[user_id] = resolved
+        return resolved
+
+    async def _load(self, user_id: str) -> ResolvedPlan:
+        result = await self.session.execute(
+            select(
+                Subscription.plan_id,
+                Subscription.status,
+                Subscription.purchased_credits,
+                Subscription.current_period_end,
+            ).where(Subscription.user_id == user_id)
+        )
+        row = result.first()
+        if row is None:
+            return ResolvedPlan(user_id=user_id, plan_id="free", status="active")
+        return ResolvedPlan(
+            user_id=user_id,
+            plan_id=row.plan_id or "free",
+            status=row.status,
+            purchased_credits=row.purchased_credits or 0,
+            current_period_end=row.current_period_end,
+            has_subscription=True,
+        )
+
+
+def invalidate_plan(user_id: str, session: Optional[Session] = None) -> None:
+    """
+    Drop a user's cached plan.
+
+    With a session, also clears that session's request memo and repeats
+    the invalidation when its transaction ends.
+    """
+    user_id = str(user_id)
+    if session is not None:
+        session.info.get(_MEMO_KEY, {}).pop(user_id, None)
+    invalidate_with_session(_plan_cache, user_id, session)
+
+
+def clear_plan_cache() -> None:
+    """Drop every cached plan in this process."""
+    _plan_cache.clear()
+
+
+def _on_subscription_change(mapper, connection, target: Subscription) -> None:
+    invalidate_plan(target.user_id, object_session(target))
+
+
+for _event in ("after_insert", "after_update", "after_delete"):
+    event.listen(Subscription, _event, _on_subscription_change)
@@ -68,11 +68,36 @@ class ProjectService:
         """
         List all projects for a user.
 
+        Agent, workflow and MCP server counts come from the same query:
+        each is grouped by project over the user's rows and LEFT JOINed.
+
         Returns:
-            List of projects with agent counts
+            List of projects with agent_count, workflow_count and
+            mcp_server_count set
         """
         user_id_str = str(user_id)
-        stmt = select(Project).where(Project.user_id == user_id_str)
+
+        def counts(model):
+            return (
+                select(model.project_id, func.count().label("n"))
+                .where(model.user_id == user_id_str, model.project_id.is_not(None))
+                .group_by(model.project_id)
+                .subquery()
+            )
+
+        agents, workflows, mcp_servers = counts(AgentComponent), counts(Workflow), counts(MCPServer)
+        stmt = (
+            select(
+                Project,
+                func.coalesce(agents.c.n, 0),
+                func.coalesce(workflows.c.n, 0),
+                func.coalesce(mcp_servers.c.n, 0),
+            )
+            .outerjoin(agents, agents.c.project_id == Project.id)
+            .outerjoin(workflows, workflows.c.project_id == Project.id)
+            .outerjoin(mcp_servers, mcp_servers.c.project_id == Project.id)
+            .where(Project.user_id == user_id_str)
+        )
 
         if not include_archived:
             stmt = stmt.where(Project.is_archived == False)
@@ -80,32 +105,12 @@ class ProjectService:
         stmt = stmt.order_by(Project.sort_order, Project.created_at)
 
         result = await self.session.execute(stmt)
-        projects = list(result.scalars().all())
-
-        # Get counts for each project
-        for project in projects:
-            project_id_str = str(project.id)
-
-            # Count agents (AgentComponents)
-            agent_count_stmt = select(func.count()).select_from(AgentComponent).where(
-                AgentComponent.project_id == project_id_str,
-            )
-            agent_count_result = await self.session.execute(agent_count_stmt)
-            project.agent_count = agent_count_result.scalar_one()
-
-            # Count workflows
-            workflow_count_stmt = select(func.count()).select_from(Workflow).where(
-                Workflow.project_id == project_id_str,
-            )
-            workflow_count_result = await self.session.execute(workflow_count_stmt)
-            project.workflow_count = workflow_count_result.scalar_one()
-
-            # Count MCP servers
-            mcp_count_stmt = select(func.count()).select_from(MCPServer).where(
-                MCPServer.project_id == project_id_str,
-            )
-            mcp_count_result = await self.session.execute(mcp_count_stmt)
-            project.mcp_server_count = mcp_count_result.scalar_one()
+        projects = []
+        for project, agent_count, workflow_count, mcp_server_count in result.all():
+            project.agent_count = agent_count
+            project.workflow_count = workflow_count
+            project.mcp_server_count = mcp_server_count
+            projects.append(project)
 
         return projects
 
@@ -338,14 +343,9 @@ class ProjectService:
         if active_only:
             stmt = stmt.where(AgentComponent.is_active == True)
 
-        # Count
-        count_stmt = select(func.count()).select_from(stmt.subquery())
-        total_result = await self.session.execute(count_stmt)
-        total = total_result.scalar_one()
-
-        # Get agent components
-        stmt = stmt.order_by(AgentComponent.created_at.desc())
+        # Unpaginated, so the total is the number of rows (no count query)
+        stmt = stmt.order_by(AgentComponent.created_at.desc(), AgentComponent.id.desc())
         result = await self.session.execute(stmt)
         agent_components = list(result.scalars().all())
 
-        return agent_components, total
+        return agent_components, len(agent_components)
@@ -0,0 +1,110 @@
+"""
+Process-wide caches of ORM rows by lookup key.
+
+Used for hot lookups that would otherwise query on every request (Clerk
+identities, embed tokens, MCP bridge tokens). Column values are cached,
+not instances; a hit is attached to the caller's session with
+Session.merge(load=False), which issues no query and leaves the instance
+fully usable (changes flush as normal UPDATEs).
+
+Misses can be cached too (negative_ttl_seconds), so unknown tokens on
+public endpoints do not reach the database on every request.
+
+Callers invalidate keys from ORM events on the cached model, via
+invalidate(key, session) so the entry is dropped again when the
+transaction ends. That only reaches the current process: other workers
+serve their entry until it expires, so the TTL bounds how long a change
+(e.g. a revoked token) takes to apply everywhere.
+"""
+import copy
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, Optional, Type, TypeVar
+
+from sqlalchemy import Column, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.utils.db_replica import REPLICA_KEY
+from app.utils.ttl_cache import TTLCache, invalidate_with_session
+
+M = TypeVar("M")
+
+_MISSING = object()
+
+
+def snapshot(row: Any) -> Dict[str, Any]:
+    """Column values of a loaded row, enough to rebuild it without a query."""
+    return {
+        attr.key: getattr(row, attr.key)
+        for attr in inspect(type(row)).column_attrs
+        # Skip query_expression() attributes (not columns of the table)
+        if isinstance(attr.columns[0], Column)
+    }
+
+
+async def attach(session: AsyncSession, model: Type[M], values: Dict[str, Any]) -> M:
+    """Add a row rebuilt from cached values to the session as persistent."""
+    # Copy so JSON columns are not shared between requests
+    row = model(**copy.deepcopy(values))
+    make_transient_to_detached(row)
+    return await session.merge(row, load=False)
+
+
+class RowCache(Generic[M]):
+    """TTL LRU of one model's rows by a lookup key, with optional negative caching."""
+
+    def __init__(
+        self,
+        model: Type[M],
+        max_size: int,
+        ttl_seconds: float,
+        negative_ttl_seconds: float = 0,
+    ):
+        self.model = model
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._cache: TTLCache[Optional[Dict[str, Any]]] = TTLCache(
+            max_size=max_size,
+            ttl_seconds=ttl_seconds,
+        )
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._cache), "hits": self._cache.hits, "misses": self._cache.misses}
+
+    async def get(
+        self,
+        session: AsyncSession,
+        key: Hashable,
+        load: Callable[[], Awaitable[Optional[M]]],
+    ) -> Optional[M]:
+        """
+        Return the row for `key`, calling `load` only on a cache miss.
+
+        Args:
+            session: Session to attach cached rows to
+            key: Lookup key
+            load: Loads the row (or None) from the database
+        """
+        values = self._cache.get(key, _MISSING)
+        if values is None:
+            return None
+        if values is not _MISSING:
+            return await attach(session, self.model, values)
+
+        row = await load()
+        # A lagging replica may predate the last invalidation
+        if session.info.get(REPLICA_KEY):
+            return row
+        if row is None:
+            if self.negative_ttl_seconds > 0:
+                self._cache.set(key, None, ttl_seconds=self.negative_ttl_seconds)
+        else:
+            self._cache.set(key, snapshot(row))
+        return row
+
+    def invalidate(self, key: Optional[Hashable], session: Optional[Session] = None) -> None:
+        """Drop a key now (and again when `session`'s transaction ends)."""
+        if key is not None:
+            invalidate_with_session(self._cache, key, session)
+
+    def clear(self) -> None:
+        self._cache.clear()
@@ -0,0 +1,215 @@
+"""
+Admission control for concurrent chat generations.
+
+Each in-flight generation (workflow chat and chat/stream, embed chat,
+enhanced chat stream) holds a slot against up to three caps:
+
+- globally, MAX_CONCURRENT_STREAMS per backend instance
+- per user, their plan's concurrent_streams
+- per embed token, the owner's plan's embed_concurrent_streams
+
+A request over any cap waits in a bounded queue (STREAM_QUEUE_MAX
+requests, STREAM_QUEUE_WAIT_SECONDS each) and is admitted as soon as
+slots free up, or rejected with StreamAdmissionError. Caps are per
+instance: with several instances a user can hold up to their cap on each.
+
+Queue depth, admissions, rejections and queue wait percentiles are
+reported by stream_admission.stats (and /health/full).
+"""
+import asyncio
+import time
+from bisect import bisect_left
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.plans import Plan
+from app.services.plan_resolver import PlanResolver
+from app.services.workflow_metrics import LATENCY_BUCKETS_MS, empty_histogram, histogram_percentile
+
+GLOBAL_KEY = "global"
+
+
+class StreamAdmissionError(Exception):
+    """Raised when a generation is not admitted within the queue limits."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def generation_caps(
+    plan: Plan,
+    user_id: Optional[str] = None,
+    embed_token: Optional[str] = None,
+) -> Dict[str, int]:
+    """
+    Caps for one generation, keyed by what they limit.
+
+    Args:
+        plan: Plan of the user (or of the embedded agent's owner)
+        user_id: Count against the user's concurrent_streams
+        embed_token: Count against the embed's embed_concurrent_streams
+
+    Returns:
+        Dict of slot key -> cap (unlimited caps are left out)
+    """
+    caps = {}
+    if user_id is not None and plan.limits.concurrent_streams >= 0:
+        caps[f"user:{user_id}"] = plan.limits.concurrent_streams
+    if embed_token is not None and plan.limits.embed_concurrent_streams >= 0:
+        caps[f"embed:{embed_token}"] = plan.limits.embed_concurrent_streams
+    return caps
+
+
+async def resolve_generation_caps(
+    session: AsyncSession,
+    user_id: str,
+    embed_token: Optional[str] = None,
+) -> Dict[str, int]:
+    """
+    Caps for a generation by a user, or through an embed owned by them.
+
+    Embed visitors count against the embed token only, not the owner.
+    """
+    plan = (await PlanResolver(session).resolve(str(user_id))).plan
+    if embed_token is not None:
+        return generation_caps(plan, embed_token=embed_token)
+    return generation_caps(plan, user_id=str(user_id))
+
+
+class _Waiter:
+    __slots__ = ("caps", "future", "queued_at")
+
+    def __init__(self, caps: Dict[str, int], future: "asyncio.Future[None]"):
+        self.caps = caps
+        self.future = future
+        self.queued_at = time.monotonic()
+
+
+class StreamAdmission:
+    """Counts in-flight generations per key and queues requests over their caps."""
+
+    def __init__(self, global_limit: int, max_queue: int, max_wait_seconds: float):
+        self.global_limit = global_limit
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self._in_flight: Dict[str, int] = {}
+        # Invariant: no waiter fits (each release grants every waiter that does)
+        self._waiters: List[_Waiter] = []
+        self.admitted = 0
+        self.queued_total = 0
+        self.rejected = 0
+        self.max_queue_depth = 0
+        self.wait_histogram = empty_histogram()
+
+    def _with_global(self, caps: Dict[str, int]) -> Dict[str, int]:
+        caps = dict(caps)
+        # Always counted, so stats report in-flight generations without a global cap
+        caps[GLOBAL_KEY] = self.global_limit if self.global_limit > 0 else float("inf")
+        return caps
+
+    def _fits(self, caps: Dict[str, int]) -> bool:
+        return all(self._in_flight.get(key, 0) < cap for key, cap in caps.items())
+
+    def _take(self, caps: Dict[str, int]) -> None:
+        for key in caps:
+            self._in_flight[key] = self._in_flight.get(key, 0) + 1
+        self.admitted += 1
+
+    def _record_wait(self, waiter: _Waiter) -> None:
+        waited_ms = int((time.monotonic() - waiter.queued_at) * 1000)
+        self.wait_histogram[bisect_left(LATENCY_BUCKETS_MS, waited_ms)] += 1
+
+    def _grant_waiters(self) -> None:
+        for waiter in list(self._waiters):
+            if waiter.future.done():
+                self._waiters.remove(waiter)
+            elif self._fits(waiter.caps):
+                self._waiters.remove(waiter)
+                self._take(waiter.caps)
+                self._record_wait(waiter)
+                waiter.future.set_result(None)
+
+    async def acquire(self, caps: Dict[str, int]) -> None:
+        """
+        Take a slot under every cap (and the global one), waiting if needed.
+
+        Raises:
+            StreamAdmissionError: Queue full, or no slot within max_wait_seconds
+        """
+        caps = self._with_global(caps)
+        if self._fits(caps):
+            self._take(caps)
+            return
+
+        retry_after = max(1, int(self.max_wait_seconds))
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise StreamAdmissionError(
+                "Too many conversations in progress. Please try again shortly.",
+                retry_after,
+            )
+
+        waiter = _Waiter(caps, asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        self.queued_total += 1
+        self.max_queue_depth = max(self.max_queue_depth, len(self._waiters))
+        try:
+            await asyncio.wait_for(waiter.future, timeout=self.max_wait_seconds)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise StreamAdmissionError(
+                "You have too many conversations in progress. Please wait for one to finish.",
+                retry_after,
+            )
+        except asyncio.CancelledError:
+            # Granted just as the caller went away: hand the slot back
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release(caps)
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self, caps: Dict[str, int]) -> None:
+        """Free a slot taken by acquire() and admit any waiters that now fit."""
+        for key in self._with_global(caps):
+            count = self._in_flight.get(key, 0) - 1
+            if count > 0:
+                self._in_flight[key] = count
+            else:
+                self._in_flight.pop(key, None)
+        self._grant_waiters()
+
+    @asynccontextmanager
+    async def admit(self, caps: Dict[str, int]) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the block."""
+        await self.acquire(caps)
+        try:
+            yield
+        finally:
+            self.release(caps)
+
+    @property
+    def stats(self) -> Dict[str, Optional[int]]:
+        """In-flight and queued generations, counters and queue wait percentiles."""
+        return {
+            "in_flight": self._in_flight.get(GLOBAL_KEY, 0),
+            "queue_depth": len(self._waiters),
+            "max_queue_depth": self.max_queue_depth,
+            "admitted": self.admitted,
+            "queued": self.queued_total,
+            "rejected": self.rejected,
+            "wait_p50_ms": histogram_percentile(self.wait_histogram, 50),
+            "wait_p95_ms": histogram_percentile(self.wait_histogram, 95),
+        }
+
+
+stream_admission = StreamAdmission(
+    global_limit=settings.max_concurrent_streams,
+    max_queue=settings.stream_queue_max,
+    max_wait_seconds=settings.stream_queue_wait_seconds,
+)
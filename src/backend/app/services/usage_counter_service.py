@@ -0,0 +1,381 @@
+"""
+Incremental per-user usage counters for plan limits and credits.
+
+Counters live in usage_counters (one row per user, metric and period) so
+BillingService.get_usage_summary / check_limit read a handful of rows
+instead of counting messages, agents and workflows on every call.
+
+- Monthly metrics (messages_sent, llm_tokens) are incremented through
+  BillingService.track_usage as chats are written.
+- Gauges (agents_created, workflows_created: active agent components and
+  workflows) are maintained by ORM events on AgentComponent/Workflow, in
+  the same transaction as the insert/delete/is_active change. The events
+  are registered at app startup (register_gauge_events). They do not see
+  bulk update()/delete() statements or database-level cascades, so
+  run_gauge_reconciler() recomputes the gauges from COUNT(*) every
+  USAGE_GAUGE_RECONCILE_SECONDS.
+- reconcile() recomputes all counters from the raw tables to repair
+  drift; run it nightly via scripts/reconcile_usage.py.
+
+Reads can optionally be cached in Redis (USAGE_CACHE_TTL_SECONDS > 0).
+Explicit increments invalidate the cache; gauge changes made through ORM
+events may be stale in the cache for up to the TTL.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import event, func, literal, select, true, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import get_history
+
+from app.config import settings
+from app.database import async_session_maker, dialect_insert, sql_uuid
+from app.utils.db_replica import REPLICA_KEY
+from app.utils.run_claim import claim_run
+from app.models.agent_component import AgentComponent
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.models.usage_counter import UsageCounter
+from app.models.workflow import Workflow
+
+logger = logging.getLogger(__name__)
+
+# Metrics reset each calendar month
+MONTHLY_METRICS = ("messages_sent", "llm_tokens")
+
+# Point-in-time counts; key names kept for billing API compatibility
+GAUGE_METRICS = {
+    AgentComponent: "agents_created",
+    Workflow: "workflows_created",
+}
+
+GAUGE_PERIOD = "all"
+
+# run_gauge_reconciler claim: Redis key per interval, or a PostgreSQL advisory lock
+GAUGE_CLAIM_KEY = "usage-gauges:{slot}"
+GAUGE_ADVISORY_LOCK_ID = 0x6761756765730000  # "gauges"
+
+
+def current_period(now: Optional[datetime] = None) -> str:
+    """Billing period key for monthly metrics (calendar month, UTC)."""
+    return (now or datetime.utcnow()).strftime("%Y-%m")
+
+
+def _period_for(metric: str) -> str:
+    return current_period() if metric in MONTHLY_METRICS else GAUGE_PERIOD
+
+
+def _cache_key(user_id: str) -> str:
+    return f"usage:{user_id}:{current_period()}"
+
+
+async def _get_cache():
+    """Redis client for the usage cache, or None when disabled/unavailable."""
+    if settings.usage_cache_ttl_seconds <= 0:
+        return None
+    from app.middleware.redis_rate_limit import get_redis
+    return await get_redis()
+
+
+class UsageCounterService:
+    """Read, increment and reconcile per-user usage counters."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def increment(self, user_id: str, metric: str, delta: int = 1) -> None:
+        """
+        Atomically add delta to a counter for its current period.
+
+        Does not commit; the counter changes with the caller's transaction.
+        """
+        now = datetime.utcnow()
+        stmt = dialect_insert(self.session, UsageCounter).values(
+            id=str(uuid.uuid4()),
+            user_id=str(user_id),
+            metric=metric,
+            period=_period_for(metric),
+            value=delta,
+            created_at=now,
+            updated_at=now,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UsageCounter.user_id, UsageCounter.metric, UsageCounter.period],
+            set_={"value": UsageCounter.value + delta, "updated_at": now},
+        )
+        await self.session.execute(stmt)
+        await self.invalidate_cache(str(user_id))
+
+    async def get_usage(self, user_id: str) -> Dict[str, int]:
+        """
+        Current-period usage for a user.
+
+        Returns:
+            Dict with every monthly and gauge metric (missing counters are 0)
+        """
+        user_id = str(user_id)
+        cache = await _get_cache()
+        if cache is not None:
+            try:
+                cached = await cache.get(_cache_key(user_id))
+                if cached:
+                    return json.loads(cached)
+            except Exception as e:
+                logger.warning(f"Usage cache read failed: {e}")
+
+        result = await self.session.execute(
+            select(UsageCounter.metric, UsageCounter.value).where(
+                UsageCounter.user_id == user_id,
+                UsageCounter.period.in_([current_period(), GAUGE_PERIOD]),
+            )
+        )
+        usage = {metric: 0 for metric in (*MONTHLY_METRICS, *GAUGE_METRICS.values())}
+        for metric, value in result.all():
+            usage[metric] = max(0, value)
+
+        # Replica reads may be behind the last invalidation; don't cache them
+        if cache is not None and not self.session.info.get(REPLICA_KEY):
+            try:
+                await cache.set(
+                    _cache_key(user_id),
+                    json.dumps(usage),
+                    ex=settings.usage_cache_ttl_seconds,
+                )
+            except Exception as e:
+                logger.warning(f"Usage cache write failed: {e}")
+
+        return usage
+
+    async def get_gauge(self, user_id: str, metric: str) -> Optional[int]:
+        """
+        A user's gauge counter (uncached), or None if it has no row yet.
+
+        Callers that need an exact count should count the rows themselves
+        when this returns None.
+        """
+        value = await self.session.scalar(
+            select(UsageCounter.value).where(
+                UsageCounter.user_id == str(user_id),
+                UsageCounter.metric == metric,
+                UsageCounter.period == GAUGE_PERIOD,
+            )
+        )
+        return None if value is None else max(0, value)
+
+    async def invalidate_cache(self, user_id: str) -> None:
+        """Drop a user's cached usage (no-op without Redis)."""
+        cache = await _get_cache()
+        if cache is None:
+            return
+        try:
+            await cache.delete(_cache_key(user_id))
+        except Exception as e:
+            logger.warning(f"Usage cache invalidation failed: {e}")
+
+    async def reconcile(self, user_id: Optional[str] = None) -> None:
+        """
+        Recompute current-period counters from the raw tables.
+
+        Set-based (one upsert per metric for all users, or for one user).
+        Increments that land while it runs may be lost or double counted,
+        so schedule it off-peak. Does not commit.
+        """
+        period = current_period()
+        now = datetime.utcnow()
+        period_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+        await self._reset(now, [period], user_id)
+
+        messages = (
+            select(
+                Conversation.user_id.label("user_id"),
+                func.count(Message.id).label("messages_sent"),
+                (func.coalesce(func.sum(func.length(Message.content)), 0) // 4).label("llm_tokens"),
+            )
+            .join(Conversation, Conversation.id == Message.conversation_id)
+            .where(Message.created_at >= period_start)
+            .group_by(Conversation.user_id)
+        )
+        if user_id:
+            messages = messages.where(Conversation.user_id == str(user_id))
+
+        for metric in ("messages_sent", "llm_tokens"):
+            await self._upsert_counts(messages, metric, period, now)
+        await self._upsert_gauges(now, user_id)
+
+        if user_id:
+            await self.invalidate_cache(str(user_id))
+
+    async def reconcile_gauges(self, user_id: Optional[str] = None) -> None:
+        """
+        Recompute the active agent/workflow gauges from COUNT(*).
+
+        Repairs changes the ORM events cannot see (bulk statements,
+        database cascades). Only counters that differ from the recount are
+        written, so rows without drift are never touched; a gauge event
+        committed while this runs may still be overwritten until the next
+        run. Does not commit.
+        """
+        now = datetime.utcnow()
+        await self._upsert_gauges(now, user_id)
+
+        if user_id:
+            await self.invalidate_cache(str(user_id))
+
+    async def _reset(self, now: datetime, periods, user_id: Optional[str]) -> None:
+        """Zero counters for `periods` so users with no rows left drop to 0."""
+        reset = update(UsageCounter).where(
+            UsageCounter.period.in_(periods)
+        ).values(value=0, updated_at=now)
+        if user_id:
+            reset = reset.where(UsageCounter.user_id == str(user_id))
+        await self.session.execute(reset)
+
+    async def _upsert_gauges(self, now: datetime, user_id: Optional[str]) -> None:
+        """Write active row counts per user for every gauge metric (changed rows only)."""
+        for model, metric in GAUGE_METRICS.items():
+            # Users with no active rows left
+            zero = update(UsageCounter).where(
+                UsageCounter.metric == metric,
+                UsageCounter.period == GAUGE_PERIOD,
+                UsageCounter.value != 0,
+                ~select(model.id).where(
+                    model.user_id == UsageCounter.user_id,
+                    model.is_active == True,
+                ).exists(),
+            ).values(value=0, updated_at=now)
+            if user_id:
+                zero = zero.where(UsageCounter.user_id == str(user_id))
+            await self.session.execute(zero)
+
+            counts = (
+                select(
+                    model.user_id.label("user_id"),
+                    func.count(model.id).label(metric),
+                )
+                .where(model.is_active == True)
+                .group_by(model.user_id)
+            )
+            if user_id:
+                counts = counts.where(model.user_id == str(user_id))
+            await self._upsert_counts(counts, metric, GAUGE_PERIOD, now)
+
+    async def _upsert_counts(self, counts, metric: str, period: str, now: datetime) -> None:
+        """
+        Upsert one metric from a select grouped by user_id.
+
+        Args:
+            counts: Select with a user_id column and a column named `metric`
+            metric: Counter to write
+            period: Counter period
+            now: Timestamp for created_at/updated_at
+        """
+        subq = counts.subquery()
+        source = select(
+            sql_uuid(self.session),
+            subq.c.user_id,
+            literal(metric),
+            literal(period),
+            subq.c[metric],
+            literal(now),
+            literal(now),
+        ).where(true())  # Disambiguates ON CONFLICT after SELECT on SQLite
+        stmt = dialect_insert(self.session, UsageCounter).from_select(
+            ["id", "user_id", "metric", "period", "value", "created_at", "updated_at"],
+            source,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UsageCounter.user_id, UsageCounter.metric, UsageCounter.period],
+            set_={"value": stmt.excluded.value, "updated_at": now},
+            where=UsageCounter.value != stmt.excluded.value,
+        )
+        await self.session.execute(stmt)
+
+
+async def run_gauge_reconciler() -> None:
+    """
+    Recompute gauges at startup, then every USAGE_GAUGE_RECONCILE_SECONDS.
+    Runs until cancelled.
+
+    Every worker starts it, but each interval is run by the one worker
+    that claims it.
+    """
+    interval = settings.usage_gauge_reconcile_seconds
+    while True:
+        slot = int(time.time() // interval)
+        try:
+            async with claim_run(
+                GAUGE_CLAIM_KEY.format(slot=slot), interval, GAUGE_ADVISORY_LOCK_ID
+            ) as claimed:
+                if claimed:
+                    async with async_session_maker() as session:
+                        await UsageCounterService(session).reconcile_gauges()
+                        await session.commit()
+        except Exception as e:
+            logger.error(f"Usage gauge reconciliation failed: {e}")
+        # Wake at the next interval boundary, the same moment as other workers
+        await asyncio.sleep(interval - time.time() % interval)
+
+
+# =============================================================================
+# Gauge maintenance (ORM events)
+# =============================================================================
+
+def _apply_gauge(connection, user_id: str, metric: str, delta: int) -> None:
+    """Add delta to a gauge counter inside the current flush."""
+    now = datetime.utcnow()
+    stmt = dialect_insert(connection, UsageCounter).values(
+        id=str(uuid.uuid4()),
+        user_id=str(user_id),
+        metric=metric,
+        period=GAUGE_PERIOD,
+        value=max(delta, 0),
+        created_at=now,
+        updated_at=now,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UsageCounter.user_id, UsageCounter.metric, UsageCounter.period],
+        set_={"value": UsageCounter.value + delta, "updated_at": now},
+    )
+    connection.execute(stmt)
+
+
+def _gauge_after_insert(mapper, connection, target) -> None:
+    if target.is_active:
+        _apply_gauge(connection, target.user_id, GAUGE_METRICS[mapper.class_], 1)
+
+
+def _gauge_after_delete(mapper, connection, target) -> None:
+    if target.is_active:
+        _apply_gauge(connection, target.user_id, GAUGE_METRICS[mapper.class_], -1)
+
+
+def _gauge_after_update(mapper, connection, target) -> None:
+    history = get_history(target, "is_active")
+    if not history.has_changes():
+        return
+    was_active = bool(history.deleted and history.deleted[0])
+    if bool(target.is_active) != was_active:
+        _apply_gauge(
+            connection, target.user_id, GAUGE_METRICS[mapper.class_], 1 if target.is_active else -1
+        )
+
+
+_GAUGE_EVENTS = {
+    "after_insert": _gauge_after_insert,
+    "after_delete": _gauge_after_delete,
+    "after_update": _gauge_after_update,
+}
+
+
+def register_gauge_events() -> None:
+    """Attach the gauge listeners to the gauge models (idempotent). Call at startup."""
+    for model in GAUGE_METRICS:
+        for name, listener in _GAUGE_EVENTS.items():
+            if not event.contains(model, name, listener):
+                event.listen(model, name, listener)
@@ -1,15 +1,51 @@
 """
 User service for managing user data.
+
+Identity resolution (get_or_create_from_clerk) is cached: a per-request
+memo on the session plus a process-wide row cache by clerk_id (see
+services/row_cache.py). MCP bridge token lookups are cached the same way,
+including unknown tokens. ORM updates/deletes of a user drop its entries.
 """
 import uuid
-from typing import Optional
+from datetime import datetime
+from typing import Dict, Optional
 
-from sqlalchemy import select
+from sqlalchemy import event, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import lazyload, object_session
+from sqlalchemy.orm.attributes import get_history
 
+from app.config import settings
+from app.database import dialect_insert
+from app.utils.db_replica import CLERK_USER_KEY
 from app.models.user import User
 from app.middleware.clerk_auth import ClerkUser
 from app.schemas.user import UserCreate, UserUpdate
+from app.services.row_cache import RowCache
+
+# Request memo key in Session.info
+_MEMO_KEY = "clerk_users"
+
+# clerk_id -> user
+_identity_cache: RowCache[User] = RowCache(
+    User,
+    max_size=settings.identity_cache_max_size,
+    ttl_seconds=settings.identity_cache_ttl_seconds,
+)
+
+# mcp_bridge_token -> user (or a cached miss)
+_mcp_token_cache: RowCache[User] = RowCache(
+    User,
+    max_size=settings.token_lookup_cache_max_size,
+    ttl_seconds=settings.token_lookup_cache_ttl_seconds,
+    negative_ttl_seconds=settings.token_lookup_negative_ttl_seconds,
+)
+
+
+def clear_identity_cache() -> None:
+    """Drop every cached identity and MCP token lookup in this process."""
+    _identity_cache.clear()
+    _mcp_token_cache.clear()
 
 
 class UserService:
@@ -69,11 +105,42 @@ class UserService:
         Get existing user or create new user from Clerk data.
 
         This is called on every authenticated request to ensure
-        the user exists in our database.
+        the user exists in our database. Resolved at most once per
+        request, and without any query while the identity cache is warm.
         """
-        # First try to find by clerk_id
-        user = await self.get_by_clerk_id(clerk_user.user_id)
+        clerk_id = clerk_user.user_id
+        # Commits on this session make the user's reads stick to the primary
+        self.session.info[CLERK_USER_KEY] = clerk_id
+        memo: Dict[str, User] = self.session.info.setdefault(_MEMO_KEY, {})
+        user = memo.get(clerk_id)
+        if user is not None and user in self.session:
+            return user
 
+        user = await _identity_cache.get(
+            self.session,
+            clerk_id,
+            lambda: self._load_or_create(clerk_user, email),
+        )
+        memo[clerk_id] = user
+        return user
+
+    async def get_by_mcp_bridge_token(self, token: str) -> Optional[User]:
+        """Get user by MCP bridge token (cached, including unknown tokens)."""
+        async def load() -> Optional[User]:
+            stmt = select(User).where(User.mcp_bridge_token == token).options(lazyload("*"))
+            return (await self.session.execute(stmt)).scalar_one_or_none()
+
+        return await _mcp_token_cache.get(self.session, token, load)
+
+    async def _load_or_create(self, clerk_user: ClerkUser, email: Optional[str]) -> User:
+        """Load the user by clerk_id, inserting it first if needed (race-safe)."""
+        # Relationships are not needed for identity; skip their eager loads
+        stmt = (
+            select(User)
+            .where(User.clerk_id == clerk_user.user_id)
+            .options(lazyload("*"))
+        )
+        user = (await self.session.execute(stmt)).scalar_one_or_none()
         if user:
             return user
 
@@ -91,10 +158,37 @@ class UserService:
             email=user_email,
         )
 
-        return await self.create(user_create)
+        # Concurrent first requests for the same user insert once
+        now = datetime.utcnow()
+        insert_stmt = dialect_insert(self.session, User).values(
+            id=str(uuid.uuid4()),
+            clerk_id=user_create.clerk_id,
+            email=user_create.email,
+            first_name=user_create.first_name,
+            last_name=user_create.last_name,
+            is_active=True,
+            created_at=now,
+            updated_at=now,
+        ).on_conflict_do_nothing(index_elements=[User.clerk_id])
+        await self.session.execute(insert_stmt)
+
+        return (await self.session.execute(stmt)).scalar_one()
 
     async def delete(self, user: User) -> bool:
         """Delete a user."""
         await self.session.delete(user)
         await self.session.flush()
         return True
+
+
+def _on_user_change(mapper, connection, target: User) -> None:
+    session = object_session(target)
+    _identity_cache.invalidate(target.clerk_id, session)
+    # Both the rotated-out token and a new token that may be cached as a miss
+    history = get_history(target, "mcp_bridge_token")
+    for token in {target.mcp_bridge_token, *history.deleted, *history.added}:
+        _mcp_token_cache.invalidate(token, session)
+
+
+for _event in ("after_insert", "after_update", "after_delete"):
+    event.listen(User, _event, _on_user_change)
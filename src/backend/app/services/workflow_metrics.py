@@ -0,0 +1,293 @@
+"""
+Per-workflow run metrics: latency, time-to-first-token, tokens and errors.
+
+WorkflowService.chat/chat_stream call workflow_metrics.record() once per
+run. Records are aggregated in memory per (user, workflow, day) and
+flushed to workflow_metrics_daily (and the workflows_executed /
+error_count / avg_response_time_ms columns of analytics_daily) in
+batches by run_metrics_flusher, started from the app lifespan.
+
+Latency and TTFT are kept as fixed-bucket histograms so percentiles can
+be estimated after summing any number of days.
+"""
+import asyncio
+import logging
+import math
+import uuid
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import async_session_maker, dialect_insert
+from app.models.analytics_daily import AnalyticsDaily
+from app.models.workflow_metrics_daily import WorkflowMetricsDaily
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in milliseconds; one extra overflow bucket
+LATENCY_BUCKETS_MS = (100, 250, 500, 1000, 2000, 4000, 8000, 15000, 30000, 60000)
+
+
+def empty_histogram() -> List[int]:
+    """Bucket counts for LATENCY_BUCKETS_MS plus overflow."""
+    return [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+
+def merge_histograms(a: Optional[Sequence[int]], b: Optional[Sequence[int]]) -> List[int]:
+    """Add two histograms bucket-wise (missing histograms count as empty)."""
+    merged = empty_histogram()
+    for histogram in (a, b):
+        for i, count in enumerate(histogram or []):
+            merged[i] += count
+    return merged
+
+
+def histogram_percentile(histogram: Optional[Sequence[int]], percentile: float) -> Optional[int]:
+    """
+    Estimate a percentile from bucket counts.
+
+    Returns the upper bound of the bucket holding the percentile rank (the
+    last bound for the overflow bucket), or None for an empty histogram.
+    """
+    total = sum(histogram or [])
+    if not total:
+        return None
+
+    rank = max(1, math.ceil(percentile / 100 * total))
+    cumulative = 0
+    for i, count in enumerate(histogram):
+        cumulative += count
+        if cumulative >= rank:
+            return LATENCY_BUCKETS_MS[min(i, len(LATENCY_BUCKETS_MS) - 1)]
+    return LATENCY_BUCKETS_MS[-1]
+
+
+@dataclass
+class WorkflowDayStats:
+    """In-memory metrics for one workflow on one day."""
+
+    runs: int = 0
+    errors: int = 0
+    tokens: int = 0
+    total_latency_ms: int = 0
+    total_ttft_ms: int = 0
+    ttft_count: int = 0
+    latency_histogram: List[int] = field(default_factory=empty_histogram)
+    ttft_histogram: List[int] = field(default_factory=empty_histogram)
+
+    def add_run(self, latency_ms: int, ttft_ms: Optional[int], tokens: int, error: bool) -> None:
+        self.runs += 1
+        self.errors += 1 if error else 0
+        self.tokens += tokens
+        self.total_latency_ms += latency_ms
+        self.latency_histogram[bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+        if ttft_ms is not None:
+            self.total_ttft_ms += ttft_ms
+            self.ttft_count += 1
+            self.ttft_histogram[bisect_left(LATENCY_BUCKETS_MS, ttft_ms)] += 1
+
+    def merge(self, other: "WorkflowDayStats") -> None:
+        self.runs += other.runs
+        self.errors += other.errors
+        self.tokens += other.tokens
+        self.total_latency_ms += other.total_latency_ms
+        self.total_ttft_ms += other.total_ttft_ms
+        self.ttft_count += other.ttft_count
+        self.latency_histogram = merge_histograms(self.latency_histogram, other.latency_histogram)
+        self.ttft_histogram = merge_histograms(self.ttft_histogram, other.ttft_histogram)
+
+
+# (user_id, workflow_id, record_date)
+MetricsKey = Tuple[str, str, date]
+
+
+class WorkflowMetricsAggregator:
+    """Buffers per-run metrics in memory and flushes them in batches."""
+
+    def __init__(self, max_pending: int = 500):
+        self.max_pending = max_pending
+        self._pending: Dict[MetricsKey, WorkflowDayStats] = {}
+        self._flush_requested = asyncio.Event()
+
+    @property
+    def pending(self) -> int:
+        """Number of (user, workflow, day) entries waiting to be flushed."""
+        return len(self._pending)
+
+    def record(
+        self,
+        user_id: str,
+        workflow_id: str,
+        latency_ms: int,
+        ttft_ms: Optional[int] = None,
+        tokens: int = 0,
+        error: bool = False,
+    ) -> None:
+        """
+        Record one workflow run.
+
+        Args:
+            user_id: Workflow owner
+            workflow_id: Workflow that ran
+            latency_ms: Total run time
+            ttft_ms: Time to first streamed token (None when not streaming)
+            tokens: Streamed token count (or estimate for non-streaming runs)
+            error: Whether the run failed
+        """
+        key = (str(user_id), str(workflow_id), datetime.utcnow().date())
+        stats = self._pending.get(key)
+        if stats is None:
+            stats = self._pending[key] = WorkflowDayStats()
+        stats.add_run(int(latency_ms), None if ttft_ms is None else int(ttft_ms), tokens, error)
+
+        if len(self._pending) >= self.max_pending:
+            self._flush_requested.set()
+
+    async def wait_for_batch(self, timeout: float) -> None:
+        """Wait until max_pending entries are buffered or timeout passes."""
+        try:
+            await asyncio.wait_for(self._flush_requested.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def flush(self, session: AsyncSession, commit: bool = False) -> int:
+        """
+        Write pending metrics to the database.
+
+        If writing (or the commit, when `commit` is set) fails the batch is
+        put back so it is retried on the next flush.
+
+        Args:
+            session: Database session
+            commit: Commit the session after writing
+
+        Returns:
+            Number of (user, workflow, day) entries written
+        """
+        batch, self._pending = self._pending, {}
+        self._flush_requested.clear()
+        if not batch:
+            return 0
+
+        try:
+            for key, stats in batch.items():
+                await self._write_workflow_day(session, key, stats)
+            await self._write_analytics_days(session, batch)
+            if commit:
+                await session.commit()
+        except Exception:
+            for key, stats in batch.items():
+                self._pending.setdefault(key, WorkflowDayStats()).merge(stats)
+            raise
+
+        return len(batch)
+
+    async def _write_workflow_day(
+        self,
+        session: AsyncSession,
+        key: MetricsKey,
+        stats: WorkflowDayStats,
+    ) -> None:
+        """Merge one entry into its workflow_metrics_daily row."""
+        user_id, workflow_id, record_date = key
+        now = datetime.utcnow()
+
+        # Make sure the row exists, then lock it to merge histograms
+        stmt = dialect_insert(session, WorkflowMetricsDaily).values(
+            id=str(uuid.uuid4()),
+            user_id=user_id,
+            workflow_id=workflow_id,
+            record_date=record_date,
+            created_at=now,
+            updated_at=now,
+        ).on_conflict_do_nothing(
+            index_elements=[WorkflowMetricsDaily.workflow_id, WorkflowMetricsDaily.record_date],
+        )
+        await session.execute(stmt)
+
+        result = await session.execute(
+            select(WorkflowMetricsDaily)
+            .where(
+                WorkflowMetricsDaily.workflow_id == workflow_id,
+                WorkflowMetricsDaily.record_date == record_date,
+            )
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        row = result.scalar_one()
+        row.runs += stats.runs
+        row.errors += stats.errors
+        row.tokens += stats.tokens
+        row.total_latency_ms += stats.total_latency_ms
+        row.total_ttft_ms += stats.total_ttft_ms
+        row.ttft_count += stats.ttft_count
+        row.latency_histogram = merge_histograms(row.latency_histogram, stats.latency_histogram)
+        row.ttft_histogram = merge_histograms(row.ttft_histogram, stats.ttft_histogram)
+        row.updated_at = now
+        await session.flush()
+
+    async def _write_analytics_days(
+        self,
+        session: AsyncSession,
+        batch: Dict[MetricsKey, WorkflowDayStats],
+    ) -> None:
+        """Add run counts, errors and mean latency to analytics_daily."""
+        per_user_day: Dict[Tuple[str, date], WorkflowDayStats] = {}
+        for (user_id, _, record_date), stats in batch.items():
+            per_user_day.setdefault((user_id, record_date), WorkflowDayStats()).merge(stats)
+
+        now = datetime.utcnow()
+        for (user_id, record_date), stats in per_user_day.items():
+            stmt = dialect_insert(session, AnalyticsDaily).values(
+                id=str(uuid.uuid4()),
+                user_id=user_id,
+                record_date=record_date,
+                workflows_executed=stats.runs,
+                error_count=stats.errors,
+                avg_response_time_ms=stats.total_latency_ms // stats.runs,
+                created_at=now,
+                updated_at=now,
+            )
+            executed = AnalyticsDaily.workflows_executed + stmt.excluded.workflows_executed
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[AnalyticsDaily.user_id, AnalyticsDaily.record_date],
+                set_={
+                    # Run-weighted mean of the stored and new averages
+                    "avg_response_time_ms": (
+                        func.coalesce(AnalyticsDaily.avg_response_time_ms, 0) * AnalyticsDaily.workflows_executed
+                        + stmt.excluded.avg_response_time_ms * stmt.excluded.workflows_executed
+                    ) // executed,
+                    "workflows_executed": executed,
+                    "error_count": AnalyticsDaily.error_count + stmt.excluded.error_count,
+                    "updated_at": now,
+                },
+            )
+            await session.execute(stmt)
+
+
+# Process-wide aggregator used by WorkflowService
+workflow_metrics = WorkflowMetricsAggregator()
+
+
+async def flush_workflow_metrics() -> int:
+    """Flush the process-wide aggregator in its own session."""
+    async with async_session_maker() as session:
+        return await workflow_metrics.flush(session, commit=True)
+
+
+async def run_metrics_flusher() -> None:
+    """
+    Flush workflow metrics every WORKFLOW_METRICS_FLUSH_SECONDS, or sooner
+    once max_pending entries are buffered. Runs until cancelled.
+    """
+    while True:
+        await workflow_metrics.wait_for_batch(settings.workflow_metrics_flush_seconds)
+        try:
+            await flush_workflow_metrics()
+        except Exception as e:
+            logger.error(f"Failed to flush workflow metrics: {e}")
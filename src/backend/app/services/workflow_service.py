@@ -2,11 +2,13 @@
 Workflow service for managing Langflow flows.
 """
 import logging
+import time
 import uuid
 from typing import AsyncGenerator, List, Optional, Tuple
 
-from sqlalchemy import select, func
+from sqlalchemy import String, delete, func, insert, literal, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer, lazyload
 
 from app.schemas.streaming import (
     StreamEvent,
@@ -19,6 +21,7 @@ from app.schemas.streaming import (
 logger = logging.getLogger(__name__)
 
 from app.models.workflow import Workflow
+from app.models.workflow_agent_component import WorkflowAgentComponent
 from app.models.agent_component import AgentComponent
 from app.models.user import User
 from app.models.project import Project
@@ -35,6 +38,15 @@ from app.services.template_mapping import TemplateMapper, template_mapper
 from app.services.settings_service import SettingsService
 from app.services.knowledge_service import KnowledgeService
 from app.services.billing_service import BillingService
+from app.services.credit_ledger_service import (
+    CHAT_HOLD_CREDITS,
+    CreditLedgerService,
+    InsufficientCreditsError,
+)
+from app.services.analytics_service import AnalyticsService
+from app.services.usage_counter_service import UsageCounterService
+from app.services.workflow_metrics import workflow_metrics
+from app.utils.pagination import Page, page_rows, paginate
 
 
 class WorkflowServiceError(Exception):
@@ -42,6 +54,12 @@ class WorkflowServiceError(Exception):
     pass
 
 
+INSUFFICIENT_CREDITS_MESSAGE = (
+    "You've used all your AI credits for this month. "
+    "Buy more credits or upgrade your plan to keep chatting."
+)
+
+
 # RAG Configuration
 RAG_CHUNK_SIZE = 1000
 RAG_CHUNK_OVERLAP = 200
@@ -107,8 +125,24 @@ class WorkflowService:
         page: int = 1,
         page_size: int = 20,
         active_only: bool = True,
-    ) -> Tuple[List[Workflow], int]:
-        """List workflows for a user with pagination."""
+        cursor: Optional[str] = None,
+        include_total: bool = True,
+    ) -> Page[Workflow]:
+        """
+        List workflows for a user, newest first.
+
+        Only summary columns are loaded: flow_data is deferred and raises
+        if accessed, so list responses must use WorkflowSummaryResponse.
+
+        Args:
+            cursor: Continue after a previous page's next_cursor
+            include_total: Also return the total (from the workflows gauge
+                for all active workflows when the user has one, otherwise
+                counted)
+
+        Raises:
+            InvalidCursorError: Cursor is malformed
+        """
         user_id_str = str(user_id)
         stmt = select(Workflow).where(Workflow.user_id == user_id_str)
 
@@ -119,19 +153,24 @@ class WorkflowService:
         if active_only:
             stmt = stmt.where(Workflow.is_active == True)
 
-        # Count total
-        count_stmt = select(func.count()).select_from(stmt.subquery())
-        total_result = await self.session.execute(count_stmt)
-        total = total_result.scalar_one()
-
-        # Paginate
-        stmt = stmt.order_by(Workflow.created_at.desc())
-        stmt = stmt.offset((page - 1) * page_size).limit(page_size)
+        total = None
+        if include_total:
+            if active_only and not project_id:
+                total = await UsageCounterService(self.session).get_gauge(
+                    user_id_str, "workflows_created"
+                )
+            if total is None:
+                count_stmt = select(func.count()).select_from(stmt.subquery())
+                total = (await self.session.execute(count_stmt)).scalar_one()
 
-        result = await self.session.execute(stmt)
-        workflows = list(result.scalars().all())
+        list_stmt = paginate(stmt, Workflow, page_size, cursor, page).options(
+            defer(Workflow.flow_data, raiseload=True),
+            lazyload(Workflow.user),
+        )
+        result = await self.session.execute(list_stmt)
+        workflows, next_cursor = page_rows(list(result.scalars().all()), page_size)
 
-        return workflows, total
+        return Page(workflows, total, next_cursor)
 
     async def _ingest_knowledge_sources(
         self,
@@ -477,6 +516,7 @@ class WorkflowService:
 
             self.session.add(workflow)
             await self.session.flush()
+            await self.sync_agent_links(workflow)
             await self.session.refresh(workflow)
 
             logger.info(f"Created workflow {workflow.id} from agent {component.id}")
@@ -601,10 +641,38 @@ class WorkflowService:
         except Exception as e:
             logger.warning(f"Failed to delete Langflow flow: {e}")
 
+        # Also done by ON DELETE CASCADE where foreign keys are enforced
+        await self.session.execute(
+            delete(WorkflowAgentComponent).where(WorkflowAgentComponent.workflow_id == str(workflow.id))
+        )
         await self.session.delete(workflow)
         await self.session.flush()
         return True
 
+    async def sync_agent_links(self, workflow: Workflow) -> None:
+        """
+        Rewrite a workflow's workflow_agent_components rows from agent_component_ids.
+
+        Call after flush(), so the workflow and any agent components added
+        in the same unit of work exist. Ids of agents that don't exist are
+        not linked. Does not commit.
+        """
+        workflow_id = str(workflow.id)
+        await self.session.execute(
+            delete(WorkflowAgentComponent).where(WorkflowAgentComponent.workflow_id == workflow_id)
+        )
+        ids = {str(component_id) for component_id in workflow.agent_component_ids or []}
+        if not ids:
+            return
+        await self.session.execute(
+            insert(WorkflowAgentComponent).from_select(
+                ["workflow_id", "agent_component_id"],
+                select(literal(workflow_id, String(36)), AgentComponent.id).where(
+                    AgentComponent.id.in_(ids)
+                ),
+            )
+        )
+
     async def duplicate(
         self,
         workflow: Workflow,
@@ -643,6 +711,7 @@ class WorkflowService:
 
             self.session.add(new_workflow)
             await self.session.flush()
+            await self.sync_agent_links(new_workflow)
             await self.session.refresh(new_workflow)
 
             return new_workflow
@@ -654,6 +723,28 @@ class WorkflowService:
                 pass
             raise WorkflowServiceError("Failed to save duplicate.")
 
+    async def _close_chat_hold(self, hold_id: str, run_error: bool) -> None:
+        """Charge a chat's credit hold, or return it if the run failed."""
+        ledger = CreditLedgerService(self.session)
+        try:
+            if run_error:
+                await ledger.release(hold_id)
+            else:
+                await ledger.settle(hold_id, CHAT_HOLD_CREDITS)
+        except Exception as e:
+            # Left for release_expired_holds() once it expires
+            logger.warning(f"Failed to close credit hold {hold_id}: {e}")
+
+    async def _release_abandoned_hold(self, hold_id: str) -> None:
+        """Return the credit hold of a chat stream that ended before completing."""
+        try:
+            await self.session.rollback()
+            await CreditLedgerService(self.session).release(hold_id)
+            await self.session.commit()
+        except Exception as e:
+            # Left for release_expired_holds() once it expires
+            logger.warning(f"Failed to release credit hold {hold_id}: {e}")
+
     async def chat(
         self,
         workflow: Workflow,
@@ -677,6 +768,7 @@ class WorkflowService:
 
             if not conversation:
                 raise WorkflowServiceError("Conversation not found")
+            is_new_conversation = False
         else:
             conversation = Conversation(
                 user_id=str(user.id),
@@ -686,6 +778,17 @@ class WorkflowService:
             )
             self.session.add(conversation)
             await self.session.flush()
+            is_new_conversation = True
+
+        # Reserve credits for the exchange before saving its message (a new
+        # balance counts this month's saved messages as used); nothing above
+        # is kept if this fails
+        try:
+            hold_id = await CreditLedgerService(self.session).hold(
+                str(user.id), CHAT_HOLD_CREDITS, reference=str(conversation.id)
+            )
+        except InsufficientCreditsError:
+            raise WorkflowServiceError(INSUFFICIENT_CREDITS_MESSAGE)
 
         # Save user message
         user_message = Message(
@@ -696,9 +799,15 @@ class WorkflowService:
         self.session.add(user_message)
         await self.session.flush()
 
+        # Commit so the hold is visible to concurrent requests (and the
+        # balance row is not locked) while Langflow runs
+        await self.session.commit()
+
         # Call Langflow
         response_text = ""
         response_metadata = None
+        run_error = False
+        run_started = time.monotonic()
         try:
             # Build tweaks to inject user's entity_id into Composio components
             # This enables multi-user isolation for OAuth connections
@@ -723,6 +832,15 @@ class WorkflowService:
         except Exception as e:
             logger.error(f"Langflow chat error: {e}")
             response_text = "Something went wrong. Please try again."
+            run_error = True
+
+        workflow_metrics.record(
+            user_id=str(user.id),
+            workflow_id=str(workflow.id),
+            latency_ms=(time.monotonic() - run_started) * 1000,
+            tokens=len(response_text) // 4,
+            error=run_error,
+        )
 
         # Save assistant message
         assistant_message = Message(
@@ -735,14 +853,24 @@ class WorkflowService:
         await self.session.flush()
         await self.session.refresh(assistant_message)
 
+        await self._close_chat_hold(hold_id, run_error)
+
+        # Roll up both messages (and the new conversation) into analytics_daily
+        await AnalyticsService(self.session).increment_daily_counters(
+            user_id=str(user.id),
+            conversations=1 if is_new_conversation else 0,
+            messages=2,
+            tokens=(len(message) + len(response_text)) // 4,
+        )
+
         # Track usage for billing
         try:
             billing = BillingService(self.session)
-            # Track message count
+            # Track message count (user + assistant message)
             await billing.track_usage(
                 user_id=str(user.id),
                 metric_type="messages_sent",
-                value=1,
+                value=2,
                 extra_data={"workflow_id": str(workflow.id)},
             )
             # Estimate tokens (~4 chars per token for English)
@@ -800,6 +928,7 @@ class WorkflowService:
                     message="Conversation not found",
                 )
                 return
+            is_new_conversation = False
         else:
             conversation = Conversation(
                 user_id=str(user.id),
@@ -809,6 +938,22 @@ class WorkflowService:
             )
             self.session.add(conversation)
             await self.session.flush()
+            is_new_conversation = True
+
+        # Reserve credits for the exchange before saving its message (a new
+        # balance counts this month's saved messages as used); roll back the
+        # new conversation if we can't
+        try:
+            hold_id = await CreditLedgerService(self.session).hold(
+                str(user.id), CHAT_HOLD_CREDITS, reference=str(conversation.id)
+            )
+        except InsufficientCreditsError:
+            await self.session.rollback()
+            yield error_event(
+                code="INSUFFICIENT_CREDITS",
+                message=INSUFFICIENT_CREDITS_MESSAGE,
+            )
+            return
 
         # Save user message
         user_message = Message(
@@ -819,119 +964,175 @@ class WorkflowService:
         self.session.add(user_message)
         await self.session.flush()
 
+        analytics = AnalyticsService(self.session)
+        await analytics.increment_daily_counters(
+            user_id=str(user.id),
+            conversations=1 if is_new_conversation else 0,
+            messages=1,
+            tokens=len(message) // 4,
+        )
+
         # CRITICAL: Commit before streaming so conversation exists for follow-up messages
+        # (and the credit hold is visible to concurrent requests)
         await self.session.commit()
 
-        # Generate a message ID for the assistant response
-        assistant_message_id = str(uuid.uuid4())
+        # Until the exchange is committed, the hold is returned if the stream
+        # ends early (client disconnected, consumer stopped reading, error)
+        hold_closed = False
+        try:
+            # Generate a message ID for the assistant response
+            assistant_message_id = str(uuid.uuid4())
 
-        # Yield session start with conversation/message IDs
-        yield session_start_event(
-            session_id=conversation.langflow_session_id,
-            conversation_id=str(conversation.id),
-            message_id=assistant_message_id,
-        )
+            # Yield session start with conversation/message IDs
+            yield session_start_event(
+                session_id=conversation.langflow_session_id,
+                conversation_id=str(conversation.id),
+                message_id=assistant_message_id,
+            )
 
-        # Stream response from Langflow
-        accumulated_text = ""
-        response_metadata = {}
+            # Stream response from Langflow
+            accumulated_text = ""
+            response_metadata = {}
 
-        # Build tweaks to inject user's entity_id into Composio components
-        # This enables multi-user isolation for OAuth connections
-        tweaks = {}
-        if workflow.flow_data:
-            tweaks = self.mapper.build_composio_tweaks(
-                workflow.flow_data, str(user.id)
-            )
+            # Build tweaks to inject user's entity_id into Composio components
+            # This enables multi-user isolation for OAuth connections
+            tweaks = {}
+            if workflow.flow_data:
+                tweaks = self.mapper.build_composio_tweaks(
+                    workflow.flow_data, str(user.id)
+                )
 
-        try:
-            async for event in self.langflow.run_flow_stream_enhanced(
-                flow_id=workflow.langflow_flow_id,
-                message=message,
-                session_id=conversation.langflow_session_id,
-                tweaks=tweaks if tweaks else None,
-            ):
-                # Skip the session_start from langflow client (we sent our own)
-                if event.event == StreamEventType.SESSION_START:
-                    continue
-
-                # Accumulate text for saving
-                if event.event == StreamEventType.TEXT_DELTA:
-                    accumulated_text += event.data.get("text", "")
-                elif event.event == StreamEventType.TEXT_COMPLETE:
-                    accumulated_text = event.data.get("text", accumulated_text)
-
-                # Track tool calls and thinking for metadata
-                if event.event in (
-                    StreamEventType.TOOL_CALL_START,
-                    StreamEventType.TOOL_CALL_END,
-                    StreamEventType.THINKING_START,
-                    StreamEventType.THINKING_END,
-                ):
-                    if "events" not in response_metadata:
-                        response_metadata["events"] = []
-                    response_metadata["events"].append({
-                        "type": event.event.value,
-                        "data": event.data,
-                        "timestamp": event.timestamp.isoformat() if event.timestamp else None,
-                    })
+            # Run metrics: time to first token, streamed tokens, outcome
+            run_started = time.monotonic()
+            ttft_ms = None
+            streamed_tokens = 0
+            run_error = False
 
-                # Yield the event to the client
-                yield event
+            try:
+                async for event in self.langflow.run_flow_stream_enhanced(
+                    flow_id=workflow.langflow_flow_id,
+                    message=message,
+                    session_id=conversation.langflow_session_id,
+                    tweaks=tweaks if tweaks else None,
+                ):
+                    # Skip the session_start from langflow client (we sent our own)
+                    if event.event == StreamEventType.SESSION_START:
+                        continue
+
+                    # Accumulate text for saving
+                    if event.event == StreamEventType.TEXT_DELTA:
+                        accumulated_text += event.data.get("text", "")
+                        streamed_tokens += 1
+                    elif event.event == StreamEventType.TEXT_COMPLETE:
+                        accumulated_text = event.data.get("text", accumulated_text)
+                    elif event.event == StreamEventType.ERROR:
+                        run_error = True
+
+                    if ttft_ms is None and event.event in (
+                        StreamEventType.TEXT_DELTA,
+                        StreamEventType.TEXT_COMPLETE,
+                    ):
+                        ttft_ms = (time.monotonic() - run_started) * 1000
+
+                    # Track tool calls and thinking for metadata
+                    if event.event in (
+                        StreamEventType.TOOL_CALL_START,
+                        StreamEventType.TOOL_CALL_END,
+                        StreamEventType.THINKING_START,
+                        StreamEventType.THINKING_END,
+                    ):
+                        if "events" not in response_metadata:
+                            response_metadata["events"] = []
+                        response_metadata["events"].append({
+                            "type": event.event.value,
+                            "data": event.data,
+                            "timestamp": event.timestamp.isoformat() if event.timestamp else None,
+                        })
+
+                    # Langflow's done ends the run; ours (with the IDs) follows
+                    # once the hold is closed and the reply saved
+                    if event.event == StreamEventType.DONE:
+                        break
+
+                    # Yield the event to the client
+                    yield event
 
-                # Check for done event
-                if event.event == StreamEventType.DONE:
-                    break
+            except Exception as e:
+                logger.error(f"Streaming error: {e}")
+                yield error_event(
+                    code="STREAM_ERROR",
+                    message="An error occurred during streaming",
+                    details={"error": str(e)},
+                )
+                accumulated_text = "Something went wrong. Please try again."
+                run_error = True
 
-        except Exception as e:
-            logger.error(f"Streaming error: {e}")
-            yield error_event(
-                code="STREAM_ERROR",
-                message="An error occurred during streaming",
-                details={"error": str(e)},
+            workflow_metrics.record(
+                user_id=str(user.id),
+                workflow_id=str(workflow.id),
+                latency_ms=(time.monotonic() - run_started) * 1000,
+                ttft_ms=ttft_ms,
+                tokens=streamed_tokens,
+                error=run_error,
             )
-            accumulated_text = "Something went wrong. Please try again."
 
-        # Save assistant message with accumulated text
-        if accumulated_text:
-            assistant_message = Message(
-                id=assistant_message_id,
-                conversation_id=str(conversation.id),
-                role="assistant",
-                content=accumulated_text,
-                message_metadata=response_metadata if response_metadata else None,
-            )
-            self.session.add(assistant_message)
-            await self.session.flush()
+            await self._close_chat_hold(hold_id, run_error)
 
-            # Track usage for billing
-            try:
-                billing = BillingService(self.session)
-                # Track message count
-                await billing.track_usage(
+            # Save assistant message with accumulated text
+            if accumulated_text:
+                assistant_message = Message(
+                    id=assistant_message_id,
+                    conversation_id=str(conversation.id),
+                    role="assistant",
+                    content=accumulated_text,
+                    message_metadata=response_metadata if response_metadata else None,
+                )
+                self.session.add(assistant_message)
+                await self.session.flush()
+
+                await analytics.increment_daily_counters(
                     user_id=str(user.id),
-                    metric_type="messages_sent",
-                    value=1,
-                    extra_data={"workflow_id": str(workflow.id)},
+                    messages=1,
+                    tokens=len(accumulated_text) // 4,
                 )
-                # Estimate tokens (~4 chars per token for English)
-                estimated_tokens = (len(message) + len(accumulated_text)) // 4
-                if estimated_tokens > 0:
+
+                # Track usage for billing
+                try:
+                    billing = BillingService(self.session)
+                    # Track message count (user + assistant message)
                     await billing.track_usage(
                         user_id=str(user.id),
-                        metric_type="llm_tokens",
-                        value=estimated_tokens,
+                        metric_type="messages_sent",
+                        value=2,
                         extra_data={"workflow_id": str(workflow.id)},
                     )
-            except Exception as e:
-                # Don't fail the stream if billing tracking fails
-                logger.warning(f"Failed to track usage for user {user.id}: {e}")
+                    # Estimate tokens (~4 chars per token for English)
+                    estimated_tokens = (len(message) + len(accumulated_text)) // 4
+                    if estimated_tokens > 0:
+                        await billing.track_usage(
+                            user_id=str(user.id),
+                            metric_type="llm_tokens",
+                            value=estimated_tokens,
+                            extra_data={"workflow_id": str(workflow.id)},
+                        )
+                except Exception as e:
+                    # Don't fail the stream if billing tracking fails
+                    logger.warning(f"Failed to track usage for user {user.id}: {e}")
 
-        # Final done event with IDs
-        yield done_event(
-            conversation_id=str(conversation.id),
-            message_id=assistant_message_id,
-        )
+            # The request-scoped session may already have been finalised when the
+            # response started streaming, so commit the assistant message and
+            # credit settlement here
+            await self.session.commit()
+            hold_closed = True
+
+            # Final done event with IDs
+            yield done_event(
+                conversation_id=str(conversation.id),
+                message_id=assistant_message_id,
+            )
+        finally:
+            if not hold_closed:
+                await self._release_abandoned_hold(hold_id)
 
     async def export(self, workflow: Workflow) -> dict:
         """Export workflow as JSON."""
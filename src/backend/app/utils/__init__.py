@@ -5,9 +5,11 @@ from app.utils.security import (
     sanitize_flow_data,
     mask_secret,
 )
+from app.utils.ttl_cache import TTLCache
 
 __all__ = [
     "sanitize_api_keys",
     "sanitize_flow_data",
     "mask_secret",
+    "TTLCache",
 ]
@@ -0,0 +1,153 @@
+"""
+Database connection pool instrumentation and warm-up.
+
+The PostgreSQL engine uses a pool class from instrumented_pool_class().
+It times every checkout, which covers waiting for a free connection and
+opening a new one, and counts timeouts and checkouts beyond pool_size.
+Pool events (connect, checkout, checkin, invalidate) track connections
+opened and in use.
+
+PoolMetrics.snapshot(pool) combines these counters with the pool's own
+size and overflow numbers for the /health/db endpoint.
+"""
+import asyncio
+import logging
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Type
+
+from sqlalchemy import event, exc, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
+
+logger = logging.getLogger(__name__)
+
+# Checkout wait histogram bucket upper bounds in ms; one extra overflow bucket
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+class PoolMetrics:
+    """Counters for one engine's connection pool."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.overflow_checkouts = 0
+        self.timeouts = 0
+        self.connections_opened = 0
+        self.invalidations = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.max_wait_ms = 0.0
+        self.wait_histogram: List[int] = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def record_checkout(self, wait_seconds: float, overflow: bool) -> None:
+        wait_ms = wait_seconds * 1000
+        self.checkouts += 1
+        self.overflow_checkouts += 1 if overflow else 0
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        self.wait_histogram[bisect_left(WAIT_BUCKETS_MS, wait_ms)] += 1
+
+    def wait_percentile(self, percentile: float) -> Optional[int]:
+        """Upper bound of the bucket holding the percentile, or None before any checkout."""
+        total = sum(self.wait_histogram)
+        if not total:
+            return None
+        rank = percentile / 100 * total
+        cumulative = 0
+        for i, count in enumerate(self.wait_histogram):
+            cumulative += count
+            if cumulative >= rank:
+                break
+        return WAIT_BUCKETS_MS[min(i, len(WAIT_BUCKETS_MS) - 1)]
+
+    def listen(self, engine: AsyncEngine) -> None:
+        """Track connections opened, in use and invalidated on the engine's pool."""
+        target = engine.sync_engine
+
+        @event.listens_for(target, "connect")
+        def _on_connect(dbapi_connection, connection_record):
+            self.connections_opened += 1
+
+        @event.listens_for(target, "checkout")
+        def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+
+        @event.listens_for(target, "checkin")
+        def _on_checkin(dbapi_connection, connection_record):
+            self.in_use -= 1
+
+        @event.listens_for(target, "invalidate")
+        def _on_invalidate(dbapi_connection, connection_record, exception):
+            self.invalidations += 1
+
+    def snapshot(self, pool: Pool) -> Dict[str, Any]:
+        """Current pool state and counters since startup."""
+        state: Dict[str, Any] = {"pool_class": type(pool).__name__}
+        if isinstance(pool, AsyncAdaptedQueuePool):
+            state.update(
+                pool_size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                # Negative while fewer than pool_size connections are open
+                overflow=pool.overflow(),
+            )
+        state.update(
+            in_use=self.in_use,
+            max_in_use=self.max_in_use,
+            checkouts=self.checkouts,
+            overflow_checkouts=self.overflow_checkouts,
+            timeouts=self.timeouts,
+            connections_opened=self.connections_opened,
+            invalidations=self.invalidations,
+            wait_p50_ms=self.wait_percentile(50),
+            wait_p95_ms=self.wait_percentile(95),
+            wait_p99_ms=self.wait_percentile(99),
+            max_wait_ms=round(self.max_wait_ms, 1),
+        )
+        return state
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that reports checkout waits and timeouts to `metrics`."""
+
+    metrics: PoolMetrics
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        self.metrics.record_checkout(time.perf_counter() - started, overflow=self._overflow > 0)
+        return connection
+
+
+def instrumented_pool_class(metrics: PoolMetrics) -> Type[InstrumentedQueuePool]:
+    """Pool class bound to `metrics` (kept across pool recreation on dispose)."""
+    return type("InstrumentedQueuePool", (InstrumentedQueuePool,), {"metrics": metrics})
+
+
+async def warm_up_pool(engine: AsyncEngine, connections: int) -> int:
+    """
+    Open `connections` pool connections at once so first requests don't pay for them.
+
+    Returns:
+        Number of connections opened and returned to the pool
+    """
+    if connections <= 0:
+        return 0
+
+    async def open_one():
+        conn = await engine.connect()
+        await conn.execute(text("SELECT 1"))
+        return conn
+
+    results = await asyncio.gather(*(open_one() for _ in range(connections)), return_exceptions=True)
+    opened = [c for c in results if not isinstance(c, BaseException)]
+    await asyncio.gather(*(c.close() for c in opened))
+    errors = [e for e in results if isinstance(e, BaseException)]
+    if errors:
+        logger.warning(f"Database pool warm-up opened {len(opened)}/{connections} connections: {errors[0]}")
+    return len(opened)
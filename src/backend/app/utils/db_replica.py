@@ -0,0 +1,195 @@
+"""
+Read replica routing.
+
+Read-only endpoints take a ReadOnlySessionDep session (app.database),
+opened on the replica engine unless:
+
+- no replica is configured (DATABASE_REPLICA_URL is empty),
+- the replica's lag probe failed or reported more than
+  REPLICA_MAX_LAG_SECONDS (probed at most every REPLICA_LAG_CHECK_SECONDS), or
+- the user committed a write within REPLICA_STICKY_SECONDS, so they read
+  their own writes from the primary.
+
+Stickiness is per process: after a write handled by one instance, the
+user's next read on another instance can still go to the replica and
+miss up to REPLICA_MAX_LAG_SECONDS of changes.
+
+Replica sessions refuse to flush or execute INSERT/UPDATE/DELETE.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Keys in Session.info
+REPLICA_KEY = "replica"
+# Clerk user the session serves (set by UserService.get_or_create_from_clerk)
+CLERK_USER_KEY = "clerk_user_id"
+_WRITES_KEY = "has_writes"
+
+PROBE_TIMEOUT_SECONDS = 2.0
+
+# Seconds since the last replayed transaction; 0 on a primary or while the
+# replica has replayed everything it received (an idle primary sends nothing)
+_LAG_SQL = {
+    "postgresql": text(
+        "SELECT CASE"
+        " WHEN NOT pg_is_in_recovery() THEN 0"
+        " WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+        " ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+        " END"
+    ),
+}
+
+
+class ReadOnlySessionError(Exception):
+    """Raised when a replica session is used to write."""
+
+
+class ReplicaRouter:
+    """Decides per request whether reads go to the replica or the primary."""
+
+    def __init__(
+        self,
+        engine: Optional[AsyncEngine],
+        max_lag_seconds: float,
+        check_seconds: float,
+        sticky_seconds: float,
+        sticky_max_size: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.engine = engine
+        self.session_maker = (
+            async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
+            if engine is not None
+            else None
+        )
+        self.max_lag_seconds = max_lag_seconds
+        self.check_seconds = check_seconds
+        self._clock = clock
+        # Clerk user id -> True while their reads stick to the primary
+        self._sticky: TTLCache[bool] = TTLCache(sticky_max_size, sticky_seconds, clock)
+        self._lock = asyncio.Lock()
+        self._checked_at: Optional[float] = None
+        # None until the first probe, and after a failed one
+        self.lag_seconds: Optional[float] = None
+        self.probe_errors = 0
+        self.replica_reads = 0
+        self.primary_reads = {"sticky": 0, "lagging": 0, "unavailable": 0}
+
+    def mark_write(self, clerk_user_id: str) -> None:
+        """Send the user's reads to the primary for the next sticky_seconds."""
+        self._sticky.set(clerk_user_id, True)
+
+    def is_sticky(self, clerk_user_id: str) -> bool:
+        return self._sticky.get(clerk_user_id) is not None
+
+    async def _probe_lag(self) -> float:
+        async with self.engine.connect() as conn:
+            sql = _LAG_SQL.get(conn.dialect.name)
+            if sql is None:
+                return 0.0
+            return float((await conn.execute(sql)).scalar() or 0)
+
+    def _fresh(self) -> bool:
+        return self._checked_at is not None and self._clock() - self._checked_at < self.check_seconds
+
+    async def replica_lag(self) -> Optional[float]:
+        """Replica lag in seconds (probed at most every check_seconds), or None if unreachable."""
+        if self._fresh():
+            return self.lag_seconds
+        async with self._lock:
+            if self._fresh():
+                return self.lag_seconds
+            try:
+                self.lag_seconds = await asyncio.wait_for(self._probe_lag(), PROBE_TIMEOUT_SECONDS)
+            except Exception as e:
+                self.probe_errors += 1
+                if self.lag_seconds is not None:
+                    logger.warning(f"Read replica unavailable, reading from primary: {e}")
+                self.lag_seconds = None
+            self._checked_at = self._clock()
+            return self.lag_seconds
+
+    async def use_replica(self, clerk_user_id: Optional[str] = None) -> bool:
+        """
+        Whether a read for this user can go to the replica.
+
+        Args:
+            clerk_user_id: User making the request (None for anonymous reads)
+
+        Returns:
+            True to read from the replica, False to read from the primary
+        """
+        if self.engine is None:
+            return False
+        if clerk_user_id is not None and self.is_sticky(clerk_user_id):
+            self.primary_reads["sticky"] += 1
+            return False
+        lag = await self.replica_lag()
+        if lag is None:
+            self.primary_reads["unavailable"] += 1
+            return False
+        if lag > self.max_lag_seconds:
+            self.primary_reads["lagging"] += 1
+            return False
+        self.replica_reads += 1
+        return True
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Replica state and read routing counters since startup."""
+        return {
+            "configured": self.engine is not None,
+            "lag_seconds": self.lag_seconds,
+            "max_lag_seconds": self.max_lag_seconds,
+            "probe_errors": self.probe_errors,
+            "sticky_users": len(self._sticky),
+            "replica_reads": self.replica_reads,
+            "primary_reads": dict(self.primary_reads),
+        }
+
+
+def track_writes(router_getter: Callable[[], ReplicaRouter]) -> None:
+    """
+    Make committed writes stick their user to the primary, and refuse
+    writes on replica sessions.
+
+    Args:
+        router_getter: Returns the router to mark writes on (looked up at
+            commit time so tests can swap it)
+    """
+
+    @event.listens_for(Session, "before_flush")
+    def _reject_replica_flush(session, flush_context, instances):
+        if session.info.get(REPLICA_KEY):
+            raise ReadOnlySessionError("Cannot write through a read replica session")
+
+    @event.listens_for(Session, "after_flush")
+    def _record_flush(session, flush_context):
+        session.info[_WRITES_KEY] = True
+
+    @event.listens_for(Session, "do_orm_execute")
+    def _record_dml(orm_execute_state):
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            if orm_execute_state.session.info.get(REPLICA_KEY):
+                raise ReadOnlySessionError("Cannot write through a read replica session")
+            orm_execute_state.session.info[_WRITES_KEY] = True
+
+    @event.listens_for(Session, "after_commit")
+    def _stick_writer(session):
+        clerk_user_id = session.info.get(CLERK_USER_KEY)
+        if session.info.pop(_WRITES_KEY, False) and clerk_user_id:
+            router_getter().mark_write(clerk_user_id)
+
+    @event.listens_for(Session, "after_rollback")
+    def _forget_writes(session):
+        session.info.pop(_WRITES_KEY, None)
@@ -0,0 +1,93 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+
+Lists are ordered newest first by (created_at, id). A page ends with an
+opaque cursor encoding its last row's (created_at, id); the next page
+continues strictly after it, so each page is an index range scan on
+(user_id, created_at, id) whatever its depth, and rows created while
+paging don't shift later pages. created_at is used rather than
+updated_at because it never changes, so a row can't move between pages.
+
+OFFSET paging (page > 1 without a cursor) remains for older clients.
+"""
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Generic, List, Optional, Tuple, TypeVar
+
+from sqlalchemy import Select, tuple_
+
+T = TypeVar("T")
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+@dataclass
+class Page(Generic[T]):
+    """One page of a list: its rows, the total if requested and the next page's cursor."""
+
+    items: List[T]
+    total: Optional[int]
+    next_cursor: Optional[str]
+
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    """Opaque cursor for the position after a row."""
+    raw = json.dumps([created_at.isoformat(), str(row_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    Decode a cursor from encode_cursor.
+
+    Raises:
+        InvalidCursorError: Cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(row_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError("Invalid pagination cursor") from e
+
+
+def paginate(
+    stmt: Select,
+    model,
+    page_size: int,
+    cursor: Optional[str] = None,
+    page: int = 1,
+) -> Select:
+    """
+    Order a list query newest first and select one page (plus one row to
+    tell whether another page follows).
+
+    Args:
+        stmt: Filtered select of `model`
+        model: Mapped class with created_at and id columns
+        page_size: Rows per page
+        cursor: Continue after this cursor (takes precedence over page)
+        page: 1-indexed page number for OFFSET paging without a cursor
+
+    Raises:
+        InvalidCursorError: Cursor is malformed
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(model.created_at, model.id) < (created_at, row_id))
+    elif page > 1:
+        stmt = stmt.offset((page - 1) * page_size)
+    return stmt.order_by(model.created_at.desc(), model.id.desc()).limit(page_size + 1)
+
+
+def page_rows(rows: List[T], page_size: int) -> Tuple[List[T], Optional[str]]:
+    """Trim the lookahead row from a paginate() result. Returns (rows, next cursor)."""
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    last = rows[-1]
+    return rows, encode_cursor(last.created_at, last.id)
@@ -0,0 +1,69 @@
+"""
+Single-runner claims for background jobs started on every app worker.
+
+Each worker runs the app lifespan, so periodic jobs (analytics rollup,
+gauge reconciliation) would otherwise run once per worker. A job claims
+a run first and skips it when another worker holds the claim.
+"""
+import logging
+import os
+import socket
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def claim_run(key: str, ttl_seconds: int, lock_id: int) -> AsyncIterator[bool]:
+    """
+    Claim one run of a job so only one app worker performs it.
+
+    Uses a Redis key (SET NX, kept for `ttl_seconds` so workers that wake
+    up later skip the same run too). Without Redis, falls back to a
+    PostgreSQL advisory lock on `lock_id` held for the duration of the
+    run. SQLite (single-process development) always gets the claim.
+
+    Args:
+        key: Redis key identifying the run (e.g. the job name and its date)
+        ttl_seconds: How long the Redis claim is kept
+        lock_id: PostgreSQL advisory lock id for the job
+
+    Yields:
+        True if this worker should run the job
+    """
+    from app.database import engine
+    from app.middleware.redis_rate_limit import get_redis
+
+    claimed = None
+    redis = await get_redis()
+    if redis is not None:
+        try:
+            # SET NX returns None when another worker holds the key
+            claimed = bool(await redis.set(
+                key,
+                f"{socket.gethostname()}:{os.getpid()}",
+                nx=True,
+                ex=ttl_seconds,
+            ))
+        except Exception as e:
+            logger.warning(f"Claim {key} via Redis failed, using the database: {e}")
+    if claimed is not None:
+        yield claimed
+        return
+
+    if engine.dialect.name != "postgresql":
+        yield True
+        return
+
+    async with engine.connect() as conn:
+        claimed = await conn.scalar(text("SELECT pg_try_advisory_lock(:id)"), {"id": lock_id})
+        await conn.commit()
+        try:
+            yield bool(claimed)
+        finally:
+            if claimed:
+                await conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": lock_id})
+                await conn.commit()
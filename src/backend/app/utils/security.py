@@ -8,9 +8,12 @@ This module provides functions for:
 """
 
 import re
-import copy
 import logging
-from typing import Any, Dict, List, Optional, Union
+from functools import lru_cache
+from typing import Any, Dict, Hashable, Optional
+
+from app.config import settings
+from app.utils.ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
@@ -46,6 +49,25 @@ API_KEY_PATTERNS = [
 ]
 
 
+# Every key format above is a run of at least 20 of these characters, so
+# strings are scanned once for such runs and only the runs are matched
+# against the individual patterns (in order, as each may mask part of a
+# run another would match). One alternation of all the patterns is slower:
+# it is retried at every character of every string.
+_KEY_RUN_RE = re.compile(r"[a-zA-Z0-9_-]{20,}")
+_COMPILED_API_KEY_PATTERNS = [
+    (re.compile(pattern), replacement) for pattern, replacement in API_KEY_PATTERNS
+]
+
+_SENSITIVE_FIELD_RE = re.compile("|".join(re.escape(p) for p in SENSITIVE_FIELD_PATTERNS))
+
+# (workflow id, updated_at) -> sanitized flow_data
+_flow_data_cache: TTLCache[Dict[str, Any]] = TTLCache(
+    max_size=settings.sanitized_flow_cache_max_size,
+    ttl_seconds=3600,
+)
+
+
 def mask_secret(value: str, visible_chars: int = 4) -> str:
     """
     Mask a secret value, showing only first and last few characters.
@@ -67,10 +89,13 @@ def mask_secret(value: str, visible_chars: int = 4) -> str:
     return f"{value[:visible_chars]}••••••••{value[-visible_chars:]}"
 
 
+@lru_cache(maxsize=4096)
 def is_sensitive_field(field_name: str) -> bool:
     """
     Check if a field name indicates sensitive data.
 
+    Flows reuse a small set of field names, so answers are memoised.
+
     Args:
         field_name: The name of the field to check
 
@@ -81,7 +106,25 @@ def is_sensitive_field(field_name: str) -> bool:
         return False
 
     field_lower = field_name.lower().replace("-", "_")
-    return any(pattern in field_lower for pattern in SENSITIVE_FIELD_PATTERNS)
+    return _SENSITIVE_FIELD_RE.search(field_lower) is not None
+
+
+def _mask_generic_token(token: str) -> str:
+    """mask_secret() a long token if it looks like a key (mixes letters and digits)."""
+    if any(c.isalpha() for c in token) and any(c.isdigit() for c in token):
+        return mask_secret(token)
+    return token
+
+
+def _mask_key_run(match: "re.Match[str]") -> str:
+    run = match.group()
+    for pattern, replacement in _COMPILED_API_KEY_PATTERNS:
+        if replacement:
+            run = pattern.sub(replacement, run)
+        else:
+            # For generic patterns, use mask_secret on tokens that look like keys
+            run = pattern.sub(lambda m: _mask_generic_token(m.group()), run)
+    return run
 
 
 def sanitize_string_value(value: str) -> str:
@@ -98,21 +141,7 @@ def sanitize_string_value(value: str) -> str:
     if not value or not isinstance(value, str):
         return value
 
-    result = value
-
-    for pattern, replacement in API_KEY_PATTERNS:
-        if replacement:
-            result = re.sub(pattern, replacement, result)
-        else:
-            # For generic patterns, use mask_secret on matches
-            matches = re.findall(pattern, result)
-            for match in matches:
-                # Only mask if it looks like a key (has mix of chars/numbers)
-                if (any(c.isalpha() for c in match) and
-                    any(c.isdigit() for c in match)):
-                    result = result.replace(match, mask_secret(match))
-
-    return result
+    return _KEY_RUN_RE.sub(_mask_key_run, value)
 
 
 def sanitize_api_keys(
@@ -129,6 +158,10 @@ def sanitize_api_keys(
     1. Field names containing 'api_key', 'secret', 'token', etc.
     2. Values matching known API key patterns (sk-xxx, AIza, etc.)
 
+    Unless in_place is set, the result is built during the traversal:
+    every dict and list in it is new, while strings and other immutable
+    values are shared with the input, so no prior copy is needed.
+
     Args:
         data: The data structure to sanitize (dict, list, or primitive)
         depth: Current recursion depth (internal use)
@@ -142,54 +175,51 @@ def sanitize_api_keys(
         logger.warning(f"Max sanitization depth ({max_depth}) reached, stopping recursion")
         return data
 
-    if data is None:
-        return None
-
     # Handle dictionaries
     if isinstance(data, dict):
         result = data if in_place else {}
 
-        for key, value in (data.items() if in_place else list(data.items())):
-            sanitized_value = value
-
+        for key, value in (list(data.items()) if in_place else data.items()):
             # Check if this is a sensitive field by name
             if is_sensitive_field(key):
                 if isinstance(value, str) and len(value) > 8:
-                    sanitized_value = mask_secret(value)
-                elif isinstance(value, dict):
-                    # Nested dict in sensitive field - sanitize recursively
-                    sanitized_value = sanitize_api_keys(value, depth + 1, max_depth)
+                    value = mask_secret(value)
+                elif isinstance(value, (dict, list)):
+                    value = sanitize_api_keys(value, depth + 1, max_depth, in_place)
 
             # Check if value looks like an API key regardless of field name
-            elif isinstance(value, str) and len(value) > 20:
-                sanitized_value = sanitize_string_value(value)
+            elif isinstance(value, str):
+                if len(value) > 20:
+                    value = sanitize_string_value(value)
 
             # Recursively handle nested structures
-            elif isinstance(value, dict):
-                sanitized_value = sanitize_api_keys(value, depth + 1, max_depth)
-            elif isinstance(value, list):
-                sanitized_value = sanitize_api_keys(value, depth + 1, max_depth)
+            elif isinstance(value, (dict, list)):
+                value = sanitize_api_keys(value, depth + 1, max_depth, in_place)
 
-            if in_place:
-                result[key] = sanitized_value
-            else:
-                result[key] = sanitized_value
+            result[key] = value
 
         return result
 
     # Handle lists
     if isinstance(data, list):
-        return [sanitize_api_keys(item, depth + 1, max_depth) for item in data]
+        items = [sanitize_api_keys(item, depth + 1, max_depth, in_place) for item in data]
+        if in_place:
+            data[:] = items
+            return data
+        return items
 
     # Handle string primitives (check for embedded keys)
     if isinstance(data, str) and len(data) > 20:
         return sanitize_string_value(data)
 
-    # Return other primitives unchanged
+    # Return other primitives (and None) unchanged
     return data
 
 
-def sanitize_flow_data(flow_data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+def sanitize_flow_data(
+    flow_data: Optional[Dict[str, Any]],
+    cache_key: Optional[Hashable] = None,
+) -> Optional[Dict[str, Any]]:
     """
     Sanitize flow_data specifically for Langflow workflow responses.
 
@@ -198,18 +228,46 @@ def sanitize_flow_data(flow_data: Optional[Dict[str, Any]]) -> Optional[Dict[str
 
     Args:
         flow_data: The Langflow flow data dictionary
+        cache_key: Identifies this version of flow_data, e.g. the workflow's
+            (id, updated_at). Results are cached under it, so it must change
+            whenever flow_data does.
 
     Returns:
-        Sanitized flow data with all API keys masked
+        Sanitized flow data with all API keys masked. Its dicts and lists
+        are never shared with the input, the cache or other callers.
     """
     if not flow_data:
         return flow_data
 
-    # Create a deep copy to avoid modifying the original
-    sanitized = copy.deepcopy(flow_data)
+    if cache_key is not None:
+        cached = _flow_data_cache.get(cache_key)
+        if cached is not None:
+            return _copy_containers(cached)
+
+    sanitized = sanitize_api_keys(flow_data)
+
+    if cache_key is not None:
+        _flow_data_cache.set(cache_key, _copy_containers(sanitized))
+    return sanitized
+
+
+def _copy_containers(data: Any) -> Any:
+    """
+    Copy the dicts and lists of a JSON-like structure.
+
+    Strings and other immutable values are shared, which makes this much
+    cheaper than copy.deepcopy (and than re-sanitizing).
+    """
+    if isinstance(data, dict):
+        return {key: _copy_containers(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_copy_containers(item) for item in data]
+    return data
+
 
-    # Sanitize the entire structure
-    return sanitize_api_keys(sanitized)
+def clear_sanitized_flow_cache() -> None:
+    """Drop all cached sanitized flow_data."""
+    _flow_data_cache.clear()
 
 
 def sanitize_for_logging(data: Any, max_length: int = 1000) -> str:
@@ -0,0 +1,106 @@
+"""
+In-process TTL + LRU cache.
+
+A small bounded mapping for hot lookups (plans, identities, tokens) that
+are invalidated explicitly when the underlying data changes, with a TTL
+as a backstop for changes made by other processes.
+
+Not shared between workers; each process keeps its own copy.
+"""
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Optional, Tuple, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+class TTLCache(Generic[V]):
+    """
+    Least-recently-used cache whose entries expire after `ttl_seconds`.
+
+    Safe to use from the event loop (no awaits between read and write).
+    A ttl_seconds or max_size of 0 disables the cache.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl_seconds > 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Optional[V] = None) -> Optional[V]:
+        """Return a live entry (marking it recently used), else default."""
+        item = self._data.get(key, _MISSING)
+        if item is _MISSING:
+            self.misses += 1
+            return default
+
+        expires_at, value = item
+        if expires_at <= self._clock():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: V, ttl_seconds: Optional[float] = None) -> None:
+        """Store an entry, evicting the least recently used beyond max_size."""
+        if not self.enabled:
+            return
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._data[key] = (self._clock() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        """Drop one entry if present."""
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+# Key in Session.info
+_PENDING_KEY = "ttl_cache_invalidations"
+
+
+def invalidate_with_session(cache: TTLCache, key: Hashable, session: Optional[Session]) -> None:
+    """
+    Drop an entry now and again when the session's transaction ends.
+
+    Use from ORM events on the cached rows: the second pop discards values
+    that concurrent requests cached from pre-commit reads (or that this
+    transaction cached before rolling back).
+    """
+    cache.pop(key)
+    if session is not None:
+        session.info.setdefault(_PENDING_KEY, []).append((cache, key))
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _invalidate_pending(session: Session) -> None:
+    for cache, key in session.info.pop(_PENDING_KEY, ()):
+        cache.pop(key)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Analytics Backfill Script
+
+Rebuilds the analytics_daily message/conversation/token rollup from the
+messages and conversations tables. Run once after deploying incremental
+rollups, or whenever the rollup needs to be repaired.
+
+Usage:
+    python -m scripts.backfill_analytics
+    python -m scripts.backfill_analytics --user-id <uuid>
+
+Environment Variables:
+    DATABASE_URL: PostgreSQL connection string
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import select
+
+from app.database import async_session_maker
+from app.models.user import User
+from app.services.analytics_service import AnalyticsService
+
+
+async def backfill(user_id: str = None) -> tuple:
+    """
+    Backfill the rollup for one user or all users.
+
+    Commits after each user so an interrupted run can simply be restarted.
+
+    Returns:
+        Tuple of (users_processed, days_written)
+    """
+    async with async_session_maker() as session:
+        if user_id:
+            user_ids = [user_id]
+        else:
+            result = await session.execute(select(User.id).order_by(User.id))
+            user_ids = [str(uid) for uid in result.scalars().all()]
+
+    users_processed = 0
+    days_written = 0
+    for uid in user_ids:
+        async with async_session_maker() as session:
+            days_written += await AnalyticsService(session).backfill_daily_counters(uid)
+            await session.commit()
+        users_processed += 1
+        if users_processed % 100 == 0:
+            print(f"  ... {users_processed}/{len(user_ids)} users")
+
+    return users_processed, days_written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild analytics_daily rollups")
+    parser.add_argument("--user-id", help="Only backfill this user")
+    args = parser.parse_args()
+
+    users, days = asyncio.run(backfill(user_id=args.user_id))
+    print(f"Backfilled {days} daily rows for {users} users")
+
+
+if __name__ == "__main__":
+    main()
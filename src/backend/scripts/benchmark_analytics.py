@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Analytics Query Benchmark
+
+Seeds a scratch database with synthetic conversations/messages and compares
+the dashboard's per-user daily message query in two forms:
+
+- formatted: filters on to_char(created_at)/date(created_at) strings
+  (the pre-2026-10 query; defeats indexes on created_at)
+- range:     filters on a half-open created_at range and groups by the
+  truncated day (current AnalyticsService behaviour)
+
+Prints the query plan and median timing for each.
+
+Usage:
+    python -m scripts.benchmark_analytics
+    python -m scripts.benchmark_analytics --messages 1000000 --users 200
+    python -m scripts.benchmark_analytics --database-url postgresql://localhost/bench
+
+Environment Variables:
+    BENCHMARK_DATABASE_URL: Scratch database (default: temporary SQLite file).
+        The benchmark DROPS and recreates its tables - never point it at
+        a real database.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine, text
+
+
+SCHEMA = [
+    "DROP TABLE IF EXISTS bench_messages",
+    "DROP TABLE IF EXISTS bench_conversations",
+    """
+    CREATE TABLE bench_conversations (
+        id VARCHAR(36) PRIMARY KEY,
+        user_id VARCHAR(36) NOT NULL,
+        created_at TIMESTAMP NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE bench_messages (
+        id VARCHAR(36) PRIMARY KEY,
+        conversation_id VARCHAR(36) NOT NULL,
+        content TEXT NOT NULL,
+        created_at TIMESTAMP NOT NULL
+    )
+    """,
+]
+
+# Mirrors ix_conversations_user_created / ix_messages_conversation_created
+INDEXES = [
+    "CREATE INDEX ix_bench_conv_user_created ON bench_conversations (user_id, created_at)",
+    "CREATE INDEX ix_bench_msg_conv_created ON bench_messages (conversation_id, created_at)",
+    "CREATE INDEX ix_bench_msg_created ON bench_messages (created_at)",
+]
+
+
+def seed(engine, messages: int, users: int, days: int) -> str:
+    """Create tables and insert synthetic data. Returns a heavy user's ID."""
+    rng = random.Random(42)
+    user_ids = [str(uuid.uuid4()) for _ in range(users)]
+    now = datetime.utcnow()
+
+    with engine.begin() as conn:
+        for stmt in SCHEMA:
+            conn.execute(text(stmt))
+
+    msgs_per_conv = 20
+    conv_count = max(1, messages // msgs_per_conv)
+    conversations = []
+    for _ in range(conv_count):
+        # Skew traffic so the first user is a heavy user
+        user_id = user_ids[0] if rng.random() < 0.2 else rng.choice(user_ids)
+        created = now - timedelta(days=rng.randint(0, days - 1), seconds=rng.randint(0, 86399))
+        conversations.append({"id": str(uuid.uuid4()), "user_id": user_id, "created_at": created})
+
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO bench_conversations (id, user_id, created_at) VALUES (:id, :user_id, :created_at)"),
+            conversations,
+        )
+
+    batch = []
+    inserted = 0
+    with engine.begin() as conn:
+        for conv in conversations:
+            for i in range(msgs_per_conv):
+                if inserted >= messages:
+                    break
+                batch.append({
+                    "id": str(uuid.uuid4()),
+                    "conversation_id": conv["id"],
+                    "content": "x" * rng.randint(20, 400),
+                    "created_at": conv["created_at"] + timedelta(seconds=30 * i),
+                })
+                inserted += 1
+                if len(batch) >= 50000:
+                    conn.execute(
+                        text("INSERT INTO bench_messages (id, conversation_id, content, created_at) "
+                             "VALUES (:id, :conversation_id, :content, :created_at)"),
+                        batch,
+                    )
+                    batch = []
+                    print(f"  seeded {inserted:,} messages")
+        if batch:
+            conn.execute(
+                text("INSERT INTO bench_messages (id, conversation_id, content, created_at) "
+                     "VALUES (:id, :conversation_id, :content, :created_at)"),
+                batch,
+            )
+
+    with engine.begin() as conn:
+        for stmt in INDEXES:
+            conn.execute(text(stmt))
+        conn.execute(text("ANALYZE"))
+
+    return user_ids[0]
+
+
+def build_queries(is_sqlite: bool) -> dict:
+    """Return the formatted-string and range versions of the daily query."""
+    if is_sqlite:
+        day_str = "date(m.created_at)"
+        day_trunc = "date(m.created_at)"
+    else:
+        day_str = "to_char(m.created_at, 'YYYY-MM-DD')"
+        day_trunc = "date_trunc('day', m.created_at)"
+
+    formatted = f"""
+        SELECT {day_str} AS d, count(m.id)
+        FROM bench_messages m JOIN bench_conversations c ON c.id = m.conversation_id
+        WHERE c.user_id = :user_id AND {day_str} >= :start_str AND {day_str} <= :end_str
+        GROUP BY {day_str}
+    """
+    ranged = f"""
+        SELECT {day_trunc} AS d, count(m.id)
+        FROM bench_messages m JOIN bench_conversations c ON c.id = m.conversation_id
+        WHERE c.user_id = :user_id AND m.created_at >= :start_ts AND m.created_at < :end_ts
+        GROUP BY {day_trunc}
+    """
+    return {"formatted": formatted, "range": ranged}
+
+
+def run(engine, user_id: str, window_days: int, repeat: int) -> None:
+    """Print plans and timings for both query forms."""
+    is_sqlite = engine.dialect.name == "sqlite"
+    end = date.today()
+    start = end - timedelta(days=window_days - 1)
+    params = {
+        "user_id": user_id,
+        "start_str": start.isoformat(),
+        "end_str": end.isoformat(),
+        "start_ts": datetime.combine(start, datetime.min.time()),
+        "end_ts": datetime.combine(end + timedelta(days=1), datetime.min.time()),
+    }
+    explain = "EXPLAIN QUERY PLAN " if is_sqlite else "EXPLAIN "
+
+    with engine.connect() as conn:
+        for name, sql in build_queries(is_sqlite).items():
+            print(f"\n=== {name} ({window_days}-day window) ===")
+            for row in conn.execute(text(explain + sql), params):
+                print("  " + " | ".join(str(col) for col in row))
+
+            timings = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                conn.execute(text(sql), params).all()
+                timings.append((time.perf_counter() - t0) * 1000)
+            print(f"  median {statistics.median(timings):.1f} ms over {repeat} runs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark analytics date filtering")
+    parser.add_argument("--database-url", default=os.environ.get("BENCHMARK_DATABASE_URL"))
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--days", type=int, default=365, help="Days of history to seed")
+    parser.add_argument("--window", type=int, default=30, help="Dashboard window in days")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    db_url = args.database_url
+    if not db_url:
+        db_path = Path(tempfile.gettempdir()) / "teachcharlie_analytics_bench.db"
+        db_url = f"sqlite:///{db_path}"
+    engine = create_engine(db_url)
+
+    print(f"Seeding {args.messages:,} messages for {args.users} users into {engine.url.render_as_string(hide_password=True)}")
+    user_id = seed(engine, args.messages, args.users, args.days)
+    run(engine, user_id, args.window, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
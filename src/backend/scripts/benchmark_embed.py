@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Embed Endpoint Benchmark
+
+Measures GET /api/v1/embed/{token} throughput in-process (httpx ASGI
+transport, no network) against a scratch database seeded with embeddable
+agents, in three modes:
+
+- uncached: the embed token cache is cleared before every request
+  (one agent_components lookup per request, the pre-cache behaviour)
+- cached:   warm token cache (no queries)
+- unknown:  random unknown tokens (negative-cache hits after the first)
+
+Usage:
+    python -m scripts.benchmark_embed
+    python -m scripts.benchmark_embed --requests 5000 --concurrency 50
+    python -m scripts.benchmark_embed --database-url postgresql+asyncpg://localhost/bench
+
+Environment Variables:
+    BENCHMARK_DATABASE_URL: Scratch async database URL (default: temporary
+        SQLite file). The benchmark DROPS and recreates the users,
+        agent_components and usage_counters tables - never point it at a real database.
+"""
+import argparse
+import asyncio
+import os
+import secrets
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.database import Base, get_async_session
+from app.models.agent_component import AgentComponent
+from app.models.usage_counter import UsageCounter
+from app.models.user import User
+from app.services.agent_component_service import clear_embed_token_cache
+
+# Only what the embed path touches (usage_counters is bumped on agent insert)
+TABLES = [User.__table__, AgentComponent.__table__, UsageCounter.__table__]
+
+
+async def seed(session_maker, agents: int) -> list:
+    """Create one user with `agents` embeddable agents. Returns their tokens."""
+    tokens = []
+    async with session_maker() as session:
+        user = User(clerk_id="bench_user", email="bench@example.com")
+        session.add(user)
+        await session.flush()
+        for i in range(agents):
+            token = secrets.token_urlsafe(48)
+            tokens.append(token)
+            session.add(AgentComponent(
+                user_id=user.id,
+                name=f"Bench agent {i}",
+                qa_who="A benchmark assistant",
+                qa_rules="Be quick",
+                qa_tricks="None",
+                system_prompt="You are fast.",
+                is_embeddable=True,
+                embed_token=token,
+                embed_config={"welcome_message": "Hi", "theme": "light"},
+            ))
+        await session.commit()
+    return tokens
+
+
+async def run_mode(client: AsyncClient, tokens: list, requests: int, concurrency: int, clear: bool):
+    """Issue `requests` GETs with `concurrency` workers. Returns (req/s, latencies ms)."""
+    latencies = []
+    counter = iter(range(requests))
+
+    async def worker():
+        for i in counter:
+            if clear:
+                clear_embed_token_cache()
+            t0 = time.perf_counter()
+            response = await client.get(f"/api/v1/embed/{tokens[i % len(tokens)]}")
+            latencies.append((time.perf_counter() - t0) * 1000)
+            if response.status_code not in (200, 404):
+                raise RuntimeError(f"Unexpected status {response.status_code}: {response.text}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return requests / elapsed, latencies
+
+
+async def main_async(args) -> None:
+    db_url = args.database_url
+    if not db_url:
+        db_path = Path(tempfile.gettempdir()) / "teachcharlie_embed_bench.db"
+        db_url = f"sqlite+aiosqlite:///{db_path}"
+    engine = create_async_engine(db_url)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: Base.metadata.drop_all(sync_conn, tables=TABLES))
+        await conn.run_sync(lambda sync_conn: Base.metadata.create_all(sync_conn, tables=TABLES))
+    tokens = await seed(session_maker, args.agents)
+
+    from app.main import app
+
+    async def override_get_session():
+        async with session_maker() as session:
+            yield session
+            await session.commit()
+
+    app.dependency_overrides[get_async_session] = override_get_session
+    unknown = [secrets.token_urlsafe(48) for _ in range(args.agents)]
+
+    print(f"{args.requests:,} requests, concurrency {args.concurrency}, "
+          f"{args.agents} agents on {engine.url.render_as_string(hide_password=True)}")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        for name, mode_tokens, clear in (
+            ("uncached", tokens, True),
+            ("cached", tokens, False),
+            ("unknown", unknown, False),
+        ):
+            clear_embed_token_cache()
+            rps, latencies = await run_mode(client, mode_tokens, args.requests, args.concurrency, clear)
+            latencies.sort()
+            print(
+                f"  {name:<9} {rps:8.0f} req/s   "
+                f"p50 {statistics.median(latencies):6.2f} ms   "
+                f"p95 {latencies[int(len(latencies) * 0.95) - 1]:6.2f} ms"
+            )
+
+    app.dependency_overrides.clear()
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embed token lookups")
+    parser.add_argument("--database-url", default=os.environ.get("BENCHMARK_DATABASE_URL"))
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--agents", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
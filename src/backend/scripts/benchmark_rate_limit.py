@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Rate Limiter Benchmark
+
+Compares the Redis rate limit check in two forms, with the same limits and
+concurrent callers:
+
+- zset: two pipelines per check (minute then hour), each doing
+  ZREMRANGEBYSCORE/ZCARD/ZADD/EXPIRE on a sorted set (the pre-2026-10
+  RedisRateLimiter)
+- gcra: one Lua script call checking both windows (RedisRateLimiter
+  with leasing off)
+- lease: the same script, leasing batches of up to --lease-size tokens
+  and spending them in-process
+
+Prints checks/s, median latency, Redis calls per check and the memory
+held per identifier. Use a
+real Redis for meaningful numbers: --fake has no network round trips and
+no MEMORY USAGE.
+
+Usage:
+    python -m scripts.benchmark_rate_limit
+    python -m scripts.benchmark_rate_limit --checks 50000 --concurrency 100
+    python -m scripts.benchmark_rate_limit --fake
+
+Environment Variables:
+    BENCHMARK_REDIS_URL: Scratch Redis (default: REDIS_URL). Keys are
+        written under "bench:" and "ratelimit:{user:bench-" and deleted
+        afterwards.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from starlette.requests import Request
+
+from app.config import settings
+from app.middleware import redis_rate_limit
+from app.middleware.redis_rate_limit import RedisRateLimiter
+
+# Limits high enough that every check is allowed (the common case)
+PER_MINUTE = 1_000_000
+PER_HOUR = 10_000_000
+
+
+async def zset_check(client, identifier: str) -> bool:
+    """The previous sorted-set sliding window check."""
+    now = time.time()
+    minute_key = f"{identifier}:minute"
+    pipe = client.pipeline()
+    pipe.zremrangebyscore(minute_key, 0, now - 60)
+    pipe.zcard(minute_key)
+    pipe.zadd(minute_key, {str(now): now})
+    pipe.expire(minute_key, 60)
+    if (await pipe.execute())[1] >= PER_MINUTE:
+        return False
+
+    hour_key = f"{identifier}:hour"
+    pipe = client.pipeline()
+    pipe.zremrangebyscore(hour_key, 0, now - 3600)
+    pipe.zcard(hour_key)
+    pipe.zadd(hour_key, {str(now): now})
+    pipe.expire(hour_key, 3600)
+    return (await pipe.execute())[1] < PER_HOUR
+
+
+async def run(check, checks: int, concurrency: int, identifiers: int):
+    """Run `checks` calls over `concurrency` workers. Returns (checks/s, latencies ms)."""
+    latencies = []
+    counter = iter(range(checks))
+
+    async def worker():
+        for i in counter:
+            t0 = time.perf_counter()
+            await check(f"bench:{{user:{i % identifiers}}}", i)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return checks / (time.perf_counter() - started), latencies
+
+
+async def memory_per_identifier(client, keys: list, identifiers: int):
+    """Average MEMORY USAGE of `keys` per identifier, or None if unsupported."""
+    total = 0
+    try:
+        for key in keys:
+            total += await client.memory_usage(key) or 0
+    except Exception:
+        return None
+    return total / identifiers
+
+
+async def main_async(args) -> None:
+    if args.fake:
+        import fakeredis
+        client = fakeredis.FakeAsyncRedis(decode_responses=True)
+        target = "fakeredis"
+    else:
+        import redis.asyncio as redis
+        client = redis.from_url(args.redis_url, decode_responses=True)
+        await client.ping()
+        target = args.redis_url
+
+    # The limiter gets its client from get_redis()
+    redis_rate_limit._redis_client = client
+    redis_rate_limit._redis_available = True
+    limiter = RedisRateLimiter(requests_per_minute=PER_MINUTE, requests_per_hour=PER_HOUR)
+    leased = RedisRateLimiter(
+        requests_per_minute=PER_MINUTE,
+        requests_per_hour=PER_HOUR,
+        lease_fraction=args.lease_size / PER_MINUTE,
+    )
+    request = Request({"type": "http", "headers": [], "client": ("127.0.0.1", 0)})
+
+    async def zset(identifier, i):
+        await zset_check(client, identifier)
+
+    def limiter_check(rate_limiter):
+        async def check(identifier, i):
+            allowed, _, meta = await rate_limiter.check_rate_limit(
+                request, user_id=f"bench-{i % args.identifiers}"
+            )
+            if not allowed or "error" in meta:
+                raise RuntimeError(f"Unexpected limiter result: {meta}")
+        return check
+
+    print(f"{args.checks:,} checks, concurrency {args.concurrency}, "
+          f"{args.identifiers} identifiers on {target}")
+    modes = (
+        ("zset", zset, "bench:*", None),
+        ("gcra", limiter_check(limiter), "ratelimit:{user:bench-*", limiter),
+        ("lease", limiter_check(leased), "ratelimit:{user:bench-*", leased),
+    )
+    for name, check, pattern, rate_limiter in modes:
+        rps, latencies = await run(check, args.checks, args.concurrency, args.identifiers)
+        # zset: two pipelines per check
+        calls = rate_limiter.redis_calls if rate_limiter else 2 * args.checks
+        if rate_limiter:
+            await rate_limiter.release_expired_leases(release_all=True)
+        keys = [key async for key in client.scan_iter(pattern)]
+        memory = await memory_per_identifier(client, keys, args.identifiers)
+        print(
+            f"  {name:<5} {rps:8.0f} checks/s   p50 {statistics.median(latencies):6.2f} ms   "
+            f"{calls / args.checks:5.2f} calls/check   "
+            + (f"{memory:8.0f} bytes/identifier" if memory is not None else "")
+        )
+        if keys:
+            await client.delete(*keys)
+
+    await client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Redis rate limit checks")
+    parser.add_argument(
+        "--redis-url",
+        default=os.environ.get("BENCHMARK_REDIS_URL", settings.redis_url),
+    )
+    parser.add_argument("--fake", action="store_true", help="Use in-process fakeredis")
+    parser.add_argument("--checks", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--identifiers", type=int, default=100)
+    parser.add_argument("--lease-size", type=int, default=12, help="Largest lease in lease mode")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
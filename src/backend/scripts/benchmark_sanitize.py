@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Flow Sanitizer Benchmark
+
+Measures WorkflowResponse validation, which masks API keys in flow_data,
+over the Langflow starter templates (templates/langflow, 45-335 KB each),
+in two modes:
+
+- uncached: the sanitized flow cache is cleared before every response
+  (a full traversal of flow_data each time)
+- cached:   warm cache (same workflow ids and updated_at); each hit still
+  copies the cached dicts and lists for the caller
+
+Each template gets a fake OpenAI key planted in it, and the benchmark
+fails if the key survives sanitization.
+
+Usage:
+    python -m scripts.benchmark_sanitize
+    python -m scripts.benchmark_sanitize --rounds 20
+    python -m scripts.benchmark_sanitize --templates "templates/*.json"
+
+Environment Variables:
+    None
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.schemas.workflow import WorkflowResponse
+from app.utils.security import clear_sanitized_flow_cache
+
+BACKEND_DIR = Path(__file__).parent.parent
+FAKE_KEY = "sk-proj-" + "bench0123456789" * 3
+
+
+def load_templates(pattern: str) -> list:
+    """Load templates matching `pattern` as (name, size in KB, response payload)."""
+    templates = []
+    for path in sorted(glob.glob(str(BACKEND_DIR / pattern))):
+        with open(path, encoding="utf-8") as f:
+            flow_data = json.load(f)
+        flow_data["description"] = f"{flow_data.get('description') or ''} (key: {FAKE_KEY})"
+        payload = {
+            "id": uuid.uuid4(),
+            "project_id": None,
+            "name": Path(path).stem,
+            "description": None,
+            "langflow_flow_id": str(uuid.uuid4()),
+            "flow_data": flow_data,
+            "agent_component_ids": None,
+            "is_active": True,
+            "is_public": False,
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow(),
+        }
+        templates.append((Path(path).stem, os.path.getsize(path) / 1024, payload))
+    return templates
+
+
+def run_mode(templates: list, rounds: int, clear: bool) -> list:
+    """Validate every template `rounds` times. Returns latencies in ms."""
+    latencies = []
+    for _ in range(rounds):
+        for name, _, payload in templates:
+            if clear:
+                clear_sanitized_flow_cache()
+            t0 = time.perf_counter()
+            response = WorkflowResponse.model_validate(payload)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            if FAKE_KEY in json.dumps(response.flow_data):
+                raise RuntimeError(f"Key not masked in {name}")
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark flow_data sanitization")
+    parser.add_argument("--templates", default="templates/langflow/*.json",
+                        help="Glob relative to the backend directory")
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    templates = load_templates(args.templates)
+    if not templates:
+        parser.error(f"No templates match {args.templates}")
+
+    sizes = [size for _, size, _ in templates]
+    print(f"{len(templates)} templates ({min(sizes):.0f}-{max(sizes):.0f} KB, "
+          f"mean {statistics.mean(sizes):.0f} KB), {args.rounds} rounds")
+    for name, clear in (("uncached", True), ("cached", False)):
+        clear_sanitized_flow_cache()
+        if not clear:
+            run_mode(templates, 1, clear)  # Warm the cache
+        latencies = sorted(run_mode(templates, args.rounds, clear))
+        print(
+            f"  {name:<9} "
+            f"p50 {statistics.median(latencies):7.3f} ms   "
+            f"p95 {latencies[int(len(latencies) * 0.95) - 1]:7.3f} ms   "
+            f"max {latencies[-1]:7.3f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
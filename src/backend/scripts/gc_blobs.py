@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Blob Garbage Collection Script
+
+Reconciles blob reference counts with the user_files / knowledge_sources
+rows that point at them, then deletes unreferenced blobs from the
+database and disk.
+
+Usage:
+    python -m scripts.gc_blobs
+    python -m scripts.gc_blobs --grace-hours 24
+    python -m scripts.gc_blobs --skip-reconcile
+
+Environment Variables:
+    DATABASE_URL: PostgreSQL connection string
+"""
+import argparse
+import asyncio
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.database import async_session_maker
+from app.services.blob_store import BlobStore
+
+
+async def run_gc(grace_hours: float, reconcile: bool) -> tuple:
+    """
+    Run one garbage-collection pass.
+
+    Returns:
+        Tuple of (reconciled_count, removed_count)
+    """
+    async with async_session_maker() as session:
+        store = BlobStore(session)
+
+        reconciled = 0
+        if reconcile:
+            reconciled = await store.reconcile_ref_counts()
+            await session.commit()
+
+        removed = await store.collect_garbage(
+            grace_period=timedelta(hours=grace_hours),
+        )
+        await session.commit()
+
+    return reconciled, removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Garbage-collect unreferenced file blobs")
+    parser.add_argument(
+        "--grace-hours",
+        type=float,
+        default=1.0,
+        help="Only remove blobs unreferenced for at least this long (default: 1)",
+    )
+    parser.add_argument(
+        "--skip-reconcile",
+        action="store_true",
+        help="Do not recompute reference counts before collecting",
+    )
+    args = parser.parse_args()
+
+    reconciled, removed = asyncio.run(
+        run_gc(grace_hours=args.grace_hours, reconcile=not args.skip_reconcile)
+    )
+    print(f"Reconciled {reconciled} blob reference counts")
+    print(f"Removed {removed} unreferenced blobs")
+
+
+if __name__ == "__main__":
+    main()
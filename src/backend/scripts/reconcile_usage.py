@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Usage Counter Reconciliation
+
+Recomputes the current billing period's usage_counters (messages, tokens,
+active agents and workflows) from the raw tables, repairing any drift in
+the incrementally maintained counters (the migration that adds them
+backfills the current period). Credit holds that expired without being settled
+or released are returned to their users.
+
+Run nightly, off-peak:
+    30 2 * * * cd /app && python -m scripts.reconcile_usage
+
+Usage:
+    python -m scripts.reconcile_usage
+    python -m scripts.reconcile_usage --user-id <uuid>
+
+Environment Variables:
+    DATABASE_URL: PostgreSQL connection string
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.database import async_session_maker
+from app.services.credit_ledger_service import CreditLedgerService
+from app.services.usage_counter_service import UsageCounterService, current_period
+
+
+async def reconcile(user_id: str = None) -> int:
+    """
+    Reconcile counters for one user or all users in one transaction.
+
+    Returns:
+        Number of expired credit holds released
+    """
+    async with async_session_maker() as session:
+        await UsageCounterService(session).reconcile(user_id=user_id)
+        released = await CreditLedgerService(session).release_expired_holds()
+        await session.commit()
+    return released
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile usage counters")
+    parser.add_argument("--user-id", help="Only reconcile this user")
+    args = parser.parse_args()
+
+    released = asyncio.run(reconcile(user_id=args.user_id))
+    scope = f"user {args.user_id}" if args.user_id else "all users"
+    print(f"Reconciled usage counters for {scope} (period {current_period()})")
+    print(f"Released {released} expired credit holds")
+
+
+if __name__ == "__main__":
+    main()
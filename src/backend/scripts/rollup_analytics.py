@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Analytics Rollup Job
+
+Rebuilds analytics_daily for ALL users over a date range using set-based
+statements (see app/services/analytics_rollup.py). Idempotent: each day
+is recomputed from the raw tables and committed on its own, so a failed
+run can be resumed with --start set to the first day not reported done.
+Today (UTC) cannot be rolled up: its counters are maintained live.
+
+Defaults to yesterday, which makes it suitable for a nightly cron entry:
+    0 2 * * * cd /app && python -m scripts.rollup_analytics
+
+Usage:
+    python -m scripts.rollup_analytics
+    python -m scripts.rollup_analytics --start 2026-01-01 --end 2026-01-31
+
+Environment Variables:
+    DATABASE_URL: PostgreSQL connection string
+"""
+import argparse
+import asyncio
+import sys
+from datetime import date
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.analytics_rollup import last_closed_day, rollup_range
+
+
+def main():
+    yesterday = last_closed_day()
+
+    parser = argparse.ArgumentParser(description="Roll up analytics_daily for all users")
+    parser.add_argument("--start", type=date.fromisoformat, default=yesterday,
+                        help="First day to roll up (YYYY-MM-DD, default: yesterday)")
+    parser.add_argument("--end", type=date.fromisoformat, default=None,
+                        help="Last day to roll up (YYYY-MM-DD, default: --start)")
+    args = parser.parse_args()
+
+    end = args.end or args.start
+    if args.start > end:
+        parser.error("--start must be before or equal to --end")
+    if end > yesterday:
+        parser.error(f"--end must be {yesterday} or earlier (today's counters are live)")
+
+    days = asyncio.run(rollup_range(
+        args.start,
+        end,
+        on_day_done=lambda day: print(f"  rolled up {day}"),
+    ))
+    print(f"Rolled up {days} days ({args.start} to {end})")
+
+
+if __name__ == "__main__":
+    main()
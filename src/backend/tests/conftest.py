@@ -72,6 +72,13 @@ async def test_session() -> AsyncGenerator[AsyncSession, None]:
         await session.rollback()
 
 
+@pytest_asyncio.fixture(scope="function")
+async def db_session(setup_test_database) -> AsyncGenerator[AsyncSession, None]:
+    """Create a database session on freshly created test tables."""
+    async with test_session_maker() as session:
+        yield session
+
+
 @pytest_asyncio.fixture(scope="function")
 async def client(setup_test_database) -> AsyncGenerator[AsyncClient, None]:
     """
@@ -123,8 +130,26 @@ async def setup_test_database():
         mission,
         user_mission_progress,
         user_connection,
+        file_blob,
+        workflow_metrics_daily,
+        usage_counter,
+        credit_balance,
+        credit_ledger_entry,
     )
 
+    from app.services.agent_component_service import clear_embed_token_cache
+    from app.services.plan_resolver import clear_plan_cache
+    from app.services.usage_counter_service import register_gauge_events
+    from app.services.user_service import clear_identity_cache
+
+    # Done by the app lifespan, which test clients do not run
+    register_gauge_events()
+
+    # Process-wide caches would otherwise point at rows from earlier tests
+    clear_plan_cache()
+    clear_identity_cache()
+    clear_embed_token_cache()
+
     async with test_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
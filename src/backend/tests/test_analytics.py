@@ -0,0 +1,197 @@
+"""
+Analytics service tests.
+
+These tests verify the analytics_daily rollup:
+- Incremental counters accumulate per user per day
+- Dashboard stats are served from the rollup in a single round trip
+- Backfill rebuilds the rollup from raw messages/conversations
+- Detailed exports stream in batches
+
+Uses SQLite in-memory database for isolation.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+
+from app.models.analytics_daily import AnalyticsDaily
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.models.user import User
+from app.services.analytics_service import AnalyticsService
+
+
+@pytest_asyncio.fixture
+async def user(db_session):
+    """Create a user for analytics records."""
+    user = User(clerk_id="user_analytics_test", email="analytics@example.com")
+    db_session.add(user)
+    await db_session.flush()
+    return user
+
+
+@pytest.mark.asyncio
+async def test_increment_daily_counters_accumulates(db_session, user):
+    """Repeated increments for the same day update one rollup row."""
+    analytics = AnalyticsService(db_session)
+    await analytics.increment_daily_counters(str(user.id), conversations=1, messages=1, tokens=10)
+    await analytics.increment_daily_counters(str(user.id), messages=1, tokens=5)
+
+    result = await db_session.execute(
+        select(AnalyticsDaily).where(AnalyticsDaily.user_id == str(user.id))
+    )
+    rows = result.scalars().all()
+
+    assert len(rows) == 1
+    assert rows[0].conversations_count == 1
+    assert rows[0].messages_count == 2
+    assert rows[0].tokens_used == 15
+
+
+@pytest.mark.asyncio
+async def test_dashboard_stats_read_rollup(db_session, user):
+    """Daily series and period totals come from analytics_daily."""
+    analytics = AnalyticsService(db_session)
+    today = datetime.utcnow().date()
+    await analytics.increment_daily_counters(
+        str(user.id), conversations=2, messages=6, tokens=60, record_date=today
+    )
+    await analytics.increment_daily_counters(
+        str(user.id), conversations=1, messages=4, tokens=40, record_date=today - timedelta(days=7)
+    )
+
+    stats = await analytics.get_dashboard_stats(str(user.id), days=7)
+
+    assert len(stats["daily"]) == 7
+    assert stats["daily"][-1] == {
+        "date": today.isoformat(),
+        "conversations": 2,
+        "messages": 6,
+        "tokens": 60,
+    }
+    assert stats["comparison"]["current_period"]["messages"] == 6
+    assert stats["comparison"]["previous_period"]["messages"] == 4
+    assert stats["totals"]["conversations"] == 3
+
+
+@pytest.mark.asyncio
+async def test_backfill_rebuilds_rollup(db_session, user):
+    """Backfill produces the same counts as the raw tables."""
+    created = datetime.utcnow() - timedelta(days=3)
+    conversation = Conversation(
+        user_id=str(user.id),
+        langflow_session_id="session-1",
+        created_at=created,
+    )
+    db_session.add(conversation)
+    await db_session.flush()
+    for text in ("hello there!", "hi, how can I help?"):
+        db_session.add(Message(
+            conversation_id=str(conversation.id),
+            role="user",
+            content=text,
+            created_at=created,
+        ))
+    await db_session.flush()
+
+    analytics = AnalyticsService(db_session)
+    assert await analytics.backfill_daily_counters(str(user.id)) == 1
+
+    row = (await db_session.execute(
+        select(AnalyticsDaily).where(AnalyticsDaily.user_id == str(user.id))
+    )).scalar_one()
+    assert row.record_date == created.date()
+    assert row.conversations_count == 1
+    assert row.messages_count == 2
+    assert row.tokens_used == (len("hello there!") + len("hi, how can I help?")) // 4
+
+
+@pytest.mark.asyncio
+async def test_dashboard_stats_single_round_trip(db_session, user):
+    """The whole dashboard is served by one SQL statement."""
+    from sqlalchemy import event
+
+    from app.models.workflow import Workflow
+    from tests.conftest import test_engine
+
+    workflow = Workflow(user_id=str(user.id), name="Support Bot", langflow_flow_id="flow-1")
+    db_session.add(workflow)
+    await db_session.flush()
+    db_session.add(Conversation(
+        user_id=str(user.id),
+        workflow_id=str(workflow.id),
+        langflow_session_id="session-1",
+        title="First chat",
+    ))
+    await db_session.flush()
+
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", count_statement)
+    try:
+        stats = await AnalyticsService(db_session).get_dashboard_stats(str(user.id), days=7)
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", count_statement)
+
+    assert len(statements) == 1
+    assert stats["totals"]["workflows"] == 1
+    assert stats["recent_conversations"][0]["title"] == "First chat"
+    assert len(stats["agent_stats"]) == 1
+    assert stats["agent_stats"][0]["id"] == str(workflow.id)
+    assert stats["agent_stats"][0]["conversations"] == 1
+    assert stats["agent_stats"][0]["runs"] == 0
+
+
+@pytest.mark.asyncio
+async def test_stream_export_rows_in_batches(db_session, user):
+    """Per-message exports stream in cursor batches within the date range."""
+    created = datetime.utcnow() - timedelta(days=1)
+    conversation = Conversation(
+        user_id=str(user.id),
+        langflow_session_id="session-1",
+        created_at=created,
+    )
+    db_session.add(conversation)
+    await db_session.flush()
+    for i in range(3):
+        db_session.add(Message(
+            conversation_id=str(conversation.id),
+            role="user",
+            content="x" * 40,
+            created_at=created + timedelta(seconds=i),
+        ))
+    # Outside the exported range
+    db_session.add(Message(
+        conversation_id=str(conversation.id),
+        role="user",
+        content="old",
+        created_at=created - timedelta(days=30),
+    ))
+    await db_session.flush()
+
+    analytics = AnalyticsService(db_session)
+    batches = [
+        batch async for batch in analytics.stream_export_rows(
+            str(user.id), "messages", created.date(), datetime.utcnow().date(), batch_size=2
+        )
+    ]
+
+    assert [len(batch) for batch in batches] == [2, 1]
+    assert batches[0][0]["tokens"] == 10
+    assert set(batches[0][0]) == {
+        "conversation_id", "message_id", "created_at", "role", "tokens", "content",
+    }
+
+    conversations = [
+        row
+        async for batch in analytics.stream_export_rows(
+            str(user.id), "conversations", created.date(), datetime.utcnow().date()
+        )
+        for row in batch
+    ]
+    assert len(conversations) == 1
+    assert conversations[0]["messages"] == 4
@@ -0,0 +1,213 @@
+"""
+Analytics rollup tests.
+
+These tests verify the set-based nightly rollup:
+- All users are rolled up for a day, including per-workflow breakdown
+- Re-running a day is idempotent and clears stale counts
+- Active agents come from that day's messages, and today is never rebuilt
+- Only one worker claims a scheduled run
+
+Uses SQLite in-memory database for isolation.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.models.agent_component import AgentComponent
+from app.models.analytics_daily import AnalyticsDaily
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.models.user import User
+from app.models.workflow import Workflow
+from app.models.workflow_agent_component import WorkflowAgentComponent
+from app.services import analytics_rollup
+from app.services.analytics_rollup import AnalyticsRollupService, rollup_range
+from tests.conftest import test_session_maker
+
+
+async def _rows_by_user(session, day):
+    session.expire_all()
+    result = await session.execute(
+        select(AnalyticsDaily).where(AnalyticsDaily.record_date == day)
+    )
+    return {row.user_id: row for row in result.scalars().all()}
+
+
+@pytest.mark.asyncio
+async def test_rollup_day_all_users(db_session):
+    """One rollup pass fills counters and breakdown for every active user."""
+    created = datetime.utcnow() - timedelta(days=1)
+    day = created.date()
+
+    alice = User(clerk_id="user_rollup_a", email="a@example.com")
+    bob = User(clerk_id="user_rollup_b", email="b@example.com")
+    db_session.add_all([alice, bob])
+    await db_session.flush()
+
+    workflow = Workflow(
+        user_id=str(alice.id), name="Support", langflow_flow_id="flow-1", created_at=created
+    )
+    db_session.add(workflow)
+    await db_session.flush()
+
+    conversations = [
+        Conversation(user_id=str(alice.id), workflow_id=str(workflow.id),
+                     langflow_session_id="s-a", created_at=created),
+        Conversation(user_id=str(bob.id), langflow_session_id="s-b", created_at=created),
+    ]
+    db_session.add_all(conversations)
+    await db_session.flush()
+    for conversation, count in zip(conversations, (3, 1)):
+        for _ in range(count):
+            db_session.add(Message(
+                conversation_id=str(conversation.id),
+                role="user",
+                content="x" * 8,
+                created_at=created,
+            ))
+    await db_session.flush()
+
+    alice_id, bob_id, workflow_id = str(alice.id), str(bob.id), str(workflow.id)
+    await AnalyticsRollupService(db_session).rollup_day(day)
+    rows = await _rows_by_user(db_session, day)
+
+    assert set(rows) == {alice_id, bob_id}
+    assert rows[alice_id].messages_count == 3
+    assert rows[alice_id].tokens_used == 6
+    assert rows[alice_id].conversations_count == 1
+    assert rows[alice_id].workflows_created == 1
+    assert rows[alice_id].breakdown == {
+        "workflows": {workflow_id: {"conversations": 1, "messages": 3}}
+    }
+    assert rows[bob_id].messages_count == 1
+    assert rows[bob_id].breakdown is None
+
+
+@pytest.mark.asyncio
+async def test_rollup_day_idempotent(db_session):
+    """Re-running a day gives the same result and drops stale counters."""
+    created = datetime.utcnow() - timedelta(days=2)
+    day = created.date()
+
+    user = User(clerk_id="user_rollup_c", email="c@example.com")
+    db_session.add(user)
+    await db_session.flush()
+    # Stale counts with no raw activity behind them
+    db_session.add(AnalyticsDaily(user_id=str(user.id), record_date=day, messages_count=99))
+    conversation = Conversation(user_id=str(user.id), langflow_session_id="s-c", created_at=created)
+    db_session.add(conversation)
+    await db_session.flush()
+    db_session.add(Message(
+        conversation_id=str(conversation.id), role="user", content="hi", created_at=created
+    ))
+    await db_session.flush()
+
+    user_id = str(user.id)
+    rollup = AnalyticsRollupService(db_session)
+    await rollup.rollup_day(day)
+    await rollup.rollup_day(day)
+    rows = await _rows_by_user(db_session, day)
+
+    assert len(rows) == 1
+    assert rows[user_id].messages_count == 1
+    assert rows[user_id].conversations_count == 1
+
+
+@pytest.mark.asyncio
+async def test_rollup_day_agents_active_from_messages(db_session):
+    """agents_active counts agents whose workflows had messages that day."""
+    created = datetime.utcnow() - timedelta(days=3)
+    day = created.date()
+
+    user = User(clerk_id="user_rollup_d", email="d@example.com")
+    db_session.add(user)
+    await db_session.flush()
+    used, idle = (
+        AgentComponent(
+            user_id=str(user.id), name=name, qa_who="Helper", qa_rules="-", qa_tricks="-",
+            system_prompt="You help.",
+        )
+        for name in ("Used", "Idle")
+    )
+    busy_workflow = Workflow(user_id=str(user.id), name="Busy", langflow_flow_id="flow-busy")
+    quiet_workflow = Workflow(user_id=str(user.id), name="Quiet", langflow_flow_id="flow-quiet")
+    db_session.add_all([used, idle, busy_workflow, quiet_workflow])
+    await db_session.flush()
+    db_session.add_all([
+        WorkflowAgentComponent(workflow_id=str(busy_workflow.id), agent_component_id=str(used.id)),
+        WorkflowAgentComponent(workflow_id=str(quiet_workflow.id), agent_component_id=str(idle.id)),
+    ])
+    conversation = Conversation(
+        user_id=str(user.id), workflow_id=str(busy_workflow.id),
+        langflow_session_id="s-d", created_at=created,
+    )
+    db_session.add(conversation)
+    await db_session.flush()
+    db_session.add_all([
+        Message(conversation_id=str(conversation.id), role="user", content="hi", created_at=created),
+        Message(conversation_id=str(conversation.id), role="assistant", content="hello", created_at=created),
+    ])
+    await db_session.flush()
+
+    user_id = str(user.id)
+    await AnalyticsRollupService(db_session).rollup_day(day)
+    rows = await _rows_by_user(db_session, day)
+
+    # Both agents are active now, but only one answered that day
+    assert rows[user_id].agents_active == 1
+
+
+@pytest.mark.asyncio
+async def test_rollup_never_rebuilds_today(db_session, monkeypatch):
+    """Today's live counters are left alone."""
+    monkeypatch.setattr(analytics_rollup, "async_session_maker", test_session_maker)
+    today = datetime.utcnow().date()
+    user = User(clerk_id="user_rollup_e", email="e@example.com")
+    db_session.add(user)
+    await db_session.flush()
+    user_id = str(user.id)
+    db_session.add(AnalyticsDaily(user_id=user_id, record_date=today, messages_count=7))
+    await db_session.commit()
+
+    with pytest.raises(ValueError):
+        await AnalyticsRollupService(db_session).rollup_day(today)
+    await db_session.rollback()
+
+    days = await rollup_range(today - timedelta(days=1), today)
+
+    assert days == 1
+    rows = await _rows_by_user(db_session, today)
+    assert rows[user_id].messages_count == 7
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.keys = {}
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.keys:
+            return None
+        self.keys[key] = value
+        return True
+
+
+@pytest.mark.asyncio
+async def test_scheduled_run_claimed_once(monkeypatch):
+    """Workers sharing Redis run the scheduled jobs for a day only once."""
+    redis = _FakeRedis()
+
+    async def get_redis():
+        return redis
+
+    monkeypatch.setattr("app.middleware.redis_rate_limit.get_redis", get_redis)
+    day = datetime.utcnow().date()
+
+    async with analytics_rollup._claim_run(day) as first:
+        async with analytics_rollup._claim_run(day) as second:
+            assert (first, second) == (True, False)
+    # The claim outlives the run, so a worker waking up later skips the day too
+    async with analytics_rollup._claim_run(day) as late:
+        assert late is False
+    async with analytics_rollup._claim_run(day + timedelta(days=1)) as next_day:
+        assert next_day is True
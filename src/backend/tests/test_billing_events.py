@@ -0,0 +1,115 @@
+"""
+Billing event queue tests.
+
+These tests verify queued Stripe webhook processing:
+- Redelivered events are queued once and applied once
+- Failing events are retried, then marked failed
+- A retried subscription event does not overwrite a newer one
+- Stripe SDK calls time out instead of hanging the request
+
+Uses SQLite in-memory database for isolation.
+"""
+import time
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+
+from app.config import settings
+from app.models.billing_event import BillingEvent
+from app.models.subscription import Subscription
+from app.models.user import User
+from app.services.billing_events import process_pending_billing_events
+from app.services.billing_service import BillingService, BillingServiceError, run_stripe
+
+
+@pytest_asyncio.fixture
+async def subscription(db_session):
+    """Create a user with a paid Stripe subscription."""
+    user = User(clerk_id="user_billing_events", email="billing@example.com")
+    db_session.add(user)
+    await db_session.flush()
+    subscription = Subscription(
+        user_id=str(user.id),
+        plan_id="individual",
+        status="active",
+        stripe_customer_id="cus_test",
+        stripe_subscription_id="sub_test",
+    )
+    db_session.add(subscription)
+    await db_session.commit()
+    return subscription
+
+
+@pytest.mark.asyncio
+async def test_webhook_event_applied_once(db_session, subscription):
+    """A redelivered event is queued once and applied by the worker."""
+    from tests.conftest import test_session_maker
+
+    billing = BillingService(db_session)
+    payload = {"customer": "cus_test", "metadata": {"user_id": str(subscription.user_id)}}
+    assert await billing.enqueue_event("evt_1", "customer.subscription.deleted", payload) is True
+    assert await billing.enqueue_event("evt_1", "customer.subscription.deleted", payload) is False
+    await db_session.commit()
+
+    assert await process_pending_billing_events(session_maker=test_session_maker) == 1
+    assert await process_pending_billing_events(session_maker=test_session_maker) == 0
+
+    async with test_session_maker() as session:
+        event = (await session.execute(select(BillingEvent))).scalar_one()
+        sub = (await session.execute(select(Subscription))).scalar_one()
+    assert event.status == "processed"
+    assert event.user_id == str(subscription.user_id)
+    assert sub.plan_id == "free"
+    assert sub.status == "canceled"
+
+
+@pytest.mark.asyncio
+async def test_failing_event_retried_then_failed(db_session, subscription, monkeypatch):
+    """Errors are recorded per attempt until the event is marked failed."""
+    from tests.conftest import test_session_maker
+
+    monkeypatch.setattr(settings, "billing_event_max_attempts", 2)
+    payload = {
+        "metadata": {
+            "user_id": str(subscription.user_id),
+            "type": "credit_purchase",
+            "credits": "not-a-number",
+        },
+    }
+    await BillingService(db_session).enqueue_event("evt_bad", "checkout.session.completed", payload)
+    await db_session.commit()
+
+    assert await process_pending_billing_events(session_maker=test_session_maker) == 0
+    assert await process_pending_billing_events(session_maker=test_session_maker) == 0
+
+    async with test_session_maker() as session:
+        event = (await session.execute(select(BillingEvent))).scalar_one()
+    assert event.status == "failed"
+    assert event.attempts == 2
+    assert "not-a-number" in event.last_error
+
+    monkeypatch.setattr(settings, "stripe_timeout_seconds", 0.05)
+    with pytest.raises(BillingServiceError):
+        await run_stripe(time.sleep, 0.5)
+
+
+@pytest.mark.asyncio
+async def test_older_subscription_event_skipped(db_session, subscription):
+    """An event applied after a newer one (e.g. a retry) does not overwrite it."""
+    from tests.conftest import test_session_maker
+
+    billing = BillingService(db_session)
+    updated = {"customer": "cus_test", "status": "past_due"}
+    await billing.enqueue_event("evt_new", "customer.subscription.updated", updated, created=2000)
+    await billing.enqueue_event(
+        "evt_old", "customer.subscription.deleted", {"customer": "cus_test"}, created=1000
+    )
+    await db_session.commit()
+
+    assert await process_pending_billing_events(session_maker=test_session_maker) == 2
+
+    async with test_session_maker() as session:
+        sub = (await session.execute(select(Subscription))).scalar_one()
+    assert sub.status == "past_due"
+    assert sub.plan_id == "individual"
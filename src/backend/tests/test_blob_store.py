@@ -0,0 +1,118 @@
+"""
+Blob store tests.
+
+These tests verify content-addressed storage of uploads:
+- Identical uploads share one blob and one copy on disk
+- "Add file as knowledge" links the existing blob instead of copying it
+- Stored paths keep the file extension (Langflow parses by extension)
+- Released blobs are garbage-collected
+
+Uses SQLite in-memory database and a temporary uploads directory.
+"""
+from datetime import timedelta
+
+import pytest
+import pytest_asyncio
+
+from app.models.user import User
+from app.services import blob_store as blob_store_module
+from app.services import file_service as file_service_module
+from app.services import knowledge_service as knowledge_service_module
+from app.services.blob_store import BlobStore
+from app.services.file_service import FileService
+from app.services.knowledge_service import KnowledgeService
+
+
+@pytest.fixture(autouse=True)
+def uploads_dir(tmp_path, monkeypatch):
+    """Point every storage module at a temporary uploads directory."""
+    monkeypatch.setattr(blob_store_module, "UPLOADS_DIR", tmp_path)
+    monkeypatch.setattr(file_service_module, "UPLOADS_DIR", tmp_path)
+    monkeypatch.setattr(knowledge_service_module, "UPLOADS_DIR", tmp_path)
+    monkeypatch.setattr(knowledge_service_module, "KNOWLEDGE_STORAGE_DIR", tmp_path / "knowledge")
+    return tmp_path
+
+
+@pytest_asyncio.fixture
+async def user(db_session):
+    """Create a user to own uploaded files."""
+    user = User(clerk_id="user_blob_test", email="blob@example.com")
+    db_session.add(user)
+    await db_session.flush()
+    return user
+
+
+@pytest.mark.asyncio
+async def test_identical_uploads_share_one_blob(db_session, user, uploads_dir):
+    """Uploading the same bytes twice stores them once."""
+    service = FileService(db_session)
+    first = await service.upload_file(user, "notes.txt", b"hello charlie", "text/plain")
+    second = await service.upload_file(user, "copy.txt", b"hello charlie", "text/plain")
+
+    assert first.blob_sha256 == second.blob_sha256
+    assert first.storage_path == second.storage_path
+
+    blob = await BlobStore(db_session).get(first.blob_sha256)
+    assert blob.ref_count == 2
+    # The extension-named path is a link to the blob, not a second copy
+    assert len({p.stat().st_ino for p in uploads_dir.rglob("*") if p.is_file()}) == 1
+
+
+@pytest.mark.asyncio
+async def test_add_file_as_knowledge_links_blob(db_session, user, uploads_dir):
+    """Creating knowledge from a file references the file's blob."""
+    user_file = await FileService(db_session).upload_file(
+        user, "faq.md", b"# FAQ\nQ: Who is Charlie?", "text/markdown"
+    )
+
+    source = await KnowledgeService(db_session).create_from_user_file(user, user_file.id)
+
+    assert source.blob_sha256 == user_file.blob_sha256
+    assert source.file_path == user_file.storage_path
+    assert source.content_preview.startswith("# FAQ")
+    assert not (uploads_dir / "knowledge").exists()
+
+    blob = await BlobStore(db_session).get(user_file.blob_sha256)
+    assert blob.ref_count == 2
+
+
+@pytest.mark.asyncio
+async def test_ingestion_paths_keep_extension(db_session, user):
+    """Knowledge file paths end in the original extension and hold the bytes."""
+    service = KnowledgeService(db_session)
+    pdf = await service.create_from_file(user, b"%PDF-1.4 charlie", "Report.PDF", "application/pdf")
+    text = await service.create_from_text(user, "Charlie likes walks", "Notes")
+    user_file = await FileService(db_session).upload_file(user, "faq.md", b"# FAQ", "text/markdown")
+    linked = await service.create_from_user_file(user, user_file.id)
+
+    for source, suffix, content in (
+        (pdf, ".pdf", b"%PDF-1.4 charlie"),
+        (text, ".txt", b"Charlie likes walks"),
+        (linked, ".md", b"# FAQ"),
+    ):
+        path = service.get_file_absolute_path(source)
+        assert path.suffix == suffix
+        assert path.read_bytes() == content
+
+
+@pytest.mark.asyncio
+async def test_garbage_collection_removes_unreferenced_blobs(db_session, user):
+    """Blobs are deleted only after their last reference is released."""
+    file_service = FileService(db_session)
+    knowledge_service = KnowledgeService(db_session)
+    store = BlobStore(db_session)
+
+    user_file = await file_service.upload_file(user, "a.txt", b"shared bytes", "text/plain")
+    source = await knowledge_service.create_from_user_file(user, user_file.id)
+    sha256 = user_file.blob_sha256
+    path = store.get_path(sha256)
+
+    await file_service.delete_file(user_file.id, user.id)
+    assert await store.collect_garbage(grace_period=timedelta(0)) == 0
+    assert path.exists()
+
+    await knowledge_service.delete(source)
+    assert await store.collect_garbage(grace_period=timedelta(0)) == 1
+    assert not path.exists()
+    assert not list(path.parent.glob(f"{sha256}*"))
+    assert await store.get(sha256) is None
@@ -0,0 +1,125 @@
+"""
+Chat stream credit hold tests.
+
+These tests verify that a streamed chat never leaves its credit hold open:
+- A stream that runs to done (and the client stops reading there) settles it
+- A stream closed early releases it
+
+Langflow is replaced by a canned event stream; uses SQLite in-memory
+database for isolation.
+"""
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import select
+
+from app.database import get_async_session
+from app.middleware.clerk_auth import ClerkUser, get_current_user
+from app.models.credit_ledger_entry import CreditLedgerEntry
+from app.models.workflow import Workflow
+from app.schemas.streaming import StreamEventType, done_event, text_delta_event
+from app.services.credit_ledger_service import CHAT_HOLD_CREDITS, CreditLedgerService
+from app.services.langflow_client import langflow_client
+from app.services.user_service import UserService
+from app.services.workflow_service import WorkflowService
+from tests.conftest import test_session_maker
+
+CLERK_USER = ClerkUser(
+    user_id="user_stream_credits",
+    session_id=None,
+    email="stream@example.com",
+    authorized_party=None,
+    expires_at=None,
+    issued_at=None,
+)
+
+
+@pytest.fixture(autouse=True)
+def langflow_stream(monkeypatch):
+    """Langflow answers every run with two text chunks and its own done event."""
+    async def run_flow_stream_enhanced(**kwargs):
+        yield text_delta_event("Hello")
+        yield text_delta_event(" there")
+        yield done_event()
+
+    monkeypatch.setattr(langflow_client, "run_flow_stream_enhanced", run_flow_stream_enhanced)
+
+
+@pytest_asyncio.fixture
+async def workflow(db_session):
+    user = await UserService(db_session).get_or_create_from_clerk(CLERK_USER)
+    workflow = Workflow(user_id=str(user.id), name="Streamed", langflow_flow_id="flow-stream")
+    db_session.add(workflow)
+    await db_session.commit()
+    return workflow
+
+
+async def _holds(session, user_id: str) -> tuple:
+    """Closing entry type per hold ("open" if none), and the balance."""
+    result = await session.execute(
+        select(CreditLedgerEntry.id).where(
+            CreditLedgerEntry.user_id == user_id,
+            CreditLedgerEntry.entry_type == "hold",
+        )
+    )
+    closing = {}
+    for hold_id in result.scalars().all():
+        entry_type = await session.scalar(
+            select(CreditLedgerEntry.entry_type).where(CreditLedgerEntry.hold_id == hold_id)
+        )
+        closing[hold_id] = entry_type or "open"
+    return closing, await CreditLedgerService(session).get_balance(user_id)
+
+
+@pytest.mark.asyncio
+async def test_completed_stream_settles_hold(workflow):
+    from app.main import app
+
+    async def override_get_session():
+        async with test_session_maker() as session:
+            yield session
+            await session.commit()
+
+    async def override_get_current_user():
+        return CLERK_USER
+
+    app.dependency_overrides[get_async_session] = override_get_session
+    app.dependency_overrides[get_current_user] = override_get_current_user
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.post(
+                f"/api/v1/workflows/{workflow.id}/chat/stream",
+                json={"message": "Hi"},
+            )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.text.count(f"event: {StreamEventType.DONE.value}") == 1
+
+    async with test_session_maker() as session:
+        closing, balance = await _holds(session, workflow.user_id)
+    assert list(closing.values()) == ["settle"]
+    assert balance["held"] == 0
+    assert balance["used"] == CHAT_HOLD_CREDITS
+
+
+@pytest.mark.asyncio
+async def test_abandoned_stream_releases_hold(workflow):
+    async with test_session_maker() as session:
+        user = await UserService(session).get_or_create_from_clerk(CLERK_USER)
+        stream = WorkflowService(session).chat_stream(
+            workflow=await session.get(Workflow, workflow.id),
+            user=user,
+            message="Hi",
+        )
+        first = await stream.__anext__()
+        assert first.event == StreamEventType.SESSION_START
+        # Client goes away after the first event
+        await stream.aclose()
+
+    async with test_session_maker() as session:
+        closing, balance = await _holds(session, workflow.user_id)
+    assert list(closing.values()) == ["release"]
+    assert balance["held"] == 0
+    assert balance["used"] == 0
@@ -0,0 +1,92 @@
+"""
+Clerk token verification tests.
+
+These tests verify JWT handling without network access:
+- Tokens verify against keys held by the JWKS manager
+- Verified tokens are served from the cache
+- Unknown key IDs trigger a JWKS refresh
+
+Uses a locally generated RSA key.
+"""
+import json
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+
+from app.config import settings
+from app.middleware import clerk_auth
+from app.middleware.clerk_auth import JWKSManager, validate_clerk_token
+
+ISSUER = "https://clerk.test"
+
+
+@pytest.fixture
+def signing_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(settings, "clerk_issuer", ISSUER)
+    monkeypatch.setattr(settings, "clerk_jwks_url", "https://clerk.test/.well-known/jwks.json")
+    manager = JWKSManager(settings.clerk_jwks_url)
+    monkeypatch.setattr(clerk_auth, "_jwks_manager", manager)
+    clerk_auth.clear_token_cache()
+    yield manager
+    clerk_auth.clear_token_cache()
+
+
+def _jwks(private_key, kid: str) -> dict:
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update({"kid": kid, "use": "sig", "alg": "RS256"})
+    return {"keys": [jwk]}
+
+
+def _token(private_key, kid: str, sub: str = "user_abc") -> str:
+    now = int(time.time())
+    claims = {"sub": sub, "iss": ISSUER, "iat": now, "exp": now + 60}
+    return jwt.encode(claims, private_key, algorithm="RS256", headers={"kid": kid})
+
+
+@pytest.mark.asyncio
+async def test_verified_token_is_cached(manager, signing_key, monkeypatch):
+    """A valid token is verified once, then served from the cache."""
+    manager.load(_jwks(signing_key, "key-1"))
+    token = _token(signing_key, "key-1")
+
+    assert (await validate_clerk_token(token))["sub"] == "user_abc"
+
+    def fail_decode(*args, **kwargs):
+        raise AssertionError("token verified twice")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(clerk_auth.jwt, "decode", fail_decode)
+        assert (await validate_clerk_token(token))["sub"] == "user_abc"
+
+    # A token signed by another key with the same kid is rejected
+    other_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    with pytest.raises(HTTPException) as exc:
+        await validate_clerk_token(_token(other_key, "key-1"))
+    assert exc.value.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_unknown_kid_refreshes_keys(manager, signing_key, monkeypatch):
+    """A rotated key is fetched on demand, once for concurrent requests."""
+    manager.load(_jwks(signing_key, "old-key"))
+    rotated = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    fetches = []
+
+    async def fake_refresh():
+        fetches.append(1)
+        manager.load(_jwks(rotated, "new-key"))
+        manager._last_attempt = time.monotonic()
+
+    monkeypatch.setattr(manager, "refresh", fake_refresh)
+    payload = await validate_clerk_token(_token(rotated, "new-key", sub="user_new"))
+
+    assert payload["sub"] == "user_new"
+    assert fetches == [1]
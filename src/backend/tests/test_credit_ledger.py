@@ -0,0 +1,155 @@
+"""
+Credit ledger tests.
+
+These tests verify pre-authorised credit holds:
+- Holds reserve credits and settle/release move them exactly once
+- Holds fail instead of overspending the balance
+- Expired, unclosed holds are released by the sweeper, and lazily by
+  the next hold
+- A new balance counts this month's messages as used, even without a
+  usage counter row
+
+Uses SQLite in-memory database for isolation.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select, update
+
+from app.models.conversation import Conversation
+from app.models.credit_ledger_entry import CreditLedgerEntry
+from app.models.message import Message
+from app.models.usage_counter import UsageCounter
+from app.models.user import User
+from app.plans import get_plan
+from app.services.credit_ledger_service import (
+    CHAT_HOLD_CREDITS,
+    CREDITS_PER_MESSAGE,
+    HOLD_TTL,
+    CreditLedgerService,
+    InsufficientCreditsError,
+)
+
+
+@pytest_asyncio.fixture
+async def user(db_session):
+    """Create a free-plan user."""
+    user = User(clerk_id="user_ledger_test", email="ledger@example.com")
+    db_session.add(user)
+    await db_session.flush()
+    return user
+
+
+@pytest.mark.asyncio
+async def test_hold_settle_and_release(db_session, user):
+    """Holds reserve credits; settle charges and release refunds, once each."""
+    user_id = str(user.id)
+    ledger = CreditLedgerService(db_session)
+    granted = get_plan("free").limits.monthly_credits
+
+    settled_hold = await ledger.hold(user_id, CHAT_HOLD_CREDITS)
+    released_hold = await ledger.hold(user_id, CHAT_HOLD_CREDITS)
+    balance = await ledger.get_balance(user_id)
+    assert balance["granted"] == granted
+    assert balance["held"] == 2 * CHAT_HOLD_CREDITS
+    assert balance["available"] == granted - 2 * CHAT_HOLD_CREDITS
+
+    assert await ledger.settle(settled_hold, 15) is True
+    assert await ledger.release(released_hold) is True
+    # Closing a hold again (either way) is a no-op
+    assert await ledger.settle(settled_hold, 15) is False
+    assert await ledger.settle(released_hold, 15) is False
+
+    balance = await ledger.get_balance(user_id)
+    assert balance["held"] == 0
+    assert balance["used"] == 15
+    assert balance["available"] == granted - 15
+
+
+@pytest.mark.asyncio
+async def test_holds_never_overspend(db_session, user):
+    """Once the balance is exhausted, further holds are refused."""
+    user_id = str(user.id)
+    ledger = CreditLedgerService(db_session)
+    granted = get_plan("free").limits.monthly_credits
+
+    placed = 0
+    with pytest.raises(InsufficientCreditsError):
+        while True:
+            await ledger.hold(user_id, CHAT_HOLD_CREDITS)
+            placed += 1
+
+    assert placed == granted // CHAT_HOLD_CREDITS
+    balance = await ledger.get_balance(user_id)
+    assert balance["held"] <= balance["granted"]
+    assert balance["available"] < CHAT_HOLD_CREDITS
+
+
+@pytest.mark.asyncio
+async def test_release_expired_holds(db_session, user):
+    """Only unclosed holds past their expiry are released."""
+    user_id = str(user.id)
+    ledger = CreditLedgerService(db_session)
+
+    expired = await ledger.hold(user_id, CHAT_HOLD_CREDITS)
+    closed = await ledger.hold(user_id, CHAT_HOLD_CREDITS)
+    await ledger.settle(closed, CHAT_HOLD_CREDITS)
+
+    later = datetime.utcnow() + HOLD_TTL + timedelta(minutes=1)
+    assert await ledger.release_expired_holds(now=datetime.utcnow()) == 0
+    assert await ledger.release_expired_holds(now=later) == 1
+    assert await ledger.release_expired_holds(now=later) == 0
+
+    balance = await ledger.get_balance(user_id)
+    assert balance["held"] == 0
+    assert balance["used"] == CHAT_HOLD_CREDITS
+
+    closing = await db_session.scalar(
+        select(func.count(CreditLedgerEntry.id)).where(CreditLedgerEntry.hold_id == expired)
+    )
+    assert closing == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_holds_are_released_lazily(db_session, user):
+    """Abandoned holds stop blocking new ones once expired, without the sweeper job."""
+    user_id = str(user.id)
+    ledger = CreditLedgerService(db_session)
+
+    with pytest.raises(InsufficientCreditsError):
+        while True:
+            await ledger.hold(user_id, CHAT_HOLD_CREDITS)
+
+    await db_session.execute(
+        update(CreditLedgerEntry)
+        .where(CreditLedgerEntry.entry_type == "hold")
+        .values(expires_at=datetime.utcnow() - timedelta(minutes=1))
+    )
+
+    await ledger.hold(user_id, CHAT_HOLD_CREDITS)
+    balance = await ledger.get_balance(user_id)
+    assert balance["held"] == CHAT_HOLD_CREDITS
+    assert balance["used"] == 0
+
+
+@pytest.mark.asyncio
+async def test_new_balance_counts_messages_without_counter(db_session, user):
+    """Enabling the ledger mid-month charges the messages already sent."""
+    user_id = str(user.id)
+    now = datetime.utcnow()
+    conversation = Conversation(user_id=user_id, langflow_session_id="s-ledger")
+    db_session.add(conversation)
+    await db_session.flush()
+    for created_at in (now, now, now.replace(day=1) - timedelta(days=1)):
+        db_session.add(Message(
+            conversation_id=str(conversation.id), role="user", content="hi", created_at=created_at
+        ))
+    await db_session.flush()
+    counters = await db_session.scalar(select(func.count(UsageCounter.id)))
+    assert counters == 0
+
+    balance = await CreditLedgerService(db_session).get_balance(user_id)
+
+    # Last month's message is not charged
+    assert balance["used"] == 2 * CREDITS_PER_MESSAGE
@@ -0,0 +1,78 @@
+"""
+Database pool instrumentation tests.
+
+These tests verify the instrumented pool on a scratch SQLite file:
+- Checkouts, waits, in-use counts and timeouts are recorded
+- Warm-up opens connections ahead of the first request
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.utils.db_pool import PoolMetrics, instrumented_pool_class, warm_up_pool
+
+
+def _engine(tmp_path, metrics: PoolMetrics, pool_size: int, max_overflow: int = 0):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=instrumented_pool_class(metrics),
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=0.1,
+    )
+    metrics.listen(engine)
+    return engine
+
+
+@pytest.mark.asyncio
+async def test_pool_records_checkouts_and_timeouts(tmp_path):
+    """In-use, overflow and timed-out checkouts show up in the snapshot."""
+    metrics = PoolMetrics()
+    engine = _engine(tmp_path, metrics, pool_size=1, max_overflow=1)
+    try:
+        first = await engine.connect()
+        second = await engine.connect()
+        with pytest.raises(exc.TimeoutError):
+            await engine.connect()
+
+        snapshot = metrics.snapshot(engine.sync_engine.pool)
+        assert snapshot["in_use"] == 2
+        assert snapshot["checked_out"] == 2
+        assert snapshot["overflow"] == 1
+        assert snapshot["overflow_checkouts"] == 1
+        assert snapshot["timeouts"] == 1
+
+        await first.close()
+        await second.close()
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+        snapshot = metrics.snapshot(engine.sync_engine.pool)
+        assert snapshot["in_use"] == 0
+        assert snapshot["max_in_use"] == 2
+        assert snapshot["checkouts"] == 3
+        assert snapshot["connections_opened"] == 2
+        assert snapshot["wait_p50_ms"] is not None
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_warm_up_opens_connections(tmp_path):
+    """Warm-up leaves the requested connections open and idle in the pool."""
+    metrics = PoolMetrics()
+    engine = _engine(tmp_path, metrics, pool_size=3)
+    try:
+        assert await warm_up_pool(engine, 3) == 3
+        pool = engine.sync_engine.pool
+        assert pool.checkedin() == 3
+        assert metrics.connections_opened == 3
+
+        # Requests now reuse them
+        conns = await asyncio.gather(*(engine.connect() for _ in range(3)))
+        assert metrics.connections_opened == 3
+        await asyncio.gather(*(c.close() for c in conns))
+    finally:
+        await engine.dispose()
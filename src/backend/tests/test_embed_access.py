@@ -0,0 +1,113 @@
+"""
+Embed access tests.
+
+These tests verify that revoking embed access takes effect:
+- disable_embed denies the public embed endpoint on the next request
+- A change made by another worker (no local invalidation) applies once the
+  cached lookup expires
+
+Uses SQLite in-memory database for isolation.
+"""
+import time
+
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import update
+
+from app.config import settings
+from app.database import get_async_session
+from app.middleware.clerk_auth import ClerkUser, get_current_user
+from app.models.agent_component import AgentComponent
+from app.services.agent_component_service import AgentComponentService, _embed_token_cache
+from app.services.user_service import UserService
+from tests.conftest import test_session_maker
+
+CLERK_USER = ClerkUser(
+    user_id="user_embed_access",
+    session_id=None,
+    email="embed@example.com",
+    authorized_party=None,
+    expires_at=None,
+    issued_at=None,
+)
+
+
+@pytest_asyncio.fixture
+async def client():
+    from app.main import app
+
+    async def override_get_session():
+        async with test_session_maker() as session:
+            yield session
+
+    async def override_get_current_user():
+        return CLERK_USER
+
+    app.dependency_overrides[get_async_session] = override_get_session
+    app.dependency_overrides[get_current_user] = override_get_current_user
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            yield client
+    finally:
+        app.dependency_overrides.clear()
+
+
+@pytest_asyncio.fixture
+async def agent_id(db_session):
+    user = await UserService(db_session).get_or_create_from_clerk(CLERK_USER)
+    agent = AgentComponent(
+        user_id=str(user.id),
+        name="Widget",
+        qa_who="A helpful assistant",
+        qa_rules="Be kind",
+        qa_tricks="None",
+        system_prompt="You are helpful.",
+    )
+    db_session.add(agent)
+    await db_session.commit()
+    return str(agent.id)
+
+
+@pytest.mark.asyncio
+async def test_disable_embed_denies_access(client, agent_id):
+    enabled = await client.post(f"/api/v1/embed/{agent_id}/enable", json={})
+    assert enabled.status_code == 200
+    token = enabled.json()["embed_token"]
+
+    # Warm the token cache
+    assert (await client.get(f"/api/v1/embed/{token}")).status_code == 200
+
+    disabled = await client.post(f"/api/v1/embed/{agent_id}/disable")
+    assert disabled.status_code == 200
+
+    assert (await client.get(f"/api/v1/embed/{token}")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_revocation_by_other_worker_expires(db_session, agent_id, monkeypatch):
+    """A worker that missed the invalidation denies access after the short TTL."""
+    assert _embed_token_cache._cache.ttl_seconds <= 10
+    await db_session.execute(
+        update(AgentComponent)
+        .where(AgentComponent.id == agent_id)
+        .values(is_embeddable=True, embed_token="tok-other-worker")
+    )
+    await db_session.commit()
+
+    async with test_session_maker() as session:
+        assert await AgentComponentService(session).get_by_embed_token("tok-other-worker") is not None
+
+    # Core UPDATE: no ORM events, like a disable handled by another process
+    await db_session.execute(
+        update(AgentComponent).where(AgentComponent.id == agent_id).values(is_embeddable=False)
+    )
+    await db_session.commit()
+
+    async with test_session_maker() as session:
+        assert await AgentComponentService(session).get_by_embed_token("tok-other-worker") is not None
+
+    later = time.monotonic() + settings.token_lookup_cache_ttl_seconds + 1
+    monkeypatch.setattr(_embed_token_cache._cache, "_clock", lambda: later)
+    async with test_session_maker() as session:
+        assert await AgentComponentService(session).get_by_embed_token("tok-other-worker") is None
@@ -0,0 +1,73 @@
+"""
+List projection tests.
+
+These tests verify that list queries load summary columns only:
+- Workflow lists leave flow_data unloaded and serialize without it
+- Agent component lists leave the prompt fields and advanced_config
+  unloaded, and still carry channel_preferences
+
+Uses SQLite in-memory database for isolation.
+"""
+import pytest
+import pytest_asyncio
+from sqlalchemy import inspect
+
+from app.models.agent_component import AgentComponent
+from app.models.user import User
+from app.models.workflow import Workflow
+from app.schemas.agent_component import AgentComponentSummaryResponse
+from app.schemas.workflow import WorkflowSummaryResponse
+from app.services.agent_component_service import AgentComponentService
+from app.services.workflow_service import WorkflowService
+
+
+@pytest_asyncio.fixture
+async def user(db_session):
+    user = User(clerk_id="user_projection_test", email="projection@example.com")
+    db_session.add(user)
+    await db_session.flush()
+    return user
+
+
+@pytest.mark.asyncio
+async def test_workflow_list_defers_flow_data(db_session, user):
+    db_session.add(Workflow(
+        user_id=str(user.id),
+        name="Big flow",
+        langflow_flow_id="flow-projection",
+        flow_data={"data": {"nodes": [{"id": str(i)} for i in range(100)]}},
+    ))
+    await db_session.commit()
+    db_session.expunge_all()
+
+    page = await WorkflowService(db_session).list_by_user(user.id)
+
+    workflow = page.items[0]
+    assert "flow_data" in inspect(workflow).unloaded
+    summary = WorkflowSummaryResponse.model_validate(workflow).model_dump()
+    assert summary["name"] == "Big flow"
+    assert "flow_data" not in summary
+
+
+@pytest.mark.asyncio
+async def test_agent_component_list_defers_bodies(db_session, user):
+    db_session.add(AgentComponent(
+        user_id=str(user.id),
+        name="Concierge",
+        qa_who="A helpful assistant",
+        qa_rules="Be kind",
+        qa_tricks="None",
+        system_prompt="You are helpful." * 500,
+        advanced_config={"temperature": 0.2, "channel_preferences": ["slack", "email"]},
+    ))
+    await db_session.commit()
+    db_session.expunge_all()
+
+    page = await AgentComponentService(db_session).list_by_user(user.id)
+
+    component = page.items[0]
+    unloaded = inspect(component).unloaded
+    assert {"qa_rules", "qa_tricks", "system_prompt", "advanced_config"} <= unloaded
+    summary = AgentComponentSummaryResponse.model_validate(component).model_dump()
+    assert summary["channel_preferences"] == ["slack", "email"]
+    assert "system_prompt" not in summary and "advanced_config" not in summary
@@ -0,0 +1,109 @@
+"""
+Keyset pagination tests.
+
+These tests verify cursor pagination of list queries:
+- Following next_cursor visits every row once, newest first, across
+  created_at ties
+- Totals are optional, and come from usage counters for active lists
+  (counted when the user has no counter row)
+- Malformed cursors are rejected
+
+Uses SQLite in-memory database for isolation.
+"""
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, event
+
+from app.models.agent_component import AgentComponent
+from app.models.usage_counter import UsageCounter
+from app.models.user import User
+from app.services.agent_component_service import AgentComponentService
+from app.utils.pagination import InvalidCursorError
+from tests.conftest import test_engine
+
+
+@pytest_asyncio.fixture
+async def agents(db_session):
+    """Five agents for one user, three of them created at the same instant."""
+    user = User(clerk_id="user_pagination_test", email="pages@example.com")
+    db_session.add(user)
+    await db_session.flush()
+    created = [
+        datetime(2026, 10, 1), datetime(2026, 10, 2), datetime(2026, 10, 2),
+        datetime(2026, 10, 2), datetime(2026, 10, 3),
+    ]
+    agents = [
+        AgentComponent(
+            user_id=str(user.id),
+            name=f"Agent {i}",
+            qa_who="A helpful assistant",
+            qa_rules="Be kind",
+            qa_tricks="None",
+            system_prompt="You are helpful.",
+            created_at=created_at,
+        )
+        for i, created_at in enumerate(created)
+    ]
+    db_session.add_all(agents)
+    await db_session.flush()
+    return agents
+
+
+@pytest.mark.asyncio
+async def test_cursor_pages_cover_every_row_once(db_session, agents):
+    service = AgentComponentService(db_session)
+    user_id = agents[0].user_id
+
+    seen, cursor = [], None
+    while True:
+        page = await service.list_by_user(user_id, page_size=2, cursor=cursor, include_total=False)
+        assert page.total is None
+        seen.extend(page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    expected = sorted(agents, key=lambda a: (a.created_at, a.id), reverse=True)
+    assert [a.id for a in seen] == [a.id for a in expected]
+
+
+@pytest.mark.asyncio
+async def test_active_total_comes_from_usage_counters(db_session, agents):
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", count_statement)
+    try:
+        page = await AgentComponentService(db_session).list_by_user(agents[0].user_id, page_size=2)
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", count_statement)
+
+    assert page.total == 5
+    assert len(page.items) == 2 and page.next_cursor
+    assert not any("count(" in s.lower() for s in statements)
+
+    # Filters the counters don't cover are counted
+    page = await AgentComponentService(db_session).list_by_user(
+        agents[0].user_id, page_size=2, published_only=True,
+    )
+    assert page.total == 0 and page.items == []
+
+
+@pytest.mark.asyncio
+async def test_total_counted_without_counter_row(db_session, agents):
+    """Users whose counters were never populated still get a real total."""
+    await db_session.execute(delete(UsageCounter))
+
+    page = await AgentComponentService(db_session).list_by_user(agents[0].user_id, page_size=2)
+
+    assert page.total == 5
+
+
+@pytest.mark.asyncio
+async def test_invalid_cursor_is_rejected(db_session, agents):
+    with pytest.raises(InvalidCursorError):
+        await AgentComponentService(db_session).list_by_user(agents[0].user_id, cursor="not-a-cursor")
@@ -0,0 +1,105 @@
+"""
+Plan resolution cache tests.
+
+These tests verify subscription plan caching:
+- Warm plan lookups issue no queries, within and across sessions
+- Subscription changes invalidate the cached plan once committed
+- A plan check for a user without a subscription creates their free row
+
+Uses SQLite in-memory database for isolation.
+"""
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from sqlalchemy import event, select
+
+from app.middleware.clerk_auth import ClerkUser
+from app.middleware.feature_gate import check_plan_access
+from app.models.subscription import Subscription
+from app.models.user import User
+from app.services.billing_service import BillingService
+from app.services.plan_resolver import PlanResolver
+from tests.conftest import test_engine
+
+
+@pytest_asyncio.fixture
+async def subscription(db_session):
+    """Create a user on the individual plan."""
+    user = User(clerk_id="user_plan_cache", email="plans@example.com")
+    db_session.add(user)
+    await db_session.flush()
+    subscription = Subscription(user_id=str(user.id), plan_id="individual", status="active")
+    db_session.add(subscription)
+    await db_session.commit()
+    return subscription
+
+
+def _count_statements():
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    return statements, count_statement
+
+
+@pytest.mark.asyncio
+async def test_warm_plan_lookups_skip_database(db_session, subscription):
+    """After the first resolution, plan gating runs without queries."""
+    from tests.conftest import test_session_maker
+
+    user_id = str(subscription.user_id)
+    assert (await PlanResolver(db_session).resolve(user_id)).plan_id == "individual"
+
+    statements, count_statement = _count_statements()
+    event.listen(test_engine.sync_engine, "before_cursor_execute", count_statement)
+    try:
+        plan = await BillingService(db_session).get_plan_for_user(user_id)
+        async with test_session_maker() as other_session:
+            resolved = await PlanResolver(other_session).resolve(user_id)
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", count_statement)
+
+    assert statements == []
+    assert plan.id == "individual"
+    assert resolved.is_active
+
+
+@pytest.mark.asyncio
+async def test_subscription_change_invalidates_plan(db_session, subscription):
+    """A committed plan change is visible to the next lookup."""
+    from tests.conftest import test_session_maker
+
+    user_id = str(subscription.user_id)
+    assert (await PlanResolver(db_session).resolve(user_id)).plan_id == "individual"
+
+    subscription.plan_id = "free"
+    await db_session.flush()
+    # Same request sees its own change
+    assert (await PlanResolver(db_session).resolve(user_id)).plan_id == "free"
+    await db_session.commit()
+
+    async with test_session_maker() as other_session:
+        assert (await PlanResolver(other_session).resolve(user_id)).plan_id == "free"
+
+
+@pytest.mark.asyncio
+async def test_plan_check_creates_missing_subscription(db_session):
+    """Users with no subscription get a free one and are gated as free."""
+    clerk_user = ClerkUser(
+        user_id="user_no_subscription",
+        session_id=None,
+        email="nosub@example.com",
+        authorized_party=None,
+        expires_at=None,
+        issued_at=None,
+    )
+
+    await check_plan_access(db_session, clerk_user, allowed_plans=["free", "individual"])
+    with pytest.raises(HTTPException) as exc_info:
+        await check_plan_access(db_session, clerk_user, allowed_plans=["pro"])
+    await db_session.commit()
+
+    assert exc_info.value.status_code == 403
+    subscriptions = (await db_session.execute(select(Subscription))).scalars().all()
+    assert [(s.plan_id, s.status) for s in subscriptions] == [("free", "active")]
@@ -0,0 +1,95 @@
+"""
+Project listing tests.
+
+These tests verify ProjectService.list_by_user:
+- Agent, workflow and MCP server counts are correct per project
+- The listing is one query however many projects the user has
+
+Uses SQLite in-memory database for isolation.
+"""
+import pytest
+from sqlalchemy import event
+
+from app.models.agent_component import AgentComponent
+from app.models.mcp_server import MCPServer
+from app.models.project import Project
+from app.models.user import User
+from app.models.workflow import Workflow
+from app.services.project_service import ProjectService
+from tests.conftest import test_engine
+
+
+async def _seed(session, clerk_id: str, projects: int) -> User:
+    """A user with `projects` projects; project i holds i agents, i workflows and one MCP server."""
+    user = User(clerk_id=clerk_id, email=f"{clerk_id}@example.com")
+    session.add(user)
+    await session.flush()
+    user_id = str(user.id)
+    for i in range(projects):
+        project = Project(user_id=user_id, name=f"Project {i}", sort_order=i)
+        session.add(project)
+        await session.flush()
+        project_id = str(project.id)
+        for j in range(i):
+            session.add(AgentComponent(
+                user_id=user_id,
+                project_id=project_id,
+                name=f"Agent {i}.{j}",
+                qa_who="A helpful assistant",
+                qa_rules="Be kind",
+                qa_tricks="None",
+                system_prompt="You are helpful.",
+            ))
+            session.add(Workflow(
+                user_id=user_id,
+                project_id=project_id,
+                name=f"Workflow {i}.{j}",
+                langflow_flow_id=f"flow-{i}-{j}",
+            ))
+        session.add(MCPServer(
+            user_id=user_id,
+            project_id=project_id,
+            name=f"Server {i}",
+            server_type="custom",
+        ))
+    session.add(Project(user_id=user_id, name="Archived", is_archived=True, sort_order=99))
+    await session.flush()
+    return user
+
+
+async def _list_counting_queries(session, user: User):
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", count_statement)
+    try:
+        projects = await ProjectService(session).list_by_user(user.id)
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", count_statement)
+    return projects, len(statements)
+
+
+@pytest.mark.asyncio
+async def test_list_counts_each_project(db_session):
+    user = await _seed(db_session, "user_projects_counts", 3)
+
+    projects, _ = await _list_counting_queries(db_session, user)
+
+    assert [p.name for p in projects] == ["Project 0", "Project 1", "Project 2"]
+    assert [(p.agent_count, p.workflow_count, p.mcp_server_count) for p in projects] == [
+        (0, 0, 1), (1, 1, 1), (2, 2, 1),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_list_query_count_is_constant(db_session):
+    few = await _seed(db_session, "user_projects_few", 1)
+    many = await _seed(db_session, "user_projects_many", 8)
+
+    few_projects, few_queries = await _list_counting_queries(db_session, few)
+    many_projects, many_queries = await _list_counting_queries(db_session, many)
+
+    assert (len(few_projects), len(many_projects)) == (1, 8)
+    assert few_queries == many_queries == 1
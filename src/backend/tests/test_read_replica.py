@@ -0,0 +1,112 @@
+"""
+Read replica routing tests.
+
+These tests verify ReadOnlySessionDep (get_read_session) routing:
+- Reads go to the replica while it is within the allowed lag
+- Reads fall back to the primary when the replica lags or is unreachable
+- A user's committed write makes their reads stick to the primary
+- Replica sessions refuse writes
+
+Uses two SQLite files, one standing in for each database.
+"""
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import app.database as database
+from app.database import get_read_session
+from app.middleware.clerk_auth import ClerkUser
+from app.models.user import User
+from app.services.user_service import UserService
+from app.utils.db_replica import REPLICA_KEY, ReadOnlySessionError, ReplicaRouter
+from tests.conftest import test_session_maker
+
+
+def _clerk_user(user_id: str = "user_replica") -> ClerkUser:
+    return ClerkUser(
+        user_id=user_id,
+        session_id=None,
+        email=f"{user_id}@example.com",
+        authorized_party=None,
+        expires_at=None,
+        issued_at=None,
+    )
+
+
+@pytest_asyncio.fixture
+async def router(tmp_path, monkeypatch):
+    """A router over a replica holding one user the primary doesn't have."""
+    replica_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    async with replica_engine.begin() as conn:
+        await conn.run_sync(lambda c: User.__table__.create(c))
+        await conn.execute(User.__table__.insert().values(
+            id="replica-only", clerk_id="replica_only", email="replica@example.com",
+        ))
+    router = ReplicaRouter(replica_engine, max_lag_seconds=5, check_seconds=60, sticky_seconds=60)
+    monkeypatch.setattr(database, "replica_router", router)
+    yield router
+    await replica_engine.dispose()
+
+
+async def _read_session(clerk_user, primary):
+    return await get_read_session(clerk_user, primary).__anext__()
+
+
+async def _has_replica_user(session) -> bool:
+    result = await session.execute(select(User.id).where(User.id == "replica-only"))
+    return result.scalar_one_or_none() is not None
+
+
+@pytest.mark.asyncio
+async def test_reads_go_to_healthy_replica(setup_test_database, router):
+    async with test_session_maker() as primary:
+        session = await _read_session(_clerk_user(), primary)
+
+        assert session is not primary
+        assert session.info[REPLICA_KEY]
+        assert await _has_replica_user(session)
+        assert router.stats["replica_reads"] == 1
+
+        session.add(User(clerk_id="nope", email="nope@example.com"))
+        with pytest.raises(ReadOnlySessionError):
+            await session.flush()
+        await session.close()
+
+
+@pytest.mark.asyncio
+async def test_lagging_or_unreachable_replica_falls_back_to_primary(setup_test_database, router, monkeypatch):
+    async def lagging():
+        return 30.0
+
+    monkeypatch.setattr(router, "_probe_lag", lagging)
+    async with test_session_maker() as primary:
+        assert await _read_session(_clerk_user(), primary) is primary
+        assert router.stats["primary_reads"]["lagging"] == 1
+
+        async def unreachable():
+            raise ConnectionError("replica down")
+
+        monkeypatch.setattr(router, "_probe_lag", unreachable)
+        router._checked_at = None
+        assert await _read_session(_clerk_user(), primary) is primary
+        assert router.stats["primary_reads"]["unavailable"] == 1
+        assert router.lag_seconds is None
+
+
+@pytest.mark.asyncio
+async def test_user_reads_own_writes_from_primary(setup_test_database, router):
+    writer, other = _clerk_user("user_writer"), _clerk_user("user_other")
+
+    async with test_session_maker() as primary:
+        # First request creates the user: a committed write
+        await UserService(primary).get_or_create_from_clerk(writer)
+        await primary.commit()
+
+    assert router.is_sticky("user_writer")
+    async with test_session_maker() as primary:
+        assert await _read_session(writer, primary) is primary
+        session = await _read_session(other, primary)
+        assert session is not primary
+        await session.close()
+    assert router.stats["primary_reads"]["sticky"] == 1
@@ -0,0 +1,145 @@
+"""
+Redis rate limiter tests.
+
+These tests verify the single-script GCRA limiter against fakeredis
+(with Lua support):
+- Bursts up to the per-minute limit, then rejects with Retry-After
+- The hour window is enforced in the same call
+- Rejected requests do not consume quota
+- One O(1) string key per window
+- Leased quota is spent locally and unused tokens are returned
+- The bounded in-memory limiter slides, evicts and backs Redis outages
+"""
+import fakeredis
+import pytest
+import pytest_asyncio
+from starlette.requests import Request
+
+from app.middleware import redis_rate_limit
+from app.middleware.rate_limit import RateLimiter
+from app.middleware.redis_rate_limit import RedisRateLimiter
+
+
+@pytest_asyncio.fixture
+async def fake_redis(monkeypatch):
+    """Point get_redis() at an in-process fake Redis."""
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(redis_rate_limit, "_redis_client", client)
+    monkeypatch.setattr(redis_rate_limit, "_redis_available", True)
+    yield client
+    await client.aclose()
+
+
+def _request(ip: str = "203.0.113.7") -> Request:
+    return Request({"type": "http", "headers": [], "client": (ip, 1234)})
+
+
+@pytest.mark.asyncio
+async def test_minute_limit_allows_burst_then_rejects(fake_redis):
+    """The full per-minute limit is available at once; the next request waits."""
+    limiter = RedisRateLimiter(requests_per_minute=5, requests_per_hour=100)
+
+    results = [await limiter.check_rate_limit(_request(), user_id="u1") for _ in range(6)]
+
+    assert [allowed for allowed, _, _ in results] == [True] * 5 + [False]
+    assert results[0][2] == {"remaining_minute": 4, "remaining_hour": 99}
+    assert results[4][2]["remaining_minute"] == 0
+
+    _, message, meta = results[5]
+    assert meta["limit"] == "minute"
+    assert 1 <= meta["retry_after"] <= 12
+    assert "slow down" in message
+
+    # Other identifiers have their own budget
+    allowed, _, _ = await limiter.check_rate_limit(_request(), user_id="u2")
+    assert allowed
+
+
+@pytest.mark.asyncio
+async def test_hour_limit_and_rejections_do_not_consume(fake_redis):
+    """Both windows are checked together and only allowed requests are recorded."""
+    limiter = RedisRateLimiter(requests_per_minute=100, requests_per_hour=3)
+
+    for _ in range(3):
+        allowed, _, _ = await limiter.check_rate_limit(_request())
+        assert allowed
+    tats = {key: await fake_redis.get(key) for key in await fake_redis.keys("*")}
+
+    for _ in range(5):
+        allowed, _, meta = await limiter.check_rate_limit(_request())
+        assert not allowed
+        assert meta["limit"] == "hour"
+        assert 1190 <= meta["retry_after"] <= 1200
+
+    # Rejections left the stored state untouched
+    assert {key: await fake_redis.get(key) for key in await fake_redis.keys("*")} == tats
+    assert sorted(tats) == [
+        "ratelimit:{ip:203.0.113.7}:hour",
+        "ratelimit:{ip:203.0.113.7}:minute",
+    ]
+    for key in tats:
+        assert await fake_redis.type(key) == "string"
+        assert 0 < await fake_redis.pttl(key) <= 3_600_000
+
+
+@pytest.mark.asyncio
+async def test_leases_cut_redis_calls_without_exceeding_limit(fake_redis):
+    """Leases grow while used up, never exceed the limit, and return unused tokens."""
+    limiter = RedisRateLimiter(requests_per_minute=10, requests_per_hour=100, lease_fraction=0.5)
+
+    results = [await limiter.check_rate_limit(_request(), user_id="busy") for _ in range(12)]
+
+    assert [allowed for allowed, _, _ in results] == [True] * 10 + [False] * 2
+    # Leases of 1, 2, 4, then the last 3 tokens; then two denials
+    assert limiter.redis_calls == 6
+
+    for _ in range(2):
+        await limiter.check_rate_limit(_request(), user_id="idle")
+    assert await limiter.release_expired_leases(release_all=True) == 1
+
+    unleased = RedisRateLimiter(requests_per_minute=10, requests_per_hour=100)
+    _, _, meta = await unleased.check_rate_limit(_request(), user_id="idle")
+    assert meta == {"remaining_minute": 7, "remaining_hour": 97}
+
+
+@pytest.mark.asyncio
+async def test_redis_unavailable_falls_back_to_memory(monkeypatch):
+    """Without Redis the same limits are enforced in memory."""
+    monkeypatch.setattr(redis_rate_limit, "_redis_client", None)
+    monkeypatch.setattr(redis_rate_limit, "_redis_available", False)
+    monkeypatch.setattr(redis_rate_limit, "_redis_retry_at", float("inf"))
+    limiter = RedisRateLimiter(requests_per_minute=2, requests_per_hour=100)
+
+    results = [await limiter.check_rate_limit(_request(), user_id="u1") for _ in range(3)]
+
+    assert [allowed for allowed, _, _ in results] == [True, True, False]
+    assert results[0][2] == {"remaining_minute": 1, "remaining_hour": 99, "fallback": True}
+    assert results[2][2]["limit"] == "minute"
+
+
+def test_memory_limiter_slides_and_evicts():
+    """Buckets expire as the window slides; idle and excess identifiers are evicted."""
+    now = [1000.0]
+    limiter = RateLimiter(requests_per_minute=3, requests_per_hour=100, max_keys=2, clock=lambda: now[0])
+
+    assert all(limiter.hit("a")[0] for _ in range(3))
+    allowed, _, meta = limiter.hit("a")
+    assert not allowed
+    assert meta == {"retry_after": 60, "limit": "minute"}
+
+    # The first bucket leaves the minute window after a minute
+    now[0] += 60
+    allowed, _, meta = limiter.hit("a")
+    assert allowed
+    assert meta["remaining_hour"] == 96
+
+    limiter.hit("b")
+    limiter.hit("c")
+    assert limiter.stats["keys"] == 2
+    assert limiter.stats["evictions"] == 1
+    assert limiter.stats["approx_bytes"] > 0
+
+    # Identifiers idle for longer than the hour window are swept
+    now[0] += 3601
+    limiter.hit("d")
+    assert limiter.stats["keys"] == 1
@@ -0,0 +1,119 @@
+"""
+Flow data sanitization tests.
+
+These tests verify sanitize_flow_data:
+- Keys are masked by field name and by format, without modifying the input
+- Results are cached per workflow version, and callers never share them
+"""
+import copy
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.schemas.workflow import WorkflowResponse
+from app.utils.security import clear_sanitized_flow_cache, sanitize_flow_data
+
+OPENAI_KEY = "sk-proj-" + "a1B2c3D4e5" * 3
+GENERIC_TOKEN = "tok" + "9x8y7z6w5v" * 4
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    clear_sanitized_flow_cache()
+    yield
+    clear_sanitized_flow_cache()
+
+
+def _flow(key: str = OPENAI_KEY) -> dict:
+    return {
+        "data": {
+            "nodes": [{
+                "id": "OpenAIModel-1",
+                "data": {
+                    "node": {
+                        "template": {
+                            "openai_api_key": "plain-secret-value",
+                            "api_key": "short",
+                            "system_message": {"value": f"Use {key} and {GENERIC_TOKEN} here"},
+                            "max_tokens": {"value": 256},
+                            "headers": ["x-api-key", key],
+                        },
+                    },
+                },
+            }],
+            "edges": [],
+        },
+    }
+
+
+def test_masks_without_modifying_input():
+    flow = _flow()
+    original = copy.deepcopy(flow)
+
+    sanitized = sanitize_flow_data(flow)
+
+    assert flow == original
+    template = sanitized["data"]["nodes"][0]["data"]["node"]["template"]
+    assert template["openai_api_key"] == "plai••••••••alue"
+    assert template["api_key"] == "short"
+    assert template["system_message"]["value"] == (
+        f"Use sk-•••••••• and {GENERIC_TOKEN[:4]}••••••••{GENERIC_TOKEN[-4:]} here"
+    )
+    assert template["max_tokens"] == {"value": 256}
+    assert template["headers"] == ["x-api-key", "sk-••••••••"]
+    # No containers are shared with the input
+    assert sanitized["data"]["edges"] is not flow["data"]["edges"]
+    assert template["max_tokens"] is not original["data"]["nodes"][0]["data"]["node"]["template"]["max_tokens"]
+
+
+def test_cached_per_workflow_version():
+    workflow_id = uuid.uuid4()
+    updated_at = datetime(2026, 10, 19, 12, 0)
+
+    first = sanitize_flow_data(_flow(), cache_key=(workflow_id, updated_at))
+    again = sanitize_flow_data(_flow(), cache_key=(workflow_id, updated_at))
+    assert again == first and again is not first
+
+    other_key = "sk-" + "Z9y8X7w6V5" * 3
+    edited = sanitize_flow_data(_flow(other_key), cache_key=(workflow_id, updated_at + timedelta(seconds=1)))
+    assert edited is not first
+    assert other_key not in str(edited)
+
+
+def test_workflow_response_uses_cache():
+    payload = {
+        "id": uuid.uuid4(),
+        "project_id": None,
+        "name": "Cached",
+        "description": None,
+        "langflow_flow_id": "flow-cached",
+        "flow_data": _flow(),
+        "agent_component_ids": None,
+        "is_active": True,
+        "is_public": False,
+        "created_at": datetime(2026, 10, 19),
+        "updated_at": datetime(2026, 10, 19),
+    }
+
+    first = WorkflowResponse.model_validate(payload)
+    second = WorkflowResponse.model_validate(payload)
+
+    assert OPENAI_KEY not in str(first.flow_data)
+    assert second.flow_data == first.flow_data
+
+
+def test_cached_result_is_not_shared():
+    """Modifying a returned result does not leak into the cache."""
+    cache_key = (uuid.uuid4(), datetime(2026, 10, 19))
+
+    first = sanitize_flow_data(_flow(), cache_key=cache_key)
+    first["data"]["nodes"][0]["data"]["node"]["template"]["max_tokens"]["value"] = 1
+    first["data"]["edges"].append({"id": "edited"})
+    second = sanitize_flow_data(_flow(), cache_key=cache_key)
+    second["data"]["nodes"].clear()
+    third = sanitize_flow_data(_flow(), cache_key=cache_key)
+
+    template = third["data"]["nodes"][0]["data"]["node"]["template"]
+    assert template["max_tokens"] == {"value": 256}
+    assert third["data"]["edges"] == []
@@ -0,0 +1,74 @@
+"""
+Stream admission tests.
+
+These tests verify concurrent generation caps:
+- Requests over a cap wait and are admitted when a slot frees up
+- Waits are bounded, and so is the queue
+- Plan caps per user and per embed token
+
+Uses no database.
+"""
+import asyncio
+
+import pytest
+
+from app.plans import get_plan
+from app.services.stream_admission import (
+    StreamAdmission,
+    StreamAdmissionError,
+    generation_caps,
+)
+
+
+@pytest.mark.asyncio
+async def test_over_cap_waits_for_release():
+    """A request over its cap is admitted as soon as a slot is released."""
+    admission = StreamAdmission(global_limit=10, max_queue=10, max_wait_seconds=5)
+    caps = {"user:1": 1}
+
+    await admission.acquire(caps)
+    waiting = asyncio.create_task(admission.acquire(caps))
+    await asyncio.sleep(0)
+    assert not waiting.done()
+    assert admission.stats["queue_depth"] == 1
+
+    # Other users are not held up by user 1's queue
+    async with admission.admit({"user:2": 1}):
+        assert admission.stats["in_flight"] == 2
+
+    admission.release(caps)
+    await asyncio.wait_for(waiting, timeout=1)
+    stats = admission.stats
+    assert stats["in_flight"] == 1
+    assert stats["queue_depth"] == 0
+    assert stats["admitted"] == 3
+    assert stats["queued"] == 1
+    assert stats["wait_p50_ms"] == 100
+
+
+@pytest.mark.asyncio
+async def test_wait_and_queue_are_bounded():
+    """Waiters time out, and a full queue rejects immediately."""
+    admission = StreamAdmission(global_limit=1, max_queue=1, max_wait_seconds=0.05)
+    await admission.acquire({})
+
+    waiting = asyncio.create_task(admission.acquire({"user:2": 5}))
+    await asyncio.sleep(0)
+    with pytest.raises(StreamAdmissionError):
+        await admission.acquire({"user:3": 5})
+    with pytest.raises(StreamAdmissionError) as exc_info:
+        await waiting
+    assert exc_info.value.retry_after == 1
+
+    stats = admission.stats
+    assert stats["rejected"] == 2
+    assert stats["queue_depth"] == 0
+    assert stats["in_flight"] == 1
+
+
+def test_generation_caps_follow_plan():
+    """Caps come from the plan; unlimited caps are omitted."""
+    free = get_plan("free")
+    assert generation_caps(free, user_id="u1") == {"user:u1": free.limits.concurrent_streams}
+    assert generation_caps(free, embed_token="tok") == {"embed:tok": free.limits.embed_concurrent_streams}
+    assert get_plan("individual").limits.concurrent_streams > free.limits.concurrent_streams
@@ -0,0 +1,183 @@
+"""
+Usage counter tests.
+
+These tests verify the incremental plan-limit counters:
+- Active agent/workflow gauges follow inserts, deactivation and deletes
+- track_usage feeds get_usage_summary and check_limit
+- Reconciliation repairs drifted counters, including gauges changed by
+  bulk statements the ORM events cannot see
+
+Uses SQLite in-memory database for isolation.
+"""
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, update
+
+from app.models.agent_component import AgentComponent
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.models.usage_counter import UsageCounter
+from app.models.user import User
+from app.models.workflow import Workflow
+from app.services.billing_service import BillingService
+from app.services.usage_counter_service import UsageCounterService, register_gauge_events
+
+
+@pytest_asyncio.fixture
+async def user(db_session):
+    """Create a user for usage records."""
+    user = User(clerk_id="user_usage_test", email="usage@example.com")
+    db_session.add(user)
+    await db_session.flush()
+    return user
+
+
+def _agent(user_id: str, name: str) -> AgentComponent:
+    return AgentComponent(
+        user_id=user_id,
+        name=name,
+        qa_who="A helpful assistant",
+        qa_rules="Be kind",
+        qa_tricks="None",
+        system_prompt="You are helpful.",
+    )
+
+
+@pytest.mark.asyncio
+async def test_gauges_follow_lifecycle(db_session, user):
+    """Creating, deactivating and deleting rows adjusts active counts."""
+    user_id = str(user.id)
+    first, second = _agent(user_id, "First"), _agent(user_id, "Second")
+    workflow = Workflow(user_id=user_id, name="Flow", langflow_flow_id="flow-1")
+    db_session.add_all([first, second, workflow])
+    await db_session.flush()
+
+    counters = UsageCounterService(db_session)
+    usage = await counters.get_usage(user_id)
+    assert usage["agents_created"] == 2
+    assert usage["workflows_created"] == 1
+
+    second.is_active = False
+    await db_session.flush()
+    await db_session.delete(workflow)
+    await db_session.flush()
+    # Deleting an inactive row must not decrement again
+    await db_session.delete(second)
+    await db_session.flush()
+
+    usage = await counters.get_usage(user_id)
+    assert usage["agents_created"] == 1
+    assert usage["workflows_created"] == 0
+
+
+@pytest.mark.asyncio
+async def test_track_usage_feeds_limits(db_session, user):
+    """Tracked messages show up in the summary and credit balance."""
+    billing = BillingService(db_session)
+    await billing.track_usage(str(user.id), "messages_sent", 2)
+    await billing.track_usage(str(user.id), "messages_sent", 2)
+    await billing.track_usage(str(user.id), "llm_tokens", 40)
+
+    usage = await billing.get_usage_summary(str(user.id))
+    assert usage["messages_sent"] == 4
+    assert usage["llm_tokens"] == 40
+
+    # The credit balance is seeded from messages rows, not from the counters
+    balance = await billing.get_credit_balance(str(user.id))
+    assert balance["credits_used"] == 0
+
+    within, current, _ = await billing.check_limit(str(user.id), "agents")
+    assert within and current == 0
+
+
+@pytest.mark.asyncio
+async def test_reconcile_repairs_drift(db_session, user):
+    """Reconciliation overwrites counters with counts from raw rows."""
+    user_id = str(user.id)
+    conversation = Conversation(user_id=user_id, langflow_session_id="s-1")
+    db_session.add(conversation)
+    await db_session.flush()
+    for text in ("hello", "hi there"):
+        db_session.add(Message(
+            conversation_id=str(conversation.id),
+            role="user",
+            content=text,
+            created_at=datetime.utcnow(),
+        ))
+    db_session.add(_agent(user_id, "Agent"))
+    await db_session.flush()
+
+    counters = UsageCounterService(db_session)
+    await counters.increment(user_id, "messages_sent", 50)
+    await counters.increment(user_id, "agents_created", 3)
+
+    await counters.reconcile()
+    usage = await counters.get_usage(user_id)
+
+    assert usage["messages_sent"] == 2
+    assert usage["llm_tokens"] == len("hellohi there") // 4
+    assert usage["agents_created"] == 1
+    # One row per metric: no duplicates from the earlier increments
+    rows = (await db_session.execute(
+        select(UsageCounter.metric).where(UsageCounter.user_id == user_id)
+    )).scalars().all()
+    assert sorted(rows) == ["agents_created", "llm_tokens", "messages_sent"]
+
+
+@pytest.mark.asyncio
+async def test_reconcile_gauges_after_bulk_update(db_session, user):
+    """Bulk deactivation skips the events; the gauge recompute catches up."""
+    user_id = str(user.id)
+    # Registering again (e.g. a second startup) must not double count
+    register_gauge_events()
+    db_session.add_all([_agent(user_id, "One"), _agent(user_id, "Two")])
+    db_session.add(Workflow(user_id=user_id, name="Flow", langflow_flow_id="flow-bulk"))
+    await db_session.flush()
+
+    counters = UsageCounterService(db_session)
+    await counters.increment(user_id, "messages_sent", 5)
+    assert (await counters.get_usage(user_id))["agents_created"] == 2
+
+    await db_session.execute(
+        update(AgentComponent).where(AgentComponent.user_id == user_id).values(is_active=False)
+    )
+    assert (await counters.get_usage(user_id))["agents_created"] == 2
+
+    await counters.reconcile_gauges()
+    usage = await counters.get_usage(user_id)
+
+    assert usage["agents_created"] == 0
+    assert usage["workflows_created"] == 1
+    # Monthly counters are left alone
+    assert usage["messages_sent"] == 5
+
+
+@pytest.mark.asyncio
+async def test_reconcile_gauges_writes_changed_rows_only(db_session, user):
+    """Counters that already match the recount are not rewritten."""
+    user_id = str(user.id)
+    db_session.add(_agent(user_id, "Agent"))
+    db_session.add(Workflow(user_id=user_id, name="Flow", langflow_flow_id="flow-diff"))
+    await db_session.flush()
+    await db_session.execute(
+        update(UsageCounter)
+        .where(UsageCounter.user_id == user_id)
+        .values(updated_at=datetime(2026, 1, 1))
+    )
+    # Drift: a bulk deactivation the events did not see
+    await db_session.execute(
+        update(Workflow).where(Workflow.user_id == user_id).values(is_active=False)
+    )
+
+    await UsageCounterService(db_session).reconcile_gauges()
+
+    rows = dict((await db_session.execute(
+        select(UsageCounter.metric, UsageCounter.updated_at).where(UsageCounter.user_id == user_id)
+    )).all())
+    assert rows["agents_created"] == datetime(2026, 1, 1)
+    assert rows["workflows_created"] > datetime(2026, 1, 1)
+    usage = await UsageCounterService(db_session).get_usage(user_id)
+    assert usage["agents_created"] == 1
+    assert usage["workflows_created"] == 0
@@ -0,0 +1,110 @@
+"""
+Identity cache tests.
+
+These tests verify get_or_create_from_clerk caching:
+- First resolution creates the user once (upsert)
+- Warm resolutions issue no queries and return a session-attached user
+- Updating a user drops its cached identity
+- MCP bridge token lookups (including misses) follow token rotation
+
+Uses SQLite in-memory database for isolation.
+"""
+import pytest
+from sqlalchemy import event, func, select
+
+from app.middleware.clerk_auth import ClerkUser
+from app.models.user import User
+from app.services.user_service import UserService
+from tests.conftest import test_engine
+
+
+def _clerk_user() -> ClerkUser:
+    return ClerkUser(
+        user_id="user_identity_cache",
+        session_id=None,
+        email="identity@example.com",
+        authorized_party=None,
+        expires_at=None,
+        issued_at=None,
+    )
+
+
+@pytest.mark.asyncio
+async def test_warm_identity_skips_database(db_session):
+    """After the first request, resolving the user needs no queries."""
+    from tests.conftest import test_session_maker
+
+    user = await UserService(db_session).get_or_create_from_clerk(_clerk_user())
+    again = await UserService(db_session).get_or_create_from_clerk(_clerk_user())
+    assert again is user
+    await db_session.commit()
+    user_id = str(user.id)
+
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", count_statement)
+    try:
+        async with test_session_maker() as session:
+            cached = await UserService(session).get_or_create_from_clerk(_clerk_user())
+            cached_id, cached_email = str(cached.id), cached.email
+            attached = cached in session
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", count_statement)
+
+    assert statements == []
+    assert cached_id == user_id
+    assert cached_email == "identity@example.com"
+    assert attached
+
+    count = await db_session.scalar(select(func.count(User.id)))
+    assert count == 1
+
+
+@pytest.mark.asyncio
+async def test_user_update_invalidates_identity(db_session):
+    """Changes to a cached user are visible to the next request."""
+    from tests.conftest import test_session_maker
+
+    user = await UserService(db_session).get_or_create_from_clerk(_clerk_user())
+    await db_session.commit()
+
+    async with test_session_maker() as session:
+        cached = await UserService(session).get_or_create_from_clerk(_clerk_user())
+        cached.first_name = "Charlie"
+        await session.commit()
+
+    async with test_session_maker() as session:
+        fresh = await UserService(session).get_or_create_from_clerk(_clerk_user())
+        assert fresh.first_name == "Charlie"
+        assert str(fresh.id) == str(user.id)
+
+
+@pytest.mark.asyncio
+async def test_mcp_token_rotation_invalidates_lookups(db_session):
+    """Cached hits and misses are dropped when a bridge token is rotated."""
+    from tests.conftest import test_session_maker
+
+    user = await UserService(db_session).get_or_create_from_clerk(_clerk_user())
+    user.mcp_bridge_token = "old-token"
+    await db_session.commit()
+
+    async with test_session_maker() as session:
+        service = UserService(session)
+        assert await service.get_by_mcp_bridge_token("old-token") is not None
+        # Unknown token is cached as a miss
+        assert await service.get_by_mcp_bridge_token("new-token") is None
+
+    async with test_session_maker() as session:
+        cached = await UserService(session).get_by_mcp_bridge_token("old-token")
+        cached.mcp_bridge_token = "new-token"
+        await session.commit()
+
+    async with test_session_maker() as session:
+        service = UserService(session)
+        assert await service.get_by_mcp_bridge_token("old-token") is None
+        rotated = await service.get_by_mcp_bridge_token("new-token")
+        assert rotated is not None
+        assert str(rotated.id) == str(user.id)
@@ -0,0 +1,120 @@
+"""
+Workflow agent link tests.
+
+These tests verify the workflow_agent_components link table:
+- Links follow Workflow.agent_component_ids on insert, update and delete
+- Ids of agents that don't exist are not linked
+- An agent and a workflow created in one unit of work are linked
+- get_linked_workflows finds active workflows through the links
+
+Uses SQLite in-memory database for isolation.
+"""
+import uuid
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+
+from app.models.agent_component import AgentComponent
+from app.models.user import User
+from app.models.workflow import Workflow
+from app.models.workflow_agent_component import WorkflowAgentComponent
+from app.services.agent_component_service import AgentComponentService
+from app.services.langflow_client import langflow_client
+from app.services.workflow_service import WorkflowService
+
+
+@pytest_asyncio.fixture
+async def agents(db_session):
+    """A user with two agent components."""
+    user = User(clerk_id="user_links_test", email="links@example.com")
+    db_session.add(user)
+    await db_session.flush()
+    agents = [_agent(str(user.id), name) for name in ("First", "Second")]
+    db_session.add_all(agents)
+    await db_session.flush()
+    return agents
+
+
+def _agent(user_id: str, name: str, **kwargs) -> AgentComponent:
+    return AgentComponent(
+        user_id=user_id,
+        name=name,
+        qa_who="A helpful assistant",
+        qa_rules="Be kind",
+        qa_tricks="None",
+        system_prompt="You are helpful.",
+        **kwargs,
+    )
+
+
+def _workflow(user_id: str, component_ids: list) -> Workflow:
+    return Workflow(
+        user_id=user_id,
+        name="Linked",
+        langflow_flow_id="flow-links",
+        agent_component_ids=component_ids,
+    )
+
+
+async def _links(session, workflow: Workflow) -> set:
+    result = await session.execute(
+        select(WorkflowAgentComponent.agent_component_id).where(
+            WorkflowAgentComponent.workflow_id == str(workflow.id)
+        )
+    )
+    return set(result.scalars().all())
+
+
+@pytest.mark.asyncio
+async def test_links_follow_agent_component_ids(db_session, agents, monkeypatch):
+    async def delete_flow(flow_id):
+        return True
+
+    monkeypatch.setattr(langflow_client, "delete_flow", delete_flow)
+    service = WorkflowService(db_session)
+    first, second = (str(a.id) for a in agents)
+    workflow = _workflow(agents[0].user_id, [first, "deleted-agent-id"])
+    db_session.add(workflow)
+    await db_session.flush()
+    await service.sync_agent_links(workflow)
+    assert await _links(db_session, workflow) == {first}
+
+    for component_ids in ([first, second], [second]):
+        workflow.agent_component_ids = component_ids
+        await db_session.flush()
+        await service.sync_agent_links(workflow)
+        assert await _links(db_session, workflow) == set(component_ids)
+
+    await service.delete(workflow)
+    assert await _links(db_session, workflow) == set()
+
+
+@pytest.mark.asyncio
+async def test_agent_and_workflow_in_one_unit_of_work(db_session, agents):
+    """The link is written after the flush that inserts both rows."""
+    agent = _agent(agents[0].user_id, "New", id=str(uuid.uuid4()))
+    workflow = _workflow(agents[0].user_id, [agent.id])
+    # Workflow first: the flush may insert it before the agent
+    db_session.add_all([workflow, agent])
+    await db_session.flush()
+    await WorkflowService(db_session).sync_agent_links(workflow)
+
+    assert await _links(db_session, workflow) == {agent.id}
+
+
+@pytest.mark.asyncio
+async def test_get_linked_workflows(db_session, agents):
+    first, second = (str(a.id) for a in agents)
+    both = _workflow(agents[0].user_id, [first, second])
+    only_second = _workflow(agents[0].user_id, [second])
+    inactive = _workflow(agents[0].user_id, [first])
+    inactive.is_active = False
+    db_session.add_all([both, only_second, inactive])
+    await db_session.flush()
+    for workflow in (both, only_second, inactive):
+        await WorkflowService(db_session).sync_agent_links(workflow)
+
+    service = AgentComponentService(db_session)
+    assert {w.id for w in await service.get_linked_workflows(first)} == {both.id}
+    assert {w.id for w in await service.get_linked_workflows(second)} == {both.id, only_second.id}
@@ -0,0 +1,110 @@
+"""
+Workflow run metrics tests.
+
+These tests verify:
+- Histogram percentile estimates
+- The in-memory aggregator flushes merged per-workflow per-day rows
+- A batch whose commit fails is kept for the next flush
+- Dashboard workflow stats report p50/p95 from flushed metrics
+
+Uses SQLite in-memory database for isolation.
+"""
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+
+from app.models.analytics_daily import AnalyticsDaily
+from app.models.user import User
+from app.models.workflow import Workflow
+from app.models.workflow_metrics_daily import WorkflowMetricsDaily
+from app.services.analytics_service import AnalyticsService
+from app.services.workflow_metrics import (
+    WorkflowMetricsAggregator,
+    empty_histogram,
+    histogram_percentile,
+)
+
+
+@pytest_asyncio.fixture
+async def workflow(db_session):
+    """Create a user with one workflow."""
+    user = User(clerk_id="user_metrics_test", email="metrics@example.com")
+    db_session.add(user)
+    await db_session.flush()
+    workflow = Workflow(user_id=str(user.id), name="Support Bot", langflow_flow_id="flow-1")
+    db_session.add(workflow)
+    await db_session.flush()
+    return workflow
+
+
+def test_histogram_percentile():
+    """Percentiles resolve to bucket upper bounds."""
+    histogram = empty_histogram()
+    histogram[0] = 90   # <= 100ms
+    histogram[4] = 10   # <= 2000ms
+    assert histogram_percentile(histogram, 50) == 100
+    assert histogram_percentile(histogram, 95) == 2000
+    assert histogram_percentile(empty_histogram(), 50) is None
+
+
+@pytest.mark.asyncio
+async def test_flush_merges_runs(db_session, workflow):
+    """Two flushes accumulate into one row per workflow per day."""
+    user_id, workflow_id = str(workflow.user_id), str(workflow.id)
+    aggregator = WorkflowMetricsAggregator()
+
+    aggregator.record(user_id, workflow_id, latency_ms=80, ttft_ms=40, tokens=10)
+    aggregator.record(user_id, workflow_id, latency_ms=1500, ttft_ms=300, tokens=20)
+    assert await aggregator.flush(db_session) == 1
+    assert aggregator.pending == 0
+
+    aggregator.record(user_id, workflow_id, latency_ms=3000, error=True)
+    await aggregator.flush(db_session)
+
+    row = (await db_session.execute(select(WorkflowMetricsDaily))).scalar_one()
+    assert row.runs == 3
+    assert row.errors == 1
+    assert row.tokens == 30
+    assert row.ttft_count == 2
+    assert sum(row.latency_histogram) == 3
+
+    daily = (await db_session.execute(
+        select(AnalyticsDaily).where(AnalyticsDaily.user_id == user_id)
+    )).scalar_one()
+    assert daily.workflows_executed == 3
+    assert daily.error_count == 1
+    assert daily.avg_response_time_ms == (80 + 1500 + 3000) // 3
+
+
+@pytest.mark.asyncio
+async def test_failed_commit_keeps_batch(db_session, workflow, monkeypatch):
+    """Metrics are not lost when the flush commit raises."""
+    aggregator = WorkflowMetricsAggregator()
+    aggregator.record(str(workflow.user_id), str(workflow.id), latency_ms=80)
+
+    async def failing_commit():
+        raise RuntimeError("connection lost")
+
+    monkeypatch.setattr(db_session, "commit", failing_commit)
+    with pytest.raises(RuntimeError):
+        await aggregator.flush(db_session, commit=True)
+    assert aggregator.pending == 1
+
+
+@pytest.mark.asyncio
+async def test_dashboard_reports_latency_percentiles(db_session, workflow):
+    """Workflow stats include run counts and latency percentiles."""
+    aggregator = WorkflowMetricsAggregator()
+    for _ in range(19):
+        aggregator.record(str(workflow.user_id), str(workflow.id), latency_ms=400, ttft_ms=90)
+    aggregator.record(str(workflow.user_id), str(workflow.id), latency_ms=9000, ttft_ms=900, error=True)
+    await aggregator.flush(db_session)
+
+    stats = await AnalyticsService(db_session).get_dashboard_stats(str(workflow.user_id), days=7)
+    workflow_stats = stats["agent_stats"][0]
+
+    assert workflow_stats["runs"] == 20
+    assert workflow_stats["error_rate"] == 5.0
+    assert workflow_stats["p50_latency_ms"] == 500
+    assert workflow_stats["p95_latency_ms"] == 500
+    assert workflow_stats["p50_ttft_ms"] == 100
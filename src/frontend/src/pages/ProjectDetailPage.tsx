@@ -597,7 +597,7 @@ function AgentRow({
             Live
           </span>
         )}
-        {agent.advanced_config?.channel_preferences?.map((ch) => (
+        {(agent.channel_preferences ?? agent.advanced_config?.channel_preferences)?.map((ch) => (
           <span key={ch} className="px-1.5 py-0.5 rounded text-[10px] font-medium bg-gray-100 dark:bg-neutral-800 text-gray-500 dark:text-neutral-400 flex-shrink-0">
             {ch}
           </span>
@@ -685,6 +685,7 @@ function AgentCard({
   const [menuOpen, setMenuOpen] = useState(false)
   const gradientColor = getGradientColor(colorIndex)
   const isLive = agent.is_published
+  const channelPreferences = agent.channel_preferences ?? agent.advanced_config?.channel_preferences
 
   return (
     <div className={`${isLive ? 'bg-gradient-to-br from-violet-50 via-white to-purple-50 dark:from-violet-950/30 dark:via-neutral-800 dark:to-purple-950/30 border-violet-400 dark:border-violet-600' : 'bg-white dark:bg-neutral-800 border-gray-200 dark:border-neutral-700'} border rounded-lg p-4 hover:shadow-md dark:hover:shadow-gray-900/50 transition-all group`}>
@@ -768,9 +769,9 @@ function AgentCard({
         <h3 className="font-medium text-gray-900 dark:text-white mb-1 truncate hover:text-gray-600 dark:hover:text-neutral-300">
           {agent.name}
         </h3>
-        {agent.advanced_config?.channel_preferences && agent.advanced_config.channel_preferences.length > 0 && (
+        {channelPreferences && channelPreferences.length > 0 && (
           <div className="flex flex-wrap gap-1 mb-1">
-            {agent.advanced_config.channel_preferences.map((ch) => (
+            {channelPreferences.map((ch) => (
               <span key={ch} className="px-1.5 py-0.5 rounded text-[10px] font-medium bg-gray-100 dark:bg-neutral-800 text-gray-500 dark:text-neutral-400">
                 {ch}
               </span>
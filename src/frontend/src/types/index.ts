@@ -286,6 +286,8 @@ export interface AgentComponent {
   knowledge_source_ids?: string[]
   system_prompt: string
   advanced_config?: AgentComponentAdvancedConfig
+  // Set on list responses, which leave out advanced_config and the prompt fields
+  channel_preferences?: string[]
   component_file_path?: string
   component_class_name?: string
   is_published: boolean